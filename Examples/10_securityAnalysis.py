@@ -9,9 +9,8 @@ from ibapi.contract import Contract, ContractDetails
 from ibapi.order import Order
 from ibapi.order_state import OrderState
 from ibapi.execution import Execution, ExecutionFilter
-from ibapi.common import BarData
+from ibapi.columnar import toDataFrame
 
-from dataclasses import dataclass, fields, astuple
 import pandas as pd
 
 import threading, logging, time
@@ -21,18 +20,6 @@ logging.basicConfig(level=logging.INFO,
 
 #######################################
 
-@dataclass
-class BarDataNew:
-
-    date: str = ''
-    open: float = 0.0
-    high: float = 0.0
-    low: float = 0.0
-    close: float = 0.0
-    volume: int = 0
-    average: float = 0.0
-    barCount: int = 0
-
 class AlphaApp(EWrapper, EClient):
 
     def __init__(self):
@@ -40,6 +27,9 @@ class AlphaApp(EWrapper, EClient):
         self.logger = logging.getLogger(__name__)
         EClient.__init__(self, wrapper=self)
 
+        # All the bars of a request in one numpy array (needs numpy):
+        self.setColumnarBars(True)
+
     ###########################################################
 
     def error(self, reqId: int, errorCode: int, errorString: str):
@@ -112,12 +102,12 @@ class AlphaApp(EWrapper, EClient):
 
         self.logger.info(f'reqId: {reqId} / account: {account} / tag: {tag} / value: {value} / currency: {currency}')
 
-    def historicalData(self, reqId: int, 
-                             bar: BarData):
+    def historicalDataBatch(self, reqId: int, 
+                                  bars):
 
-        '''Returns the requested historical data bars.
+        '''Returns all the requested historical data bars at once, as a
+        numpy array with the columns:
 
-            reqId - the request's identifier
             date  - the bar's date and time (either as a yyyymmss hh:mm:ssformatted
                 string or as system time according to the request)
             open  - the bar's open point
@@ -125,14 +115,13 @@ class AlphaApp(EWrapper, EClient):
             low   - the bar's low point
             close - the bar's closing point
             volume - the bar's traded volume if available
-            count - the number of trades during the bar's timespan (only available
-                for TRADES).
-            WAP -   the bar's Weighted Average Price
-            hasGaps  -indicates if the data has gaps or not.'''
+            average - the bar's Weighted Average Price
+            barCount - the number of trades during the bar's timespan (only available
+                for TRADES).'''
 
-        self.logger.info(f'reqId: {reqId} / bar: {bar}')
+        self.logger.info(f'reqId: {reqId} / bars: {len(bars)}')
 
-        self.historicalDataContainer.append(BarDataNew(**bar.__dict__))
+        self.historicalDataContainer = toDataFrame(bars, index='date')
 
     def historicalDataEnd(self, reqId:int, 
                                 start:str, 
@@ -143,23 +132,12 @@ class AlphaApp(EWrapper, EClient):
         self.logger.info(f'reqId: {reqId} / start: {start} / end: {end}')
 
         # Print the data:
-        df = self._convertDataToDataFrame(self.historicalDataContainer)
+        df = self.historicalDataContainer
         self.logger.info(df)
 
         # Make some calculations:
         self.makeSomeCalculations(df)
 
-    def _convertDataToDataFrame(self, data: list) -> pd.DataFrame:
-
-        dataContainerList = data
-        dataStructure = dataContainerList[0]
-
-        df = pd.DataFrame.from_records(astuple(o) for o in dataContainerList)
-        df.columns = [field.name for field in fields(dataStructure)]
-        df = df.set_index('date', drop=True)
-
-        return df
-
     def makeSomeCalculations(self, df: pd.DataFrame):
 
         # Calculate returns based on the close:
@@ -199,7 +177,7 @@ class AlphaApp(EWrapper, EClient):
         # Request contract data:
         nvidiaStock = self.createUSStockContract('NVDA', primaryExchange='NASDAQ')
 
-        self.historicalDataContainer = []
+        self.historicalDataContainer = None
         self.reqHistoricalData(reqId=self.getNextValidId(), 
                                contract=nvidiaStock,
                                endDateTime='20200903 18:00:00',
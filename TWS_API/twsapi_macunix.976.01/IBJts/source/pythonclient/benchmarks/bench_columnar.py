@@ -0,0 +1,99 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+
+"""
+Measures the decoding of reqHistoricalTicks() pages and reqHistoricalData()
+answers, one HistoricalTick* or BarData object per tick or bar (the default)
+vs the numpy arrays of the columnar mode (EClient.setColumnarTicks(True) and
+setColumnarBars(True), see columnar.py). The wrapper keeps the ticks and
+bars, as a download would.
+
+    python benchmarks/bench_columnar.py --page 1000 --pages 200
+"""
+
+import os
+import sys
+import timeit
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ibapi import comm
+from ibapi.decoder import Decoder
+from ibapi.wrapper import EWrapper
+from ibapi.message import IN
+from ibapi.server_versions import MAX_CLIENT_VER
+
+
+def make_fields(*vals):
+    return comm.read_fields("".join(comm.make_field(val) for val in vals))
+
+
+def make_page(msgId, nTicks):
+    vals = [msgId, 1001, nTicks]
+    if msgId == IN.HISTORICAL_DATA:
+        vals[2:] = ["20191010 10:00:00", "20191011 10:00:00", nTicks]
+    for i in range(nTicks):
+        price = 100. + (i % 100) * .01
+        if msgId == IN.HISTORICAL_DATA:
+            vals += ["20191010 %02d:%02d:00" % (i // 60 % 24, i % 60), price,
+                     price + .5, price - .5, price + .1, 1000 + i, price, 10]
+        elif msgId == IN.HISTORICAL_TICKS:
+            vals += [1570000000 + i, 0, price, 100 + i % 10]
+        elif msgId == IN.HISTORICAL_TICKS_BID_ASK:
+            vals += [1570000000 + i, i & 3, price, price + .01, 100, 200]
+        else:
+            vals += [1570000000 + i, i & 3, price, 100 + i % 10,
+                     ("ISLAND", "ARCA", "NYSE")[i % 3], ""]
+    if msgId != IN.HISTORICAL_DATA:
+        vals.append(1)
+    return make_fields(*vals)
+
+
+class KeepingWrapper(EWrapper):
+    def __init__(self):
+        self.pages = []
+
+    def keep(self, reqId, ticks, done=False):
+        self.pages.append(ticks)
+
+    historicalTicks = historicalTicksBidAsk = historicalTicksLast = keep
+    historicalTicksArray = historicalTicksBidAskArray = keep
+    historicalTicksLastArray = keep
+    historicalData = historicalDataBatch = keep
+
+
+def main():
+    cmdLineParser = argparse.ArgumentParser("columnar decoding benchmark")
+    cmdLineParser.add_argument("--page", action="store", type=int,
+        dest="page", default=1000, help="ticks per msg")
+    cmdLineParser.add_argument("--pages", action="store", type=int,
+        dest="pages", default=200, help="msgs per timing")
+    args = cmdLineParser.parse_args()
+
+    nTicks = args.page * args.pages
+    print("%-24s %14s %14s %8s" % ("ticks or bars/s", "objects", "columnar",
+                                   "speedup"))
+    for (title, msgId) in (("HISTORICAL_TICKS", IN.HISTORICAL_TICKS),
+                           ("HISTORICAL_TICKS_BID_ASK", IN.HISTORICAL_TICKS_BID_ASK),
+                           ("HISTORICAL_TICKS_LAST", IN.HISTORICAL_TICKS_LAST),
+                           ("HISTORICAL_DATA", IN.HISTORICAL_DATA)):
+        fields = make_page(msgId, args.page)
+        rates = []
+        for columnar in (False, True):
+            def download():
+                decoder = Decoder(KeepingWrapper(), MAX_CLIENT_VER,
+                                  columnarTicks=columnar, columnarBars=columnar)
+                for _ in range(args.pages):
+                    decoder.interpret(fields)
+            best = min(timeit.repeat(download, number=1, repeat=3))
+            rates.append(nTicks / best)
+        print("%-24s %14.0f %14.0f %7.1fx" % (title, rates[0], rates[1],
+                                              rates[1] / rates[0]))
+
+
+if "__main__" == __name__:
+    main()
@@ -0,0 +1,116 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+
+"""
+Measures contract_cache.ContractResolver on --contracts instruments, each
+answered by faketws.FakeTws with one CONTRACT_DATA per exchange: a cold
+start (every contract requested, the pacing made loose enough not to be
+what is measured), a warm start from the cache file saved by the cold one,
+and the lookups of the contracts cached.
+
+    python benchmarks/bench_contract_cache.py --contracts 5000
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ibapi import faketws
+from ibapi.contract_cache import ContractCache, ContractResolver
+from ibapi.async_client import AsyncEClient
+from ibapi.wrapper import EWrapper
+from ibapi.contract import Contract, ContractDetails
+from ibapi.message import IN, OUT
+
+
+EXCHANGES = ("SMART", "ISLAND", "ARCA")
+
+
+def make_details(conId, symbol, exchange):
+    details = ContractDetails()
+    contract = details.contract
+    (contract.conId, contract.symbol, contract.secType) = (conId, symbol, "STK")
+    (contract.exchange, contract.primaryExchange) = (exchange, "NASDAQ")
+    (contract.currency, contract.localSymbol) = ("USD", symbol)
+    details.longName = symbol + " Inc"
+    details.validExchanges = ",".join(EXCHANGES)
+    details.tradingHours = "20191010:0930-20191010:1600;" * 7
+    return details
+
+
+def symbol_of(i):
+    return "S%05d" % i
+
+
+def make_contract(i):
+    contract = Contract()
+    (contract.symbol, contract.secType) = (symbol_of(i), "STK")
+    contract.currency = "USD"
+    return contract
+
+
+def handle_contract_data(session, fields):
+    reqId = int(fields[2])
+    symbol = fields[4].decode()
+    conId = 100000 + int(symbol[1:])
+    session.send(b"".join(faketws.contractDataFrame(reqId,
+        make_details(conId, symbol, exchange)) for exchange in EXCHANGES)
+        + faketws.makeFrame(IN.CONTRACT_DATA_END, 1, reqId))
+
+
+async def resolve_all(port, cache, contracts):
+    client = AsyncEClient(EWrapper())
+    await client.connect("127.0.0.1", port, 0)
+    resolver = ContractResolver(client, cache, maxRequestsPerSec=1000000)
+    try:
+        t0 = time.perf_counter()
+        await resolver.resolveMany(contracts)
+        return time.perf_counter() - t0
+    finally:
+        client.disconnect()
+        await asyncio.sleep(0.01)
+
+
+def main():
+    cmdLineParser = argparse.ArgumentParser("contract cache benchmark")
+    cmdLineParser.add_argument("--contracts", action="store", type=int,
+        dest="contracts", default=5000, help="number of contracts resolved")
+    args = cmdLineParser.parse_args()
+
+    contracts = [make_contract(i) for i in range(args.contracts)]
+    with tempfile.TemporaryDirectory() as directory, faketws.FakeTws() as tws:
+        tws.onRequest(OUT.REQ_CONTRACT_DATA, handle_contract_data)
+        path = os.path.join(directory, "contracts.pickle")
+
+        print("%-28s %12s %12s" % ("", "ms", "us/contract"))
+        def report(title, seconds):
+            print("%-28s %12.1f %12.2f" % (title, seconds * 1000,
+                                           seconds * 1e6 / args.contracts))
+
+        cache = ContractCache(path)
+        report("cold start", asyncio.run(resolve_all(tws.port, cache, contracts)))
+        t0 = time.perf_counter()
+        cache.save()
+        report("save", time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        cache = ContractCache(path)
+        report("load", time.perf_counter() - t0)
+        report("warm start", asyncio.run(resolve_all(tws.port, cache, contracts)))
+
+        t0 = time.perf_counter()
+        for i in range(args.contracts):
+            cache.lookup(symbol_of(i), "STK", "SMART", "USD")
+        report("lookup()", time.perf_counter() - t0)
+
+
+if "__main__" == __name__:
+    main()
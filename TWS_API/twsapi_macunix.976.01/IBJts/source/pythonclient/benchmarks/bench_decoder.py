@@ -0,0 +1,170 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+
+"""
+Measures Decoder.interpret() for the high volume msgs, generic decoding vs
+the handlers specialized by fastdecoder, and the msgs decoded from the
+EWrapper method signatures, per-msg signature walk (as it was, kept here as
+the reference) vs the converters compiled by Decoder.discoverParams().
+The wrapper does nothing so that only the decoding is timed.
+
+    python benchmarks/bench_decoder.py
+"""
+
+import os
+import sys
+import timeit
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ibapi import comm
+from ibapi.decoder import Decoder
+from ibapi.wrapper import EWrapper
+from ibapi.message import IN
+from ibapi.server_versions import MAX_CLIENT_VER
+
+
+logger = logging.getLogger("ibapi.decoder")
+
+
+def make_fields(*vals):
+    return comm.read_fields("".join(comm.make_field(val) for val in vals))
+
+
+def make_bars(nBars):
+    bars = []
+    for i in range(nBars):
+        bars += ["20191010 10:%02d:00" % (i % 60), 1.5, 2.5, 1., 2., 1000, 1.75, 10]
+    return bars
+
+
+MSGS = {
+    "TICK_PRICE": make_fields(IN.TICK_PRICE, 6, 1001, 1, 123.45, 300, 3),
+    "TICK_SIZE": make_fields(IN.TICK_SIZE, 6, 1001, 8, 12345),
+    "TICK_BY_TICK Last": make_fields(IN.TICK_BY_TICK, 1001, 1, 1570000000,
+                                     123.4, 100, 2, "ISLAND", "@ T"),
+    "TICK_BY_TICK BidAsk": make_fields(IN.TICK_BY_TICK, 1001, 3, 1570000000,
+                                       123.4, 123.5, 100, 200, 1),
+    "MARKET_DEPTH_L2": make_fields(IN.MARKET_DEPTH_L2, 1, 1001, 0, "NSDQ", 1,
+                                   1, 123.4, 500, 1),
+    "HISTORICAL_DATA x100": make_fields(IN.HISTORICAL_DATA, 1001,
+                                        "20191010 10:00:00", "20191011 10:00:00",
+                                        100, *make_bars(100)),
+}
+
+
+SIGNATURE_MSGS = {
+    "TICK_SIZE": make_fields(IN.TICK_SIZE, 6, 1001, 8, 12345),
+    "TICK_GENERIC": make_fields(IN.TICK_GENERIC, 6, 1001, 49, 0.5),
+    "TICK_STRING": make_fields(IN.TICK_STRING, 6, 1001, 45, "1570000000"),
+    "ACCT_VALUE": make_fields(IN.ACCT_VALUE, 2, "NetLiquidation", "1000.5",
+                              "USD", "DU123"),
+    "ACCOUNT_SUMMARY": make_fields(IN.ACCOUNT_SUMMARY, 1, 7, "DU123",
+                                   "NetLiquidation", "1000.5", "USD"),
+}
+
+
+def legacy_interpret_with_signature(decoder, fields, handleInfo):
+    """ Decoder.interpretWithSignature() as it was """
+    nIgnoreFields = 2
+    if len(fields) - nIgnoreFields != len(handleInfo.wrapperParams) - 1:
+        return
+
+    fieldIdx = nIgnoreFields
+    args = []
+    for (pname, param) in handleInfo.wrapperParams.items():
+        if pname != "self":
+            logger.debug("field %s ", fields[fieldIdx])
+            try:
+                arg = fields[fieldIdx].decode('UTF-8')
+            except UnicodeDecodeError:
+                arg = fields[fieldIdx].decode('latin-1')
+            logger.debug("arg %s type %s", arg, param.annotation)
+            if param.annotation is int:
+                arg = int(arg)
+            elif param.annotation is float:
+                arg = float(arg)
+
+            args.append(arg)
+            fieldIdx += 1
+
+    method = getattr(decoder.wrapper, handleInfo.wrapperMeth.__name__)
+    logger.debug("calling %s with %s %s", method, decoder.wrapper, args)
+    method(*args)
+
+
+class LegacySignatureDecoder(Decoder):
+    def interpretWithSignature(self, fields, handleInfo):
+        legacy_interpret_with_signature(self, fields, handleInfo)
+
+
+class NullWrapper(EWrapper):
+    def tickPrice(self, *args):
+        pass
+
+    def tickSize(self, *args):
+        pass
+
+    def tickByTickAllLast(self, *args):
+        pass
+
+    def tickByTickBidAsk(self, *args):
+        pass
+
+    def updateMktDepthL2(self, *args):
+        pass
+
+    def historicalData(self, *args):
+        pass
+
+    def historicalDataEnd(self, *args):
+        pass
+
+    def tickGeneric(self, *args):
+        pass
+
+    def tickString(self, *args):
+        pass
+
+    def updateAccountValue(self, *args):
+        pass
+
+    def accountSummary(self, *args):
+        pass
+
+
+def msgs_per_sec(decoder, fields, number):
+    elapsed = min(timeit.repeat(lambda: decoder.interpret(fields),
+                                number=number, repeat=3))
+    return number / elapsed
+
+
+def main():
+    fastDecoder = Decoder(NullWrapper(), MAX_CLIENT_VER)
+    slowDecoder = Decoder(NullWrapper(), MAX_CLIENT_VER)
+    slowDecoder.fastHandlers = {}
+
+    print("%-22s %14s %14s %8s" % ("msg", "generic msg/s", "fast msg/s", "speedup"))
+    for (name, fields) in MSGS.items():
+        number = 200 if "x100" in name else 20000
+        slow = msgs_per_sec(slowDecoder, fields, number)
+        fast = msgs_per_sec(fastDecoder, fields, number)
+        print("%-22s %14.0f %14.0f %7.1fx" % (name, slow, fast, fast / slow))
+
+    legacyDecoder = LegacySignatureDecoder(NullWrapper(), MAX_CLIENT_VER)
+    legacyDecoder.fastHandlers = {}
+
+    print()
+    print("%-22s %14s %14s %8s" % ("msg", "legacy msg/s", "compiled msg/s", "speedup"))
+    for (name, fields) in SIGNATURE_MSGS.items():
+        slow = msgs_per_sec(legacyDecoder, fields, 20000)
+        fast = msgs_per_sec(slowDecoder, fields, 20000)
+        print("%-22s %14.0f %14.0f %7.1fx" % (name, slow, fast, fast / slow))
+
+
+if "__main__" == __name__:
+    main()
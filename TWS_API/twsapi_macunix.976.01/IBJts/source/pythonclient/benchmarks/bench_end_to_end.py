@@ -0,0 +1,106 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+
+"""
+Measures the whole client stack (socket, EReader, EClient.run, Decoder,
+wrapper) against the faketws stand-in server streaming a repeatable mix of
+ticks: the msgs/s received when the stream is sent as fast as possible, and
+for a paced stream how long after the last frame was sent the last tick
+gets to the wrapper.
+
+    python benchmarks/bench_end_to_end.py --frames 200000 --rate 100000
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ibapi import faketws
+from ibapi.client import EClient
+from ibapi.wrapper import EWrapper
+from ibapi.contract import Contract
+from ibapi.message import OUT
+
+
+class CountingWrapper(EWrapper):
+    def __init__(self, nExpected):
+        self.nExpected = nExpected
+        self.nSeen = 0
+        self.done = threading.Event()
+        self.lastTime = None
+
+    def tick(self, *args):
+        self.nSeen += 1
+        if self.nSeen == self.nExpected:
+            self.lastTime = time.perf_counter()
+            self.done.set()
+
+    tickPrice = tickSize = tickByTickAllLast = tickByTickBidAsk = tick
+    updateMktDepthL2 = tick
+
+
+def count_callbacks(frames):
+    """ TICK_PRICE for the bid, ask and last also give a TICK_SIZE """
+    return len(frames) + sum(1 for frame in frames
+        if frame[4:6] == b"1\0" and frame[4:].split(b"\0")[3] in (b"1", b"2", b"4"))
+
+
+def measure(frames, rate, socketOptions):
+    with faketws.FakeTws() as tws:
+        replayed = {}
+        replayDone = threading.Event()
+        def onMktData(session, fields):
+            replayed["t0"] = time.perf_counter()
+            session.replay(frames, rate)
+            replayed["t1"] = time.perf_counter()
+            replayDone.set()
+        tws.onRequest(OUT.REQ_MKT_DATA, onMktData)
+
+        wrapper = CountingWrapper(count_callbacks(frames))
+        client = EClient(wrapper)
+        client.setSocketOptions(**socketOptions)
+        client.connect("127.0.0.1", tws.port, 0)
+        thread = threading.Thread(target=client.run)
+        thread.start()
+
+        client.reqMktData(1001, Contract(), "", False, False, [])
+        ok = wrapper.done.wait(120) and replayDone.wait(120)
+        client.disconnect()
+        thread.join()
+
+    if not ok:
+        raise RuntimeError("only %d of %d callbacks" % (wrapper.nSeen, wrapper.nExpected))
+    return (len(frames) / (wrapper.lastTime - replayed["t0"]),
+            wrapper.lastTime - replayed["t1"])
+
+
+def main():
+    cmdLineParser = argparse.ArgumentParser("end to end benchmark")
+    cmdLineParser.add_argument("--frames", action="store", type=int,
+        dest="frames", default=200000, help="number of frames streamed")
+    cmdLineParser.add_argument("--rate", action="store", type=int,
+        dest="rate", default=100000, help="frames/s of the paced stream")
+    args = cmdLineParser.parse_args()
+
+    frames = faketws.tickStream(args.frames, (1001, 1002, 1003))
+    print("%-40s %12s %12s" % ("", "msgs/s", "lag ms"))
+    for (title, socketOptions) in (("recv", {}),
+                                   ("recv_into", {"recvInto": True}),
+                                   ("recv_into, 4MB SO_RCVBUF, 64K reads",
+                                    {"recvInto": True, "recvBufSize": 1 << 22,
+                                     "readSize": 1 << 16})):
+        for rate in (None, args.rate):
+            (msgsPerSec, lag) = measure(frames, rate, socketOptions)
+            print("%-40s %12.0f %12.1f" % ("%s @ %s" % (title, rate or "max"),
+                                           msgsPerSec, lag * 1000))
+
+
+if "__main__" == __name__:
+    main()
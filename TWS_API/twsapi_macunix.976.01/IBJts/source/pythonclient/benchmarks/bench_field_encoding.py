@@ -0,0 +1,197 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+
+"""
+Measures the making of the reqMktData() and placeOrder() msgs, per msg: as
+text fields with make_field() then make_msg() (as it was, kept here as the
+reference), and as bytes with the cached field encodings of comm, as EClient
+makes them now. The msgs of both are checked to be the same first. The
+EClient lines are the whole request method, its checks included.
+
+    python benchmarks/bench_field_encoding.py --number 20000
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ibapi import comm
+from ibapi.comm import make_field
+from ibapi.client import EClient
+from ibapi.wrapper import EWrapper
+from ibapi.contract import Contract
+from ibapi.order import Order
+from ibapi.message import OUT
+from ibapi.orderencoder import OrderEncoder
+from ibapi.server_versions import * # @UnusedWildImport
+
+from bench_place_order import legacy_place_order_msg, NullConn
+
+
+def legacy_req_mkt_data_msg(serverVersion, reqId, contract, genericTickList,
+                            snapshot, regulatorySnapshot) -> bytes:
+    """ the msg of EClient.reqMktData(), as it was, for a contract without
+    combo legs nor delta neutral contract """
+    VERSION = 11
+
+    flds = []
+    flds += [make_field(OUT.REQ_MKT_DATA),
+        make_field(VERSION),
+        make_field(reqId)]
+
+    if serverVersion >= MIN_SERVER_VER_REQ_MKT_DATA_CONID:
+        flds += [make_field(contract.conId),]
+
+    flds += [make_field(contract.symbol),
+        make_field(contract.secType),
+        make_field(contract.lastTradeDateOrContractMonth),
+        make_field(contract.strike),
+        make_field(contract.right),
+        make_field(contract.multiplier),
+        make_field(contract.exchange),
+        make_field(contract.primaryExchange),
+        make_field(contract.currency),
+        make_field(contract.localSymbol) ]
+
+    if serverVersion >= MIN_SERVER_VER_TRADING_CLASS:
+        flds += [make_field(contract.tradingClass),]
+
+    if serverVersion >= MIN_SERVER_VER_DELTA_NEUTRAL:
+        flds += [make_field(False),]
+
+    flds += [make_field(genericTickList),
+        make_field(snapshot)]
+
+    if serverVersion >= MIN_SERVER_VER_REQ_SMART_COMPONENTS:
+        flds += [make_field(regulatorySnapshot),]
+
+    if serverVersion >= MIN_SERVER_VER_LINKING:
+        flds += [make_field(""),]
+
+    return comm.make_msg("".join(flds))
+
+
+def req_mkt_data_msg(serverVersion, reqId, contract, genericTickList,
+                     snapshot, regulatorySnapshot) -> bytes:
+    """ the same msg made as EClient.reqMktData() makes it now """
+    VERSION = 11
+
+    flds = [OUT.REQ_MKT_DATA, VERSION, reqId]
+
+    if serverVersion >= MIN_SERVER_VER_REQ_MKT_DATA_CONID:
+        flds.append(contract.conId)
+
+    flds += [contract.symbol,
+        contract.secType,
+        contract.lastTradeDateOrContractMonth,
+        contract.strike,
+        contract.right,
+        contract.multiplier,
+        contract.exchange,
+        contract.primaryExchange,
+        contract.currency,
+        contract.localSymbol]
+
+    if serverVersion >= MIN_SERVER_VER_TRADING_CLASS:
+        flds.append(contract.tradingClass)
+
+    if serverVersion >= MIN_SERVER_VER_DELTA_NEUTRAL:
+        flds.append(False)
+
+    flds += [genericTickList, snapshot]
+
+    if serverVersion >= MIN_SERVER_VER_REQ_SMART_COMPONENTS:
+        flds.append(regulatorySnapshot)
+
+    if serverVersion >= MIN_SERVER_VER_LINKING:
+        flds.append("")
+
+    return comm.encode_msg(flds)
+
+
+class LastMsgConn(NullConn):
+    def sendMsg(self, msg):
+        self.last = msg
+        return super().sendMsg(msg)
+
+
+def make_client() -> EClient:
+    client = EClient(EWrapper())
+    client.conn = LastMsgConn()
+    client.serverVersion_ = MAX_CLIENT_VER
+    client.setConnState(EClient.CONNECTED)
+    return client
+
+
+def make_contract() -> Contract:
+    contract = Contract()
+    (contract.conId, contract.symbol, contract.secType) = (265598, "AAPL", "STK")
+    (contract.exchange, contract.currency) = ("SMART", "USD")
+    return contract
+
+
+def make_order() -> Order:
+    order = Order()
+    (order.action, order.totalQuantity) = ("BUY", 100.)
+    (order.orderType, order.lmtPrice) = ("LMT", 123.45)
+    return order
+
+
+def measure(fn, number) -> float:
+    """ the us per call, best of 3 """
+    best = None
+    for _ in range(3):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best / number * 1e6
+
+
+def main():
+    cmdLineParser = argparse.ArgumentParser("field encoding benchmark")
+    cmdLineParser.add_argument("--number", action="store", type=int,
+        dest="number", default=20000, help="number of msgs of each kind")
+    args = cmdLineParser.parse_args()
+
+    client = make_client()
+    contract = make_contract()
+    order = make_order()
+    reqMktData = lambda: client.reqMktData(1001, contract, "233", False, False, [])
+    legacyReqMktData = lambda: legacy_req_mkt_data_msg(MAX_CLIENT_VER, 1001,
+        contract, "233", False, False)
+    reqMktDataMsg = lambda: req_mkt_data_msg(MAX_CLIENT_VER, 1001,
+        contract, "233", False, False)
+    encoder = OrderEncoder(MAX_CLIENT_VER)
+    placeOrderMsg = lambda: encoder.encode(7, contract, order)
+    placeOrder = lambda: client.placeOrder(7, contract, order)
+    legacyPlaceOrder = lambda: comm.make_msg(legacy_place_order_msg(
+        MAX_CLIENT_VER, 7, contract, order))
+
+    reqMktData()
+    assert client.conn.last == legacyReqMktData() == reqMktDataMsg(), \
+        "reqMktData msgs differ"
+    placeOrder()
+    assert client.conn.last == legacyPlaceOrder() == placeOrderMsg(), \
+        "placeOrder msgs differ"
+
+    print("%-40s %10s" % ("", "us/msg"))
+    for (title, fn) in (
+            ("reqMktData, text fields (as it was)", legacyReqMktData),
+            ("reqMktData, bytes", reqMktDataMsg),
+            ("EClient.reqMktData", reqMktData),
+            ("placeOrder, text fields (as it was)", legacyPlaceOrder),
+            ("placeOrder, bytes", placeOrderMsg),
+            ("EClient.placeOrder", placeOrder)):
+        print("%-40s %10.2f" % (title, measure(fn, args.number)))
+
+
+if "__main__" == __name__:
+    main()
@@ -0,0 +1,86 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+
+"""
+Measures how fast a burst of back-to-back low level messages received in a
+single read is cut into msgs, old way (comm.read_msg on a bytes buffer) vs
+comm.FrameBuffer.
+
+    python benchmarks/bench_framing.py
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ibapi import comm
+from ibapi.message import IN
+
+
+# a typical TICK_PRICE msg
+TICK_PRICE = "".join(comm.make_field(val) for val in
+                     (IN.TICK_PRICE, 6, 1001, 1, 123.45, 300, 0))
+
+
+def make_burst(nMsgs):
+    return comm.make_msg(TICK_PRICE) * nMsgs
+
+
+def frame_with_read_msg(burst):
+    msgs = []
+    buf = b""
+    buf += burst
+    while len(buf) > 0:
+        (size, msg, buf) = comm.read_msg(buf)
+        if msg:
+            msgs.append(msg)
+        else:
+            break
+    return msgs
+
+
+def frame_with_frame_buffer(burst):
+    msgs = []
+    frames = comm.FrameBuffer()
+    frames.feed(burst)
+    msg = frames.nextMsg()
+    while msg is not None:
+        msgs.append(msg.tobytes())
+        msg = frames.nextMsg()
+    return msgs
+
+
+def measure(fn, burst, nMsgs):
+    t0 = time.perf_counter()
+    msgs = fn(burst)
+    elapsed = time.perf_counter() - t0
+    assert len(msgs) == nMsgs
+    return nMsgs / elapsed
+
+
+def main():
+    cmdLineParser = argparse.ArgumentParser("framing benchmark")
+    cmdLineParser.add_argument("--max-read-msg", action="store", type=int,
+        dest="maxReadMsg", default=10000,
+        help="largest burst to run through read_msg (it is quadratic)")
+    args = cmdLineParser.parse_args()
+
+    print("%10s %18s %18s" % ("msgs", "read_msg msgs/s", "FrameBuffer msgs/s"))
+    for nMsgs in (1000, 10000, 100000):
+        burst = make_burst(nMsgs)
+        if nMsgs <= args.maxReadMsg:
+            old = "%18.0f" % measure(frame_with_read_msg, burst, nMsgs)
+        else:
+            old = "%18s" % "skipped"
+        new = measure(frame_with_frame_buffer, burst, nMsgs)
+        print("%10d %s %18.0f" % (nMsgs, old, new))
+
+
+if "__main__" == __name__:
+    main()
@@ -0,0 +1,113 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+
+"""
+Replays the burst of an open through the writer thread: --requests
+reqMktData() queued at once, then --orders placeOrder() and their
+cancelOrder() spread over the first second, written to a stand-in
+connection that only records when each msg is written. Without a governor
+(as it was) and with RateGovernor(--rate, reserve=--reserve). Gives the
+most msgs written in any second (TWS disconnects over 50), how long the
+burst took, and the mean / max latency from the request to the write of
+the orders and of the data requests. The order msgs over the reserve in a
+second wait for the window to move on, as the data requests do.
+
+    python benchmarks/bench_governor.py --requests 200 --orders 5
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ibapi import comm
+from ibapi.writer import EWriter
+from ibapi.governor import RateGovernor, MAX_MSGS_PER_SEC
+from ibapi.message import OUT
+
+
+class TimingConn:
+    def __init__(self):
+        self.writes = []        # (time, msgs written)
+
+    def isConnected(self):
+        return True
+
+    def sendAll(self, data):
+        nMsgs = 0
+        rest = data
+        while rest:
+            (size, text, rest) = comm.read_msg(rest)
+            nMsgs += 1
+        self.writes.append((time.monotonic(), nMsgs))
+        return len(data)
+
+
+def peakPerSecond(writes) -> int:
+    """ the most msgs written in any 1s window """
+    peak = 0
+    first = 0
+    inWindow = 0
+    for (t, nMsgs) in writes:
+        inWindow += nMsgs
+        while writes[first][0] <= t - 1.:
+            inWindow -= writes[first][1]
+            first += 1
+        peak = max(peak, inWindow)
+    return peak
+
+
+def measure(nRequests, nOrders, governor) -> tuple:
+    conn = TimingConn()
+    writer = EWriter(conn, governor=governor)
+    writer.start()
+    t0 = time.monotonic()
+    for reqId in range(nRequests):
+        writer.put(comm.encode_msg([OUT.REQ_MKT_DATA, 11, reqId, "SYM%d" % reqId,
+                                    "STK", "", 0., "", "", "SMART", "", "USD"]))
+    for orderId in range(nOrders):
+        writer.put(comm.encode_msg([OUT.PLACE_ORDER, orderId, "SYM", "STK",
+                                    "BUY", 100., "LMT", 123.45]))
+        time.sleep(0.5 / nOrders)
+        writer.put(comm.encode_msg([OUT.CANCEL_ORDER, 1, orderId]))
+        time.sleep(0.5 / nOrders)
+    writer.flush()
+    elapsed = time.monotonic() - t0
+    metrics = writer.metrics()
+    writer.stop(5)
+    return (elapsed, peakPerSecond(conn.writes), metrics)
+
+
+def main():
+    cmdLineParser = argparse.ArgumentParser("rate governor benchmark")
+    cmdLineParser.add_argument("--requests", action="store", type=int,
+        dest="requests", default=200, help="number of reqMktData()")
+    cmdLineParser.add_argument("--orders", action="store", type=int,
+        dest="orders", default=5, help="number of orders, each cancelled")
+    cmdLineParser.add_argument("--rate", action="store", type=int,
+        dest="rate", default=MAX_MSGS_PER_SEC, help="msgs per second allowed")
+    cmdLineParser.add_argument("--reserve", action="store", type=int,
+        dest="reserve", default=5, help="msgs per second kept for the orders")
+    args = cmdLineParser.parse_args()
+
+    print("%-32s %8s %10s %10s %10s %10s %10s" % ("", "seconds", "peak msg/s",
+          "order mean", "order max", "req mean", "req max"))
+    for (title, governor) in (("no governor, as it was", None),
+                              ("RateGovernor(%d, reserve=%d)" % (args.rate,
+                                                                  args.reserve),
+                               RateGovernor(args.rate, reserve=args.reserve))):
+        (elapsed, peak, metrics) = measure(args.requests, args.orders, governor)
+        latencies = metrics["latencies"]
+        (orders, requests) = latencies if len(latencies) > 1 else latencies * 2
+        print("%-32s %8.2f %10d %9.1fms %9.1fms %9.1fms %9.1fms" % (title,
+            elapsed, peak, orders["meanLatency"] * 1e3, orders["maxLatency"] * 1e3,
+            requests["meanLatency"] * 1e3, requests["maxLatency"] * 1e3))
+
+
+if "__main__" == __name__:
+    main()
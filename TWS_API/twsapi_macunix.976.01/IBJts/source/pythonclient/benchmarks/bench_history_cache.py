@@ -0,0 +1,117 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+
+"""
+Measures the reads of history_cache.HistoryCache: a cache of --bars 1 min
+bars is filled once, then ranges of it are read back by a new cache (as
+after a restart), vs decoding the same bars from HISTORICAL_DATA msgs, which
+is what getting them again from TWS costs at the least, pacing and network
+aside.
+
+    python benchmarks/bench_history_cache.py --bars 1000000
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ibapi import faketws
+from ibapi import comm
+from ibapi.history_cache import HistoryCache
+from ibapi.decoder import Decoder
+from ibapi.wrapper import EWrapper
+from ibapi.common import BarData
+from ibapi.contract import Contract
+from ibapi.server_versions import MAX_CLIENT_VER
+
+
+T0 = 1570406400     # 20191007 00:00:00 GMT
+DAY = 86400
+
+
+class Client(object):
+    columnarBars = False
+    columnarTicks = False
+
+
+class SyntheticDownloader(object):
+    def __init__(self):
+        self.client = Client()
+
+    async def downloadBars(self, contract, start, end, barSizeSetting,
+                           whatToShow, useRTH=1):
+        return make_bars(start, end)
+
+
+def make_bars(start, end):
+    bars = []
+    for t in range(start, end, 60):
+        bar = BarData()
+        bar.date = str(t)
+        (bar.open, bar.high, bar.low, bar.close) = (1.5, 2.5, 1., 2.)
+        (bar.volume, bar.average, bar.barCount) = (1000, 1.75, 10)
+        bars.append(bar)
+    return bars
+
+
+class CountingWrapper(EWrapper):
+    def __init__(self):
+        self.nBars = 0
+
+    def historicalData(self, reqId, bar):
+        self.nBars += 1
+
+    def historicalDataEnd(self, reqId, start, end):
+        pass
+
+
+def main():
+    cmdLineParser = argparse.ArgumentParser("history cache benchmark")
+    cmdLineParser.add_argument("--bars", action="store", type=int,
+        dest="bars", default=1000000, help="number of 1 min bars cached")
+    args = cmdLineParser.parse_args()
+
+    contract = Contract()
+    contract.conId = 265598
+    end = T0 + args.bars * 60
+    with tempfile.TemporaryDirectory() as directory:
+        cache = HistoryCache(SyntheticDownloader(), directory,
+                             clock=lambda: end + DAY)
+        t0 = time.perf_counter()
+        asyncio.run(cache.bars(contract, T0, end, "1 min", "TRADES"))
+        print("filled with %d bars in %.2fs" % (args.bars, time.perf_counter() - t0))
+
+        print("%-28s %12s %12s" % ("", "ms", "bars"))
+        for (title, start) in (("read 1 day", end - DAY), ("read 30 days", end - 30 * DAY),
+                               ("read all", T0)):
+            cache = HistoryCache(SyntheticDownloader(), directory,
+                                 clock=lambda: end + DAY)
+            t0 = time.perf_counter()
+            bars = asyncio.run(cache.bars(contract, start, end, "1 min", "TRADES"))
+            bars["close"].sum()     # touches the column
+            t1 = time.perf_counter()
+            print("%-28s %12.2f %12d" % (title, (t1 - t0) * 1000, len(bars)))
+
+        # the same bars decoded from HISTORICAL_DATA msgs of 1 day
+        frame = faketws.historicalDataFrame(1, make_bars(T0, T0 + DAY))
+        fields = comm.read_fields(frame[4:])
+        wrapper = CountingWrapper()
+        decoder = Decoder(wrapper, MAX_CLIENT_VER)
+        t0 = time.perf_counter()
+        for _ in range(max(1, args.bars // 1440)):
+            decoder.interpret(fields)
+        t1 = time.perf_counter()
+        print("%-28s %12.2f %12d" % ("decode all from msgs", (t1 - t0) * 1000,
+                                     wrapper.nBars))
+
+
+if "__main__" == __name__:
+    main()
@@ -0,0 +1,152 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+
+"""
+Measures the cost of the hot path logging per request sent and per msg
+received (framed, split and decoded), for:
+    - before: the request logging as it was, the request name and vars()
+      captured and the sent msg logged with current_fn_name() whatever the
+      log level (kept here as the reference)
+    - loggers off: the ibapi loggers at WARNING, hot path level NOTSET
+    - hot path OFF: setHotPathLogLevel(HotPathLog.OFF)
+    - instrumented: the ibapi loggers at DEBUG, to a handler dropping it all
+
+    python benchmarks/bench_logging.py
+"""
+
+import os
+import sys
+import timeit
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ibapi import comm
+from ibapi.client import EClient
+from ibapi.decoder import Decoder
+from ibapi.wrapper import EWrapper
+from ibapi.contract import Contract
+from ibapi.message import IN
+from ibapi.server_versions import MAX_CLIENT_VER
+from ibapi.utils import HotPathLog, setHotPathLogLevel, current_fn_name
+
+
+logger = logging.getLogger("ibapi")
+
+
+class NullConn:
+    def isConnected(self):
+        return True
+
+    def sendMsg(self, msg):
+        return len(msg)
+
+
+class NullWrapper(EWrapper):
+    def tickPrice(self, *args):
+        pass
+
+    def tickSize(self, *args):
+        pass
+
+    def tickOptionComputation(self, *args):
+        pass
+
+
+class LegacyClient(EClient):
+    """ logRequest() and sendMsg() as they were """
+    def logRequest(self, fnName=None, fnParams=None):
+        # the caller used to pass current_fn_name() and vars()
+        caller = sys._getframe(1)
+        fnName = caller.f_code.co_name
+        fnParams = dict(caller.f_locals)
+        if logging.getLogger("ibapi.client").isEnabledFor(logging.INFO):
+            del fnParams['self']
+            logging.getLogger("ibapi.client").info("REQUEST %s %s" % (fnName, fnParams))
+
+    def sendMsg(self, msg):
+        full_msg = msg if type(msg) is bytes else comm.make_msg(msg)
+        logging.getLogger("ibapi.client").info("%s %s %s", "SENDING",
+                                               current_fn_name(1), full_msg)
+        self.conn.sendMsg(full_msg)
+
+
+def make_client(clientClass):
+    client = clientClass(EWrapper())
+    client.conn = NullConn()
+    client.serverVersion_ = MAX_CLIENT_VER
+    client.setConnState(EClient.CONNECTED)
+    return client
+
+
+def make_frame(*vals):
+    return comm.make_msg("".join(comm.make_field(val) for val in vals))
+
+
+FRAMES = {
+    "TICK_PRICE": make_frame(IN.TICK_PRICE, 6, 1001, 1, 123.45, 300, 3),
+    "TICK_OPTION_COMPUTATION": make_frame(IN.TICK_OPTION_COMPUTATION, 6, 1001,
+        13, 0.25, 0.5, 1.2, 0.01, 0.1, 0.05, -0.02, 100.),
+}
+
+
+def request_us(client):
+    contract = Contract()
+    contract.symbol = "EUR"
+    contract.secType = "CASH"
+    contract.exchange = "IDEALPRO"
+    contract.currency = "USD"
+    number = 20000
+    elapsed = min(timeit.repeat(
+        lambda: client.reqMktData(1001, contract, "", False, False, []),
+        number=number, repeat=3))
+    return elapsed / number * 1e6
+
+
+def msg_us(decoder, frame):
+    def receive():
+        frames = comm.FrameBuffer()
+        frames.feed(frame)
+        decoder.interpret(comm.read_fields(frames.nextMsg()))
+    number = 20000
+    elapsed = min(timeit.repeat(receive, number=number, repeat=3))
+    return elapsed / number * 1e6
+
+
+def configure(loggerLevel, hotPathLevel):
+    logger.setLevel(loggerLevel)
+    setHotPathLogLevel(hotPathLevel)
+
+
+CONFIGS = (
+    ("before", LegacyClient, logging.WARNING, logging.NOTSET),
+    ("loggers off", EClient, logging.WARNING, logging.NOTSET),
+    ("hot path OFF", EClient, logging.WARNING, HotPathLog.OFF),
+    ("instrumented", EClient, logging.DEBUG, logging.NOTSET),
+)
+
+
+def main():
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+
+    decoder = Decoder(NullWrapper(), MAX_CLIENT_VER)
+
+    print("%-14s %16s %s" % ("", "reqMktData us",
+        " ".join("%24s" % (name + " us") for name in FRAMES)))
+    for (title, clientClass, loggerLevel, hotPathLevel) in CONFIGS:
+        configure(loggerLevel, hotPathLevel)
+        client = make_client(clientClass)
+        row = [request_us(client)]
+        row += [msg_us(decoder, frame) for frame in FRAMES.values()]
+        print("%-14s %16.2f %s" % (title, row[0],
+            " ".join("%24.2f" % val for val in row[1:])))
+
+    configure(logging.NOTSET, logging.NOTSET)
+
+
+if "__main__" == __name__:
+    main()
@@ -0,0 +1,179 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+
+"""
+Measures the memory and the time taken by 1M historical ticks and bars, the
+common.py classes with __slots__ and the shared tick attributes vs the
+classes as they were (with a __dict__, one attribute object per tick, kept
+here as the reference), and the decoding of HISTORICAL_TICKS_LAST msgs.
+
+    python benchmarks/bench_objects.py --ticks 1000000
+"""
+
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ibapi import comm
+from ibapi import common
+from ibapi.decoder import Decoder
+from ibapi.wrapper import EWrapper
+from ibapi.message import IN
+from ibapi.server_versions import MAX_CLIENT_VER
+
+
+class LegacyObject(object):
+    pass
+
+
+class LegacyTickAttribLast(LegacyObject):
+    def __init__(self):
+        self.pastLimit = False
+        self.unreported = False
+
+
+class LegacyHistoricalTickLast(LegacyObject):
+    def __init__(self):
+        self.time = 0
+        self.tickAttribLast = LegacyTickAttribLast()
+        self.price = 0.
+        self.size = 0
+        self.exchange = ""
+        self.specialConditions = ""
+
+
+class LegacyHistoricalTick(LegacyObject):
+    def __init__(self):
+        self.time = 0
+        self.price = 0.
+        self.size = 0
+
+
+class LegacyBarData(LegacyObject):
+    def __init__(self):
+        self.date = ""
+        self.open = 0.
+        self.high = 0.
+        self.low = 0.
+        self.close = 0.
+        self.volume = 0
+        self.barCount = 0
+        self.average = 0.
+
+
+def make_ticks_last(nTicks, tickClass, attribFn):
+    ticks = []
+    for i in range(nTicks):
+        tick = tickClass()
+        tick.time = 1570000000 + i
+        tick.tickAttribLast = attribFn(i & 3)
+        tick.price = 100. + (i % 100) * .01
+        tick.size = 100
+        tick.exchange = "ISLAND"
+        tick.specialConditions = ""
+        ticks.append(tick)
+    return ticks
+
+
+def legacy_attrib(mask):
+    attrib = LegacyTickAttribLast()
+    attrib.pastLimit = mask & 1 != 0
+    attrib.unreported = mask & 2 != 0
+    return attrib
+
+
+def make_ticks(nTicks, tickClass, attribFn):
+    ticks = []
+    for i in range(nTicks):
+        tick = tickClass()
+        tick.time = 1570000000 + i
+        tick.price = 100. + (i % 100) * .01
+        tick.size = 100
+        ticks.append(tick)
+    return ticks
+
+
+def make_bars(nBars, barClass, attribFn):
+    bars = []
+    for i in range(nBars):
+        bar = barClass()
+        bar.date = "20191010"
+        (bar.open, bar.high, bar.low, bar.close) = (1.5, 2.5, 1., 2.)
+        (bar.volume, bar.barCount, bar.average) = (1000, 10, 1.75)
+        bars.append(bar)
+    return bars
+
+
+def measure(make, *args):
+    """ (bytes, seconds) to make and keep the objects, the time is taken
+    on a separate run as tracemalloc slows down the allocations """
+    t0 = time.perf_counter()
+    objs = make(*args)
+    t1 = time.perf_counter()
+    del objs
+    tracemalloc.start()
+    objs = make(*args)
+    (size, _) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objs
+    return (size, t1 - t0)
+
+
+class KeepingWrapper(EWrapper):
+    def __init__(self):
+        self.ticks = []
+
+    def historicalTicksLast(self, reqId, ticks, done):
+        self.ticks += ticks
+
+
+def decode_ticks_last(nTicks):
+    nPerMsg = 1000
+    vals = [IN.HISTORICAL_TICKS_LAST, 1001, nPerMsg]
+    for i in range(nPerMsg):
+        vals += [1570000000 + i, i & 3, 100. + (i % 100) * .01, 100, "ISLAND", ""]
+    vals.append(1)
+    fields = comm.read_fields("".join(comm.make_field(val) for val in vals))
+    wrapper = KeepingWrapper()
+    decoder = Decoder(wrapper, MAX_CLIENT_VER)
+    for _ in range(nTicks // nPerMsg):
+        decoder.interpret(fields)
+    return wrapper.ticks
+
+
+def main():
+    cmdLineParser = argparse.ArgumentParser("compact data objects benchmark")
+    cmdLineParser.add_argument("--ticks", action="store", type=int,
+        dest="ticks", default=1000000, help="number of objects")
+    args = cmdLineParser.parse_args()
+    n = args.ticks
+
+    print("%-28s %14s %14s %10s %10s" % ("x%d" % n, "before MB", "after MB",
+                                          "before s", "after s"))
+    for (title, make, before, after) in (
+            ("HistoricalTickLast", make_ticks_last,
+             (LegacyHistoricalTickLast, legacy_attrib),
+             (common.HistoricalTickLast, common.TICK_ATTRIB_LAST.__getitem__)),
+            ("HistoricalTick", make_ticks,
+             (LegacyHistoricalTick, None), (common.HistoricalTick, None)),
+            ("BarData", make_bars,
+             (LegacyBarData, None), (common.BarData, None))):
+        (sizeBefore, timeBefore) = measure(make, n, *before)
+        (sizeAfter, timeAfter) = measure(make, n, *after)
+        print("%-28s %14.1f %14.1f %10.2f %10.2f" % (title, sizeBefore / 1e6,
+            sizeAfter / 1e6, timeBefore, timeAfter))
+
+    (size, seconds) = measure(decode_ticks_last, n)
+    print("%-28s %14s %14.1f %10s %10.2f" % ("HISTORICAL_TICKS_LAST decoded",
+                                             "", size / 1e6, "", seconds))
+
+
+if "__main__" == __name__:
+    main()
@@ -0,0 +1,91 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+
+"""
+Measures the decoding of --orders OPEN_ORDER msgs, as after reqAllOpenOrders()
+or a reconnect with that many orders working: the EWrapper signatures
+discovered again for every msg (as it was, kept here as the reference), the
+fields read one by one by a reused OrderDecoder, and the flat field plan of
+the server version, through Decoder.interpret().
+
+    python benchmarks/bench_open_orders.py --orders 10000
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ibapi import comm
+from ibapi import faketws
+from ibapi.decoder import Decoder
+from ibapi.wrapper import EWrapper
+from ibapi.contract import Contract
+from ibapi.order import Order
+from ibapi.order_state import OrderState
+from ibapi.tag_value import TagValue
+from ibapi.server_versions import MAX_CLIENT_VER
+
+
+def make_frames(nOrders):
+    frames = []
+    for i in range(nOrders):
+        contract = Contract()
+        (contract.conId, contract.symbol) = (1000 + i % 500, "SYM%d" % (i % 500))
+        (contract.secType, contract.exchange, contract.currency) = ("STK", "SMART", "USD")
+        order = Order()
+        (order.orderId, order.permId) = (i + 1, 100000 + i)
+        (order.action, order.totalQuantity) = ("BUY" if i % 2 else "SELL", 100.)
+        (order.orderType, order.lmtPrice) = ("LMT", 100. + (i % 100) * 0.01)
+        if i % 4 == 0:
+            order.algoStrategy = "Adaptive"
+            order.algoParams = [TagValue("adaptivePriority", "Normal")]
+        orderState = OrderState()
+        orderState.status = "Submitted"
+        frames.append(faketws.openOrderFrame(contract, order, orderState))
+    return frames
+
+
+def run(decodeMsg, stream) -> float:
+    t0 = time.perf_counter()
+    for fields in stream:
+        decodeMsg(fields)
+    return time.perf_counter() - t0
+
+
+def main():
+    cmdLineParser = argparse.ArgumentParser("open orders benchmark")
+    cmdLineParser.add_argument("--orders", action="store", type=int,
+        dest="orders", default=10000, help="number of open orders")
+    args = cmdLineParser.parse_args()
+
+    stream = [comm.read_fields(frame[4:]) for frame in make_frames(args.orders)]
+    decoder = Decoder(EWrapper(), MAX_CLIENT_VER)
+    orderDecoder = decoder.orderDecoder
+
+    def rediscover(fields):
+        Decoder.signaturesDiscovered = False
+        decoder.discoverParams()
+        steps(fields)
+
+    def steps(fields):
+        orderDecoder.reset(Contract(), Order(), OrderState(), MAX_CLIENT_VER)
+        orderDecoder.decodeOpenOrder(iter(fields[1:]))
+
+    print("%-40s %12s %12s" % ("", "us/msg", "total s"))
+    for (title, decodeMsg) in (
+            ("signatures discovered per msg", rediscover),
+            ("fields one by one, reused decoder", steps),
+            ("field plan, Decoder.interpret()", decoder.interpret)):
+        seconds = run(decodeMsg, stream)
+        print("%-40s %12.2f %12.3f" % (title, seconds / len(stream) * 1e6,
+                                       seconds))
+
+
+if "__main__" == __name__:
+    main()
@@ -0,0 +1,134 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+
+"""
+Measures orderbook.OrderBooks on a stream of MARKET_DEPTH_L2 msgs spread
+over --books books of about --depth rows per side (mostly updates, some
+inserts and deletes), vs the usual book kept in the wrapper with list
+insert/delete. The "at rate" column is the share of one core used to keep
+up with --rate updates per second.
+
+    python benchmarks/bench_orderbook.py --books 50 --rate 10000
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ibapi import comm
+from ibapi import faketws
+from ibapi.orderbook import OrderBooks
+from ibapi.decoder import Decoder
+from ibapi.wrapper import EWrapper
+from ibapi.server_versions import MAX_CLIENT_VER
+
+
+class NullWrapper(EWrapper):
+    def updateMktDepthL2(self, reqId, position, marketMaker, operation, side,
+                         price, size, isSmartDepth):
+        pass
+
+
+class ListBooksWrapper(EWrapper):
+    """ the book as usually kept: one list of rows per side """
+    def __init__(self):
+        self.books = {}
+
+    def updateMktDepthL2(self, reqId, position, marketMaker, operation, side,
+                         price, size, isSmartDepth):
+        book = self.books.get(reqId, None)
+        if book is None:
+            book = ([], [])
+            self.books[reqId] = book
+        rows = book[side]
+        if operation == 0:
+            rows.insert(position, [price, size, marketMaker])
+        elif operation == 1:
+            if position < len(rows):
+                rows[position] = [price, size, marketMaker]
+            else:
+                rows.append([price, size, marketMaker])
+        elif position < len(rows):
+            del rows[position]
+
+
+def make_stream(nUpdates, nBooks, depth, seed=0):
+    rnd = random.Random(seed)
+    nRows = {}
+    fields = []
+    for i in range(nUpdates):
+        reqId = 1000 + i % nBooks
+        side = rnd.randint(0, 1)
+        n = nRows.get((reqId, side), 0)
+        kind = rnd.random()
+        if n < depth and (n == 0 or kind < 0.1):
+            (operation, position) = (0, rnd.randint(0, n))
+            n += 1
+        elif kind < 0.2:
+            (operation, position) = (2, rnd.randint(0, n - 1))
+            n -= 1
+        else:
+            (operation, position) = (1, rnd.randint(0, n - 1))
+        nRows[(reqId, side)] = n
+        price = 100. + (position if side == 0 else -position) * 0.01
+        frame = faketws.marketDepthL2Frame(reqId, position, "ISLAND", operation,
+                                           side, price, rnd.randint(1, 20) * 100,
+                                           True)
+        fields.append(comm.read_fields(frame[4:]))
+    return fields
+
+
+def run(decoder, stream) -> float:
+    interpret = decoder.interpret
+    t0 = time.perf_counter()
+    for fields in stream:
+        interpret(fields)
+    return (time.perf_counter() - t0) / len(stream)
+
+
+def main():
+    cmdLineParser = argparse.ArgumentParser("order book benchmark")
+    cmdLineParser.add_argument("--books", action="store", type=int,
+        dest="books", default=50, help="number of books")
+    cmdLineParser.add_argument("--depth", action="store", type=int,
+        dest="depth", default=20, help="rows per side")
+    cmdLineParser.add_argument("--updates", action="store", type=int,
+        dest="updates", default=200000, help="number of updates")
+    cmdLineParser.add_argument("--rate", action="store", type=int,
+        dest="rate", default=10000, help="updates per second")
+    args = cmdLineParser.parse_args()
+
+    stream = make_stream(args.updates, args.books, args.depth)
+    print("%-32s %12s %12s" % ("", "us/update", "at rate"))
+    def report(title, seconds):
+        print("%-32s %12.2f %11.1f%%" % (title, seconds * 1e6,
+                                         seconds * args.rate * 100))
+
+    report("decode only", run(Decoder(NullWrapper(), MAX_CLIENT_VER), stream))
+    report("decode + list books", run(Decoder(ListBooksWrapper(),
+                                              MAX_CLIENT_VER), stream))
+    books = OrderBooks()
+    report("decode + OrderBooks", run(Decoder(NullWrapper(), MAX_CLIENT_VER,
+                                              feeds=[books]), stream))
+
+    nQueries = 100000
+    reqIds = [1000 + i % args.books for i in range(nQueries)]
+    for (title, query) in (("top()", lambda reqId: books.books[reqId].top()),
+            ("levels(BID)", lambda reqId: books.books[reqId].levels(1)),
+            ("cumulativeSize(BID, 99.9)",
+             lambda reqId: books.books[reqId].cumulativeSize(1, 99.9))):
+        t0 = time.perf_counter()
+        for reqId in reqIds:
+            query(reqId)
+        print("%-32s %12.2f" % (title, (time.perf_counter() - t0) / nQueries * 1e6))
+
+
+if "__main__" == __name__:
+    main()
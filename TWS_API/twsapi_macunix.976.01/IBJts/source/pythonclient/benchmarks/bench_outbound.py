@@ -0,0 +1,90 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+
+"""
+Measures a burst of --requests reqMktData() against the faketws stand-in
+server, as when subscribing to a watch list at startup: each request sent
+from the calling thread, one socket write per msg (as it was), then queued
+for the writer thread of setOutboundQueue(True). The time is until the
+calling thread is done, then until the last request is written.
+
+    python benchmarks/bench_outbound.py --requests 500
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ibapi import faketws
+from ibapi.client import EClient
+from ibapi.wrapper import EWrapper
+from ibapi.contract import Contract
+
+
+class StartedWrapper(EWrapper):
+    def __init__(self):
+        self.started = threading.Event()
+
+    def nextValidId(self, orderId):
+        self.started.set()
+
+
+def measure(nRequests, outboundQueue, linger) -> tuple:
+    contracts = []
+    for i in range(nRequests):
+        contract = Contract()
+        (contract.symbol, contract.secType) = ("SYM%d" % i, "STK")
+        (contract.exchange, contract.currency) = ("SMART", "USD")
+        contracts.append(contract)
+
+    with faketws.FakeTws() as tws:
+        wrapper = StartedWrapper()
+        client = EClient(wrapper)
+        client.setOutboundQueue(outboundQueue, linger)
+        client.connect("127.0.0.1", tws.port, 0)
+        thread = threading.Thread(target=client.run)
+        thread.start()
+        wrapper.started.wait(5)
+        try:
+            t0 = time.perf_counter()
+            for (reqId, contract) in enumerate(contracts):
+                client.reqMktData(reqId, contract, "", False, False, [])
+            t1 = time.perf_counter()
+            client.flush()
+            t2 = time.perf_counter()
+            metrics = client.outboundMetrics()
+        finally:
+            client.disconnect()
+        thread.join(5)
+    writes = metrics["writes"] - 1 if metrics else nRequests  # startApi
+    return (t1 - t0, t2 - t0, writes)
+
+
+def main():
+    cmdLineParser = argparse.ArgumentParser("outbound queue benchmark")
+    cmdLineParser.add_argument("--requests", action="store", type=int,
+        dest="requests", default=500, help="number of reqMktData()")
+    args = cmdLineParser.parse_args()
+
+    print("%-36s %14s %14s %8s" % ("", "caller us/req", "written us/req",
+                                   "writes"))
+    for (title, outboundQueue, linger) in (
+            ("one write per msg, as it was", False, 0.),
+            ("writer thread", True, 0.),
+            ("writer thread, linger 1ms", True, 0.001)):
+        (callerSeconds, writtenSeconds, writes) = measure(args.requests,
+                                                          outboundQueue, linger)
+        print("%-36s %14.2f %14.2f %8d" % (title,
+            callerSeconds / args.requests * 1e6,
+            writtenSeconds / args.requests * 1e6, writes))
+
+
+if "__main__" == __name__:
+    main()
@@ -0,0 +1,460 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+
+"""
+Measures the encoding of the PLACE_ORDER msg per order: the fields made one
+by one with the server version checks of every field (as it was, kept here
+as the reference), the OrderEncoder compiled for the server version, and a
+basket of --basket orders sent in one go by EClient.placeOrders(). The msgs
+of both encodings are checked to be the same first.
+
+    python benchmarks/bench_place_order.py --orders 20000 --basket 500
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ibapi import comm
+from ibapi.comm import make_field, make_field_handle_empty
+from ibapi.client import EClient
+from ibapi.wrapper import EWrapper
+from ibapi.contract import Contract, ComboLeg
+from ibapi.order import Order
+from ibapi.tag_value import TagValue
+from ibapi.message import OUT
+from ibapi.common import UNSET_INTEGER, UNSET_DOUBLE
+from ibapi.orderencoder import OrderEncoder
+from ibapi.server_versions import * # @UnusedWildImport
+
+
+def legacy_place_order_msg(serverVersion, orderId, contract, order):
+    """ the msg of EClient.placeOrder(), as it was """
+    VERSION = 27 if (serverVersion < MIN_SERVER_VER_NOT_HELD) else 45
+
+    # send place order msg
+    flds = []
+    flds += [make_field(OUT.PLACE_ORDER)]
+
+    if serverVersion < MIN_SERVER_VER_ORDER_CONTAINER:
+        flds += [make_field(VERSION)]
+
+    flds += [make_field(orderId)]
+
+    # send contract fields
+    if serverVersion >= MIN_SERVER_VER_PLACE_ORDER_CONID:
+        flds.append(make_field( contract.conId))
+    flds += [make_field( contract.symbol),
+        make_field( contract.secType),
+        make_field( contract.lastTradeDateOrContractMonth),
+        make_field( contract.strike),
+        make_field( contract.right),
+        make_field( contract.multiplier), # srv v15 and above
+        make_field( contract.exchange),
+        make_field( contract.primaryExchange), # srv v14 and above
+        make_field( contract.currency),
+        make_field( contract.localSymbol)] # srv v2 and above
+    if serverVersion >= MIN_SERVER_VER_TRADING_CLASS:
+        flds.append(make_field( contract.tradingClass))
+
+    if serverVersion >= MIN_SERVER_VER_SEC_ID_TYPE:
+        flds += [make_field( contract.secIdType),
+            make_field( contract.secId)]
+
+    # send main order fields
+    flds.append(make_field( order.action))
+
+    if serverVersion >= MIN_SERVER_VER_FRACTIONAL_POSITIONS:
+        flds.append(make_field(order.totalQuantity))
+    else:
+        flds.append(make_field(int(order.totalQuantity)))
+
+    flds.append(make_field(order.orderType))
+    if serverVersion < MIN_SERVER_VER_ORDER_COMBO_LEGS_PRICE:
+        flds.append(make_field(
+            order.lmtPrice if order.lmtPrice != UNSET_DOUBLE else 0))
+    else:
+        flds.append(make_field_handle_empty( order.lmtPrice))
+    if serverVersion < MIN_SERVER_VER_TRAILING_PERCENT:
+        flds.append(make_field(
+            order.auxPrice if order.auxPrice != UNSET_DOUBLE else 0))
+    else:
+        flds.append(make_field_handle_empty( order.auxPrice))
+
+    # send extended order fields
+        flds += [make_field( order.tif),
+        make_field( order.ocaGroup),
+        make_field( order.account),
+        make_field( order.openClose),
+        make_field( order.origin),
+        make_field( order.orderRef),
+        make_field( order.transmit),
+        make_field( order.parentId),      # srv v4 and above
+        make_field( order.blockOrder),    # srv v5 and above
+        make_field( order.sweepToFill),   # srv v5 and above
+        make_field( order.displaySize),   # srv v5 and above
+        make_field( order.triggerMethod), # srv v5 and above
+        make_field( order.outsideRth),    # srv v5 and above
+        make_field( order.hidden)]        # srv v7 and above
+
+    # Send combo legs for BAG requests (srv v8 and above)
+    if contract.secType == "BAG":
+        comboLegsCount = len(contract.comboLegs) if contract.comboLegs else 0
+        flds.append(make_field(comboLegsCount))
+        if comboLegsCount > 0:
+            for comboLeg in contract.comboLegs:
+                assert comboLeg
+                flds += [make_field(comboLeg.conId),
+                    make_field( comboLeg.ratio),
+                    make_field( comboLeg.action),
+                    make_field( comboLeg.exchange),
+                    make_field( comboLeg.openClose),
+                    make_field( comboLeg.shortSaleSlot),      #srv v35 and above
+                    make_field( comboLeg.designatedLocation)] # srv v35 and above
+                if serverVersion >= MIN_SERVER_VER_SSHORTX_OLD:
+                    flds.append(make_field(comboLeg.exemptCode))
+
+    # Send order combo legs for BAG requests
+    if serverVersion >= MIN_SERVER_VER_ORDER_COMBO_LEGS_PRICE and contract.secType == "BAG":
+        orderComboLegsCount = len(order.orderComboLegs) if order.orderComboLegs else 0
+        flds.append(make_field( orderComboLegsCount))
+        if orderComboLegsCount:
+            for orderComboLeg in order.orderComboLegs:
+                assert orderComboLeg
+                flds.append(make_field_handle_empty( orderComboLeg.price))
+
+    if serverVersion >= MIN_SERVER_VER_SMART_COMBO_ROUTING_PARAMS and contract.secType == "BAG":
+            smartComboRoutingParamsCount = len(order.smartComboRoutingParams) if order.smartComboRoutingParams else 0
+            flds.append(make_field( smartComboRoutingParamsCount))
+            if smartComboRoutingParamsCount > 0:
+                for tagValue in order.smartComboRoutingParams:
+                    flds += [make_field(tagValue.tag),
+                        make_field(tagValue.value)]
+
+    ######################################################################
+    # Send the shares allocation.
+    #
+    # This specifies the number of order shares allocated to each Financial
+    # Advisor managed account. The format of the allocation string is as
+    # follows:
+    #                      <account_code1>/<number_shares1>,<account_code2>/<number_shares2>,...N
+    # E.g.
+    #              To allocate 20 shares of a 100 share order to account 'U101' and the
+    #      residual 80 to account 'U203' enter the following share allocation string:
+    #          U101/20,U203/80
+    #####################################################################
+    # send deprecated sharesAllocation field
+    flds += [make_field( ""),            # srv v9 and above
+
+        make_field( order.discretionaryAmt), # srv v10 and above
+        make_field( order.goodAfterTime), # srv v11 and above
+        make_field( order.goodTillDate), # srv v12 and above
+
+        make_field( order.faGroup),      # srv v13 and above
+        make_field( order.faMethod),     # srv v13 and above
+        make_field( order.faPercentage), # srv v13 and above
+        make_field( order.faProfile)]    # srv v13 and above
+
+    if serverVersion >= MIN_SERVER_VER_MODELS_SUPPORT:
+        flds.append(make_field( order.modelCode))
+
+    # institutional short saleslot data (srv v18 and above)
+    flds += [make_field( order.shortSaleSlot),   # 0 for retail, 1 or 2 for institutions
+        make_field( order.designatedLocation)]   # populate only when shortSaleSlot = 2.
+    if serverVersion >= MIN_SERVER_VER_SSHORTX_OLD:
+        flds.append(make_field( order.exemptCode))
+
+    # not needed anymore
+    #bool isVolOrder = (order.orderType.CompareNoCase("VOL") == 0)
+
+    # srv v19 and above fields
+    flds.append(make_field( order.ocaType))
+    #if( serverVersion < 38) {
+    # will never happen
+    #      send( /* order.rthOnly */ false);
+    #}
+    flds += [make_field( order.rule80A),
+        make_field( order.settlingFirm),
+        make_field( order.allOrNone),
+        make_field_handle_empty( order.minQty),
+        make_field_handle_empty( order.percentOffset),
+        make_field( order.eTradeOnly),
+        make_field( order.firmQuoteOnly),
+        make_field_handle_empty( order.nbboPriceCap),
+        make_field( order.auctionStrategy), # AUCTION_MATCH, AUCTION_IMPROVEMENT, AUCTION_TRANSPARENT
+        make_field_handle_empty( order.startingPrice),
+        make_field_handle_empty( order.stockRefPrice),
+        make_field_handle_empty( order.delta),
+        make_field_handle_empty( order.stockRangeLower),
+        make_field_handle_empty( order.stockRangeUpper),
+
+        make_field( order.overridePercentageConstraints),    #srv v22 and above
+
+        # Volatility orders (srv v26 and above)
+        make_field_handle_empty( order.volatility),
+        make_field_handle_empty( order.volatilityType),
+        make_field( order.deltaNeutralOrderType),             # srv v28 and above
+        make_field_handle_empty( order.deltaNeutralAuxPrice)] # srv v28 and above
+
+    if serverVersion >= MIN_SERVER_VER_DELTA_NEUTRAL_CONID and order.deltaNeutralOrderType:
+        flds += [make_field( order.deltaNeutralConId),
+            make_field( order.deltaNeutralSettlingFirm),
+            make_field( order.deltaNeutralClearingAccount),
+            make_field( order.deltaNeutralClearingIntent)]
+
+    if serverVersion >= MIN_SERVER_VER_DELTA_NEUTRAL_OPEN_CLOSE and order.deltaNeutralOrderType:
+        flds += [make_field( order.deltaNeutralOpenClose),
+            make_field( order.deltaNeutralShortSale),
+            make_field( order.deltaNeutralShortSaleSlot),
+            make_field( order.deltaNeutralDesignatedLocation)]
+
+    flds += [make_field( order.continuousUpdate),
+        make_field_handle_empty( order.referencePriceType),
+        make_field_handle_empty( order.trailStopPrice)] # srv v30 and above
+
+    if serverVersion >= MIN_SERVER_VER_TRAILING_PERCENT:
+        flds.append(make_field_handle_empty( order.trailingPercent))
+
+    # SCALE orders
+    if serverVersion >= MIN_SERVER_VER_SCALE_ORDERS2:
+        flds += [make_field_handle_empty( order.scaleInitLevelSize),
+            make_field_handle_empty( order.scaleSubsLevelSize)]
+    else:
+            # srv v35 and above)
+        flds += [make_field( ""), # for not supported scaleNumComponents
+            make_field_handle_empty(order.scaleInitLevelSize)] # for scaleComponentSize
+
+    flds.append(make_field_handle_empty( order.scalePriceIncrement))
+
+    if serverVersion >= MIN_SERVER_VER_SCALE_ORDERS3 \
+        and order.scalePriceIncrement != UNSET_DOUBLE \
+        and order.scalePriceIncrement > 0.0:
+
+        flds += [make_field_handle_empty( order.scalePriceAdjustValue),
+            make_field_handle_empty( order.scalePriceAdjustInterval),
+            make_field_handle_empty( order.scaleProfitOffset),
+            make_field( order.scaleAutoReset),
+            make_field_handle_empty( order.scaleInitPosition),
+            make_field_handle_empty( order.scaleInitFillQty),
+            make_field( order.scaleRandomPercent)]
+
+    if serverVersion >= MIN_SERVER_VER_SCALE_TABLE:
+        flds += [make_field( order.scaleTable),
+            make_field( order.activeStartTime),
+            make_field( order.activeStopTime)]
+
+    # HEDGE orders
+    if serverVersion >= MIN_SERVER_VER_HEDGE_ORDERS:
+        flds.append(make_field( order.hedgeType))
+        if order.hedgeType:
+            flds.append(make_field( order.hedgeParam))
+
+    if serverVersion >= MIN_SERVER_VER_OPT_OUT_SMART_ROUTING:
+        flds.append(make_field( order.optOutSmartRouting))
+
+    if serverVersion >= MIN_SERVER_VER_PTA_ORDERS:
+        flds += [make_field( order.clearingAccount),
+            make_field( order.clearingIntent)]
+
+    if serverVersion >= MIN_SERVER_VER_NOT_HELD:
+        flds.append(make_field( order.notHeld))
+
+    if serverVersion >= MIN_SERVER_VER_DELTA_NEUTRAL:
+        if contract.deltaNeutralContract:
+            flds += [make_field(True),
+                make_field(contract.deltaNeutralContract.conId),
+                make_field(contract.deltaNeutralContract.delta),
+                make_field(contract.deltaNeutralContract.price)]
+        else:
+            flds.append(make_field(False))
+
+    if serverVersion >= MIN_SERVER_VER_ALGO_ORDERS:
+        flds.append(make_field( order.algoStrategy))
+        if order.algoStrategy:
+            algoParamsCount = len(order.algoParams) if order.algoParams else 0
+            flds.append(make_field(algoParamsCount))
+            if algoParamsCount > 0:
+                for algoParam in order.algoParams:
+                    flds += [make_field(algoParam.tag),
+                        make_field(algoParam.value)]
+
+    if serverVersion >= MIN_SERVER_VER_ALGO_ID:
+        flds.append(make_field( order.algoId))
+
+    flds.append(make_field( order.whatIf)) # srv v36 and above
+
+    # send miscOptions parameter
+    if serverVersion >= MIN_SERVER_VER_LINKING:
+        miscOptionsStr = ""
+        if order.orderMiscOptions:
+            for tagValue in order.orderMiscOptions:
+                miscOptionsStr += str(tagValue)
+        flds.append(make_field( miscOptionsStr))
+
+    if serverVersion >= MIN_SERVER_VER_ORDER_SOLICITED:
+        flds.append(make_field(order.solicited))
+
+    if serverVersion >= MIN_SERVER_VER_RANDOMIZE_SIZE_AND_PRICE:
+        flds += [make_field(order.randomizeSize),
+            make_field(order.randomizePrice)]
+
+    if serverVersion >= MIN_SERVER_VER_PEGGED_TO_BENCHMARK:
+        if order.orderType == "PEG BENCH":
+            flds += [make_field(order.referenceContractId),
+                make_field(order.isPeggedChangeAmountDecrease),
+                make_field(order.peggedChangeAmount),
+                make_field(order.referenceChangeAmount),
+                make_field(order.referenceExchangeId)]
+
+        flds.append(make_field(len(order.conditions)))
+
+        if len(order.conditions) > 0:
+            for cond in order.conditions:
+                flds.append(make_field(cond.type()))
+                flds += cond.make_fields()
+
+            flds += [make_field(order.conditionsIgnoreRth),
+                make_field(order.conditionsCancelOrder)]
+
+        flds += [make_field(order.adjustedOrderType),
+            make_field(order.triggerPrice),
+            make_field(order.lmtPriceOffset),
+            make_field(order.adjustedStopPrice),
+            make_field(order.adjustedStopLimitPrice),
+            make_field(order.adjustedTrailingAmount),
+            make_field(order.adjustableTrailingUnit)]
+
+    if serverVersion >= MIN_SERVER_VER_EXT_OPERATOR:
+        flds.append(make_field( order.extOperator))
+
+    if serverVersion >= MIN_SERVER_VER_SOFT_DOLLAR_TIER:
+        flds += [make_field(order.softDollarTier.name),
+            make_field(order.softDollarTier.val)]
+
+    if serverVersion >= MIN_SERVER_VER_CASH_QTY:
+        flds.append(make_field( order.cashQty))
+
+    if serverVersion >= MIN_SERVER_VER_DECISION_MAKER:
+        flds.append(make_field( order.mifid2DecisionMaker))
+        flds.append(make_field( order.mifid2DecisionAlgo))
+
+    if serverVersion >= MIN_SERVER_VER_MIFID_EXECUTION:
+        flds.append(make_field( order.mifid2ExecutionTrader))
+        flds.append(make_field( order.mifid2ExecutionAlgo))
+
+    if serverVersion >= MIN_SERVER_VER_AUTO_PRICE_FOR_HEDGE:
+        flds.append(make_field(order.dontUseAutoPriceForHedge))
+
+    if serverVersion >= MIN_SERVER_VER_ORDER_CONTAINER:
+        flds.append(make_field(order.isOmsContainer))
+
+    if serverVersion >= MIN_SERVER_VER_D_PEG_ORDERS:
+        flds.append(make_field(order.discretionaryUpToLimitPrice))
+
+    if serverVersion >= MIN_SERVER_VER_PRICE_MGMT_ALGO:
+        flds.append(make_field_handle_empty(UNSET_INTEGER if order.usePriceMgmtAlgo == None else 1 if order.usePriceMgmtAlgo else 0))
+
+    msg = "".join(flds)
+    return msg
+
+
+class NullConn(object):
+    def __init__(self):
+        self.nSends = 0
+
+    def isConnected(self):
+        return True
+
+    def sendMsg(self, msg):
+        self.nSends += 1
+        return len(msg)
+
+    def sendAll(self, data):
+        self.nSends += 1
+
+
+def make_orders(nOrders):
+    orders = []
+    for i in range(nOrders):
+        contract = Contract()
+        (contract.conId, contract.symbol) = (1000 + i % 500, "SYM%d" % (i % 500))
+        (contract.secType, contract.exchange, contract.currency) = ("STK", "SMART", "USD")
+        order = Order()
+        (order.action, order.totalQuantity) = ("BUY" if i % 2 else "SELL", 100.)
+        (order.orderType, order.lmtPrice) = ("LMT", 100. + (i % 100) * 0.01)
+        (order.tif, order.account) = ("DAY", "DU0000001")
+        if i % 4 == 0:
+            order.algoStrategy = "Adaptive"
+            order.algoParams = [TagValue("adaptivePriority", "Normal")]
+        if i % 10 == 0:
+            contract.secType = "BAG"
+            leg = ComboLeg()
+            (leg.conId, leg.ratio, leg.action, leg.exchange) = (1000, 1, "BUY", "SMART")
+            contract.comboLegs = [leg, leg]
+        orders.append((i + 1, contract, order))
+    return orders
+
+
+def run(placeOrder, orders) -> float:
+    t0 = time.perf_counter()
+    for (orderId, contract, order) in orders:
+        placeOrder(orderId, contract, order)
+    return time.perf_counter() - t0
+
+
+def main():
+    cmdLineParser = argparse.ArgumentParser("place order benchmark")
+    cmdLineParser.add_argument("--orders", action="store", type=int,
+        dest="orders", default=20000, help="number of orders")
+    cmdLineParser.add_argument("--basket", action="store", type=int,
+        dest="basket", default=500, help="number of orders per placeOrders()")
+    args = cmdLineParser.parse_args()
+
+    orders = make_orders(args.orders)
+    encoder = OrderEncoder(MAX_CLIENT_VER)
+    for (orderId, contract, order) in orders:
+        if encoder.encode(orderId, contract, order) != comm.make_msg(
+                legacy_place_order_msg(MAX_CLIENT_VER, orderId, contract, order)):
+            raise RuntimeError("msgs differ for order %d" % orderId)
+
+    client = EClient(EWrapper())
+    client.conn = NullConn()
+    client.serverVersion_ = MAX_CLIENT_VER
+    client.setConnState(EClient.CONNECTED)
+
+    def legacy(orderId, contract, order):
+        client.conn.sendMsg(comm.make_msg(
+            legacy_place_order_msg(MAX_CLIENT_VER, orderId, contract, order)))
+
+    def encode(orderId, contract, order):
+        encoder.encode(orderId, contract, order)
+
+    print("%-40s %12s %12s" % ("", "us/order", "total s"))
+    for (title, placeOrder) in (
+            ("fields one by one, as it was", legacy),
+            ("OrderEncoder.encode()", encode),
+            ("EClient.placeOrder()", client.placeOrder)):
+        seconds = run(placeOrder, orders)
+        print("%-40s %12.2f %12.3f" % (title, seconds / len(orders) * 1e6,
+                                       seconds))
+
+    baskets = [orders[i:i + args.basket]
+               for i in range(0, len(orders), args.basket)]
+    client.conn.nSends = 0
+    t0 = time.perf_counter()
+    for basket in baskets:
+        client.placeOrders(basket)
+    seconds = time.perf_counter() - t0
+    print("%-40s %12.2f %12.3f" % ("EClient.placeOrders() x%d" % args.basket,
+                                   seconds / len(orders) * 1e6, seconds))
+    print("%d sends for %d orders" % (client.conn.nSends, len(orders)))
+
+
+if "__main__" == __name__:
+    main()
@@ -0,0 +1,74 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+
+"""
+Replays a capture (see ibapi/capture.py) into the Decoder as fast as
+possible, with the generic decoding and with the fastdecoder handlers, the
+wrapper doing nothing. Without --capture a capture of a generated tick
+stream is made first.
+
+    python benchmarks/bench_replay.py --capture session.ibcap
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ibapi import faketws
+from ibapi.capture import FrameRecorder, FrameReplayer
+from ibapi.decoder import Decoder
+from ibapi.wrapper import EWrapper
+from ibapi.server_versions import MAX_CLIENT_VER
+
+
+class NullWrapper(EWrapper):
+    def __getattribute__(self, name):
+        return lambda *args: None
+
+
+def make_capture(path, nFrames):
+    recorder = FrameRecorder(path, MAX_CLIENT_VER)
+    for (i, frame) in enumerate(faketws.tickStream(nFrames, (1001, 1002, 1003))):
+        recorder.record(i * 10000, frame[4:])
+    recorder.close()
+
+
+def main():
+    cmdLineParser = argparse.ArgumentParser("replay benchmark")
+    cmdLineParser.add_argument("--capture", action="store", type=str,
+        dest="capture", default=None, help="capture file to replay")
+    cmdLineParser.add_argument("--frames", action="store", type=int,
+        dest="frames", default=200000, help="frames in the generated capture")
+    args = cmdLineParser.parse_args()
+
+    path = args.capture
+    if path is None:
+        (fd, path) = tempfile.mkstemp(suffix=".ibcap")
+        os.close(fd)
+        os.remove(path)
+        make_capture(path, args.frames)
+
+    try:
+        replayer = FrameReplayer(path)
+        for title in ("generic", "fast"):
+            decoder = Decoder(NullWrapper(), replayer.serverVersion)
+            if title == "generic":
+                decoder.fastHandlers = {}
+            t0 = time.perf_counter()
+            nMsgs = replayer.replay(decoder)
+            elapsed = time.perf_counter() - t0
+            print("%-10s %8d msgs %10.0f msgs/s" % (title, nMsgs, nMsgs / elapsed))
+    finally:
+        if args.capture is None:
+            os.remove(path)
+
+
+if "__main__" == __name__:
+    main()
@@ -0,0 +1,134 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+
+"""
+Measures the EClient.run message loop fed by a synthetic reader thread, with
+the decoding stubbed out so that only the queue hand-off and loop overhead
+are timed. The one-msg-per-get loop EClient.run used before is kept here as
+the reference.
+
+    python benchmarks/bench_run_loop.py --rate 200000 --seconds 2
+"""
+
+import os
+import sys
+import time
+import queue
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ibapi import comm
+from ibapi.client import EClient
+from ibapi.wrapper import EWrapper
+from ibapi.message import IN
+from ibapi.common import MAX_MSG_LEN
+
+
+TICK_SIZE = comm.make_msg("".join(comm.make_field(val) for val in
+                          (IN.TICK_SIZE, 6, 1001, 0, 300)))[4:]
+
+
+class FakeConn:
+    def isConnected(self):
+        return True
+
+    def disconnect(self):
+        pass
+
+
+class CountingDecoder:
+    def __init__(self, client, nMsgs):
+        self.client = client
+        self.nMsgs = nMsgs
+        self.nSeen = 0
+
+    def interpret(self, fields):
+        self.nSeen += 1
+        if self.nSeen == self.nMsgs:
+            self.client.done = True
+
+
+def make_client(nMsgs):
+    client = EClient(EWrapper())
+    client.conn = FakeConn()
+    client.setConnState(EClient.CONNECTED)
+    client.decoder = CountingDecoder(client, nMsgs)
+    return client
+
+
+def legacy_run(client):
+    """ the loop as it was: one blocking get() per msg """
+    while not client.done and (client.isConnected()
+                or not client.msg_queue.empty()):
+        try:
+            text = client.msg_queue.get(block=True, timeout=0.2)
+            if len(text) > MAX_MSG_LEN:
+                break
+        except queue.Empty:
+            pass
+        else:
+            fields = comm.read_fields(text)
+            client.decoder.interpret(fields)
+
+        client.isConnected()
+        client.msg_queue.qsize()
+
+
+def produce(msg_queue, nMsgs, rate):
+    """ puts nMsgs in bursts of 1ms worth of msgs, at the given rate """
+    perBurst = max(1, rate // 1000)
+    t0 = time.perf_counter()
+    nPut = 0
+    while nPut < nMsgs:
+        for _ in range(min(perBurst, nMsgs - nPut)):
+            msg_queue.put(TICK_SIZE)
+        nPut += perBurst
+        wait = t0 + nPut / rate - time.perf_counter()
+        if wait > 0:
+            time.sleep(wait)
+
+
+def measure(loop, nMsgs, rate):
+    client = make_client(nMsgs)
+    if rate:
+        producer = threading.Thread(target=produce,
+                                    args=(client.msg_queue, nMsgs, rate))
+    else:
+        for _ in range(nMsgs):
+            client.msg_queue.put(TICK_SIZE)
+        producer = None
+
+    t0 = time.perf_counter()
+    if producer:
+        producer.start()
+    loop(client)
+    elapsed = time.perf_counter() - t0
+    if producer:
+        producer.join()
+    return nMsgs / elapsed
+
+
+def main():
+    cmdLineParser = argparse.ArgumentParser("run loop benchmark")
+    cmdLineParser.add_argument("--rate", action="store", type=int,
+        dest="rate", default=200000, help="msgs/s sent by the reader")
+    cmdLineParser.add_argument("--seconds", action="store", type=float,
+        dest="seconds", default=2., help="length of the stream")
+    args = cmdLineParser.parse_args()
+
+    nMsgs = int(args.rate * args.seconds)
+    print("%-32s %14s %14s" % ("", "legacy msgs/s", "run msgs/s"))
+    for (title, rate) in (("stream @ %d msgs/s" % args.rate, args.rate),
+                          ("drain %d queued msgs" % nMsgs, 0)):
+        old = measure(legacy_run, nMsgs, rate)
+        new = measure(EClient.run, nMsgs, rate)
+        print("%-32s %14.0f %14.0f" % (title, old, new))
+
+
+if "__main__" == __name__:
+    main()
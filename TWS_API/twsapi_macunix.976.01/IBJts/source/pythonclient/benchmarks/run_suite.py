@@ -0,0 +1,142 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+
+"""
+Runs the benchmarks of benchmarks/suite.py and saves the results as
+benchmarks/results/<commit>.json (a "-dirty" suffix if the tree has local
+changes), so that the hot paths can be compared from one commit to another:
+
+    python benchmarks/run_suite.py                      # run and save
+    python benchmarks/run_suite.py --compare HEAD~1     # ... and compare
+    python benchmarks/run_suite.py -k Decoder --no-save
+
+With --compare, the benchmarks slower than the reference by more than
+--threshold are reported and the exit status is 1. Only compare results
+taken on the same machine.
+"""
+
+import os
+import sys
+import json
+import time
+import timeit
+import socket
+import argparse
+import platform
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import suite
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def git(*args):
+    return subprocess.run(("git", ) + args, stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL, universal_newlines=True,
+        cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+
+
+def current_commit():
+    commit = git("rev-parse", "--short=12", "HEAD") or "unknown"
+    if git("status", "--porcelain", "--untracked-files=no"):
+        commit += "-dirty"
+    return commit
+
+
+def run(bench, repeat, quick):
+    fn = bench.setup()
+    number = max(1, bench.number // 10) if quick else bench.number
+    times = timeit.repeat(fn, number=number, repeat=repeat)
+    best = min(times) / number / bench.opsPerCall
+    return {"nsPerOp": best * 1e9, "opsPerSec": 1. / best,
+            "number": number, "repeat": repeat}
+
+
+def results_path(commit):
+    return os.path.join(RESULTS_DIR, commit + ".json")
+
+
+def load(ref):
+    path = ref if os.path.exists(ref) else None
+    if path is None:
+        commit = git("rev-parse", "--short=12", ref) or ref
+        path = results_path(commit)
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(results, reference, threshold):
+    """ prints the comparison, returns the names of the regressions """
+    regressions = []
+    print()
+    print("%-42s %12s %12s %8s" % ("vs " + reference["commit"], "ref ns/op",
+                                   "ns/op", "change"))
+    for (name, result) in results["benchmarks"].items():
+        ref = reference["benchmarks"].get(name, None)
+        if ref is None:
+            continue
+        change = result["nsPerOp"] / ref["nsPerOp"] - 1.
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print("%-42s %12.1f %12.1f %+7.1f%%%s" % (name, ref["nsPerOp"],
+            result["nsPerOp"], change * 100, flag))
+    return regressions
+
+
+def main():
+    cmdLineParser = argparse.ArgumentParser("hot path benchmark suite")
+    cmdLineParser.add_argument("-k", action="store", type=str, dest="pattern",
+        default="", help="only the benchmarks whose name contains this")
+    cmdLineParser.add_argument("--repeat", action="store", type=int,
+        dest="repeat", default=5, help="timings per benchmark, the best is kept")
+    cmdLineParser.add_argument("--quick", action="store_true", dest="quick",
+        help="10x fewer calls per timing, for a smoke run")
+    cmdLineParser.add_argument("--compare", action="store", type=str,
+        dest="compare", default=None,
+        help="commit (or results file) to compare with")
+    cmdLineParser.add_argument("--threshold", action="store", type=float,
+        dest="threshold", default=0.1, help="slowdown reported as regression")
+    cmdLineParser.add_argument("--no-save", action="store_false", dest="save",
+        help="do not save the results")
+    args = cmdLineParser.parse_args()
+
+    results = {"commit": current_commit(),
+               "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+               "python": platform.python_version(),
+               "machine": "%s %s" % (socket.gethostname(), platform.machine()),
+               "benchmarks": {}}
+
+    print("%-42s %12s %14s" % ("", "ns/op", "ops/s"))
+    for (name, bench) in suite.BENCHMARKS.items():
+        if args.pattern not in name:
+            continue
+        result = run(bench, args.repeat, args.quick)
+        results["benchmarks"][name] = result
+        print("%-42s %12.1f %14.0f" % (name, result["nsPerOp"], result["opsPerSec"]))
+
+    if args.save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = results_path(results["commit"])
+        with open(path, "w") as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+        print("\nsaved %s" % path)
+
+    if args.compare is not None:
+        regressions = compare(results, load(args.compare), args.threshold)
+        if regressions:
+            print("\n%d regression(s) over %d%%" % (len(regressions),
+                                                    args.threshold * 100))
+            sys.exit(1)
+
+
+if "__main__" == __name__:
+    main()
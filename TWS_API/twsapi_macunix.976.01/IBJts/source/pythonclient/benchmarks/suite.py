@@ -0,0 +1,337 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+
+"""
+The hot path benchmarks run by benchmarks/run_suite.py.
+
+Each benchmark is a setup function registered with @benchmark: it builds
+whatever is needed and returns the function to time, which takes no args
+and does opsPerCall operations (msgs, fields, ...) per call. Names are
+"area: what", they are the keys of the saved results so keep them stable.
+"""
+
+import threading
+
+from ibapi import comm
+from ibapi import faketws
+from ibapi.client import EClient
+from ibapi.decoder import Decoder
+from ibapi.wrapper import EWrapper
+from ibapi.contract import Contract
+from ibapi.order import Order
+from ibapi.order_state import OrderState
+from ibapi.common import BarData
+from ibapi.message import IN, OUT
+from ibapi.server_versions import MAX_CLIENT_VER
+
+
+BENCHMARKS = {}
+
+
+class Benchmark(object):
+    def __init__(self, name, setup, number, opsPerCall):
+        self.name = name
+        self.setup = setup
+        self.number = number            # calls per timing
+        self.opsPerCall = opsPerCall
+
+
+def benchmark(name, number=10000, opsPerCall=1):
+    def register(setup):
+        BENCHMARKS[name] = Benchmark(name, setup, number, opsPerCall)
+        return setup
+    return register
+
+
+class CountingWrapper(EWrapper):
+    """ every callback only counts """
+    def __init__(self):
+        self.nCalls = 0
+
+    def __getattribute__(self, name):
+        if name in ("nCalls", "count") or name.startswith("__"):
+            return object.__getattribute__(self, name)
+        return object.__getattribute__(self, "count")
+
+    def count(self, *args):
+        self.nCalls += 1
+
+
+class NullConn(object):
+    def isConnected(self):
+        return True
+
+    def sendMsg(self, msg):
+        return len(msg)
+
+    def sendAll(self, data):
+        return len(data)
+
+
+def make_fields(frame):
+    return comm.read_fields(frame[4:])
+
+
+def sample_contract():
+    contract = Contract()
+    contract.conId = 265598
+    contract.symbol = "AAPL"
+    contract.secType = "STK"
+    contract.exchange = "SMART"
+    contract.primaryExchange = "NASDAQ"
+    contract.currency = "USD"
+    return contract
+
+
+def sample_order():
+    order = Order()
+    order.orderId = 7
+    order.action = "BUY"
+    order.totalQuantity = 100.
+    order.orderType = "LMT"
+    order.lmtPrice = 123.45
+    order.tif = "DAY"
+    order.account = "DU0000001"
+    return order
+
+
+def sample_bars(nBars):
+    bars = []
+    for i in range(nBars):
+        bar = BarData()
+        bar.date = "20191010 10:%02d:00" % (i % 60)
+        (bar.open, bar.high, bar.low, bar.close) = (1.5, 2.5, 1., 2.)
+        (bar.volume, bar.average, bar.barCount) = (1000, 1.75, 10)
+        bars.append(bar)
+    return bars
+
+
+######################################################################
+# comm
+
+@benchmark("comm: make_field int", number=100000)
+def make_field_int():
+    return lambda: comm.make_field(1001)
+
+
+@benchmark("comm: make_field float", number=100000)
+def make_field_float():
+    return lambda: comm.make_field(123.45)
+
+
+@benchmark("comm: make_field str", number=100000)
+def make_field_str():
+    return lambda: comm.make_field("SMART")
+
+
+@benchmark("comm: make_msg", number=100000)
+def make_msg():
+    text = "".join(comm.make_field(val) for val in
+                   (OUT.REQ_MKT_DATA, 11, 1001, 265598, "AAPL", "STK"))
+    return lambda: comm.make_msg(text)
+
+
+@benchmark("comm: encode_field int", number=100000)
+def encode_field_int():
+    return lambda: comm.encode_field(1001)
+
+
+@benchmark("comm: encode_field float", number=100000)
+def encode_field_float():
+    return lambda: comm.encode_field(123.45)
+
+
+@benchmark("comm: encode_field str", number=100000)
+def encode_field_str():
+    return lambda: comm.encode_field("SMART")
+
+
+@benchmark("comm: encode_msg", number=100000)
+def encode_msg():
+    vals = [OUT.REQ_MKT_DATA, 11, 1001, 265598, "AAPL", "STK"]
+    return lambda: comm.encode_msg(vals)
+
+
+@benchmark("comm: read_msg", number=100000)
+def read_msg():
+    frame = faketws.tickPriceFrame(1001, 1, 123.45, 300)
+    return lambda: comm.read_msg(frame)
+
+
+@benchmark("comm: read_fields", number=100000)
+def read_fields():
+    text = faketws.tickPriceFrame(1001, 1, 123.45, 300)[4:]
+    return lambda: comm.read_fields(text)
+
+
+@benchmark("comm: FrameBuffer x1000", number=100, opsPerCall=1000)
+def frame_buffer():
+    burst = b"".join(faketws.tickStream(1000))
+    def frame():
+        frames = comm.FrameBuffer()
+        frames.feed(burst)
+        msg = frames.nextMsg()
+        while msg is not None:
+            msg.tobytes()
+            msg = frames.nextMsg()
+    return frame
+
+
+######################################################################
+# Decoder.interpret, one benchmark per high volume msg
+
+INTERPRET_MSGS = {
+    "TICK_PRICE": faketws.tickPriceFrame(1001, 1, 123.45, 300, 3),
+    "TICK_SIZE": faketws.tickSizeFrame(1001, 8, 12345),
+    "TICK_GENERIC": faketws.makeFrame(IN.TICK_GENERIC, 6, 1001, 49, 0.5),
+    "TICK_STRING": faketws.makeFrame(IN.TICK_STRING, 6, 1001, 45, "1570000000"),
+    "TICK_OPTION_COMPUTATION": faketws.makeFrame(IN.TICK_OPTION_COMPUTATION,
+        6, 1001, 13, 0.25, 0.5, 1.2, 0.01, 0.1, 0.05, -0.02, 100.),
+    "TICK_BY_TICK Last": faketws.tickByTickLastFrame(1001, 1570000000, 123.4,
+                                                     100, 2, "ISLAND", "@ T"),
+    "TICK_BY_TICK BidAsk": faketws.tickByTickBidAskFrame(1001, 1570000000,
+                                                         123.4, 123.5, 100, 200, 1),
+    "TICK_BY_TICK MidPoint": faketws.tickByTickMidPointFrame(1001, 1570000000, 123.45),
+    "MARKET_DEPTH": faketws.makeFrame(IN.MARKET_DEPTH, 1, 1001, 0, 1, 1, 123.4, 500),
+    "MARKET_DEPTH_L2": faketws.marketDepthL2Frame(1001, 0, "NSDQ", 1, 1, 123.4, 500, True),
+    "REAL_TIME_BARS": faketws.makeFrame(IN.REAL_TIME_BARS, 3, 1001, 1570000000,
+                                        1.5, 2.5, 1., 2., 1000, 1.75, 10),
+    "HISTORICAL_DATA x100": faketws.historicalDataFrame(1001, sample_bars(100),
+                                                        "20191010", "20191011"),
+    "ORDER_STATUS": faketws.makeFrame(IN.ORDER_STATUS, 7, "Submitted", 0., 100.,
+                                      0., 1234, 0, 0., 0, "", 0.),
+    "OPEN_ORDER": faketws.openOrderFrame(sample_contract(), sample_order(),
+                                         OrderState()),
+}
+
+
+def register_interpret(msgName, frame):
+    number = 500 if "x100" in msgName or msgName == "OPEN_ORDER" else 20000
+
+    @benchmark("Decoder.interpret: " + msgName, number=number)
+    def interpret():
+        wrapper = CountingWrapper()
+        decoder = Decoder(wrapper, MAX_CLIENT_VER)
+        fields = make_fields(frame)
+        decoder.interpret(fields)
+        if wrapper.nCalls == 0:
+            raise RuntimeError("%s: no callback, bad frame ?" % msgName)
+        return lambda: decoder.interpret(fields)
+
+for (msgName, frame) in INTERPRET_MSGS.items():
+    register_interpret(msgName, frame)
+
+
+######################################################################
+# quotes.QuoteStore, needs numpy
+
+@benchmark("QuoteStore: interpret TICK_PRICE", number=20000)
+def quote_store_interpret():
+    from ibapi.quotes import QuoteStore
+    decoder = Decoder(CountingWrapper(), MAX_CLIENT_VER, feeds=[QuoteStore()])
+    fields = make_fields(INTERPRET_MSGS["TICK_PRICE"])
+    return lambda: decoder.interpret(fields)
+
+
+@benchmark("BarAggregator: TICK_BY_TICK Last, 3 series", number=20000)
+def bar_aggregator_interpret():
+    from ibapi.bar_aggregator import BarAggregator
+    aggregator = BarAggregator()
+    for (kind, threshold) in (("time", 1), ("volume", 10000), ("value", 1e6)):
+        aggregator.addSeries(1001, kind, threshold)
+    decoder = Decoder(CountingWrapper(), MAX_CLIENT_VER, feeds=[aggregator])
+    fields = make_fields(INTERPRET_MSGS["TICK_BY_TICK Last"])
+    return lambda: decoder.interpret(fields)
+
+
+@benchmark("QuoteStore: snapshot x1000 rows", number=2000, opsPerCall=1000)
+def quote_store_snapshot():
+    from ibapi.quotes import QuoteStore
+    store = QuoteStore(1000)
+    for reqId in range(1000):
+        store.setValue(reqId, 1, 100., 0, 100)
+        store.setValue(reqId, 2, 101., 3, 100)
+    return lambda: store.snapshot((0, 1, 2, 3))
+
+
+######################################################################
+# EClient request encoding
+
+def make_client():
+    client = EClient(EWrapper())
+    client.conn = NullConn()
+    client.serverVersion_ = MAX_CLIENT_VER
+    client.setConnState(EClient.CONNECTED)
+    return client
+
+
+@benchmark("EClient: reqMktData", number=20000)
+def req_mkt_data():
+    client = make_client()
+    contract = sample_contract()
+    return lambda: client.reqMktData(1001, contract, "", False, False, [])
+
+
+@benchmark("EClient: placeOrder", number=5000)
+def place_order():
+    client = make_client()
+    contract = sample_contract()
+    order = sample_order()
+    return lambda: client.placeOrder(7, contract, order)
+
+
+@benchmark("EClient: placeOrders x100", number=200, opsPerCall=100)
+def place_orders():
+    client = make_client()
+    orders = [(orderId, sample_contract(), sample_order())
+              for orderId in range(100)]
+    return lambda: client.placeOrders(orders)
+
+
+######################################################################
+# end to end: faketws -> socket -> EReader -> EClient.run -> Decoder -> wrapper
+
+N_STREAM_FRAMES = 50000
+
+
+class DoneWrapper(CountingWrapper):
+    def __init__(self):
+        super().__init__()
+        self.done = threading.Event()
+
+    def __getattribute__(self, name):
+        if name in ("done", "markDone"):
+            return object.__getattribute__(self, name)
+        if name == "tickByTickMidPoint":
+            return object.__getattribute__(self, "markDone")
+        return super().__getattribute__(name)
+
+    def markDone(self, *args):
+        self.done.set()
+
+
+@benchmark("end to end: ticks x%d" % N_STREAM_FRAMES, number=1,
+           opsPerCall=N_STREAM_FRAMES)
+def end_to_end():
+    frames = faketws.tickStream(N_STREAM_FRAMES - 1, (1001, 1002, 1003)) \
+        + [faketws.tickByTickMidPointFrame(1001, 1570000000, 100.)]
+
+    def stream():
+        wrapper = DoneWrapper()
+        client = EClient(wrapper)
+        with faketws.FakeTws() as tws:
+            tws.onRequest(OUT.REQ_MKT_DATA,
+                          lambda session, fields: session.replay(frames))
+            client.connect("127.0.0.1", tws.port, 0)
+            thread = threading.Thread(target=client.run)
+            thread.start()
+            client.reqMktData(1001, Contract(), "", False, False, [])
+            ok = wrapper.done.wait(60)
+            client.disconnect()
+            thread.join()
+        if not ok:
+            raise RuntimeError("end of stream not received")
+    return stream
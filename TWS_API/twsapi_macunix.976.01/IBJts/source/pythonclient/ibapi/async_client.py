@@ -0,0 +1,470 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+
+"""
+An asyncio flavour of the EClient.
+
+There is no EReader thread and no queue: the bytes are framed in
+ProtocolConn.data_received() as they arrive and decoded right away by the
+usual Decoder, in the event loop thread. All the EClient requests are
+available as they are, plus awaitable versions of the requests that end
+with an *End callback, e.g.:
+
+    client = AsyncEClient(wrapper)
+    await client.connect("127.0.0.1", 7497, clientId=0)
+    bars = await client.reqHistoricalDataAsync(reqId, contract, ...)
+
+The answers to an awaited request are returned by the await, they are not
+passed on to the wrapper. Everything else goes to the wrapper as usual.
+await client.run() returns once the connection is closed.
+
+The requests are written to the transport right away, the event loop
+writes them out: there is no writer thread, setOutboundQueue(True) is
+refused (and so is a RateGovernor), flush() returns at once and
+outboundMetrics() is None.
+"""
+
+import time
+import asyncio
+import logging
+
+from ibapi import comm
+from ibapi import writer
+from ibapi import capture
+from ibapi import decoder
+from ibapi import columnar
+from ibapi.client import EClient
+from ibapi.common import NO_VALID_ID, MAX_MSG_LEN
+from ibapi.errors import CONNECT_FAIL, BAD_LENGTH, NOT_CONNECTED
+from ibapi.object_implem import Object
+from ibapi.server_versions import MIN_CLIENT_VER, MAX_CLIENT_VER
+from ibapi.utils import BadMessage, HotPathLog
+
+
+logger = logging.getLogger(__name__)
+
+
+# error codes which are only warnings/notifications, they do not fail a request
+WARNING_CODES = range(2100, 2200)
+
+
+class RequestError(Exception):
+    """ an error received for an awaited request """
+    def __init__(self, reqId, errorCode, errorString):
+        super().__init__("reqId %d: %d %s" % (reqId, errorCode, errorString))
+        self.reqId = reqId
+        self.errorCode = errorCode
+        self.errorString = errorString
+
+
+class PendingRequest(Object):
+    def __init__(self, future):
+        self.future = future
+        self.results = []
+
+
+class RequestTracker(Object):
+    """ Stands between the Decoder and the user's wrapper: the answers to
+    the awaited requests are collected here until their *End callback, all
+    the other callbacks are the wrapper's own (bound) methods. """
+
+    def __init__(self, wrapper):
+        self.wrapper = wrapper
+        self.pending = {}
+        self.sending = None     # the reqId of the request being sent
+
+
+    def __getattr__(self, name):
+        # only called for what is not defined here
+        return getattr(self.wrapper, name)
+
+
+    def addRequest(self, reqId):
+        if reqId in self.pending:
+            raise ValueError("reqId %d is already awaited" % reqId)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[reqId] = PendingRequest(future)
+        return future
+
+
+    def removeRequest(self, reqId):
+        self.pending.pop(reqId, None)
+
+
+    def failAll(self, exc):
+        for request in self.pending.values():
+            if not request.future.done():
+                request.future.set_exception(exc)
+
+
+    def addResult(self, reqId, result) -> bool:
+        request = self.pending.get(reqId, None)
+        if request is None:
+            return False
+        request.results.append(result)
+        return True
+
+
+    def endRequest(self, reqId) -> bool:
+        request = self.pending.get(reqId, None)
+        if request is None:
+            return False
+        if not request.future.done():
+            request.future.set_result(request.results)
+        return True
+
+
+    def error(self, reqId, errorCode, errorString):
+        if reqId == NO_VALID_ID and self.sending is not None:
+            # refused by the request method itself (not connected, server
+            # version too old, ...)
+            reqId = self.sending
+        request = self.pending.get(reqId, None)
+        if request is None or errorCode in WARNING_CODES:
+            self.wrapper.error(reqId, errorCode, errorString)
+        elif not request.future.done():
+            request.future.set_exception(
+                RequestError(reqId, errorCode, errorString))
+
+
+    def contractDetails(self, reqId, contractDetails):
+        if not self.addResult(reqId, contractDetails):
+            self.wrapper.contractDetails(reqId, contractDetails)
+
+
+    def bondContractDetails(self, reqId, contractDetails):
+        if not self.addResult(reqId, contractDetails):
+            self.wrapper.bondContractDetails(reqId, contractDetails)
+
+
+    def contractDetailsEnd(self, reqId):
+        if not self.endRequest(reqId):
+            self.wrapper.contractDetailsEnd(reqId)
+
+
+    def historicalData(self, reqId, bar):
+        if not self.addResult(reqId, bar):
+            self.wrapper.historicalData(reqId, bar)
+
+
+    def historicalDataBatch(self, reqId, bars):
+        if not self.addResult(reqId, bars):
+            self.wrapper.historicalDataBatch(reqId, bars)
+
+
+    def historicalDataEnd(self, reqId, start, end):
+        if not self.endRequest(reqId):
+            self.wrapper.historicalDataEnd(reqId, start, end)
+
+
+    def addTicks(self, reqId, ticks, done) -> bool:
+        if not self.addResult(reqId, ticks):
+            return False
+        if done:
+            self.endRequest(reqId)
+        return True
+
+
+    def historicalTicks(self, reqId, ticks, done):
+        if not self.addTicks(reqId, ticks, done):
+            self.wrapper.historicalTicks(reqId, ticks, done)
+
+
+    def historicalTicksBidAsk(self, reqId, ticks, done):
+        if not self.addTicks(reqId, ticks, done):
+            self.wrapper.historicalTicksBidAsk(reqId, ticks, done)
+
+
+    def historicalTicksLast(self, reqId, ticks, done):
+        if not self.addTicks(reqId, ticks, done):
+            self.wrapper.historicalTicksLast(reqId, ticks, done)
+
+
+    def historicalTicksArray(self, reqId, ticks, done):
+        if not self.addTicks(reqId, ticks, done):
+            self.wrapper.historicalTicksArray(reqId, ticks, done)
+
+
+    def historicalTicksBidAskArray(self, reqId, ticks, done):
+        if not self.addTicks(reqId, ticks, done):
+            self.wrapper.historicalTicksBidAskArray(reqId, ticks, done)
+
+
+    def historicalTicksLastArray(self, reqId, ticks, done):
+        if not self.addTicks(reqId, ticks, done):
+            self.wrapper.historicalTicksLastArray(reqId, ticks, done)
+
+
+    def execDetails(self, reqId, contract, execution):
+        if not self.addResult(reqId, (contract, execution)):
+            self.wrapper.execDetails(reqId, contract, execution)
+
+
+    def execDetailsEnd(self, reqId):
+        if not self.endRequest(reqId):
+            self.wrapper.execDetailsEnd(reqId)
+
+
+class ProtocolConn(asyncio.Protocol):
+    """ The protocol of an AsyncEClient connection. It also stands in for
+    the Connection, so that the EClient requests go through the transport. """
+
+    def __init__(self, client):
+        self.client = client
+        self.transport = None
+        self.frames = comm.FrameBuffer()
+        self.recorder = None    # capture.FrameRecorder, see AsyncEClient.startCapture()
+
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+
+    def data_received(self, data):
+        frames = self.frames
+        frames.feed(data)
+        recorder = self.recorder
+        if recorder is not None:
+            recvTime = time.monotonic_ns()
+        msg = frames.nextMsg()
+        while msg is not None:
+            if len(msg) > MAX_MSG_LEN:
+                self.client.wrapper.error(NO_VALID_ID, BAD_LENGTH.code(),
+                    "%s:%d:%s" % (BAD_LENGTH.msg(), len(msg), msg.tobytes()))
+                self.client.disconnect()
+                return
+            if recorder is not None:
+                recorder.record(recvTime, msg)
+            self.client.msgReceived(comm.read_fields(msg))
+            msg = frames.nextMsg()
+
+
+    def connection_lost(self, exc):
+        self.transport = None
+        self.client.connectionLost(exc)
+
+
+    def isConnected(self):
+        return self.transport is not None and not self.transport.is_closing()
+
+
+    def sendMsg(self, msg):
+        if not self.isConnected():
+            logger.debug("sendMsg attempted while not connected")
+            return 0
+        self.transport.write(msg)
+        return len(msg)
+
+
+    def sendAll(self, data):
+        return self.sendMsg(data)
+
+
+    def disconnect(self):
+        if self.transport is not None:
+            logger.debug("disconnecting")
+            self.transport.close()
+
+
+class AsyncEClient(EClient):
+    def __init__(self, wrapper):
+        super().__init__(RequestTracker(wrapper))
+        self.handshake = None
+        self.closed = None      # future done once the connection is closed
+
+
+    async def connect(self, host, port, clientId):
+        """Connects and returns once the API session is started. Raises
+        OSError if the connection can not be made and ConnectionError if it
+        is lost during the handshake.
+
+        host:str - The host name or IP address of the machine where TWS is
+            running. Leave blank to connect to the local host.
+        port:int - Must match the port specified in TWS on the
+            Configure>API>Socket Port field.
+        clientId:int - A number used to identify this client connection."""
+
+        self.host = host
+        self.port = port
+        self.clientId = clientId
+        logger.debug("Connecting to %s:%d w/ id:%d", self.host, self.port, self.clientId)
+
+        loop = asyncio.get_running_loop()
+        self.handshake = loop.create_future()
+        self.decoder = decoder.Decoder(self.wrapper, self.serverVersion(),
+                                       self.columnarTicks, self.columnarBars,
+                                       self.feeds)
+        try:
+            (_, self.conn) = await loop.create_connection(
+                lambda: ProtocolConn(self), host or "127.0.0.1", port)
+        except OSError:
+            self.wrapper.error(NO_VALID_ID, CONNECT_FAIL.code(), CONNECT_FAIL.msg())
+            logger.info("could not connect")
+            raise
+        self.closed = loop.create_future()
+        self.setConnState(EClient.CONNECTING)
+
+        v100prefix = "API\0"
+        v100version = "v%d..%d" % (MIN_CLIENT_VER, MAX_CLIENT_VER)
+        self.conn.sendMsg(str.encode(v100prefix, 'ascii') + comm.make_msg(v100version))
+
+        await self.handshake
+
+        logger.info("sent startApi")
+        self.startApi()
+        self.wrapper.connectAck()
+
+
+    def msgReceived(self, fields):
+        if self.connState == EClient.CONNECTING and len(fields) == 2:
+            (server_version, conn_time) = fields
+            self.serverVersion_ = int(server_version)
+            self.connTime = conn_time
+            logger.debug("ANSWER Version:%d time:%s", self.serverVersion_, conn_time)
+            self.decoder.setServerVersion(self.serverVersion_)
+            self.setConnState(EClient.CONNECTED)
+            self.handshake.set_result(None)
+            return
+
+        if HotPathLog.debug:
+            logger.debug("fields %s", fields)
+        try:
+            self.decoder.interpret(fields)
+        except BadMessage:
+            logger.info("BadMessage")
+            self.disconnect()
+
+
+    def connectionLost(self, exc):
+        logger.info("connection lost %s", exc)
+        if self.handshake is not None and not self.handshake.done():
+            self.handshake.set_exception(ConnectionError("connection lost during handshake"))
+        self.wrapper.failAll(ConnectionError("connection lost"))
+        self.stopCapture()
+        self.reset()
+        if self.closed is not None and not self.closed.done():
+            self.closed.set_result(None)
+        self.wrapper.connectionClosed()
+
+
+    def startCapture(self, path:str):
+        """As EClient.startCapture(), the msgs are recorded as they are
+        framed by the ProtocolConn.
+
+        path:str - The capture file."""
+
+        if not self.isConnected():
+            self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(),
+                               NOT_CONNECTED.msg())
+            return
+
+        self.stopCapture()
+        self.conn.recorder = capture.FrameRecorder(path, self.serverVersion())
+
+
+    def stopCapture(self):
+        """Stops the capture started by startCapture()."""
+
+        if self.conn is not None and self.conn.recorder is not None:
+            recorder = self.conn.recorder
+            self.conn.recorder = None
+            recorder.close()
+
+
+    def disconnect(self):
+        """Closes the connection, wrapper.connectionClosed() is called once
+        it is closed."""
+
+        self.setConnState(EClient.DISCONNECTED)
+        if self.conn is not None:
+            self.conn.disconnect()
+
+
+    async def run(self):
+        """Returns once the connection is closed, the msgs are handled by
+        the event loop meanwhile."""
+
+        if self.closed is not None:
+            await asyncio.shield(self.closed)
+
+
+    def setOutboundQueue(self, outboundQueue:bool, linger:float=0.,
+                         maxBatch:int=writer.DEFAULT_MAX_BATCH, governor=None):
+        """There is no writer thread, the requests are written to the
+        transport: only setOutboundQueue(False) is accepted."""
+
+        if outboundQueue:
+            raise ValueError("AsyncEClient writes through the event loop, "
+                             "it has no outbound queue")
+        super().setOutboundQueue(False)
+
+
+    async def awaitRequest(self, reqId, request, *args):
+        """ sends the request and waits for the answers for reqId """
+        if not self.isConnected():
+            raise RequestError(reqId, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
+        tracker = self.wrapper
+        future = tracker.addRequest(reqId)
+        try:
+            tracker.sending = reqId
+            try:
+                request(*args)
+            finally:
+                tracker.sending = None
+            return await future
+        finally:
+            tracker.removeRequest(reqId)
+
+
+    async def reqContractDetailsAsync(self, reqId, contract) -> list:
+        """reqContractDetails(), returns the ContractDetails list received
+        up to contractDetailsEnd(). Raises RequestError if an error is
+        received for reqId."""
+
+        return await self.awaitRequest(reqId, self.reqContractDetails,
+                                       reqId, contract)
+
+
+    async def reqHistoricalDataAsync(self, reqId, contract, endDateTime,
+                                     durationStr, barSizeSetting, whatToShow,
+                                     useRTH, formatDate, keepUpToDate,
+                                     chartOptions) -> list:
+        """reqHistoricalData(), returns the BarData list received up to
+        historicalDataEnd(), or with setColumnarBars(True) the bars array.
+        Raises RequestError if an error is received for reqId. With
+        keepUpToDate the updates that follow go to
+        wrapper.historicalDataUpdate()."""
+
+        bars = await self.awaitRequest(reqId, self.reqHistoricalData,
+            reqId, contract, endDateTime, durationStr, barSizeSetting,
+            whatToShow, useRTH, formatDate, keepUpToDate, chartOptions)
+        if self.columnarBars:
+            (bars, ) = bars
+        return bars
+
+
+    async def reqHistoricalTicksAsync(self, reqId, contract, startDateTime,
+                                      endDateTime, numberOfTicks, whatToShow,
+                                      useRth, ignoreSize, miscOptions) -> list:
+        """reqHistoricalTicks(), returns the ticks received up to the one
+        flagged done, as a list or with setColumnarTicks(True) as an array.
+        Raises RequestError if an error is received for reqId."""
+
+        pages = await self.awaitRequest(reqId, self.reqHistoricalTicks,
+            reqId, contract, startDateTime, endDateTime, numberOfTicks,
+            whatToShow, useRth, ignoreSize, miscOptions)
+        if self.columnarTicks:
+            return columnar.numpy.concatenate(pages)
+        return [tick for page in pages for tick in page]
+
+
+    async def reqExecutionsAsync(self, reqId, execFilter) -> list:
+        """reqExecutions(), returns the (Contract, Execution) list received
+        up to execDetailsEnd(). Raises RequestError if an error is received
+        for reqId."""
+
+        return await self.awaitRequest(reqId, self.reqExecutions,
+                                       reqId, execFilter)
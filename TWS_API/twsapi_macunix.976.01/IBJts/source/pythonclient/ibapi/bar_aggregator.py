@@ -0,0 +1,210 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+
+"""
+Bars made from the reqTickByTickData() ticks as they come, needs numpy.
+
+A BarAggregator added to the client with EClient.addFeed() takes the
+TICK_BY_TICK msgs before they go on to the tickByTick*() callbacks as usual,
+and adds each tick to the BarSeries of its reqId, any number of them:
+
+    aggregator = BarAggregator()
+    client.addFeed(aggregator)
+    aggregator.addSeries(1001, "time", 10)          # 10 secs bars
+    aggregator.addSeries(1001, "volume", 50000, callback=onBar)
+    client.reqTickByTickData(1001, contract, "AllLast", 0, False)
+
+The kinds of bars, by what completes them:
+    "time"      threshold seconds: a bar covers [time, time + threshold),
+                completed by the first tick after it or by flush()
+    "volume"    threshold shares traded
+    "value"     threshold traded, price * size summed ("dollar" bars)
+    "ticks"     threshold ticks
+The tick that reaches a volume or value threshold is the last of its bar,
+which can go over the threshold. The Last and AllLast ticks make trade
+bars, the BidAsk and MidPoint ticks make midpoint bars with no volume.
+
+The bar being made is a few attributes of its series, a completed bar is
+written in the series' ring buffer, a numpy array of BAR_DTYPE preallocated
+with capacity rows, then passed to the callback if any as callback(series,
+bar), bar being its row of the ring buffer. last() copies the latest
+completed bars. Nothing is allocated per tick.
+"""
+
+import logging
+
+from ibapi import columnar
+from ibapi.message import IN
+from ibapi.object_implem import Object
+
+numpy = columnar.numpy
+
+
+logger = logging.getLogger(__name__)
+
+
+if numpy is not None:
+    BAR_DTYPE = numpy.dtype([
+        ("time", numpy.int64), ("endTime", numpy.int64),
+        ("open", numpy.float64), ("high", numpy.float64),
+        ("low", numpy.float64), ("close", numpy.float64),
+        ("volume", numpy.int64), ("value", numpy.float64),
+        ("count", numpy.int64)])
+
+BAR_KINDS = ("time", "volume", "value", "ticks")
+
+DEFAULT_CAPACITY = 4096
+
+
+class BarSeries(Object):
+    def __init__(self, reqId, kind, threshold, capacity=DEFAULT_CAPACITY,
+                 callback=None):
+        if kind not in BAR_KINDS:
+            raise ValueError("unknown kind of bars %s" % kind)
+        self.reqId = reqId
+        self.kind = kind
+        self.threshold = threshold
+        self.callback = callback
+        self.bars = numpy.zeros(capacity, dtype=BAR_DTYPE)
+        self.nBars = 0          # completed since the start, bars[nBars % capacity] is next
+
+        # the bar being made
+        self.count = 0
+        self.startTime = 0
+        self.endTime = 0
+        self.timeLimit = 0      # end of the time bar
+        self.open = self.high = self.low = self.close = 0.
+        self.volume = 0
+        self.value = 0.
+
+
+    def add(self, time, price, size):
+        if self.count and self.kind == "time" and time >= self.timeLimit:
+            self.complete()
+
+        if self.count:
+            if price > self.high:
+                self.high = price
+            elif price < self.low:
+                self.low = price
+        else:
+            if self.kind == "time":
+                self.startTime = time - time % self.threshold
+                self.timeLimit = self.startTime + self.threshold
+            else:
+                self.startTime = time
+            self.open = self.high = self.low = price
+            self.volume = 0
+            self.value = 0.
+        self.close = price
+        self.endTime = time
+        self.volume += size
+        self.value += price * size
+        self.count += 1
+
+        kind = self.kind
+        if kind == "volume":
+            if self.volume >= self.threshold:
+                self.complete()
+        elif kind == "value":
+            if self.value >= self.threshold:
+                self.complete()
+        elif kind == "ticks":
+            if self.count >= self.threshold:
+                self.complete()
+
+
+    def complete(self):
+        idx = self.nBars % len(self.bars)
+        self.bars[idx] = (self.startTime, self.endTime, self.open, self.high,
+                          self.low, self.close, self.volume, self.value,
+                          self.count)
+        self.nBars += 1
+        self.count = 0
+        if self.callback is not None:
+            self.callback(self, self.bars[idx])
+
+
+    def flush(self, now):
+        """ completes the time bar if it ended before now (epoch seconds) """
+        if self.count and self.kind == "time" and now >= self.timeLimit:
+            self.complete()
+
+
+    def last(self, n=None):
+        """ a copy of the latest n completed bars (all those kept if None),
+        oldest first """
+        capacity = len(self.bars)
+        kept = min(self.nBars, capacity)
+        n = kept if n is None else min(n, kept)
+        end = self.nBars % capacity
+        if n <= end:
+            return self.bars[end - n:end].copy()
+        return numpy.concatenate((self.bars[capacity - (n - end):],
+                                  self.bars[:end]))
+
+
+class BarAggregator(Object):
+    """ the BarSeries of every reqId, fed by the decoder """
+
+    def __init__(self):
+        columnar.checkNumpy()
+        self.series = {}        # reqId -> list of BarSeries
+
+
+    def addSeries(self, reqId, kind, threshold, capacity=DEFAULT_CAPACITY,
+                  callback=None) -> BarSeries:
+        """ a new series of the ticks of reqId, see BAR_KINDS """
+        series = BarSeries(reqId, kind, threshold, capacity, callback)
+        self.series.setdefault(reqId, []).append(series)
+        return series
+
+
+    def removeSeries(self, series):
+        seriesList = self.series.get(series.reqId, [])
+        seriesList.remove(series)
+        if not seriesList:
+            del self.series[series.reqId]
+
+
+    def remove(self, reqId):
+        """ drops all the series of reqId """
+        self.series.pop(reqId, None)
+
+
+    def flush(self, now):
+        """ completes the time bars ended before now (epoch seconds), for the
+        instruments with no tick since """
+        for seriesList in self.series.values():
+            for series in seriesList:
+                series.flush(now)
+
+
+    def makeHandlers(self, nextHandler, serverVersion) -> dict:
+        """ see Decoder.addFeed() """
+        allSeries = self.series
+
+        nextTickByTick = nextHandler(IN.TICK_BY_TICK)
+        def handleTickByTick(fields):
+            seriesList = allSeries.get(int(fields[1] or 0), None) \
+                if len(fields) >= 5 else None
+            if seriesList is not None:
+                tickType = fields[2]
+                if tickType == b"4":
+                    (price, size) = (float(fields[4] or 0), 0)
+                elif len(fields) < 9:
+                    seriesList = ()     # left to the next handler to reject
+                elif tickType == b"3":
+                    price = (float(fields[4] or 0) + float(fields[5] or 0)) / 2
+                    size = 0
+                else:
+                    (price, size) = (float(fields[4] or 0), int(fields[5] or 0))
+                time = int(fields[3] or 0)
+                for series in seriesList:
+                    series.add(time, price, size)
+            nextTickByTick(fields)
+
+        return {IN.TICK_BY_TICK: handleTickByTick}
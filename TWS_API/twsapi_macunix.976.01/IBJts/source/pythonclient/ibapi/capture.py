@@ -0,0 +1,204 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+
+"""
+Capture of the incoming msgs as they come off the wire, and their replay
+into a Decoder without a socket.
+
+The capture file is append-only:
+    header: "IBAPICAP", format version (!H), server version (!I)
+    then one record per msg: receive time (!Q, time.monotonic_ns()) and
+    the msg as received: size prefix (!I) and payload
+    each FrameRecorder (a session) starts with a session record: its
+    time.monotonic_ns() (!Q), SESSION (!I) and its time.time_ns() (!Q)
+
+The monotonic clock of a session has no common origin with the one of
+another process or boot, the session record ties it to the wall clock:
+the replay gives the receive times as time.time_ns() and paces each
+session on its own, the time between two sessions is skipped.
+
+EClient.startCapture() taps the EReader (AsyncEClient the ProtocolConn),
+FrameRecorder can also be used on its own. A record cut short (e.g. the
+process was killed while writing) ends the replay.
+"""
+
+import os
+import time
+import struct
+import logging
+import threading
+
+from ibapi import comm
+from ibapi.object_implem import Object
+
+
+logger = logging.getLogger(__name__)
+
+
+MAGIC = b"IBAPICAP"
+FORMAT_VERSION = 2
+HEADER = struct.Struct("!8sHI")
+RECORD = struct.Struct("!QI")
+# the size of a session record, then its wall clock time
+SESSION = 0xffffffff
+WALL_CLOCK = struct.Struct("!Q")
+
+
+class FrameRecorder(Object):
+    def __init__(self, path, serverVersion, bufferSize=1 << 16):
+        """ Appends to path if it is a capture of the same server version
+        (a last record cut short is dropped first), as a new session. The
+        records are buffered, see flush(). """
+        self.path = path
+        self.serverVersion = serverVersion
+        self.lock = threading.Lock()
+        self.nRecords = 0
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            self.file = open(path, "wb", buffering=bufferSize)
+            self.file.write(HEADER.pack(MAGIC, FORMAT_VERSION, serverVersion))
+            self.startSession()
+            return
+
+        self.file = open(path, "r+b", buffering=bufferSize)
+        try:
+            fileServerVersion = readHeader(self.file.read(HEADER.size), path)
+            if fileServerVersion != serverVersion:
+                raise ValueError("%s: captured with server version %d, not %d"
+                                 % (path, fileServerVersion, serverVersion))
+            self.file.seek(self.endOfRecords())
+            self.file.truncate()
+            self.startSession()
+        except:
+            self.file.close()
+            raise
+
+
+    def startSession(self):
+        self.file.write(RECORD.pack(time.monotonic_ns(), SESSION))
+        self.file.write(WALL_CLOCK.pack(time.time_ns()))
+
+
+    def endOfRecords(self) -> int:
+        """ the offset after the last complete record """
+        end = self.file.seek(0, os.SEEK_END)
+        pos = HEADER.size
+        while pos + RECORD.size <= end:
+            self.file.seek(pos)
+            (_, size) = RECORD.unpack(self.file.read(RECORD.size))
+            if size == SESSION:
+                size = WALL_CLOCK.size
+            if pos + RECORD.size + size > end:
+                break
+            pos += RECORD.size + size
+        return pos
+
+
+    def record(self, recvTime, msg):
+        """ recvTime: time.monotonic_ns() of this process, msg: the payload
+        (no size prefix) """
+        with self.lock:
+            if self.file is None:
+                return
+            self.file.write(RECORD.pack(recvTime, len(msg)))
+            self.file.write(msg)
+            self.nRecords += 1
+
+
+    def flush(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.flush()
+
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+def readHeader(header, path) -> int:
+    """ checks the header, returns the server version """
+    if len(header) < HEADER.size:
+        raise ValueError("%s: not a capture file" % path)
+    (magic, formatVersion, serverVersion) = HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ValueError("%s: not a capture file" % path)
+    if formatVersion != FORMAT_VERSION:
+        raise ValueError("%s: unsupported capture format %d" % (path, formatVersion))
+    return serverVersion
+
+
+class FrameReplayer(Object):
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.data = f.read()
+        self.serverVersion = readHeader(self.data[:HEADER.size], path)
+
+
+    def records(self):
+        """ yields (recvTime, msg) for each record, recvTime in
+        time.time_ns(), msg being a memoryview of the payload """
+        for (_, recvTime, msg) in self.sessionRecords():
+            yield (recvTime, msg)
+
+
+    def sessionRecords(self):
+        """ yields (session, recvTime, msg) for each record, session
+        counting the sessions from 0 """
+        data = memoryview(self.data)
+        pos = HEADER.size
+        end = len(data)
+        unpack = RECORD.unpack_from
+        recordSize = RECORD.size
+        session = -1
+        offset = None       # wall clock - monotonic clock of the session
+        while pos + recordSize <= end:
+            (recvTime, size) = unpack(data, pos)
+            pos += recordSize
+            isSession = size == SESSION
+            if isSession:
+                size = WALL_CLOCK.size
+            if pos + size > end:
+                logger.warning("capture cut short, %d bytes ignored",
+                               end - pos + recordSize)
+                break
+            if isSession:
+                (wallClock, ) = WALL_CLOCK.unpack_from(data, pos)
+                offset = wallClock - recvTime
+                session += 1
+            else:
+                yield (session, recvTime + offset, data[pos:pos + size])
+            pos += size
+
+
+    def replay(self, decoder, paced=False, speed=1.) -> int:
+        """ Feeds the msgs to decoder.interpret(), as fast as possible or,
+        if paced, at the recorded pace (speed times faster). Returns the
+        number of msgs replayed. """
+
+        interpret = decoder.interpret
+        read_fields = comm.read_fields
+        nMsgs = 0
+        if not paced:
+            for (_, msg) in self.records():
+                interpret(read_fields(msg))
+                nMsgs += 1
+            return nMsgs
+
+        lastSession = None
+        for (session, recvTime, msg) in self.sessionRecords():
+            if session != lastSession:
+                # the time between the sessions is not waited
+                lastSession = session
+                t0 = recvTime
+                start = time.monotonic_ns()
+            wait = (recvTime - t0) / speed - (time.monotonic_ns() - start)
+            if wait > 0:
+                time.sleep(wait / 1e9)
+            interpret(read_fields(msg))
+            nMsgs += 1
+        return nMsgs
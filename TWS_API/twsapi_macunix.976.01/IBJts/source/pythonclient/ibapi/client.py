@@ -14,20 +14,23 @@ It takes care of almost everything:
 The user just needs to override EWrapper methods to receive the answers.
 """
 
+import sys
 import logging
 import queue
 import socket
+import collections
 
-from ibapi import (decoder, reader, comm)
+from ibapi import (decoder, reader, writer, comm, capture, columnar)
 from ibapi.connection import Connection
 from ibapi.message import OUT
 from ibapi.common import * # @UnusedWildImport
 from ibapi.contract import Contract
 from ibapi.order import Order
 from ibapi.execution import ExecutionFilter
+from ibapi.orderencoder import OrderEncoder
 from ibapi.scanner import ScannerSubscription
 from ibapi.comm import (make_field, make_field_handle_empty)
-from ibapi.utils import (current_fn_name, BadMessage)
+from ibapi.utils import (current_fn_name, BadMessage, HotPathLog)
 from ibapi.errors import * #@UnusedWildImport
 from ibapi.server_versions import * # @UnusedWildImport
 
@@ -35,6 +38,9 @@ from ibapi.server_versions import * # @UnusedWildImport
 
 logger = logging.getLogger(__name__)
 
+# the seconds disconnect() gives the writer thread to send what is queued
+DISCONNECT_FLUSH_TIMEOUT = 5.
+
 
 class EClient(object):
     (DISCONNECTED, CONNECTING, CONNECTED, REDIRECT) = range(4)
@@ -45,6 +51,12 @@ class EClient(object):
         self.msg_queue = queue.Queue()
         self.wrapper = wrapper
         self.decoder = None
+        self.orderEncoder = None
+        self.socketOptions = {}
+        self.outboundOptions = None
+        self.columnarTicks = False
+        self.columnarBars = False
+        self.feeds = []
         self.reset()
 
 
@@ -62,6 +74,7 @@ class EClient(object):
         self.optCapab = ""
         self.asynchronous = False
         self.reader = None
+        self.writer = None
         self.decode = None
         self.setConnState(EClient.DISCONNECTED)
 
@@ -72,14 +85,29 @@ class EClient(object):
         logger.debug("%s connState: %s -> %s" % (id(self), _connState,
                                                  self.connState))
 
-    def sendMsg(self, msg):
-        full_msg = comm.make_msg(msg)
-        logger.info("%s %s %s", "SENDING", current_fn_name(1), full_msg)
-        self.conn.sendMsg(full_msg)
+    def sendMsg(self, msg, reqId=NO_VALID_ID):
+        """ msg: the text of the msg, or the msg as bytes with its size
+        prefix, as made by comm.encode_msg(). reqId: the id the error goes
+        with if the writer thread drops the msg (it stopped or failed). """
+        full_msg = msg if type(msg) is bytes else comm.make_msg(msg)
+        if HotPathLog.info and logger.isEnabledFor(logging.INFO):
+            logger.info("%s %s %s", "SENDING", current_fn_name(1), full_msg)
+        ewriter = self.writer
+        if ewriter is not None:
+            if not ewriter.put(full_msg):
+                self.wrapper.error(reqId, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
+        else:
+            self.conn.sendMsg(full_msg)
 
 
-    def logRequest(self, fnName, fnParams):
-        if logger.isEnabledFor(logging.INFO):
+    def logRequest(self, fnName=None, fnParams=None):
+        """ Logs a request. Called with no args it logs the calling request
+        method and its params, these are only looked up if it gets logged. """
+        if HotPathLog.info and logger.isEnabledFor(logging.INFO):
+            if fnName is None:
+                frame = sys._getframe(1)
+                fnName = frame.f_code.co_name
+                fnParams = frame.f_locals
             if 'self' in fnParams:
                 prms = dict(fnParams)
                 del prms['self']
@@ -88,11 +116,148 @@ class EClient(object):
             logger.info("REQUEST %s %s" % (fnName, prms))
 
 
+    def setSocketOptions(self, recvBufSize:int=None, readSize:int=4096,
+                         tcpNoDelay:bool=False, recvInto:bool=False):
+        """Tunes the socket used by the next connect().
+
+        recvBufSize:int - The SO_RCVBUF size. Leave None to keep the OS
+            default; raise it to ride out bursts of market data.
+        readSize:int - The max number of bytes asked from the socket per read.
+        tcpNoDelay:bool - Sets TCP_NODELAY so that small requests are sent
+            without waiting to be coalesced.
+        recvInto:bool - The reader receives straight into its preallocated
+            buffer with socket.recv_into() instead of concatenating the
+            bytes returned by socket.recv()."""
+
+        self.socketOptions = {"recvBufSize": recvBufSize,
+                              "readSize": readSize,
+                              "tcpNoDelay": tcpNoDelay,
+                              "recvInto": recvInto}
+
+
+    def setOutboundQueue(self, outboundQueue:bool, linger:float=0.,
+                         maxBatch:int=writer.DEFAULT_MAX_BATCH, governor=None):
+        """Makes the requests sent by a writer thread from the next
+        connect(): they are queued, and the writer sends all the msgs
+        queued since its last write in one socket write, see writer.py.
+        flush() waits for the queue to be written.
+
+        outboundQueue:bool - True for the writer thread, False to send each
+            request from the calling thread.
+        linger:float - The seconds the writer waits for more msgs once one
+            is queued, to make larger writes; 0 to write at once.
+        maxBatch:int - The most bytes written at once.
+        governor:RateGovernor - Keeps the writes under the TWS limit of 50
+            msgs per second, the orders and cancels written before the
+            other requests, see governor.py. None to write the msgs as
+            fast as they come. Not to be shared by two clients."""
+
+        self.outboundOptions = {"linger": linger, "maxBatch": maxBatch,
+                                "governor": governor} if outboundQueue else None
+
+
+    def flush(self, timeout:float=None) -> bool:
+        """Waits until the requests made so far are written to the socket,
+        with setOutboundQueue(True). Returns False if it timed out or the
+        writer stopped.
+
+        timeout:float - The max seconds to wait, None for no limit."""
+
+        ewriter = self.writer
+        if ewriter is None:
+            return True
+        return ewriter.flush(timeout)
+
+
+    def outboundMetrics(self) -> dict:
+        """Returns the queue depth and the writes of the writer thread, the
+        time held back by the governor and the latency of the msgs of each
+        priority class (see EWriter.metrics()). None without
+        setOutboundQueue(True)."""
+
+        ewriter = self.writer
+        return ewriter.metrics() if ewriter is not None else None
+
+
+    def setColumnarTicks(self, columnarTicks:bool):
+        """Makes the reqHistoricalTicks() answers come as numpy arrays, to
+        historicalTicksArray(), historicalTicksBidAskArray() and
+        historicalTicksLastArray(), instead of lists of objects. Needs numpy.
+
+        columnarTicks:bool - True for the numpy arrays."""
+
+        if columnarTicks:
+            columnar.checkNumpy()
+        self.columnarTicks = columnarTicks
+        if self.decoder is not None:
+            self.decoder.setColumnarTicks(columnarTicks)
+
+
+    def setColumnarBars(self, columnarBars:bool):
+        """Makes the reqHistoricalData() answers come to
+        historicalDataBatch() as one numpy array per answer instead of one
+        historicalData() call per bar, see columnar.toDataFrame() for a
+        pandas DataFrame. The updates of keepUpToDate still come to
+        historicalDataUpdate(). Needs numpy.
+
+        columnarBars:bool - True for the numpy arrays."""
+
+        if columnarBars:
+            columnar.checkNumpy()
+        self.columnarBars = columnarBars
+        if self.decoder is not None:
+            self.decoder.setColumnarBars(columnarBars)
+
+
+    def addFeed(self, feed):
+        """Makes the decoder pass the msgs the feed handles to it first,
+        before the wrapper callbacks, e.g. a quotes.QuoteStore.
+
+        feed - An object with a makeHandlers(nextHandler, serverVersion)
+            method, see Decoder.addFeed()."""
+
+        self.feeds.append(feed)
+        if self.decoder is not None:
+            self.decoder.addFeed(feed)
+
+
+    def removeFeed(self, feed):
+        """Stops the msgs going to the feed."""
+
+        self.feeds.remove(feed)
+        if self.decoder is not None:
+            self.decoder.removeFeed(feed)
+
+
+    def startCapture(self, path:str):
+        """Starts writing the incoming msgs, with their receive time, to the
+        capture file path (appended to if it exists), see capture.py.
+
+        path:str - The capture file."""
+
+        if not self.isConnected():
+            self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(),
+                               NOT_CONNECTED.msg())
+            return
+
+        self.stopCapture()
+        self.reader.recorder = capture.FrameRecorder(path, self.serverVersion())
+
+
+    def stopCapture(self):
+        """Stops the capture started by startCapture()."""
+
+        if self.reader is not None and self.reader.recorder is not None:
+            recorder = self.reader.recorder
+            self.reader.recorder = None
+            recorder.close()
+
+
     def startApi(self):
         """  Initiates the message exchange between the client application and
         the TWS/IB Gateway. """
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(),
@@ -132,7 +297,7 @@ class EClient(object):
             self.clientId = clientId
             logger.debug("Connecting to %s:%d w/ id:%d", self.host, self.port, self.clientId)
 
-            self.conn = Connection(self.host, self.port)
+            self.conn = Connection(self.host, self.port, **self.socketOptions)
 
             self.conn.connect()
             self.setConnState(EClient.CONNECTING)
@@ -148,7 +313,9 @@ class EClient(object):
             logger.debug("REQUEST %s", msg2)
             self.conn.sendMsg(msg2)
 
-            self.decoder = decoder.Decoder(self.wrapper, self.serverVersion())
+            self.decoder = decoder.Decoder(self.wrapper, self.serverVersion(),
+                                           self.columnarTicks, self.columnarBars,
+                                           self.feeds)
             fields = []
 
             #sometimes I get news before the server version, thus the loop
@@ -169,12 +336,15 @@ class EClient(object):
             logger.debug("ANSWER Version:%d time:%s", server_version, conn_time)
             self.connTime = conn_time
             self.serverVersion_ = server_version
-            self.decoder.serverVersion = self.serverVersion()
+            self.decoder.setServerVersion(self.serverVersion())
 
             self.setConnState(EClient.CONNECTED)
 
             self.reader = reader.EReader(self.conn, self.msg_queue)
             self.reader.start()   # start thread
+            if self.outboundOptions is not None:
+                self.writer = writer.EWriter(self.conn, **self.outboundOptions)
+                self.writer.start()
             logger.info("sent startApi")
             self.startApi()
             self.wrapper.connectAck()
@@ -194,6 +364,10 @@ class EClient(object):
         self.setConnState(EClient.DISCONNECTED)
         if self.conn is not None:
             logger.info("disconnecting")
+            self.stopCapture()
+            if self.writer is not None:
+                # what was queued goes out first
+                self.writer.stop(DISCONNECT_FLUSH_TIMEOUT)
             self.conn.disconnect()
             self.wrapper.connectionClosed()
             self.reset()
@@ -203,8 +377,9 @@ class EClient(object):
         """Call this function to check if there is a connection with TWS"""
 
         connConnected = self.conn and self.conn.isConnected()
-        logger.debug("%s isConn: %s, connConnected: %s" % (id(self),
-            self.connState, str(connConnected)))
+        if HotPathLog.debug:
+            logger.debug("%s isConn: %s, connConnected: %s", id(self),
+                self.connState, connConnected)
         return EClient.CONNECTED == self.connState and connConnected
 
     def keyboardInterrupt(self):
@@ -220,22 +395,24 @@ class EClient(object):
     def run(self):
         """This is the function that has the message loop."""
 
+        msgs = collections.deque()
         try:
-            while not self.done and (self.isConnected()
+            # what is already dequeued is decoded, even after a BadMessage
+            while not self.done and (self.isConnected() or msgs
                         or not self.msg_queue.empty()):
                 try:
-                    try:
-                        text = self.msg_queue.get(block=True, timeout=0.2)
+                    if not msgs:
+                        self.dequeueMsgs(msgs)
+                    while msgs and not self.done:
+                        text = msgs.popleft()
                         if len(text) > MAX_MSG_LEN:
                             self.wrapper.error(NO_VALID_ID, BAD_LENGTH.code(),
                                 "%s:%d:%s" % (BAD_LENGTH.msg(), len(text), text))
                             self.disconnect()
-                            break
-                    except queue.Empty:
-                        logger.debug("queue.get: empty")
-                    else:
+                            return
                         fields = comm.read_fields(text)
-                        logger.debug("fields %s", fields)
+                        if HotPathLog.debug:
+                            logger.debug("fields %s", fields)
                         self.decoder.interpret(fields)
                 except (KeyboardInterrupt, SystemExit):
                     logger.info("detected KeyboardInterrupt, SystemExit")
@@ -245,17 +422,37 @@ class EClient(object):
                     logger.info("BadMessage")
                     self.conn.disconnect()
 
-                logger.debug("conn:%d queue.sz:%d",
-                             self.isConnected(),
-                             self.msg_queue.qsize())
+                if HotPathLog.debug and logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("conn:%d queue.sz:%d",
+                                 self.isConnected(),
+                                 self.msg_queue.qsize())
         finally:
             self.disconnect()
 
 
+    def dequeueMsgs(self, msgs):
+        """Waits for the next message from the reader and then moves it,
+        along with all the other messages already queued, into msgs. Taking
+        the whole backlog at once costs a single lock round-trip instead of
+        one per message."""
+
+        try:
+            msgs.append(self.msg_queue.get(block=True, timeout=0.2))
+        except queue.Empty:
+            logger.debug("queue.get: empty")
+            return
+
+        msg_queue = self.msg_queue
+        with msg_queue.mutex:
+            msgs.extend(msg_queue.queue)
+            msg_queue.queue.clear()
+            msg_queue.not_full.notify_all()
+
+
     def reqCurrentTime(self):
         """Asks the current system time on the server side."""
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(),
@@ -281,7 +478,7 @@ class EClient(object):
         """The default detail level is ERROR. For more details, see API
         Logging."""
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(),
@@ -335,7 +532,7 @@ class EClient(object):
         mktDataOptions:TagValueList - For internal use only.
             Use default value XYZ. """
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(reqId, NOT_CONNECTED.code(),
@@ -363,53 +560,50 @@ class EClient(object):
         VERSION = 11
 
         # send req mkt data msg
-        flds = []
-        flds += [make_field(OUT.REQ_MKT_DATA),
-            make_field(VERSION),
-            make_field(reqId)]
+        flds = [OUT.REQ_MKT_DATA, VERSION, reqId]
 
         # send contract fields
         if self.serverVersion() >= MIN_SERVER_VER_REQ_MKT_DATA_CONID:
-            flds += [make_field(contract.conId),]
-
-        flds += [make_field(contract.symbol),
-            make_field(contract.secType),
-            make_field(contract.lastTradeDateOrContractMonth),
-            make_field(contract.strike),
-            make_field(contract.right),
-            make_field(contract.multiplier), # srv v15 and above
-            make_field(contract.exchange),
-            make_field(contract.primaryExchange), # srv v14 and above
-            make_field(contract.currency),
-            make_field(contract.localSymbol) ] # srv v2 and above
+            flds.append(contract.conId)
+
+        flds += [contract.symbol,
+            contract.secType,
+            contract.lastTradeDateOrContractMonth,
+            contract.strike,
+            contract.right,
+            contract.multiplier, # srv v15 and above
+            contract.exchange,
+            contract.primaryExchange, # srv v14 and above
+            contract.currency,
+            contract.localSymbol] # srv v2 and above
 
         if self.serverVersion() >= MIN_SERVER_VER_TRADING_CLASS:
-            flds += [make_field(contract.tradingClass),]
+            flds.append(contract.tradingClass)
 
         # Send combo legs for BAG requests (srv v8 and above)
         if contract.secType == "BAG":
             comboLegsCount = len(contract.comboLegs) if contract.comboLegs else 0
-            flds += [make_field(comboLegsCount),]
+            flds.append(comboLegsCount)
             for comboLeg in contract.comboLegs:
-                    flds += [make_field(comboLeg.conId),
-                        make_field( comboLeg.ratio),
-                        make_field( comboLeg.action),
-                        make_field( comboLeg.exchange)]
+                    flds += [comboLeg.conId,
+                        comboLeg.ratio,
+                        comboLeg.action,
+                        comboLeg.exchange]
 
         if self.serverVersion() >= MIN_SERVER_VER_DELTA_NEUTRAL:
             if contract.deltaNeutralContract:
-                flds += [make_field(True),
-                    make_field(contract.deltaNeutralContract.conId),
-                    make_field(contract.deltaNeutralContract.delta),
-                    make_field(contract.deltaNeutralContract.price)]
+                flds += [True,
+                    contract.deltaNeutralContract.conId,
+                    contract.deltaNeutralContract.delta,
+                    contract.deltaNeutralContract.price]
             else:
-                flds += [make_field(False),]
+                flds.append(False)
 
-        flds += [make_field(genericTickList), # srv v31 and above
-            make_field(snapshot)] # srv v35 and above
+        flds += [genericTickList, # srv v31 and above
+            snapshot] # srv v35 and above
 
         if self.serverVersion() >= MIN_SERVER_VER_REQ_SMART_COMPONENTS:
-            flds += [make_field(regulatorySnapshot),]
+            flds.append(regulatorySnapshot)
 
         # send mktDataOptions parameter
         if self.serverVersion() >= MIN_SERVER_VER_LINKING:
@@ -417,10 +611,9 @@ class EClient(object):
             if mktDataOptions:
                 raise NotImplementedError("not supported")
             mktDataOptionsStr = ""
-            flds += [make_field(mktDataOptionsStr),]
+            flds.append(mktDataOptionsStr)
 
-        msg = "".join(flds)
-        self.sendMsg(msg)
+        self.sendMsg(comm.encode_msg(flds))
 
 
     def cancelMktData(self, reqId:TickerId):
@@ -430,7 +623,7 @@ class EClient(object):
         reqId: TickerId - The ID that was specified in the call to
             reqMktData(). """
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(reqId, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -439,13 +632,9 @@ class EClient(object):
         VERSION = 2
 
         # send req mkt data msg
-        flds = []
-        flds += [make_field(OUT.CANCEL_MKT_DATA),
-            make_field(VERSION),
-            make_field(reqId)]
+        flds = [OUT.CANCEL_MKT_DATA, VERSION, reqId]
 
-        msg = "".join(flds)
-        self.sendMsg(msg)
+        self.sendMsg(comm.encode_msg(flds))
 
 
     def reqMarketDataType(self, marketDataType:int):
@@ -460,7 +649,7 @@ class EClient(object):
         marketDataType:int - 1 for real-time streaming market data or 2 for
             frozen market data"""
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -483,7 +672,7 @@ class EClient(object):
         self.sendMsg(msg)
 
     def reqSmartComponents(self, reqId: int, bboExchange: str):
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -502,7 +691,7 @@ class EClient(object):
         self.sendMsg(msg)
 
     def reqMarketRule(self, marketRuleId: int):
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -520,7 +709,7 @@ class EClient(object):
 
     def reqTickByTickData(self, reqId: int, contract: Contract, tickType: str,
                           numberOfTicks: int, ignoreSize: bool):
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -537,30 +726,29 @@ class EClient(object):
                                "in tick-by-tick data requests.")
             return
 
-        msg = make_field(OUT.REQ_TICK_BY_TICK_DATA)\
-            + make_field(reqId) \
-            + make_field(contract.conId) \
-            + make_field(contract.symbol) \
-            + make_field(contract.secType) \
-            + make_field(contract.lastTradeDateOrContractMonth) \
-            + make_field(contract.strike) \
-            + make_field(contract.right) \
-            + make_field(contract.multiplier) \
-            + make_field(contract.exchange) \
-            + make_field(contract.primaryExchange) \
-            + make_field(contract.currency) \
-            + make_field(contract.localSymbol) \
-            + make_field(contract.tradingClass) \
-            + make_field(tickType)
+        flds = [OUT.REQ_TICK_BY_TICK_DATA,
+            reqId,
+            contract.conId,
+            contract.symbol,
+            contract.secType,
+            contract.lastTradeDateOrContractMonth,
+            contract.strike,
+            contract.right,
+            contract.multiplier,
+            contract.exchange,
+            contract.primaryExchange,
+            contract.currency,
+            contract.localSymbol,
+            contract.tradingClass,
+            tickType]
 
         if self.serverVersion() >= MIN_SERVER_VER_TICK_BY_TICK_IGNORE_SIZE:
-            msg += make_field(numberOfTicks) \
-                + make_field(ignoreSize)
+            flds += [numberOfTicks, ignoreSize]
 
-        self.sendMsg(msg)
+        self.sendMsg(comm.encode_msg(flds))
 
     def cancelTickByTickData(self, reqId: int):
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -571,10 +759,9 @@ class EClient(object):
                                " It does not support tick-by-tick data requests.")
             return
 
-        msg = make_field(OUT.CANCEL_TICK_BY_TICK_DATA) \
-            + make_field(reqId)
+        flds = [OUT.CANCEL_TICK_BY_TICK_DATA, reqId]
 
-        self.sendMsg(msg)
+        self.sendMsg(comm.encode_msg(flds))
 
     ##########################################################################
     ################## Options
@@ -592,7 +779,7 @@ class EClient(object):
         optionPrice:double - The price of the option.
         underPrice:double - Price of the underlying."""
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(reqId, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -653,7 +840,7 @@ class EClient(object):
 
         reqId:TickerId - The request ID.  """
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(reqId, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -684,7 +871,7 @@ class EClient(object):
         volatility:double - The volatility.
         underPrice:double - Price of the underlying."""
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(reqId, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -745,7 +932,7 @@ class EClient(object):
 
         reqId:TickerId - The request ID.  """
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(reqId, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -783,7 +970,7 @@ class EClient(object):
              be overridden and the out-of-the money option would be exercised.
             Values are: 0 = no, 1 = yes."""
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(reqId, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -841,518 +1028,70 @@ class EClient(object):
         order:Order - This structure contains the details of tradedhe order.
             Note: Each client MUST connect with a unique clientId."""
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(orderId, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
             return
 
-        if self.serverVersion() < MIN_SERVER_VER_DELTA_NEUTRAL:
-            if contract.deltaNeutralContract:
-                self.wrapper.error(orderId, UPDATE_TWS.code(), UPDATE_TWS.msg() +
-                        "  It does not support delta-neutral orders.")
-                return
-
-        if self.serverVersion() < MIN_SERVER_VER_SCALE_ORDERS2:
-            if order.scaleSubsLevelSize != UNSET_INTEGER:
-                self.wrapper.error(orderId, UPDATE_TWS.code(), UPDATE_TWS.msg() +
-                        "  It does not support Subsequent Level Size for Scale orders.")
-                return
-
-        if self.serverVersion() < MIN_SERVER_VER_ALGO_ORDERS:
-            if order.algoStrategy:
-                self.wrapper.error(orderId, UPDATE_TWS.code(), UPDATE_TWS.msg() +
-                        "  It does not support algo orders.")
-                return
-
-        if self.serverVersion() < MIN_SERVER_VER_NOT_HELD:
-            if order.notHeld:
-                self.wrapper.error(orderId, UPDATE_TWS.code(), UPDATE_TWS.msg() +
-                        "  It does not support notHeld parameter.")
-                return
-
-        if self.serverVersion() < MIN_SERVER_VER_SEC_ID_TYPE:
-            if contract.secIdType or contract.secId:
-                self.wrapper.error(orderId, UPDATE_TWS.code(), UPDATE_TWS.msg() +
-                        "  It does not support secIdType and secId parameters.")
-                return
-
-        if self.serverVersion() < MIN_SERVER_VER_PLACE_ORDER_CONID:
-            if contract.conId and contract.conId > 0:
-                self.wrapper.error(orderId, UPDATE_TWS.code(), UPDATE_TWS.msg() +
-                        "  It does not support conId parameter.")
-                return
-
-        if self.serverVersion() < MIN_SERVER_VER_SSHORTX:
-            if order.exemptCode != -1:
-                self.wrapper.error(orderId, UPDATE_TWS.code(), UPDATE_TWS.msg() +
-                    "  It does not support exemptCode parameter.")
-                return
-
-        if self.serverVersion() < MIN_SERVER_VER_SSHORTX:
-            if contract.comboLegs:
-                for comboLeg in contract.comboLegs:
-                    if comboLeg.exemptCode != -1:
-                        self.wrapper.error(orderId, UPDATE_TWS.code(), UPDATE_TWS.msg() +
-                            "  It does not support exemptCode parameter.")
-                        return
-
-        if self.serverVersion() < MIN_SERVER_VER_HEDGE_ORDERS:
-            if order.hedgeType:
-                self.wrapper.error(orderId, UPDATE_TWS.code(), UPDATE_TWS.msg() +
-                    "  It does not support hedge orders.")
-                return
-
-        if self.serverVersion() < MIN_SERVER_VER_OPT_OUT_SMART_ROUTING:
-            if order.optOutSmartRouting:
-                self.wrapper.error( orderId, UPDATE_TWS.code(), UPDATE_TWS.msg() +
-                    "  It does not support optOutSmartRouting parameter.")
-                return
-
-        if self.serverVersion() < MIN_SERVER_VER_DELTA_NEUTRAL_CONID:
-            if order.deltaNeutralConId > 0 \
-                    or order.deltaNeutralSettlingFirm  \
-                    or order.deltaNeutralClearingAccount  \
-                    or order.deltaNeutralClearingIntent:
-                self.wrapper.error(orderId, UPDATE_TWS.code(), UPDATE_TWS.msg() +
-                    "  It does not support deltaNeutral parameters: ConId, SettlingFirm, ClearingAccount, ClearingIntent.")
-                return
-
-        if self.serverVersion() < MIN_SERVER_VER_DELTA_NEUTRAL_OPEN_CLOSE:
-            if order.deltaNeutralOpenClose \
-                    or order.deltaNeutralShortSale \
-                    or order.deltaNeutralShortSaleSlot > 0  \
-                    or order.deltaNeutralDesignatedLocation:
-                self.wrapper.error(orderId, UPDATE_TWS.code(), UPDATE_TWS.msg() +
-                        "  It does not support deltaNeutral parameters: OpenClose, ShortSale, ShortSaleSlot, DesignatedLocation.")
-                return
-
-        if self.serverVersion() < MIN_SERVER_VER_SCALE_ORDERS3:
-            if order.scalePriceIncrement > 0 and order.scalePriceIncrement != UNSET_DOUBLE:
-                if order.scalePriceAdjustValue != UNSET_DOUBLE \
-                        or order.scalePriceAdjustInterval != UNSET_INTEGER \
-                        or order.scaleProfitOffset != UNSET_DOUBLE \
-                        or order.scaleAutoReset  \
-                        or order.scaleInitPosition != UNSET_INTEGER \
-                        or order.scaleInitFillQty != UNSET_INTEGER \
-                        or order.scaleRandomPercent:
-                    self.wrapper.error(orderId, UPDATE_TWS.code(), UPDATE_TWS.msg() +
-                            "  It does not support Scale order parameters: PriceAdjustValue, PriceAdjustInterval, " +
-                            "ProfitOffset, AutoReset, InitPosition, InitFillQty and RandomPercent")
-                    return
-
-        if self.serverVersion() < MIN_SERVER_VER_ORDER_COMBO_LEGS_PRICE and contract.secType == "BAG":
-            if order.orderComboLegs:
-                for orderComboLeg in order.orderComboLegs:
-                    if orderComboLeg.price != UNSET_DOUBLE:
-                        self.wrapper.error(orderId, UPDATE_TWS.code(), UPDATE_TWS.msg() +
-                                "  It does not support per-leg prices for order combo legs.")
-                        return
-
-        if self.serverVersion() < MIN_SERVER_VER_TRAILING_PERCENT:
-            if order.trailingPercent != UNSET_DOUBLE:
-                self.wrapper.error(orderId, UPDATE_TWS.code(), UPDATE_TWS.msg() +
-                        "  It does not support trailing percent parameter")
-                return
-
-        if self.serverVersion() < MIN_SERVER_VER_TRADING_CLASS:
-            if contract.tradingClass:
-                self.wrapper.error(orderId, UPDATE_TWS.code(), UPDATE_TWS.msg() +
-                        "  It does not support tradingClass parameter in placeOrder.")
-                return
-
-        if self.serverVersion() < MIN_SERVER_VER_SCALE_TABLE:
-            if order.scaleTable or order.activeStartTime or order.activeStopTime:
-                self.wrapper.error(orderId, UPDATE_TWS.code(), UPDATE_TWS.msg() +
-                        "  It does not support scaleTable, activeStartTime and activeStopTime parameters")
-                return
-
-        if self.serverVersion() < MIN_SERVER_VER_ALGO_ID:
-            if order.algoId:
-                self.wrapper.error(orderId, UPDATE_TWS.code(), UPDATE_TWS.msg() +
-                        "  It does not support algoId parameter")
-                return
-
-        if self.serverVersion() < MIN_SERVER_VER_ORDER_SOLICITED:
-            if order.solicited:
-                self.wrapper.error(orderId, UPDATE_TWS.code(), UPDATE_TWS.msg() +
-                        "  It does not support order solicited parameter.")
-                return
-
-        if self.serverVersion() < MIN_SERVER_VER_MODELS_SUPPORT:
-            if order.modelCode:
-                self.wrapper.error(orderId, UPDATE_TWS.code(), UPDATE_TWS.msg() +
-                        "  It does not support model code parameter.")
-                return
-
-        if self.serverVersion() < MIN_SERVER_VER_EXT_OPERATOR:
-            if order.extOperator:
-                self.wrapper.error(orderId, UPDATE_TWS.code(), UPDATE_TWS.msg() +
-                        "  It does not support ext operator parameter")
-                return
-
-        if self.serverVersion() < MIN_SERVER_VER_SOFT_DOLLAR_TIER:
-            if order.softDollarTier.name or order.softDollarTier.val:
-                self.wrapper.error(orderId, UPDATE_TWS.code(), UPDATE_TWS.msg() +
-                        " It does not support soft dollar tier")
-                return
-
-        if self.serverVersion() < MIN_SERVER_VER_CASH_QTY:
-            if order.cashQty:
-                self.wrapper.error(orderId, UPDATE_TWS.code(), UPDATE_TWS.msg() +
-                        " It does not support cash quantity parameter")
-                return
-
-        if self.serverVersion() < MIN_SERVER_VER_DECISION_MAKER and (order.mifid2DecisionMaker != "" or order.mifid2DecisionAlgo != ""):
-            self.wrapper.error(orderId, UPDATE_TWS.code(), UPDATE_TWS.msg() +
-                        " It does not support MIFID II decision maker parameters")
-            return
-
-        if self.serverVersion() < MIN_SERVER_VER_MIFID_EXECUTION and (order.mifid2ExecutionTrader != "" or order.mifid2ExecutionAlgo != ""):
-            self.wrapper.error(orderId, UPDATE_TWS.code(), UPDATE_TWS.msg() +
-                        " It does not support MIFID II execution parameters")
+        encoder = self.getOrderEncoder()
+        text = encoder.check(contract, order)
+        if text is not None:
+            self.wrapper.error(orderId, UPDATE_TWS.code(), UPDATE_TWS.msg() + text)
             return
 
-        if self.serverVersion() < MIN_SERVER_VER_AUTO_PRICE_FOR_HEDGE and order.dontUseAutoPriceForHedge:
-            self.wrapper.error(orderId, UPDATE_TWS.code(), UPDATE_TWS.msg() +
-                        " It does not support dontUseAutoPriceForHedge parameter")
-            return
-
-        if self.serverVersion() < MIN_SERVER_VER_ORDER_CONTAINER and order.isOmsContainer:
-            self.wrapper.error(orderId, UPDATE_TWS.code(), UPDATE_TWS.msg() +
-                        " It does not support oms container parameter")
-            return
+        self.sendMsg(encoder.encode(orderId, contract, order), orderId)
 
-        if self.serverVersion() < MIN_SERVER_VER_PRICE_MGMT_ALGO and order.usePriceMgmtAlgo:
-            self.wrapper.error(orderId, UPDATE_TWS.code(), UPDATE_TWS.msg() + " It does not support Use price management algo requests")
-            return
-
-        VERSION = 27 if (self.serverVersion() < MIN_SERVER_VER_NOT_HELD) else 45
-
-        # send place order msg
-        flds = []
-        flds += [make_field(OUT.PLACE_ORDER)]
-
-        if self.serverVersion() < MIN_SERVER_VER_ORDER_CONTAINER:
-            flds += [make_field(VERSION)]
-
-        flds += [make_field(orderId)]
-
-        # send contract fields
-        if self.serverVersion() >= MIN_SERVER_VER_PLACE_ORDER_CONID:
-            flds.append(make_field( contract.conId))
-        flds += [make_field( contract.symbol),
-            make_field( contract.secType),
-            make_field( contract.lastTradeDateOrContractMonth),
-            make_field( contract.strike),
-            make_field( contract.right),
-            make_field( contract.multiplier), # srv v15 and above
-            make_field( contract.exchange),
-            make_field( contract.primaryExchange), # srv v14 and above
-            make_field( contract.currency),
-            make_field( contract.localSymbol)] # srv v2 and above
-        if self.serverVersion() >= MIN_SERVER_VER_TRADING_CLASS:
-            flds.append(make_field( contract.tradingClass))
-
-        if self.serverVersion() >= MIN_SERVER_VER_SEC_ID_TYPE:
-            flds += [make_field( contract.secIdType),
-                make_field( contract.secId)]
-
-        # send main order fields
-        flds.append(make_field( order.action))
-
-        if self.serverVersion() >= MIN_SERVER_VER_FRACTIONAL_POSITIONS:
-            flds.append(make_field(order.totalQuantity))
-        else:
-            flds.append(make_field(int(order.totalQuantity)))
-
-        flds.append(make_field(order.orderType))
-        if self.serverVersion() < MIN_SERVER_VER_ORDER_COMBO_LEGS_PRICE:
-            flds.append(make_field(
-                order.lmtPrice if order.lmtPrice != UNSET_DOUBLE else 0))
-        else:
-            flds.append(make_field_handle_empty( order.lmtPrice))
-        if self.serverVersion() < MIN_SERVER_VER_TRAILING_PERCENT:
-            flds.append(make_field(
-                order.auxPrice if order.auxPrice != UNSET_DOUBLE else 0))
-        else:
-            flds.append(make_field_handle_empty( order.auxPrice))
-
-        # send extended order fields
-            flds += [make_field( order.tif),
-            make_field( order.ocaGroup),
-            make_field( order.account),
-            make_field( order.openClose),
-            make_field( order.origin),
-            make_field( order.orderRef),
-            make_field( order.transmit),
-            make_field( order.parentId),      # srv v4 and above
-            make_field( order.blockOrder),    # srv v5 and above
-            make_field( order.sweepToFill),   # srv v5 and above
-            make_field( order.displaySize),   # srv v5 and above
-            make_field( order.triggerMethod), # srv v5 and above
-            make_field( order.outsideRth),    # srv v5 and above
-            make_field( order.hidden)]        # srv v7 and above
-
-        # Send combo legs for BAG requests (srv v8 and above)
-        if contract.secType == "BAG":
-            comboLegsCount = len(contract.comboLegs) if contract.comboLegs else 0
-            flds.append(make_field(comboLegsCount))
-            if comboLegsCount > 0:
-                for comboLeg in contract.comboLegs:
-                    assert comboLeg
-                    flds += [make_field(comboLeg.conId),
-                        make_field( comboLeg.ratio),
-                        make_field( comboLeg.action),
-                        make_field( comboLeg.exchange),
-                        make_field( comboLeg.openClose),
-                        make_field( comboLeg.shortSaleSlot),      #srv v35 and above
-                        make_field( comboLeg.designatedLocation)] # srv v35 and above
-                    if self.serverVersion() >= MIN_SERVER_VER_SSHORTX_OLD:
-                        flds.append(make_field(comboLeg.exemptCode))
-
-        # Send order combo legs for BAG requests
-        if self.serverVersion() >= MIN_SERVER_VER_ORDER_COMBO_LEGS_PRICE and contract.secType == "BAG":
-            orderComboLegsCount = len(order.orderComboLegs) if order.orderComboLegs else 0
-            flds.append(make_field( orderComboLegsCount))
-            if orderComboLegsCount:
-                for orderComboLeg in order.orderComboLegs:
-                    assert orderComboLeg
-                    flds.append(make_field_handle_empty( orderComboLeg.price))
-
-        if self.serverVersion() >= MIN_SERVER_VER_SMART_COMBO_ROUTING_PARAMS and contract.secType == "BAG":
-                smartComboRoutingParamsCount = len(order.smartComboRoutingParams) if order.smartComboRoutingParams else 0
-                flds.append(make_field( smartComboRoutingParamsCount))
-                if smartComboRoutingParamsCount > 0:
-                    for tagValue in order.smartComboRoutingParams:
-                        flds += [make_field(tagValue.tag),
-                            make_field(tagValue.value)]
-
-        ######################################################################
-        # Send the shares allocation.
-        #
-        # This specifies the number of order shares allocated to each Financial
-        # Advisor managed account. The format of the allocation string is as
-        # follows:
-        #                      <account_code1>/<number_shares1>,<account_code2>/<number_shares2>,...N
-        # E.g.
-        #              To allocate 20 shares of a 100 share order to account 'U101' and the
-        #      residual 80 to account 'U203' enter the following share allocation string:
-        #          U101/20,U203/80
-        #####################################################################
-        # send deprecated sharesAllocation field
-        flds += [make_field( ""),            # srv v9 and above
-
-            make_field( order.discretionaryAmt), # srv v10 and above
-            make_field( order.goodAfterTime), # srv v11 and above
-            make_field( order.goodTillDate), # srv v12 and above
-
-            make_field( order.faGroup),      # srv v13 and above
-            make_field( order.faMethod),     # srv v13 and above
-            make_field( order.faPercentage), # srv v13 and above
-            make_field( order.faProfile)]    # srv v13 and above
-
-        if self.serverVersion() >= MIN_SERVER_VER_MODELS_SUPPORT:
-            flds.append(make_field( order.modelCode))
-
-        # institutional short saleslot data (srv v18 and above)
-        flds += [make_field( order.shortSaleSlot),   # 0 for retail, 1 or 2 for institutions
-            make_field( order.designatedLocation)]   # populate only when shortSaleSlot = 2.
-        if self.serverVersion() >= MIN_SERVER_VER_SSHORTX_OLD:
-            flds.append(make_field( order.exemptCode))
-
-        # not needed anymore
-        #bool isVolOrder = (order.orderType.CompareNoCase("VOL") == 0)
-
-        # srv v19 and above fields
-        flds.append(make_field( order.ocaType))
-        #if( self.serverVersion() < 38) {
-        # will never happen
-        #      send( /* order.rthOnly */ false);
-        #}
-        flds += [make_field( order.rule80A),
-            make_field( order.settlingFirm),
-            make_field( order.allOrNone),
-            make_field_handle_empty( order.minQty),
-            make_field_handle_empty( order.percentOffset),
-            make_field( order.eTradeOnly),
-            make_field( order.firmQuoteOnly),
-            make_field_handle_empty( order.nbboPriceCap),
-            make_field( order.auctionStrategy), # AUCTION_MATCH, AUCTION_IMPROVEMENT, AUCTION_TRANSPARENT
-            make_field_handle_empty( order.startingPrice),
-            make_field_handle_empty( order.stockRefPrice),
-            make_field_handle_empty( order.delta),
-            make_field_handle_empty( order.stockRangeLower),
-            make_field_handle_empty( order.stockRangeUpper),
-
-            make_field( order.overridePercentageConstraints),    #srv v22 and above
-
-            # Volatility orders (srv v26 and above)
-            make_field_handle_empty( order.volatility),
-            make_field_handle_empty( order.volatilityType),
-            make_field( order.deltaNeutralOrderType),             # srv v28 and above
-            make_field_handle_empty( order.deltaNeutralAuxPrice)] # srv v28 and above
-
-        if self.serverVersion() >= MIN_SERVER_VER_DELTA_NEUTRAL_CONID and order.deltaNeutralOrderType:
-            flds += [make_field( order.deltaNeutralConId),
-                make_field( order.deltaNeutralSettlingFirm),
-                make_field( order.deltaNeutralClearingAccount),
-                make_field( order.deltaNeutralClearingIntent)]
-
-        if self.serverVersion() >= MIN_SERVER_VER_DELTA_NEUTRAL_OPEN_CLOSE and order.deltaNeutralOrderType:
-            flds += [make_field( order.deltaNeutralOpenClose),
-                make_field( order.deltaNeutralShortSale),
-                make_field( order.deltaNeutralShortSaleSlot),
-                make_field( order.deltaNeutralDesignatedLocation)]
-
-        flds += [make_field( order.continuousUpdate),
-            make_field_handle_empty( order.referencePriceType),
-            make_field_handle_empty( order.trailStopPrice)] # srv v30 and above
-
-        if self.serverVersion() >= MIN_SERVER_VER_TRAILING_PERCENT:
-            flds.append(make_field_handle_empty( order.trailingPercent))
-
-        # SCALE orders
-        if self.serverVersion() >= MIN_SERVER_VER_SCALE_ORDERS2:
-            flds += [make_field_handle_empty( order.scaleInitLevelSize),
-                make_field_handle_empty( order.scaleSubsLevelSize)]
-        else:
-                # srv v35 and above)
-            flds += [make_field( ""), # for not supported scaleNumComponents
-                make_field_handle_empty(order.scaleInitLevelSize)] # for scaleComponentSize
 
-        flds.append(make_field_handle_empty( order.scalePriceIncrement))
+    def placeOrders(self, orders):
+        """Call this function to place a basket of orders at once: their
+        msgs are sent together, in one write to the socket. Each order gets
+        its orderStatus events as with placeOrder().
 
-        if self.serverVersion() >= MIN_SERVER_VER_SCALE_ORDERS3 \
-            and order.scalePriceIncrement != UNSET_DOUBLE \
-            and order.scalePriceIncrement > 0.0:
+        orders - The (orderId, contract, order) of each order, as given to
+            placeOrder(). An order the server version cannot take gets its
+            error and is left out, the others are still sent."""
 
-            flds += [make_field_handle_empty( order.scalePriceAdjustValue),
-                make_field_handle_empty( order.scalePriceAdjustInterval),
-                make_field_handle_empty( order.scaleProfitOffset),
-                make_field( order.scaleAutoReset),
-                make_field_handle_empty( order.scaleInitPosition),
-                make_field_handle_empty( order.scaleInitFillQty),
-                make_field( order.scaleRandomPercent)]
+        self.logRequest()
 
-        if self.serverVersion() >= MIN_SERVER_VER_SCALE_TABLE:
-            flds += [make_field( order.scaleTable),
-                make_field( order.activeStartTime),
-                make_field( order.activeStopTime)]
-
-        # HEDGE orders
-        if self.serverVersion() >= MIN_SERVER_VER_HEDGE_ORDERS:
-            flds.append(make_field( order.hedgeType))
-            if order.hedgeType:
-                flds.append(make_field( order.hedgeParam))
-
-        if self.serverVersion() >= MIN_SERVER_VER_OPT_OUT_SMART_ROUTING:
-            flds.append(make_field( order.optOutSmartRouting))
-
-        if self.serverVersion() >= MIN_SERVER_VER_PTA_ORDERS:
-            flds += [make_field( order.clearingAccount),
-                make_field( order.clearingIntent)]
+        if not self.isConnected():
+            for (orderId, contract, order) in orders:
+                self.wrapper.error(orderId, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
+            return
 
-        if self.serverVersion() >= MIN_SERVER_VER_NOT_HELD:
-            flds.append(make_field( order.notHeld))
+        encoder = self.getOrderEncoder()
+        msgs = []
+        orderIds = []
+        for (orderId, contract, order) in orders:
+            text = encoder.check(contract, order)
+            if text is not None:
+                self.wrapper.error(orderId, UPDATE_TWS.code(), UPDATE_TWS.msg() + text)
+                continue
+            msgs.append(encoder.encode(orderId, contract, order))
+            orderIds.append(orderId)
 
-        if self.serverVersion() >= MIN_SERVER_VER_DELTA_NEUTRAL:
-            if contract.deltaNeutralContract:
-                flds += [make_field(True),
-                    make_field(contract.deltaNeutralContract.conId),
-                    make_field(contract.deltaNeutralContract.delta),
-                    make_field(contract.deltaNeutralContract.price)]
+        if msgs:
+            if HotPathLog.info and logger.isEnabledFor(logging.INFO):
+                logger.info("%s %s %d msgs %s", "SENDING", "placeOrders",
+                            len(msgs), b"".join(msgs))
+            ewriter = self.writer
+            if ewriter is not None:
+                if not ewriter.putAll(msgs):
+                    for orderId in orderIds:
+                        self.wrapper.error(orderId, NOT_CONNECTED.code(),
+                                           NOT_CONNECTED.msg())
             else:
-                flds.append(make_field(False))
-
-        if self.serverVersion() >= MIN_SERVER_VER_ALGO_ORDERS:
-            flds.append(make_field( order.algoStrategy))
-            if order.algoStrategy:
-                algoParamsCount = len(order.algoParams) if order.algoParams else 0
-                flds.append(make_field(algoParamsCount))
-                if algoParamsCount > 0:
-                    for algoParam in order.algoParams:
-                        flds += [make_field(algoParam.tag),
-                            make_field(algoParam.value)]
-
-        if self.serverVersion() >= MIN_SERVER_VER_ALGO_ID:
-            flds.append(make_field( order.algoId))
-
-        flds.append(make_field( order.whatIf)) # srv v36 and above
-
-        # send miscOptions parameter
-        if self.serverVersion() >= MIN_SERVER_VER_LINKING:
-            miscOptionsStr = ""
-            if order.orderMiscOptions:
-                for tagValue in order.orderMiscOptions:
-                    miscOptionsStr += str(tagValue)
-            flds.append(make_field( miscOptionsStr))
-
-        if self.serverVersion() >= MIN_SERVER_VER_ORDER_SOLICITED:
-            flds.append(make_field(order.solicited))
-
-        if self.serverVersion() >= MIN_SERVER_VER_RANDOMIZE_SIZE_AND_PRICE:
-            flds += [make_field(order.randomizeSize),
-                make_field(order.randomizePrice)]
-
-        if self.serverVersion() >= MIN_SERVER_VER_PEGGED_TO_BENCHMARK:
-            if order.orderType == "PEG BENCH":
-                flds += [make_field(order.referenceContractId),
-                    make_field(order.isPeggedChangeAmountDecrease),
-                    make_field(order.peggedChangeAmount),
-                    make_field(order.referenceChangeAmount),
-                    make_field(order.referenceExchangeId)]
-
-            flds.append(make_field(len(order.conditions)))
-
-            if len(order.conditions) > 0:
-                for cond in order.conditions:
-                    flds.append(make_field(cond.type()))
-                    flds += cond.make_fields()
-
-                flds += [make_field(order.conditionsIgnoreRth),
-                    make_field(order.conditionsCancelOrder)]
-
-            flds += [make_field(order.adjustedOrderType),
-                make_field(order.triggerPrice),
-                make_field(order.lmtPriceOffset),
-                make_field(order.adjustedStopPrice),
-                make_field(order.adjustedStopLimitPrice),
-                make_field(order.adjustedTrailingAmount),
-                make_field(order.adjustableTrailingUnit)]
-
-        if self.serverVersion() >= MIN_SERVER_VER_EXT_OPERATOR:
-            flds.append(make_field( order.extOperator))
-
-        if self.serverVersion() >= MIN_SERVER_VER_SOFT_DOLLAR_TIER:
-            flds += [make_field(order.softDollarTier.name),
-                make_field(order.softDollarTier.val)]
-
-        if self.serverVersion() >= MIN_SERVER_VER_CASH_QTY:
-            flds.append(make_field( order.cashQty))
-
-        if self.serverVersion() >= MIN_SERVER_VER_DECISION_MAKER:
-            flds.append(make_field( order.mifid2DecisionMaker))
-            flds.append(make_field( order.mifid2DecisionAlgo))
-
-        if self.serverVersion() >= MIN_SERVER_VER_MIFID_EXECUTION:
-            flds.append(make_field( order.mifid2ExecutionTrader))
-            flds.append(make_field( order.mifid2ExecutionAlgo))
-
-        if self.serverVersion() >= MIN_SERVER_VER_AUTO_PRICE_FOR_HEDGE:
-            flds.append(make_field(order.dontUseAutoPriceForHedge))
+                self.conn.sendAll(b"".join(msgs))
 
-        if self.serverVersion() >= MIN_SERVER_VER_ORDER_CONTAINER:
-            flds.append(make_field(order.isOmsContainer))
 
-        if self.serverVersion() >= MIN_SERVER_VER_D_PEG_ORDERS:
-            flds.append(make_field(order.discretionaryUpToLimitPrice))
-
-        if self.serverVersion() >= MIN_SERVER_VER_PRICE_MGMT_ALGO:
-            flds.append(make_field_handle_empty(UNSET_INTEGER if order.usePriceMgmtAlgo == None else 1 if order.usePriceMgmtAlgo else 0))
-
-        msg = "".join(flds)
-        self.sendMsg(msg)
+    def getOrderEncoder(self) -> OrderEncoder:
+        """ the OrderEncoder of the server version, made again when it
+        changes (a connection to another TWS) """
+        serverVersion = self.serverVersion()
+        encoder = self.orderEncoder
+        if encoder is None or encoder.serverVersion != serverVersion:
+            encoder = self.orderEncoder = OrderEncoder(serverVersion)
+        return encoder
 
 
     def cancelOrder(self, orderId:OrderId):
@@ -1361,7 +1100,7 @@ class EClient(object):
         orderId:OrderId - The order ID that was specified previously in the call
             to placeOrder()"""
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -1369,11 +1108,9 @@ class EClient(object):
 
         VERSION = 1
 
-        msg = make_field(OUT.CANCEL_ORDER) \
-            + make_field(VERSION) \
-            + make_field(orderId)
+        flds = [OUT.CANCEL_ORDER, VERSION, orderId]
 
-        self.sendMsg(msg)
+        self.sendMsg(comm.encode_msg(flds))
 
 
     def reqOpenOrders(self):
@@ -1386,7 +1123,7 @@ class EClient(object):
         orderId will be generated. This association will persist over multiple
         API and TWS sessions.  """
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -1412,7 +1149,7 @@ class EClient(object):
         associated with the client. If set to FALSE, no association will be
         made."""
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -1435,7 +1172,7 @@ class EClient(object):
         Note:  No association is made between the returned orders and the
         requesting client."""
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -1456,7 +1193,7 @@ class EClient(object):
         If the order was created in TWS, it also gets canceled. If the order
         was initiated in the API, it also gets canceled."""
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -1479,7 +1216,7 @@ class EClient(object):
 
         numIds:int - deprecated"""
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -1510,7 +1247,7 @@ class EClient(object):
         acctCode:str -The account code for which to receive account and
             portfolio updates."""
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -1583,7 +1320,7 @@ class EClient(object):
             $LEDGER:ALL - Single flag to relay all cash balance tags* in all
             currencies."""
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -1605,7 +1342,7 @@ class EClient(object):
 
         reqId:int - The ID of the data request being canceled."""
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -1623,7 +1360,7 @@ class EClient(object):
     def reqPositions(self):
         """Requests real-time position data for all accounts."""
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -1645,7 +1382,7 @@ class EClient(object):
     def cancelPositions(self):
         """Cancels real-time position updates."""
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -1670,7 +1407,7 @@ class EClient(object):
         Results are delivered via EWrapper.positionMulti() and
         EWrapper.positionMultiEnd() """
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -1694,7 +1431,7 @@ class EClient(object):
 
     def cancelPositionsMulti(self, reqId:int):
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -1718,7 +1455,7 @@ class EClient(object):
                                 ledgerAndNLV:bool):
         """Requests account updates for account and/or model."""
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -1743,7 +1480,7 @@ class EClient(object):
 
     def cancelAccountUpdatesMulti(self, reqId:int):
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -1769,7 +1506,7 @@ class EClient(object):
 
     def reqPnL(self, reqId: int, account: str, modelCode: str):
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -1789,7 +1526,7 @@ class EClient(object):
 
     def cancelPnL(self, reqId: int):
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -1807,7 +1544,7 @@ class EClient(object):
 
     def reqPnLSingle(self, reqId: int, account: str, modelCode: str, conid: int):
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -1828,7 +1565,7 @@ class EClient(object):
 
     def cancelPnLSingle(self, reqId: int):
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -1864,7 +1601,7 @@ class EClient(object):
 
         NOTE: Time format must be 'yyyymmdd-hh:mm:ss' Eg: '20030702-14:55'"""
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -1908,7 +1645,7 @@ class EClient(object):
         contract:Contract - The summary description of the contract being looked
             up."""
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -1981,7 +1718,7 @@ class EClient(object):
 
     def reqMktDepthExchanges(self):
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -2017,7 +1754,7 @@ class EClient(object):
         mktDepthOptions:TagValueList - For internal use only. Use default value
             XYZ."""
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -2043,32 +1780,29 @@ class EClient(object):
         VERSION = 5
 
         # send req mkt depth msg
-        flds = []
-        flds += [make_field(OUT.REQ_MKT_DEPTH),
-            make_field(VERSION),
-            make_field(reqId)]
+        flds = [OUT.REQ_MKT_DEPTH, VERSION, reqId]
 
         # send contract fields
         if self.serverVersion() >= MIN_SERVER_VER_TRADING_CLASS:
-            flds += [make_field(contract.conId),]
-        flds += [make_field(contract.symbol),
-            make_field(contract.secType),
-            make_field(contract.lastTradeDateOrContractMonth),
-            make_field(contract.strike),
-            make_field(contract.right),
-            make_field(contract.multiplier), # srv v15 and above
-            make_field(contract.exchange),]
+            flds.append(contract.conId)
+        flds += [contract.symbol,
+            contract.secType,
+            contract.lastTradeDateOrContractMonth,
+            contract.strike,
+            contract.right,
+            contract.multiplier, # srv v15 and above
+            contract.exchange]
         if self.serverVersion() >= MIN_SERVER_VER_MKT_DEPTH_PRIM_EXCHANGE:
-            flds += [make_field(contract.primaryExchange),]
-        flds += [make_field(contract.currency),
-            make_field(contract.localSymbol)]
+            flds.append(contract.primaryExchange)
+        flds += [contract.currency,
+            contract.localSymbol]
         if self.serverVersion() >= MIN_SERVER_VER_TRADING_CLASS:
-            flds += [make_field(contract.tradingClass),]
+            flds.append(contract.tradingClass)
 
-        flds += [make_field(numRows),] # srv v19 and above
+        flds.append(numRows) # srv v19 and above
 
         if self.serverVersion() >= MIN_SERVER_VER_SMART_DEPTH:
-            flds += [make_field(isSmartDepth),]
+            flds.append(isSmartDepth)
 
         # send mktDepthOptions parameter
         if self.serverVersion() >= MIN_SERVER_VER_LINKING:
@@ -2076,10 +1810,9 @@ class EClient(object):
             if mktDepthOptions:
                 raise NotImplementedError("not supported")
             mktDataOptionsStr = ""
-            flds += [make_field(mktDataOptionsStr),]
+            flds.append(mktDataOptionsStr)
 
-        msg = "".join(flds)
-        self.sendMsg(msg)
+        self.sendMsg(comm.encode_msg(flds))
 
 
     def cancelMktDepth(self, reqId:TickerId, isSmartDepth:bool):
@@ -2090,7 +1823,7 @@ class EClient(object):
             reqMktDepth().
         isSmartDepth:bool - specifies SMART depth request"""
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -2104,17 +1837,12 @@ class EClient(object):
         VERSION = 1
 
         # send cancel mkt depth msg
-        flds = []
-        flds += [make_field(OUT.CANCEL_MKT_DEPTH),
-            make_field(VERSION),
-            make_field(reqId)]
+        flds = [OUT.CANCEL_MKT_DEPTH, VERSION, reqId]
 
         if self.serverVersion() >= MIN_SERVER_VER_SMART_DEPTH:
-            flds += [make_field(isSmartDepth)]
+            flds.append(isSmartDepth)
 
-        msg = "".join(flds)
-
-        self.sendMsg(msg)
+        self.sendMsg(comm.encode_msg(flds))
 
 
     #########################################################################
@@ -2129,7 +1857,7 @@ class EClient(object):
         the currencyent day and any new ones. If set to FALSE, will only
         return new bulletins. """
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -2147,7 +1875,7 @@ class EClient(object):
     def cancelNewsBulletins(self):
         """Call this function to stop receiving news bulletins."""
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -2171,7 +1899,7 @@ class EClient(object):
 
         Note:  This request can only be made when connected to a FA managed account."""
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -2195,7 +1923,7 @@ class EClient(object):
             2 = PROFILE
             3 = ACCOUNT ALIASES"""
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -2222,7 +1950,7 @@ class EClient(object):
         cxml: str - The XML string containing the new FA configuration
             information.  """
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -2300,7 +2028,7 @@ class EClient(object):
         chartOptions:TagValueList - For internal use only. Use default value XYZ. """
 
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(reqId, NOT_CONNECTED.code(),
@@ -2378,7 +2106,7 @@ class EClient(object):
         reqId:TickerId - The ticker ID. Must be a unique value."""
 
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -2398,7 +2126,7 @@ class EClient(object):
     def reqHeadTimeStamp(self, reqId:TickerId, contract:Contract,
                                                  whatToShow: str, useRTH: int, formatDate: int):
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -2434,7 +2162,7 @@ class EClient(object):
 
     def cancelHeadTimeStamp(self, reqId: TickerId):
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -2455,7 +2183,7 @@ class EClient(object):
     def reqHistogramData(self, tickerId: int, contract: Contract,
                      useRTH: bool, timePeriod: str):
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -2490,7 +2218,7 @@ class EClient(object):
 
     def cancelHistogramData(self, tickerId: int):
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -2509,7 +2237,7 @@ class EClient(object):
                            endDateTime: str, numberOfTicks: int, whatToShow: str, useRth: int,
                            ignoreSize: bool, miscOptions: TagValueList):
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -2561,7 +2289,7 @@ class EClient(object):
     def reqScannerParameters(self):
         """Requests an XML string that describes all possible scanner queries."""
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -2586,7 +2314,7 @@ class EClient(object):
         scannerSubscriptionOptions:TagValueList - For internal use only.
             Use default value XYZ."""
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -2652,7 +2380,7 @@ class EClient(object):
     def cancelScannerSubscription(self, reqId:int):
         """reqId:int - The ticker ID. Must be a unique value."""
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -2700,7 +2428,7 @@ class EClient(object):
                 partially or completely outside.
         realTimeBarOptions:TagValueList - For internal use only. Use default value XYZ."""
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -2755,7 +2483,7 @@ class EClient(object):
 
         reqId:TickerId - The Id that was specified in the call to reqRealTimeBars(). """
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(reqId, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -2802,7 +2530,7 @@ class EClient(object):
             RESC (analyst estimates)
             CalendarReport (company calendar) """
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -2854,7 +2582,7 @@ class EClient(object):
 
         reqId:TickerId - The ID of the data request."""
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -2880,7 +2608,7 @@ class EClient(object):
 
     def reqNewsProviders(self):
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -2899,7 +2627,7 @@ class EClient(object):
 
     def reqNewsArticle(self, reqId: int, providerCode: str, articleId: str, newsArticleOptions: TagValueList):
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -2932,7 +2660,7 @@ class EClient(object):
     def reqHistoricalNews(self, reqId: int, conId: int, providerCodes: str,
                       startDateTime: str, endDateTime: str, totalResults: int, historicalNewsOptions: TagValueList):
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -2977,7 +2705,7 @@ class EClient(object):
         reqId:int - The unique number that will be associated with the
             response """
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -3002,7 +2730,7 @@ class EClient(object):
         groupId:int - The ID of the group, currently it is a number from 1 to 7.
             This is the display group subscription request sent by the API to TWS."""
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -3033,7 +2761,7 @@ class EClient(object):
                 Examples: 8314@SMART for IBM SMART; 8314@ARCA for IBM @ARCA.
             combo = if any combo is selected."""
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -3057,7 +2785,7 @@ class EClient(object):
     def unsubscribeFromGroupEvents(self, reqId:int):
         """reqId:int - The requestId specified in subscribeToGroupEvents()."""
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -3081,7 +2809,7 @@ class EClient(object):
         """For IB's internal purpose. Allows to provide means of verification
         between the TWS and third party programs."""
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -3111,7 +2839,7 @@ class EClient(object):
         """For IB's internal purpose. Allows to provide means of verification
         between the TWS and third party programs."""
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -3136,7 +2864,7 @@ class EClient(object):
         """For IB's internal purpose. Allows to provide means of verification
         between the TWS and third party programs."""
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -3167,7 +2895,7 @@ class EClient(object):
         """For IB's internal purpose. Allows to provide means of verification
         between the TWS and third party programs."""
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -3199,7 +2927,7 @@ class EClient(object):
         i.e. STK underlyingConId the contract ID of the underlying security.
         Response comes via EWrapper.securityDefinitionOptionParameter()"""
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -3227,7 +2955,7 @@ class EClient(object):
         registered professional advisors and hedge and mutual funds who have
         configured Soft Dollar Tiers in Account Management."""
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -3241,7 +2969,7 @@ class EClient(object):
 
     def reqFamilyCodes(self):
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -3259,7 +2987,7 @@ class EClient(object):
 
     def reqMatchingSymbols(self, reqId:int, pattern:str):
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -3282,7 +3010,7 @@ class EClient(object):
         Each completed order will be fed back through the
         completedOrder() function on the EWrapper."""
 
-        self.logRequest(current_fn_name(), vars())
+        self.logRequest()
 
         if not self.isConnected():
             self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
@@ -0,0 +1,184 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+
+"""
+Columnar decoding of the reqHistoricalTicks() and reqHistoricalData()
+answers, needs numpy.
+
+With EClient.setColumnarTicks(True) the HISTORICAL_TICKS, _BID_ASK and _LAST
+msgs are not decoded into one HistoricalTick* object per tick: the handlers
+made here parse the whole page at once into a numpy structured array and
+call EWrapper.historicalTicksArray(), historicalTicksBidAskArray() or
+historicalTicksLastArray() instead of the list callbacks.
+
+The arrays have the HISTORICAL_TICK_DTYPE, HISTORICAL_TICK_BID_ASK_DTYPE and
+HISTORICAL_TICK_LAST_DTYPE dtypes. "mask" is the attribute mask as sent by
+TWS: pastLimit (bit 0) and unreported (bit 1) for the trades, askPastHigh
+(bit 0) and bidPastLow (bit 1) for the bid/asks. The exchange and special
+conditions are str objects, shared by the ticks of a page with the same value.
+
+Likewise with EClient.setColumnarBars(True) all the bars of a HISTORICAL_DATA
+msg go to EWrapper.historicalDataBatch() as one BAR_DTYPE array, instead of
+one historicalData() call per BarData, followed by historicalDataEnd() as
+before. toDataFrame() turns any of these arrays into a pandas DataFrame.
+"""
+
+import logging
+
+from ibapi.message import IN
+from ibapi.server_versions import MIN_SERVER_VER_SYNT_REALTIME_BARS
+from ibapi.utils import BadMessage
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+logger = logging.getLogger(__name__)
+
+
+if numpy is not None:
+    HISTORICAL_TICK_DTYPE = numpy.dtype([
+        ("time", numpy.int64), ("price", numpy.float64), ("size", numpy.int64)])
+
+    HISTORICAL_TICK_BID_ASK_DTYPE = numpy.dtype([
+        ("time", numpy.int64), ("mask", numpy.uint8),
+        ("priceBid", numpy.float64), ("priceAsk", numpy.float64),
+        ("sizeBid", numpy.int64), ("sizeAsk", numpy.int64)])
+
+    HISTORICAL_TICK_LAST_DTYPE = numpy.dtype([
+        ("time", numpy.int64), ("mask", numpy.uint8),
+        ("price", numpy.float64), ("size", numpy.int64),
+        ("exchange", object), ("specialConditions", object)])
+
+    # by the whatToShow of reqHistoricalTicks()
+    HISTORICAL_TICK_DTYPES = {"MIDPOINT": HISTORICAL_TICK_DTYPE,
+                              "BID_ASK": HISTORICAL_TICK_BID_ASK_DTYPE,
+                              "TRADES": HISTORICAL_TICK_LAST_DTYPE}
+
+    BAR_DTYPE = numpy.dtype([
+        ("date", object), ("open", numpy.float64), ("high", numpy.float64),
+        ("low", numpy.float64), ("close", numpy.float64),
+        ("volume", numpy.int64), ("average", numpy.float64),
+        ("barCount", numpy.int64)])
+
+
+def checkNumpy():
+    if numpy is None:
+        raise ImportError("the columnar decoding needs numpy")
+
+
+def parseNumbers(column, count):
+    """ the bytes column as float64, empty fields being 0 """
+    try:
+        return numpy.fromiter(map(float, column), numpy.float64, count)
+    except ValueError:
+        return numpy.fromiter((float(value or 0) for value in column),
+                              numpy.float64, count)
+
+
+def decodeStrings(column):
+    """ the bytes column as str objects, one per distinct value """
+    strings = {value: value.decode(errors='backslashreplace')
+               for value in set(column)}
+    return list(map(strings.__getitem__, column))
+
+
+def makeTicksHandler(callback, dtype, tickLen, numberCols, stringCols):
+    """ numberCols: (dtype field, index in the tick fields) of the numbers,
+    stringCols: same for the strings """
+
+    def handleTicks(fields):
+        if len(fields) < 4:
+            raise BadMessage("no more fields")
+        reqId = int(fields[1] or 0)
+        tickCount = int(fields[2] or 0)
+        ticksEnd = 3 + tickCount * tickLen
+        if len(fields) < ticksEnd + 1:
+            raise BadMessage("no more fields")
+
+        ticks = numpy.empty(tickCount, dtype=dtype)
+        for (name, idx) in numberCols:
+            ticks[name] = parseNumbers(fields[3 + idx:ticksEnd:tickLen],
+                                       tickCount)
+        for (name, idx) in stringCols:
+            ticks[name] = decodeStrings(fields[3 + idx:ticksEnd:tickLen])
+
+        done = bool(int(fields[ticksEnd] or 0))
+        callback(reqId, ticks, done)
+
+    return handleTicks
+
+
+def makeTicksHandlers(wrapper) -> dict:
+    """ msg id -> handler, for the 3 historical ticks msgs """
+    checkNumpy()
+    return {
+        IN.HISTORICAL_TICKS: makeTicksHandler(
+            wrapper.historicalTicksArray, HISTORICAL_TICK_DTYPE, 4,
+            (("time", 0), ("price", 2), ("size", 3)), ()),
+        IN.HISTORICAL_TICKS_BID_ASK: makeTicksHandler(
+            wrapper.historicalTicksBidAskArray, HISTORICAL_TICK_BID_ASK_DTYPE, 6,
+            (("time", 0), ("mask", 1), ("priceBid", 2), ("priceAsk", 3),
+             ("sizeBid", 4), ("sizeAsk", 5)), ()),
+        IN.HISTORICAL_TICKS_LAST: makeTicksHandler(
+            wrapper.historicalTicksLastArray, HISTORICAL_TICK_LAST_DTYPE, 6,
+            (("time", 0), ("mask", 1), ("price", 2), ("size", 3)),
+            (("exchange", 4), ("specialConditions", 5))),
+    }
+
+
+def makeHistoricalDataHandler(wrapper, serverVersion):
+    historicalDataBatch = wrapper.historicalDataBatch
+    historicalDataEnd = wrapper.historicalDataEnd
+    if serverVersion < MIN_SERVER_VER_SYNT_REALTIME_BARS:
+        first = 2       # skip the version field
+        barLen = 9      # with the hasGaps field
+    else:
+        first = 1
+        barLen = 8
+    checkNumpy()
+
+    def handleHistoricalData(fields):
+        if len(fields) < first + 4:
+            raise BadMessage("no more fields")
+        reqId = int(fields[first] or 0)
+        startDateStr = fields[first + 1].decode(errors='backslashreplace')
+        endDateStr = fields[first + 2].decode(errors='backslashreplace')
+        itemCount = int(fields[first + 3] or 0)
+
+        barsStart = first + 4
+        barsEnd = barsStart + itemCount * barLen
+        if len(fields) < barsEnd:
+            raise BadMessage("no more fields")
+
+        bars = numpy.empty(itemCount, dtype=BAR_DTYPE)
+        if itemCount:
+            # one decode for all the dates
+            bars["date"] = b"\0".join(fields[barsStart:barsEnd:barLen]).decode(
+                errors='backslashreplace').split("\0")
+        for (name, idx) in (("open", 1), ("high", 2), ("low", 3), ("close", 4),
+                            ("volume", 5), ("average", 6),
+                            ("barCount", barLen - 1)):
+            bars[name] = parseNumbers(fields[barsStart + idx:barsEnd:barLen],
+                                      itemCount)
+
+        historicalDataBatch(reqId, bars)
+        # send end of dataset marker
+        historicalDataEnd(reqId, startDateStr, endDateStr)
+
+    return handleHistoricalData
+
+
+def toDataFrame(array, index=None):
+    """ the array as a pandas DataFrame (needs pandas), indexed by the
+    column index if given, e.g. "date" for the bars """
+    import pandas
+    df = pandas.DataFrame(array)
+    if index is not None:
+        df = df.set_index(index)
+    return df
@@ -13,6 +13,7 @@ import struct
 import logging
 
 from ibapi.common import UNSET_INTEGER, UNSET_DOUBLE
+from ibapi.utils import HotPathLog
 
 logger = logging.getLogger(__name__)
 
@@ -48,12 +49,93 @@ def make_field_handle_empty(val) -> str:
     return make_field(val)
 
 
+######################################################################
+# the same fields made as bytes, with the str and int ones cached: most of
+# the fields sent are the same few exchanges, currencies, sec types, msg
+# ids, versions and empty strings
+
+# the most str (or int) fields kept in the cache
+MAX_CACHED_FIELDS = 10000
+
+CACHED_STR_FIELDS = ("", "SMART", "IDEALPRO", "NASDAQ", "ISLAND", "NYSE",
+    "ARCA", "GLOBEX", "CME", "NYMEX", "CBOE", "EUREX", "IBIS", "LSE",
+    "STK", "OPT", "FUT", "FOP", "CASH", "IND", "CFD", "BOND", "BAG", "CMDTY",
+    "USD", "EUR", "GBP", "JPY", "CHF", "CAD", "AUD", "HKD",
+    "BUY", "SELL", "SSHORT", "LMT", "MKT", "STP", "STP LMT", "REL", "TRAIL",
+    "MIDPRICE", "DAY", "GTC", "IOC", "GTD", "OPG", "C", "P", "O")
+
+str_fields = {text: text.encode() + b"\0" for text in CACHED_STR_FIELDS}
+int_fields = {val: b"%d\0" % val for val in range(-1, 1000)}
+UNSET_DOUBLE_FIELD = str(UNSET_DOUBLE).encode() + b"\0"
+TRUE_FIELD = b"1\0"
+FALSE_FIELD = b"0\0"
+EMPTY_FIELD = b"\0"
+
+
+def encode_field(val) -> bytes:
+    """ make_field(val).encode(), as it is sent """
+
+    valType = type(val)
+    if valType is str:
+        field = str_fields.get(val, None)
+        if field is None:
+            field = val.encode() + b"\0"
+            if len(str_fields) < MAX_CACHED_FIELDS:
+                str_fields[val] = field
+        return field
+    if valType is int:
+        field = int_fields.get(val, None)
+        if field is None:
+            field = b"%d\0" % val
+            if len(int_fields) < MAX_CACHED_FIELDS:
+                int_fields[val] = field
+        return field
+    if valType is float:
+        # str() of a float, as make_field() sends it: the shortest repr
+        # that reads back as the same double on the TWS side
+        if val == UNSET_DOUBLE:
+            return UNSET_DOUBLE_FIELD
+        return b"%r\0" % val
+    if valType is bool:
+        return TRUE_FIELD if val else FALSE_FIELD
+    return make_field(val).encode()
+
+
+def encode_field_handle_empty(val) -> bytes:
+    """ make_field_handle_empty(val).encode() """
+
+    if val is None:
+        raise ValueError("Cannot send None to TWS")
+
+    if UNSET_INTEGER == val or UNSET_DOUBLE == val:
+        return EMPTY_FIELD
+
+    return encode_field(val)
+
+
+def encode_fields(*vals) -> bytes:
+    """ the fields of vals in a row, eg: once for the constant fields at the
+    start of a msg """
+    return b"".join([encode_field(val) for val in vals])
+
+
+pack_size = struct.Struct("!I").pack
+
+
+def encode_msg(vals) -> bytes:
+    """ make_msg() of the fields of vals, made as bytes in one go: cheaper
+    than adding the fields one by one to a bytearray for msgs this short """
+    payload = b"".join([encode_field(val) for val in vals])
+    return pack_size(len(payload)) + payload
+
+
 def read_msg(buf:bytes) -> tuple:
     """ first the size prefix and then the corresponding msg payload """
     if len(buf) < 4:
         return (0, "", buf)
     size = struct.unpack("!I", buf[0:4])[0]
-    logger.debug("read_msg: size: %d", size)
+    if HotPathLog.debug:
+        logger.debug("read_msg: size: %d", size)
     if len(buf) - 4 >= size:
         text = struct.unpack("!%ds" % size, buf[4:4+size])[0]
         return (size, text, buf[4+size:])
@@ -65,6 +147,8 @@ def read_fields(buf:bytes) -> tuple:
 
     if isinstance(buf, str):
         buf = buf.encode()
+    elif isinstance(buf, memoryview):
+        buf = buf.tobytes()
 
     """ msg payload is made of fields terminated/separated by NULL chars """
     fields = buf.split(b"\0")
@@ -72,4 +156,89 @@ def read_fields(buf:bytes) -> tuple:
     return tuple(fields[0:-1])   #last one is empty; this may slow dow things though, TODO
 
 
-
+class FrameBuffer(object):
+    """ Accumulates the incoming bytes and cuts them into low level messages.
+
+    The bytes are kept in a single bytearray: new data is appended after the
+    unread part and every complete message is handed out as a memoryview
+    slice, so taking a message off the front never copies the rest of the
+    buffer. The consumed space at the front is only reclaimed when more room
+    is needed; the buffer is compacted in place if at least compactThreshold
+    bytes were consumed, otherwise it grows.
+
+    A view returned by nextMsg() is only valid until the next call to feed()
+    or reserve(): copy it (eg: bytes(view)) if it needs to be kept around. """
+
+    def __init__(self, capacity=65536, compactThreshold=None):
+        self.buf = bytearray(capacity)
+        self.view = memoryview(self.buf)
+        self.start = 0      # first unread byte
+        self.end = 0        # end of the received data
+        if compactThreshold is None:
+            compactThreshold = capacity // 2
+        self.compactThreshold = compactThreshold
+
+
+    def __len__(self):
+        return self.end - self.start
+
+
+    def feed(self, data):
+        """ appends the received bytes """
+        n = len(data)
+        if self.end + n > len(self.buf):
+            self._makeRoom(n)
+        self.buf[self.end:self.end + n] = data
+        self.end += n
+
+
+    def reserve(self, n) -> memoryview:
+        """ returns a writable view of at least n free bytes after the received
+        data, eg: for socket.recv_into(); follow with commit() """
+        if self.end + n > len(self.buf):
+            self._makeRoom(n)
+        return self.view[self.end:]
+
+
+    def commit(self, n):
+        """ marks n bytes written into the view given by reserve() as received """
+        self.end += n
+
+
+    def nextMsg(self):
+        """ returns the payload of the next complete msg as a memoryview or
+        None if more bytes are needed """
+        start = self.start
+        if self.end - start < 4:
+            return None
+        size = struct.unpack_from("!I", self.buf, start)[0]
+        msgEnd = start + 4 + size
+        if msgEnd > self.end:
+            return None
+        if msgEnd == self.end:
+            # everything consumed: restart at the front, no copy needed
+            self.start = self.end = 0
+        else:
+            self.start = msgEnd
+        return self.view[start + 4:msgEnd]
+
+
+    def _makeRoom(self, n):
+        pending = self.end - self.start
+        capacity = len(self.buf)
+        newCapacity = capacity
+        while pending + n > newCapacity:
+            newCapacity *= 2
+        if newCapacity == capacity and self.start < self.compactThreshold:
+            # too little to gain from moving the unread bytes to the front
+            newCapacity *= 2
+
+        if newCapacity != capacity:
+            buf = bytearray(newCapacity)
+            buf[0:pending] = self.view[self.start:self.end]
+            self.buf = buf
+            self.view = memoryview(buf)
+        else:
+            self.buf[0:pending] = self.buf[self.start:self.end]
+        self.start = 0
+        self.end = pending
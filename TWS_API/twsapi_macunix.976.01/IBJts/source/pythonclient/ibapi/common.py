@@ -42,8 +42,16 @@ ListOfPriceIncrements = list
 ListOfHistoricalTick = list
 ListOfHistoricalTickBidAsk = list
 ListOfHistoricalTickLast = list
+# numpy structured arrays, see columnar.py
+ArrayOfHistoricalTick = object
+ArrayOfHistoricalTickBidAsk = object
+ArrayOfHistoricalTickLast = object
+ArrayOfBarData = object
 
 class BarData(Object):
+    __slots__ = ("date", "open", "high", "low", "close", "volume", "barCount",
+                 "average")
+
     def __init__(self):
         self.date = ""
         self.open = 0.
@@ -59,6 +67,9 @@ class BarData(Object):
             self.low, self.close, self.volume, self.average, self.barCount)
 
 class RealTimeBar(Object):
+    __slots__ = ("time", "endTime", "open_", "high", "low", "close", "volume",
+                 "wap", "count")
+
     def __init__(self, time = 0, endTime = -1, open_ = 0., high = 0., low = 0., close = 0., volume = 0., wap = 0., count = 0):
         self.time = time
         self.endTime = endTime
@@ -115,6 +126,8 @@ class SmartComponent(Object):
         return "BitNumber: %d, Exchange: %s, ExchangeLetter: %s" % (self.bitNumber, self.exchange, self.exchangeLetter)
 
 class TickAttrib(Object):
+    __slots__ = ("canAutoExecute", "pastLimit", "preOpen")
+
     def __init__(self):
         self.canAutoExecute = False
         self.pastLimit = False
@@ -124,6 +137,8 @@ class TickAttrib(Object):
         return "CanAutoExecute: %d, PastLimit: %d, PreOpen: %d" % (self.canAutoExecute, self.pastLimit, self.preOpen)
 
 class TickAttribBidAsk(Object):
+    __slots__ = ("bidPastLow", "askPastHigh")
+
     def __init__(self):
         self.bidPastLow = False
         self.askPastHigh = False
@@ -132,6 +147,8 @@ class TickAttribBidAsk(Object):
         return "BidPastLow: %d, AskPastHigh: %d" % (self.bidPastLow, self.askPastHigh)
 
 class TickAttribLast(Object):
+    __slots__ = ("pastLimit", "unreported")
+
     def __init__(self):
         self.pastLimit = False
         self.unreported = False
@@ -139,6 +156,46 @@ class TickAttribLast(Object):
     def __str__(self):
         return "PastLimit: %d, Unreported: %d" % (self.pastLimit, self.unreported)
 
+class SharedTickAttribBidAsk(TickAttribBidAsk):
+    """ Read-only TickAttribBidAsk. There is one per mask value, in
+    TICK_ATTRIB_BID_ASK, given to all the ticks with that mask. """
+    __slots__ = ()
+
+    def __init__(self, mask):
+        object.__setattr__(self, "bidPastLow", mask & 1 != 0)
+        object.__setattr__(self, "askPastHigh", mask & 2 != 0)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("shared TickAttribBidAsk, it can not be modified")
+
+    def __delattr__(self, name):
+        raise AttributeError("shared TickAttribBidAsk, it can not be modified")
+
+    def __reduce__(self):
+        return (SharedTickAttribBidAsk, (self.bidPastLow | self.askPastHigh << 1, ))
+
+class SharedTickAttribLast(TickAttribLast):
+    """ Read-only TickAttribLast. There is one per mask value, in
+    TICK_ATTRIB_LAST, given to all the ticks with that mask. """
+    __slots__ = ()
+
+    def __init__(self, mask):
+        object.__setattr__(self, "pastLimit", mask & 1 != 0)
+        object.__setattr__(self, "unreported", mask & 2 != 0)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("shared TickAttribLast, it can not be modified")
+
+    def __delattr__(self, name):
+        raise AttributeError("shared TickAttribLast, it can not be modified")
+
+    def __reduce__(self):
+        return (SharedTickAttribLast, (self.pastLimit | self.unreported << 1, ))
+
+# indexed by the tick-by-tick attribute mask (& 3)
+TICK_ATTRIB_BID_ASK = tuple(SharedTickAttribBidAsk(mask) for mask in range(4))
+TICK_ATTRIB_LAST = tuple(SharedTickAttribLast(mask) for mask in range(4))
+
 class FamilyCode(Object):
     def __init__(self):
         self.accountID = ""
@@ -156,6 +213,8 @@ class PriceIncrement(Object):
         return "LowEdge: %f, Increment: %f" % (self.lowEdge, self.increment)
 
 class HistoricalTick(Object):
+    __slots__ = ("time", "price", "size")
+
     def __init__(self):
         self.time = 0
         self.price = 0.
@@ -165,9 +224,12 @@ class HistoricalTick(Object):
         return "Time: %d, Price: %f, Size: %d" % (self.time, self.price, self.size)
 
 class HistoricalTickBidAsk(Object):
+    __slots__ = ("time", "tickAttribBidAsk", "priceBid", "priceAsk", "sizeBid",
+                 "sizeAsk")
+
     def __init__(self):
         self.time = 0
-        self.tickAttribBidAsk = TickAttribBidAsk()
+        self.tickAttribBidAsk = TICK_ATTRIB_BID_ASK[0]
         self.priceBid = 0.
         self.priceAsk = 0.
         self.sizeBid = 0
@@ -177,9 +239,12 @@ class HistoricalTickBidAsk(Object):
         return "Time: %d, TickAttriBidAsk: %s, PriceBid: %f, PriceAsk: %f, SizeBid: %d, SizeAsk: %d" % (self.time, self.tickAttribBidAsk, self.priceBid, self.priceAsk, self.sizeBid, self.sizeAsk)
 
 class HistoricalTickLast(Object):
+    __slots__ = ("time", "tickAttribLast", "price", "size", "exchange",
+                 "specialConditions")
+
     def __init__(self):
         self.time = 0
-        self.tickAttribLast = TickAttribLast()
+        self.tickAttribLast = TICK_ATTRIB_LAST[0]
         self.price = 0.
         self.size = 0
         self.exchange = ""
@@ -16,6 +16,7 @@ import logging
 
 from ibapi.common import * # @UnusedWildImport
 from ibapi.errors import * # @UnusedWildImport
+from ibapi.utils import HotPathLog
 
 
 #TODO: support SSL !!
@@ -24,12 +25,18 @@ logger = logging.getLogger(__name__)
 
 
 class Connection:
-    def __init__(self, host, port):
+    def __init__(self, host, port, recvBufSize=None, readSize=4096,
+                 tcpNoDelay=False, recvInto=False):
         self.host = host
         self.port = port
         self.socket = None
         self.wrapper = None
         self.lock = threading.Lock()
+        self.recvBufSize = recvBufSize  # SO_RCVBUF, None keeps the OS default
+        self.readSize = readSize        # max bytes asked per socket read
+        self.tcpNoDelay = tcpNoDelay
+        self.recvInto = recvInto        # the reader should use recvMsgInto()
+        self.closing = False            # disconnect() waiting for a send
 
 
     def connect(self):
@@ -40,6 +47,13 @@ class Connection:
             if self.wrapper:
                 self.wrapper.error(NO_VALID_ID, FAIL_CREATE_SOCK.code(), FAIL_CREATE_SOCK.msg())
 
+        # set before connecting so that the TCP window scaling can use it
+        if self.recvBufSize:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF,
+                                   self.recvBufSize)
+        if self.tcpNoDelay:
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
         try:
             self.socket.connect((self.host, self.port))
         except socket.error:
@@ -50,6 +64,7 @@ class Connection:
 
 
     def disconnect(self):
+        self.closing = True
         self.lock.acquire()
         try:
             if self.socket is not None:
@@ -69,28 +84,73 @@ class Connection:
 
     def sendMsg(self, msg):
 
-        logger.debug("acquiring lock")
+        debug = HotPathLog.debug
+        if debug:
+            logger.debug("acquiring lock")
         self.lock.acquire()
-        logger.debug("acquired lock")
+        if debug:
+            logger.debug("acquired lock")
         if not self.isConnected():
             logger.debug("sendMsg attempted while not connected, releasing lock")
             self.lock.release()
             return 0
         try:
-            nSent = self.socket.send(msg)
+            nSent = self._sendAll(msg)
         except socket.error:
             logger.debug("exception from sendMsg %s", sys.exc_info())
             raise
         finally:
-            logger.debug("releasing lock")
+            if debug:
+                logger.debug("releasing lock")
             self.lock.release()
-            logger.debug("release lock")
+            if debug:
+                logger.debug("release lock")
 
-        logger.debug("sendMsg: sent: %d", nSent)
+        if debug:
+            logger.debug("sendMsg: sent: %d", nSent)
 
         return nSent
 
 
+    def sendAll(self, data):
+        """ data: several msgs made with make_msg(), sent in one go """
+        with self.lock:
+            if not self.isConnected():
+                logger.debug("sendAll attempted while not connected")
+                return 0
+            try:
+                nSent = self._sendAll(data)
+            except socket.error:
+                logger.debug("exception from sendAll %s", sys.exc_info())
+                raise
+
+        if HotPathLog.debug:
+            logger.debug("sendAll: sent: %d", nSent)
+
+        return nSent
+
+
+    def _sendAll(self, data):
+        """ with the lock held. socket.send() may send only part of data, and
+        with the socket timeout it raises once the socket buffer has been
+        full for that long, having sent nothing: both are retried, until
+        disconnect() is called. socket.sendall() would not say how much was
+        sent before a timeout. """
+        view = memoryview(data)
+        nSent = 0
+        while nSent < len(view):
+            try:
+                nSent += self.socket.send(view[nSent:])
+            except socket.timeout:
+                if self.closing:
+                    logger.debug("send given up, disconnecting: %d of %d bytes sent",
+                                 nSent, len(view))
+                    break
+                logger.debug("socket buffer full: %d of %d bytes sent", nSent,
+                             len(view))
+        return nSent
+
+
     def recvMsg(self):
         if not self.isConnected():
             logger.debug("recvMsg attempted while not connected, releasing lock")
@@ -111,17 +171,59 @@ class Connection:
         return buf
 
 
+    def recvMsgInto(self, frames):
+        """ Same as recvMsg() but the bytes are read straight into the free
+        space of frames (a comm.FrameBuffer) instead of being returned.
+        Returns the number of bytes received. """
+
+        if not self.isConnected():
+            logger.debug("recvMsgInto attempted while not connected")
+            return 0
+        nBefore = len(frames)
+        try:
+            nRecvd = self._recvAllMsgInto(frames)
+            # receiving 0 bytes outside a timeout means the connection is either
+            # closed or broken
+            if nRecvd == 0:
+                logger.debug("socket either closed or broken, disconnecting")
+                self.disconnect()
+        except socket.timeout:
+            logger.debug("socket timeout from recvMsgInto %s", sys.exc_info())
+            # whatever was read before the timeout is already in frames
+            nRecvd = len(frames) - nBefore
+
+        return nRecvd
+
+
     def _recvAllMsg(self):
         cont = True
         allbuf = b""
 
         while cont and self.socket is not None:
-            buf = self.socket.recv(4096)
+            buf = self.socket.recv(self.readSize)
             allbuf += buf
-            logger.debug("len %d raw:%s|", len(buf), buf)
+            if HotPathLog.debug:
+                logger.debug("len %d raw:%s|", len(buf), buf)
 
-            if len(buf) < 4096:
+            if len(buf) < self.readSize:
                 cont = False
 
         return allbuf
 
+
+    def _recvAllMsgInto(self, frames):
+        nRecvd = 0
+        readSize = self.readSize
+
+        while self.socket is not None:
+            nBytes = self.socket.recv_into(frames.reserve(readSize), readSize)
+            frames.commit(nBytes)
+            nRecvd += nBytes
+            if HotPathLog.debug:
+                logger.debug("len %d", nBytes)
+
+            if nBytes < readSize:
+                break
+
+        return nRecvd
+
@@ -0,0 +1,289 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+
+"""
+Resolution of contracts to their ContractDetails over an AsyncEClient, with
+a cache.
+
+ContractResolver.resolve() answers from its ContractCache when it can,
+without any round trip to TWS; only the contracts not cached, or cached too
+long ago, are asked with reqContractDetails(). resolveMany() sends all the
+requests needed at once, paced, and the same contract asked several times
+at once is only requested once:
+
+    cache = ContractCache("~/.ibapi/contracts.pickle")
+    resolver = ContractResolver(client, cache)
+    detailsLists = await resolver.resolveMany(contracts)
+    cache.save()
+
+The cache keeps at most maxSize ContractDetails, the least recently used
+are dropped first, and none older than ttl seconds. Besides the answers to
+the queries made, they are indexed by conId, by (symbol, secType, exchange,
+currency) and by localSymbol: get(), lookup() and lookupLocalSymbol().
+
+The cache file is a pickle: only load files written by a cache of yours.
+"""
+
+import os
+import time
+import pickle
+import asyncio
+import logging
+import itertools
+import collections
+
+from ibapi.history import TokenBucket
+from ibapi.object_implem import Object
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_MAX_SIZE = 100000
+DEFAULT_TTL = 86400.
+
+# the requests per second, left some of the 50 msgs/s allowed by TWS
+MAX_REQUESTS_PER_SEC = 40
+MAX_OPEN_REQUESTS = 50
+
+FILE_VERSION = 1
+
+
+def queryKey(contract) -> tuple:
+    """ the fields of the contract sent by reqContractDetails() """
+    return (contract.conId, contract.symbol, contract.secType,
+            contract.lastTradeDateOrContractMonth, contract.strike,
+            contract.right, contract.multiplier, contract.exchange,
+            contract.primaryExchange, contract.currency, contract.localSymbol,
+            contract.tradingClass, contract.includeExpired, contract.secIdType,
+            contract.secId)
+
+
+def entryKey(contract) -> tuple:
+    """ the same conId comes once per exchange it trades on """
+    return (contract.conId, contract.exchange)
+
+
+def symbolKey(contract) -> tuple:
+    return (contract.symbol, contract.secType, contract.exchange,
+            contract.currency)
+
+
+class ContractCache(Object):
+    def __init__(self, path=None, maxSize=DEFAULT_MAX_SIZE, ttl=DEFAULT_TTL,
+                 clock=time.time):
+        """ path: the file save() writes, loaded now if it exists """
+        self.path = os.path.expanduser(path) if path is not None else None
+        self.maxSize = maxSize
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = collections.OrderedDict()   # entryKey -> (time, details), LRU first
+        self.queries = {}           # queryKey -> (time, entryKeys)
+        self.byConId = {}           # conId -> set of entryKeys
+        self.bySymbol = {}          # symbolKey -> set of entryKeys
+        self.byLocalSymbol = {}     # localSymbol -> set of entryKeys
+        if self.path is not None and os.path.exists(self.path):
+            self.load(self.path)
+
+
+    def __len__(self):
+        return len(self.entries)
+
+
+    def isExpired(self, fetched) -> bool:
+        return fetched + self.ttl <= self.clock()
+
+
+    def indexes(self, contract):
+        return ((self.byConId, contract.conId),
+                (self.bySymbol, symbolKey(contract)),
+                (self.byLocalSymbol, contract.localSymbol))
+
+
+    def put(self, details, fetched=None):
+        """ adds (or replaces) a ContractDetails """
+        if fetched is None:
+            fetched = self.clock()
+        key = entryKey(details.contract)
+        if key in self.entries:
+            self.remove(key)
+        self.entries[key] = (fetched, details)
+        for (index, indexKey) in self.indexes(details.contract):
+            index.setdefault(indexKey, set()).add(key)
+        while len(self.entries) > self.maxSize:
+            self.remove(next(iter(self.entries)))
+
+
+    def remove(self, key):
+        (_, details) = self.entries.pop(key)
+        for (index, indexKey) in self.indexes(details.contract):
+            keys = index[indexKey]
+            keys.discard(key)
+            if not keys:
+                del index[indexKey]
+
+
+    def getEntry(self, key):
+        """ the ContractDetails of the entryKey, None if not cached """
+        entry = self.entries.get(key, None)
+        if entry is None:
+            return None
+        if self.isExpired(entry[0]):
+            self.remove(key)
+            return None
+        self.entries.move_to_end(key)
+        return entry[1]
+
+
+    def getEntries(self, keys) -> list:
+        """ None if any is not cached """
+        detailsList = []
+        for key in keys:
+            details = self.getEntry(key)
+            if details is None:
+                return None
+            detailsList.append(details)
+        return detailsList
+
+
+    def lookupIndex(self, index, indexKey) -> list:
+        keys = sorted(index.get(indexKey, ()))
+        return [details for details in map(self.getEntry, keys)
+                if details is not None]
+
+
+    def get(self, conId, exchange=None):
+        """ the ContractDetails of conId on exchange, on any exchange if
+        None, None if not cached """
+        if exchange is not None:
+            return self.getEntry((conId, exchange))
+        detailsList = self.lookupIndex(self.byConId, conId)
+        return detailsList[0] if detailsList else None
+
+
+    def lookup(self, symbol, secType, exchange, currency) -> list:
+        """ the ContractDetails cached for these """
+        return self.lookupIndex(self.bySymbol,
+                                (symbol, secType, exchange, currency))
+
+
+    def lookupLocalSymbol(self, localSymbol) -> list:
+        return self.lookupIndex(self.byLocalSymbol, localSymbol)
+
+
+    def addAnswer(self, contract, detailsList):
+        """ caches the reqContractDetails() answer for contract """
+        now = self.clock()
+        for details in detailsList:
+            self.put(details, now)
+        self.queries[queryKey(contract)] = (now, tuple(
+            entryKey(details.contract) for details in detailsList))
+
+
+    def getAnswer(self, contract):
+        """ the cached reqContractDetails() answer for contract, None if
+        not cached """
+        if contract.conId and contract.exchange:
+            # the answer whatever the other fields
+            details = self.getEntry(entryKey(contract))
+            if details is not None:
+                return [details]
+
+        key = queryKey(contract)
+        query = self.queries.get(key, None)
+        if query is None:
+            return None
+        detailsList = self.getEntries(query[1]) \
+            if not self.isExpired(query[0]) else None
+        if detailsList is None:
+            del self.queries[key]
+        return detailsList
+
+
+    def save(self, path=None):
+        """ writes the cache to path, by default the one given at creation,
+        ValueError if there is none """
+        path = os.path.expanduser(path) if path is not None else self.path
+        if path is None:
+            raise ValueError("no path given, neither to save() nor at creation")
+        state = {"version": FILE_VERSION,
+                 "entries": [(fetched, details) for (fetched, details)
+                             in self.entries.values()],
+                 "queries": {key: query for (key, query) in self.queries.items()
+                             if all(entry in self.entries for entry in query[1])}}
+        tmpPath = path + ".tmp"
+        with open(tmpPath, "wb") as f:
+            pickle.dump(state, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmpPath, path)
+
+
+    def load(self, path):
+        """ adds what path holds, but what has expired since """
+        with open(os.path.expanduser(path), "rb") as f:
+            state = pickle.load(f)
+        if state.get("version", None) != FILE_VERSION:
+            logger.warning("%s: not a contract cache file of version %d, ignored",
+                           path, FILE_VERSION)
+            return
+        for (fetched, details) in state["entries"]:
+            if not self.isExpired(fetched):
+                self.put(details, fetched)
+        for (key, (fetched, keys)) in state["queries"].items():
+            if not self.isExpired(fetched):
+                self.queries[key] = (fetched, keys)
+
+
+class ContractResolver(Object):
+    def __init__(self, client, cache=None, firstReqId=1 << 25,
+                 maxRequestsPerSec=MAX_REQUESTS_PER_SEC,
+                 maxOpenRequests=MAX_OPEN_REQUESTS, clock=time.monotonic):
+        """ client: a connected AsyncEClient, the reqIds used start at
+        firstReqId """
+        self.client = client
+        self.cache = cache if cache is not None else ContractCache()
+        self.reqIds = itertools.count(firstReqId)
+        self.pacer = TokenBucket(maxRequestsPerSec, 1.)
+        self.maxOpenRequests = maxOpenRequests
+        self.openRequests = None
+        self.clock = clock
+        self.pending = {}           # queryKey -> future of the answer
+
+
+    async def resolve(self, contract) -> list:
+        """ The ContractDetails list of contract, from the cache if there.
+        Raises async_client.RequestError if TWS answers with an error. """
+        detailsList = self.cache.getAnswer(contract)
+        if detailsList is not None:
+            return detailsList
+
+        key = queryKey(contract)
+        future = self.pending.get(key, None)
+        if future is None:
+            future = asyncio.ensure_future(self.fetch(contract))
+            self.pending[key] = future
+            future.add_done_callback(lambda _: self.pending.pop(key, None))
+        return await asyncio.shield(future)
+
+
+    async def resolveMany(self, contracts, returnExceptions=False) -> list:
+        """ resolve() of each contract, the requests all sent at once """
+        return await asyncio.gather(*map(self.resolve, contracts),
+                                    return_exceptions=returnExceptions)
+
+
+    async def fetch(self, contract) -> list:
+        if self.openRequests is None:
+            self.openRequests = asyncio.Semaphore(self.maxOpenRequests)
+        async with self.openRequests:
+            delay = self.pacer.delay(self.clock())
+            while delay > 0:
+                await asyncio.sleep(delay)
+                delay = self.pacer.delay(self.clock())
+            self.pacer.take(self.clock())
+            detailsList = await self.client.reqContractDetailsAsync(
+                next(self.reqIds), contract)
+        self.cache.addAnswer(contract, detailsList)
+        return detailsList
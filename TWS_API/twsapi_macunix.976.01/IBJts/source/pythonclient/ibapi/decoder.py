@@ -22,6 +22,8 @@ from ibapi.scanner import ScanData
 from ibapi.errors import BAD_MESSAGE
 from ibapi.common import * # @UnusedWildImport
 from ibapi.orderdecoder import OrderDecoder
+from ibapi import fastdecoder
+from ibapi import columnar
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +32,7 @@ class HandleInfo(Object):
     def __init__(self, wrap=None, proc=None):
         self.wrapperMeth = wrap
         self.wrapperParams = None
+        self.wrapperConverters = None
         self.processMeth = proc
         if wrap is None and proc is None:
             raise ValueError("both wrap and proc can't be None")
@@ -41,13 +44,77 @@ class HandleInfo(Object):
 
 
 class Decoder(Object):
-    def __init__(self, wrapper, serverVersion):
+    def __init__(self, wrapper, serverVersion, columnarTicks=False,
+                 columnarBars=False, feeds=()):
         self.wrapper = wrapper
-        self.serverVersion = serverVersion
+        self.fastHandlers = {}
+        self.columnarTicks = columnarTicks
+        self.columnarBars = columnarBars
+        self.feeds = list(feeds)
+        self.setServerVersion(serverVersion)
         self.discoverParams()
         #self.printParams()
 
 
+    def setServerVersion(self, serverVersion):
+        """ (re)builds the handlers specialized for this server version """
+        self.serverVersion = serverVersion
+        if serverVersion is not None:
+            self.fastHandlers = fastdecoder.makeHandlers(self.wrapper,
+                                                         serverVersion)
+            self.orderDecoder = OrderDecoder(None, None, None, serverVersion,
+                                             serverVersion)
+        else:
+            self.fastHandlers = {}
+            self.orderDecoder = None
+        if self.columnarTicks:
+            self.fastHandlers.update(columnar.makeTicksHandlers(self.wrapper))
+        if self.columnarBars and serverVersion is not None:
+            self.fastHandlers[IN.HISTORICAL_DATA] = \
+                columnar.makeHistoricalDataHandler(self.wrapper, serverVersion)
+        if serverVersion is not None:
+            for feed in self.feeds:
+                self.fastHandlers.update(feed.makeHandlers(self.nextHandler,
+                                                           serverVersion))
+
+
+    def nextHandler(self, msgId):
+        """ the handler of msgId as it is now, for a feed to pass the msgs
+        on to once it has taken what it needs from them """
+        fastHandler = self.fastHandlers.get(msgId, None)
+        if fastHandler is not None:
+            return fastHandler
+        handleInfo = self.msgId2handleInfo[msgId]
+        if handleInfo.wrapperMeth is not None:
+            return lambda fields: self.interpretWithSignature(fields, handleInfo)
+        return lambda fields: handleInfo.processMeth(self, iter(fields))
+
+
+    def setColumnarTicks(self, columnarTicks):
+        """ the historical ticks decoded into numpy arrays, see columnar.py """
+        self.columnarTicks = columnarTicks
+        self.setServerVersion(self.serverVersion)
+
+
+    def setColumnarBars(self, columnarBars):
+        """ the historical bars decoded into numpy arrays, see columnar.py """
+        self.columnarBars = columnarBars
+        self.setServerVersion(self.serverVersion)
+
+
+    def addFeed(self, feed):
+        """ feed.makeHandlers(nextHandler, serverVersion) returns the
+        handlers (msg id -> handler) to put in front of those of the
+        decoder, e.g. quotes.QuoteStore """
+        self.feeds.append(feed)
+        self.setServerVersion(self.serverVersion)
+
+
+    def removeFeed(self, feed):
+        self.feeds.remove(feed)
+        self.setServerVersion(self.serverVersion)
+
+
     def processTickPriceMsg(self, fields):
         next(fields)
         decode(int, fields)
@@ -131,85 +198,15 @@ class Decoder(Object):
         order = Order()
         contract = Contract()
         orderState = OrderState()
+        orderDecoder = self.orderDecoder
 
-        if self.serverVersion < MIN_SERVER_VER_ORDER_CONTAINER:
+        if orderDecoder.openOrderPlan is None:
             version = decode(int, fields)
+            orderDecoder.reset(contract, order, orderState, version)
+            orderDecoder.decodeOpenOrder(fields)
         else:
-            version = self.serverVersion
-
-        
-        OrderDecoder.__init__(self, contract, order, orderState, version, self.serverVersion)
-
-        # read orderId
-        OrderDecoder.decodeOrderId(self, fields)
-
-        # read contract fields
-        OrderDecoder.decodeContractFields(self, fields)
-
-        # read order fields
-        OrderDecoder.decodeAction(self, fields)
-        OrderDecoder.decodeTotalQuantity(self, fields)
-        OrderDecoder.decodeOrderType(self, fields)
-        OrderDecoder.decodeLmtPrice(self, fields)
-        OrderDecoder.decodeAuxPrice(self, fields)
-        OrderDecoder.decodeTIF(self, fields)
-        OrderDecoder.decodeOcaGroup(self, fields)
-        OrderDecoder.decodeAccount(self, fields)
-        OrderDecoder.decodeOpenClose(self, fields)
-        OrderDecoder.decodeOrigin(self, fields)
-        OrderDecoder.decodeOrderRef(self, fields)
-        OrderDecoder.decodeClientId(self, fields)
-        OrderDecoder.decodePermId(self, fields)
-        OrderDecoder.decodeOutsideRth(self, fields)
-        OrderDecoder.decodeHidden(self, fields)
-        OrderDecoder.decodeDiscretionaryAmt(self, fields)
-        OrderDecoder.decodeGoodAfterTime(self, fields)
-        OrderDecoder.skipSharesAllocation(self, fields)
-        OrderDecoder.decodeFAParams(self, fields)
-        OrderDecoder.decodeModelCode(self, fields)
-        OrderDecoder.decodeGoodTillDate(self, fields)
-        OrderDecoder.decodeRule80A(self, fields)
-        OrderDecoder.decodePercentOffset(self, fields)
-        OrderDecoder.decodeSettlingFirm(self, fields)
-        OrderDecoder.decodeShortSaleParams(self, fields)
-        OrderDecoder.decodeAuctionStrategy(self, fields)
-        OrderDecoder.decodeBoxOrderParams(self, fields)
-        OrderDecoder.decodePegToStkOrVolOrderParams(self, fields)
-        OrderDecoder.decodeDisplaySize(self, fields)
-        OrderDecoder.decodeBlockOrder(self, fields)
-        OrderDecoder.decodeSweepToFill(self, fields)
-        OrderDecoder.decodeAllOrNone(self, fields)
-        OrderDecoder.decodeMinQty(self, fields)
-        OrderDecoder.decodeOcaType(self, fields)
-        OrderDecoder.decodeETradeOnly(self, fields)
-        OrderDecoder.decodeFirmQuoteOnly(self, fields)
-        OrderDecoder.decodeNbboPriceCap(self, fields)
-        OrderDecoder.decodeParentId(self, fields)
-        OrderDecoder.decodeTriggerMethod(self, fields)
-        OrderDecoder.decodeVolOrderParams(self, fields, True)
-        OrderDecoder.decodeTrailParams(self, fields)
-        OrderDecoder.decodeBasisPoints(self, fields)
-        OrderDecoder.decodeComboLegs(self, fields)
-        OrderDecoder.decodeSmartComboRoutingParams(self, fields)
-        OrderDecoder.decodeScaleOrderParams(self, fields)
-        OrderDecoder.decodeHedgeParams(self, fields)
-        OrderDecoder.decodeOptOutSmartRouting(self, fields)
-        OrderDecoder.decodeClearingParams(self, fields)
-        OrderDecoder.decodeNotHeld(self, fields)
-        OrderDecoder.decodeDeltaNeutral(self, fields)
-        OrderDecoder.decodeAlgoParams(self, fields)
-        OrderDecoder.decodeSolicited(self, fields)
-        OrderDecoder.decodeWhatIfInfoAndCommission(self, fields)
-        OrderDecoder.decodeVolRandomizeFlags(self, fields)
-        OrderDecoder.decodePegToBenchParams(self, fields)
-        OrderDecoder.decodeConditions(self, fields)
-        OrderDecoder.decodeAdjustedOrderParams(self, fields)
-        OrderDecoder.decodeSoftDollarTier(self, fields)
-        OrderDecoder.decodeCashQty(self, fields)
-        OrderDecoder.decodeDontUseAutoPriceForHedge(self, fields)
-        OrderDecoder.decodeIsOmsContainers(self, fields)
-        OrderDecoder.decodeDiscretionaryUpToLimitPrice(self, fields)
-        OrderDecoder.decodeUsePriceMgmtAlgo(self, fields)
+            orderDecoder.reset(contract, order, orderState, self.serverVersion)
+            orderDecoder.decodePlan(orderDecoder.openOrderPlan, fields)
 
         self.wrapper.openOrder(order.orderId, contract, order, orderState)
 
@@ -540,7 +537,7 @@ class Decoder(Object):
 
         bar = RealTimeBar()
         bar.time = decode(int, fields)
-        bar.open = decode(float, fields)
+        bar.open_ = decode(float, fields)
         bar.high = decode(float, fields)
         bar.low = decode(float, fields)
         bar.close = decode(float, fields)
@@ -548,7 +545,7 @@ class Decoder(Object):
         bar.wap = decode(float, fields)
         bar.count = decode(int, fields)
 
-        self.wrapper.realtimeBar(reqId, bar.time, bar.open, bar.high, bar.low, bar.close, bar.volume, bar.wap, bar.count)
+        self.wrapper.realtimeBar(reqId, bar.time, bar.open_, bar.high, bar.low, bar.close, bar.volume, bar.wap, bar.count)
 
     def processTickOptionComputationMsg(self, fields):
         optPrice = None
@@ -988,10 +985,9 @@ class Decoder(Object):
             historicalTickBidAsk = HistoricalTickBidAsk()
             historicalTickBidAsk.time = decode(int, fields)
             mask = decode(int, fields)
-            tickAttribBidAsk = TickAttribBidAsk()
-            tickAttribBidAsk.askPastHigh = mask & 1 != 0
-            tickAttribBidAsk.bidPastLow = mask & 2 != 0
-            historicalTickBidAsk.tickAttribBidAsk = tickAttribBidAsk
+            # askPastHigh is bit 0 here, bidPastLow in TICK_ATTRIB_BID_ASK
+            historicalTickBidAsk.tickAttribBidAsk = TICK_ATTRIB_BID_ASK[
+                (mask & 1) << 1 | (mask & 2) >> 1]
             historicalTickBidAsk.priceBid = decode(float, fields)
             historicalTickBidAsk.priceAsk = decode(float, fields)
             historicalTickBidAsk.sizeBid = decode(int, fields)
@@ -1013,10 +1009,7 @@ class Decoder(Object):
             historicalTickLast = HistoricalTickLast()
             historicalTickLast.time = decode(int, fields)
             mask = decode(int, fields)
-            tickAttribLast = TickAttribLast()
-            tickAttribLast.pastLimit = mask & 1 != 0
-            tickAttribLast.unreported = mask & 2 != 0
-            historicalTickLast.tickAttribLast = tickAttribLast
+            historicalTickLast.tickAttribLast = TICK_ATTRIB_LAST[mask & 3]
             historicalTickLast.price = decode(float, fields)
             historicalTickLast.size = decode(int, fields)
             historicalTickLast.exchange = decode(str, fields)
@@ -1042,9 +1035,7 @@ class Decoder(Object):
             size = decode(int, fields)
             mask = decode(int, fields)
 
-            tickAttribLast = TickAttribLast()
-            tickAttribLast.pastLimit = mask & 1 != 0
-            tickAttribLast.unreported = mask & 2 != 0
+            tickAttribLast = TICK_ATTRIB_LAST[mask & 3]
             exchange = decode(str, fields)
             specialConditions = decode(str, fields)
 
@@ -1057,9 +1048,7 @@ class Decoder(Object):
             bidSize = decode(int, fields)
             askSize = decode(int, fields)
             mask = decode(int, fields)
-            tickAttribBidAsk = TickAttribBidAsk()
-            tickAttribBidAsk.bidPastLow = mask & 1 != 0
-            tickAttribBidAsk.askPastHigh = mask & 2 != 0
+            tickAttribBidAsk = TICK_ATTRIB_BID_ASK[mask & 3]
 
             self.wrapper.tickByTickBidAsk(reqId, time, bidPrice, askPrice, bidSize,
                                           askSize, tickAttribBidAsk)
@@ -1103,73 +1092,10 @@ class Decoder(Object):
         order = Order()
         contract = Contract()
         orderState = OrderState()
+        orderDecoder = self.orderDecoder
 
-        OrderDecoder.__init__(self, contract, order, orderState, UNSET_INTEGER, self.serverVersion)
-
-        # read contract fields
-        OrderDecoder.decodeContractFields(self, fields)
-
-        # read order fields
-        OrderDecoder.decodeAction(self, fields)
-        OrderDecoder.decodeTotalQuantity(self, fields)
-        OrderDecoder.decodeOrderType(self, fields)
-        OrderDecoder.decodeLmtPrice(self, fields)
-        OrderDecoder.decodeAuxPrice(self, fields)
-        OrderDecoder.decodeTIF(self, fields)
-        OrderDecoder.decodeOcaGroup(self, fields)
-        OrderDecoder.decodeAccount(self, fields)
-        OrderDecoder.decodeOpenClose(self, fields)
-        OrderDecoder.decodeOrigin(self, fields)
-        OrderDecoder.decodeOrderRef(self, fields)
-        OrderDecoder.decodePermId(self, fields)
-        OrderDecoder.decodeOutsideRth(self, fields)
-        OrderDecoder.decodeHidden(self, fields)
-        OrderDecoder.decodeDiscretionaryAmt(self, fields)
-        OrderDecoder.decodeGoodAfterTime(self, fields)
-        OrderDecoder.decodeFAParams(self, fields)
-        OrderDecoder.decodeModelCode(self, fields)
-        OrderDecoder.decodeGoodTillDate(self, fields)
-        OrderDecoder.decodeRule80A(self, fields)
-        OrderDecoder.decodePercentOffset(self, fields)
-        OrderDecoder.decodeSettlingFirm(self, fields)
-        OrderDecoder.decodeShortSaleParams(self, fields)
-        OrderDecoder.decodeBoxOrderParams(self, fields)
-        OrderDecoder.decodePegToStkOrVolOrderParams(self, fields)
-        OrderDecoder.decodeDisplaySize(self, fields)
-        OrderDecoder.decodeSweepToFill(self, fields)
-        OrderDecoder.decodeAllOrNone(self, fields)
-        OrderDecoder.decodeMinQty(self, fields)
-        OrderDecoder.decodeOcaType(self, fields)
-        OrderDecoder.decodeTriggerMethod(self, fields)
-        OrderDecoder.decodeVolOrderParams(self, fields, False)
-        OrderDecoder.decodeTrailParams(self, fields)
-        OrderDecoder.decodeComboLegs(self, fields)
-        OrderDecoder.decodeSmartComboRoutingParams(self, fields)
-        OrderDecoder.decodeScaleOrderParams(self, fields)
-        OrderDecoder.decodeHedgeParams(self, fields)
-        OrderDecoder.decodeClearingParams(self, fields)
-        OrderDecoder.decodeNotHeld(self, fields)
-        OrderDecoder.decodeDeltaNeutral(self, fields)
-        OrderDecoder.decodeAlgoParams(self, fields)
-        OrderDecoder.decodeSolicited(self, fields)
-        OrderDecoder.decodeOrderStatus(self, fields)
-        OrderDecoder.decodeVolRandomizeFlags(self, fields)
-        OrderDecoder.decodePegToBenchParams(self, fields)
-        OrderDecoder.decodeConditions(self, fields)
-        OrderDecoder.decodeStopPriceAndLmtPriceOffset(self, fields)
-        OrderDecoder.decodeCashQty(self, fields)
-        OrderDecoder.decodeDontUseAutoPriceForHedge(self, fields)
-        OrderDecoder.decodeIsOmsContainers(self, fields)
-        OrderDecoder.decodeAutoCancelDate(self, fields)
-        OrderDecoder.decodeFilledQuantity(self, fields)
-        OrderDecoder.decodeRefFuturesConId(self, fields)
-        OrderDecoder.decodeAutoCancelParent(self, fields)
-        OrderDecoder.decodeShareholder(self, fields)
-        OrderDecoder.decodeImbalanceOnly(self, fields)
-        OrderDecoder.decodeRouteMarketableToBbo(self, fields)
-        OrderDecoder.decodeParentPermId(self, fields)
-        OrderDecoder.decodeCompletedTime(self, fields)
-        OrderDecoder.decodeCompletedStatus(self, fields)
+        orderDecoder.reset(contract, order, orderState, UNSET_INTEGER)
+        orderDecoder.decodePlan(orderDecoder.completedOrderPlan, fields)
 
         self.wrapper.completedOrder(contract, order, orderState)
 
@@ -1198,9 +1124,15 @@ class Decoder(Object):
 
     ######################################################################
 
-    def discoverParams(self):
+    @classmethod
+    def discoverSignatures(cls):
+        """ the params of the EWrapper methods into the HandleInfos of the
+        class, only done the first time """
+        if cls.__dict__.get("signaturesDiscovered", False):
+            return
+
         meth2handleInfo = {}
-        for handleInfo in self.msgId2handleInfo.values():
+        for handleInfo in cls.msgId2handleInfo.values():
             meth2handleInfo[handleInfo.wrapperMeth] = handleInfo
 
         methods = inspect.getmembers(EWrapper, inspect.isfunction)
@@ -1210,10 +1142,38 @@ class Decoder(Object):
             handleInfo = meth2handleInfo.get(meth, None)
             if handleInfo is not None:
                 handleInfo.wrapperParams = sig.parameters
+                # one converter per field, following the param annotations
+                handleInfo.wrapperConverters = tuple(
+                    cls.converterFor(param.annotation)
+                    for (pname, param) in sig.parameters.items()
+                    if pname != "self")
 
             #for (pname, param) in sig.parameters.items():
             #     logger.debug("\tparam %s %s %s", pname, param.name, param.annotation)
 
+        cls.signaturesDiscovered = True
+
+
+    def discoverParams(self):
+        self.discoverSignatures()
+
+        # wrapper methods bound once instead of looked up for every msg
+        self.wrapperMeths = {}
+        for handleInfo in self.msgId2handleInfo.values():
+            if handleInfo.wrapperMeth is not None:
+                self.wrapperMeths[handleInfo.wrapperMeth] = getattr(
+                    self.wrapper, handleInfo.wrapperMeth.__name__)
+
+
+    @staticmethod
+    def converterFor(annotation):
+        if annotation is int:
+            return int
+        elif annotation is float:
+            return float
+        else:
+            return decodeStr
+
 
     def printParams(self):
         for (_, handleInfo) in self.msgId2handleInfo.items():
@@ -1225,37 +1185,24 @@ class Decoder(Object):
 
 
     def interpretWithSignature(self, fields, handleInfo):
-        if handleInfo.wrapperParams is None:
+        converters = handleInfo.wrapperConverters
+        if converters is None:
             logger.debug("%s: no param info in %s", fields, handleInfo)
             return
 
         nIgnoreFields = 2 #bypass msgId and versionId faster this way
-        if len(fields) - nIgnoreFields != len(handleInfo.wrapperParams) - 1:
+        if len(fields) - nIgnoreFields != len(converters):
             logger.error("diff len fields and params %d %d for fields: %s and handleInfo: %s",
                          len(fields), len(handleInfo.wrapperParams), fields,
                          handleInfo)
             return
 
-        fieldIdx = nIgnoreFields
-        args = []
-        for (pname, param) in handleInfo.wrapperParams.items():
-            if pname != "self":
-                logger.debug("field %s ", fields[fieldIdx])
-                try:
-                    arg = fields[fieldIdx].decode('UTF-8')
-                except UnicodeDecodeError:
-                    arg = fields[fieldIdx].decode('latin-1')
-                logger.debug("arg %s type %s", arg, param.annotation)
-                if param.annotation is int:
-                    arg = int(arg)
-                elif param.annotation is float:
-                    arg = float(arg)
-
-                args.append(arg)
-                fieldIdx += 1
-
-        method = getattr(self.wrapper, handleInfo.wrapperMeth.__name__)
-        logger.debug("calling %s with %s %s", method, self.wrapper, args)
+        args = [convert(field) for (convert, field)
+                in zip(converters, fields[nIgnoreFields:])]
+
+        method = self.wrapperMeths[handleInfo.wrapperMeth]
+        if HotPathLog.debug:
+            logger.debug("calling %s with %s %s", method, self.wrapper, args)
         method(*args)
 
     def interpret(self, fields):
@@ -1266,20 +1213,25 @@ class Decoder(Object):
         sMsgId = fields[0]
         nMsgId = int(sMsgId)
 
-        handleInfo = self.msgId2handleInfo.get(nMsgId, None)
+        fastHandler = self.fastHandlers.get(nMsgId, None)
+        if fastHandler is None:
+            handleInfo = self.msgId2handleInfo.get(nMsgId, None)
 
-        if handleInfo is None:
-            logger.debug("%s: no handleInfo", fields)
-            return
+            if handleInfo is None:
+                logger.debug("%s: no handleInfo", fields)
+                return
 
         try:
-            if handleInfo.wrapperMeth is not None:
-                logger.debug("In interpret(), handleInfo: %s", handleInfo)
+            if fastHandler is not None:
+                fastHandler(fields)
+            elif handleInfo.wrapperMeth is not None:
+                if HotPathLog.debug:
+                    logger.debug("In interpret(), handleInfo: %s", handleInfo)
                 self.interpretWithSignature(fields, handleInfo)
             elif handleInfo.processMeth is not None:
                 handleInfo.processMeth(self, iter(fields))
         except BadMessage:
-                theBadMsg = ",".join(fields)
+                theBadMsg = b",".join(fields).decode(errors='backslashreplace')
                 self.wrapper.error(NO_VALID_ID, BAD_MESSAGE.code(),
                                    BAD_MESSAGE.msg() + theBadMsg)
                 raise
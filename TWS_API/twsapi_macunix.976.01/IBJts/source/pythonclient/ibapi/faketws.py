@@ -0,0 +1,470 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+
+"""
+A stand-in for TWS/IBGW, to exercise the whole client stack (socket,
+EReader, EClient.run, Decoder) without a live TWS, e.g. for tests and
+throughput/latency benchmarks.
+
+It speaks the handshake, answers startApi with MANAGED_ACCTS and
+NEXT_VALID_ID, and passes every other request to the handler registered
+for its msg id, which can answer with the frames made by the *Frame()
+functions below, replayed as fast as possible or at a given rate:
+
+    def onMktData(session, fields):
+        reqId = int(fields[2])
+        session.startReplay(tickStream(100000, (reqId, )), rate=50000)
+
+    with FakeTws() as tws:
+        tws.onRequest(OUT.REQ_MKT_DATA, onMktData)
+        client.connect("127.0.0.1", tws.port, clientId=0)
+
+Each client connection is served by its own FakeTwsSession thread.
+"""
+
+import time
+import random
+import socket
+import logging
+import threading
+
+from ibapi import comm
+from ibapi.message import IN, OUT
+from ibapi.common import UNSET_DOUBLE
+from ibapi.object_implem import Object
+from ibapi.server_versions import * # @UnusedWildImport
+
+
+logger = logging.getLogger(__name__)
+
+
+def makeFrame(*vals) -> bytes:
+    """ the length prefixed msg made of these fields """
+    return comm.make_msg("".join(comm.make_field(val) for val in vals))
+
+
+def tickPriceFrame(reqId, tickType, price, size, attrMask=0) -> bytes:
+    return makeFrame(IN.TICK_PRICE, 6, reqId, tickType, price, size, attrMask)
+
+
+def tickSizeFrame(reqId, tickType, size) -> bytes:
+    return makeFrame(IN.TICK_SIZE, 6, reqId, tickType, size)
+
+
+def tickByTickLastFrame(reqId, time, price, size, mask=0, exchange="",
+                        specialConditions="", tickType=1) -> bytes:
+    return makeFrame(IN.TICK_BY_TICK, reqId, tickType, time, price, size,
+                     mask, exchange, specialConditions)
+
+
+def tickByTickBidAskFrame(reqId, time, bidPrice, askPrice, bidSize, askSize,
+                          mask=0) -> bytes:
+    return makeFrame(IN.TICK_BY_TICK, reqId, 3, time, bidPrice, askPrice,
+                     bidSize, askSize, mask)
+
+
+def tickByTickMidPointFrame(reqId, time, midPoint) -> bytes:
+    return makeFrame(IN.TICK_BY_TICK, reqId, 4, time, midPoint)
+
+
+def marketDepthL2Frame(reqId, position, marketMaker, operation, side, price,
+                       size, isSmartDepth=False,
+                       serverVersion=MAX_CLIENT_VER) -> bytes:
+    fields = [IN.MARKET_DEPTH_L2, 1, reqId, position, marketMaker, operation,
+              side, price, size]
+    if serverVersion >= MIN_SERVER_VER_SMART_DEPTH:
+        fields.append(isSmartDepth)
+    return makeFrame(*fields)
+
+
+def historicalDataFrame(reqId, bars, startDateStr="", endDateStr="",
+                        serverVersion=MAX_CLIENT_VER) -> bytes:
+    """ bars: list of BarData """
+    old = serverVersion < MIN_SERVER_VER_SYNT_REALTIME_BARS
+    fields = [IN.HISTORICAL_DATA]
+    if old:
+        fields.append(3)
+    fields += [reqId, startDateStr, endDateStr, len(bars)]
+    for bar in bars:
+        fields += [bar.date, bar.open, bar.high, bar.low, bar.close,
+                   bar.volume, bar.average]
+        if old:
+            fields.append("")   # hasGaps
+        fields.append(bar.barCount)
+    return makeFrame(*fields)
+
+
+def contractDataFrame(reqId, details) -> bytes:
+    """ details: a ContractDetails, the fields in the order read by
+    Decoder.processContractDataMsg() at MAX_CLIENT_VER """
+    contract = details.contract
+    lastTradeDate = contract.lastTradeDateOrContractMonth
+    if details.lastTradeTime:
+        lastTradeDate += " " + details.lastTradeTime
+    fields = [IN.CONTRACT_DATA, 8, reqId, contract.symbol, contract.secType,
+        lastTradeDate, contract.strike, contract.right, contract.exchange,
+        contract.currency, contract.localSymbol, details.marketName,
+        contract.tradingClass, contract.conId, details.minTick,
+        details.mdSizeMultiplier, contract.multiplier, details.orderTypes,
+        details.validExchanges, details.priceMagnifier, details.underConId,
+        details.longName, contract.primaryExchange, details.contractMonth,
+        details.industry, details.category, details.subcategory,
+        details.timeZoneId, details.tradingHours, details.liquidHours,
+        details.evRule, details.evMultiplier]
+    secIdList = details.secIdList or []
+    fields.append(len(secIdList))
+    for tagValue in secIdList:
+        fields += [tagValue.tag, tagValue.value]
+    fields += [details.aggGroup, details.underSymbol, details.underSecType,
+               details.marketRuleIds, details.realExpirationDate]
+    return makeFrame(*fields)
+
+
+def openOrderFrame(contract, order, orderState,
+                   serverVersion=MAX_CLIENT_VER) -> bytes:
+    """ The fields in the order read by Decoder.processOpenOrder(). Only
+    for server versions >= MIN_SERVER_VER_ORDER_CONTAINER (no msg version
+    field), the order conditions and the combo legs are not sent. """
+
+    if serverVersion < MIN_SERVER_VER_ORDER_CONTAINER:
+        raise ValueError("server version %d not supported" % serverVersion)
+
+    fields = [IN.OPEN_ORDER, order.orderId,
+        contract.conId, contract.symbol, contract.secType,
+        contract.lastTradeDateOrContractMonth, contract.strike, contract.right,
+        contract.multiplier, contract.exchange, contract.currency,
+        contract.localSymbol, contract.tradingClass,
+        order.action, order.totalQuantity, order.orderType, order.lmtPrice,
+        order.auxPrice, order.tif, order.ocaGroup, order.account,
+        order.openClose, order.origin, order.orderRef, order.clientId,
+        order.permId, order.outsideRth, order.hidden, order.discretionaryAmt,
+        order.goodAfterTime, "",    # sharesAllocation
+        order.faGroup, order.faMethod, order.faPercentage, order.faProfile,
+        order.modelCode, order.goodTillDate, order.rule80A,
+        order.percentOffset, order.settlingFirm,
+        order.shortSaleSlot, order.designatedLocation, order.exemptCode,
+        order.auctionStrategy,
+        order.startingPrice, order.stockRefPrice, order.delta,
+        order.stockRangeLower, order.stockRangeUpper,
+        order.displaySize, order.blockOrder, order.sweepToFill,
+        order.allOrNone, order.minQty, order.ocaType, order.eTradeOnly,
+        order.firmQuoteOnly, order.nbboPriceCap, order.parentId,
+        order.triggerMethod,
+        order.volatility, order.volatilityType, order.deltaNeutralOrderType,
+        order.deltaNeutralAuxPrice]
+
+    if order.deltaNeutralOrderType:
+        fields += [order.deltaNeutralConId, order.deltaNeutralSettlingFirm,
+            order.deltaNeutralClearingAccount,
+            order.deltaNeutralClearingIntent, order.deltaNeutralOpenClose,
+            order.deltaNeutralShortSale, order.deltaNeutralShortSaleSlot,
+            order.deltaNeutralDesignatedLocation]
+    fields += [order.continuousUpdate, order.referencePriceType,
+        order.trailStopPrice, order.trailingPercent,
+        order.basisPoints, order.basisPointsType,
+        contract.comboLegsDescrip, 0, 0]    # no combo legs
+
+    smartComboRoutingParams = order.smartComboRoutingParams or []
+    fields.append(len(smartComboRoutingParams))
+    for tagValue in smartComboRoutingParams:
+        fields += [tagValue.tag, tagValue.value]
+
+    fields += [order.scaleInitLevelSize, order.scaleSubsLevelSize,
+               order.scalePriceIncrement]
+    if order.scalePriceIncrement != UNSET_DOUBLE and order.scalePriceIncrement > 0.0:
+        fields += [order.scalePriceAdjustValue, order.scalePriceAdjustInterval,
+            order.scaleProfitOffset, order.scaleAutoReset,
+            order.scaleInitPosition, order.scaleInitFillQty,
+            order.scaleRandomPercent]
+
+    fields.append(order.hedgeType)
+    if order.hedgeType:
+        fields.append(order.hedgeParam)
+    fields += [order.optOutSmartRouting, order.clearingAccount,
+               order.clearingIntent, order.notHeld]
+
+    deltaNeutralContract = contract.deltaNeutralContract
+    fields.append(deltaNeutralContract is not None)
+    if deltaNeutralContract is not None:
+        fields += [deltaNeutralContract.conId, deltaNeutralContract.delta,
+                   deltaNeutralContract.price]
+
+    fields.append(order.algoStrategy)
+    if order.algoStrategy:
+        algoParams = order.algoParams or []
+        fields.append(len(algoParams))
+        for tagValue in algoParams:
+            fields += [tagValue.tag, tagValue.value]
+
+    fields += [order.solicited, order.whatIf, orderState.status,
+        orderState.initMarginBefore, orderState.maintMarginBefore,
+        orderState.equityWithLoanBefore, orderState.initMarginChange,
+        orderState.maintMarginChange, orderState.equityWithLoanChange,
+        orderState.initMarginAfter, orderState.maintMarginAfter,
+        orderState.equityWithLoanAfter, orderState.commission,
+        orderState.minCommission, orderState.maxCommission,
+        orderState.commissionCurrency, orderState.warningText,
+        order.randomizeSize, order.randomizePrice]
+
+    if order.orderType == "PEG BENCH":
+        fields += [order.referenceContractId,
+            order.isPeggedChangeAmountDecrease, order.peggedChangeAmount,
+            order.referenceChangeAmount, order.referenceExchangeId]
+    fields.append(0)    # no conditions
+
+    softDollarTier = order.softDollarTier
+    fields += [order.adjustedOrderType, order.triggerPrice,
+        order.trailStopPrice, order.lmtPriceOffset, order.adjustedStopPrice,
+        order.adjustedStopLimitPrice, order.adjustedTrailingAmount,
+        order.adjustableTrailingUnit,
+        softDollarTier.name, softDollarTier.val, softDollarTier.displayName,
+        order.cashQty, order.dontUseAutoPriceForHedge, order.isOmsContainer]
+    if serverVersion >= MIN_SERVER_VER_D_PEG_ORDERS:
+        fields.append(order.discretionaryUpToLimitPrice)
+    if serverVersion >= MIN_SERVER_VER_PRICE_MGMT_ALGO:
+        fields.append(bool(order.usePriceMgmtAlgo))
+
+    return makeFrame(*fields)
+
+
+def tickStream(nFrames, reqIds=(1,), seed=0, serverVersion=MAX_CLIENT_VER) -> list:
+    """ A repeatable mix of TICK_PRICE, TICK_SIZE, TICK_BY_TICK and
+    MARKET_DEPTH_L2 frames around a random walk, for the given reqIds. """
+
+    rnd = random.Random(seed)
+    price = 100.
+    frames = []
+    t = 1570000000
+    for i in range(nFrames):
+        reqId = reqIds[i % len(reqIds)]
+        price = round(max(0.01, price + rnd.choice((-0.01, 0., 0.01))), 2)
+        size = rnd.randint(1, 20) * 100
+        kind = rnd.random()
+        if kind < 0.4:
+            tickType = rnd.choice((1, 2, 4))
+            frames.append(tickPriceFrame(reqId, tickType, price, size,
+                                         rnd.randint(0, 3)))
+        elif kind < 0.6:
+            frames.append(tickSizeFrame(reqId, rnd.choice((0, 3, 5, 8)), size))
+        elif kind < 0.8:
+            t += rnd.randint(0, 1)
+            if rnd.random() < 0.5:
+                frames.append(tickByTickLastFrame(reqId, t, price, size,
+                                                  0, "ISLAND", ""))
+            else:
+                frames.append(tickByTickBidAskFrame(reqId, t, price - 0.01,
+                                                    price + 0.01, size, size))
+        else:
+            frames.append(marketDepthL2Frame(reqId, rnd.randint(0, 9), "NSDQ",
+                rnd.randint(0, 2), rnd.randint(0, 1), price, size, True,
+                serverVersion))
+    return frames
+
+
+class FakeTwsSession(Object):
+    """ one client connection """
+
+    def __init__(self, server, sock):
+        self.server = server
+        self.socket = sock
+        self.lock = threading.Lock()
+        self.serverVersion = None
+        self.clientId = None
+        self.requests = []
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+
+    def send(self, frames):
+        """ frames: bytes, made of one or more frames """
+        with self.lock:
+            self.socket.sendall(frames)
+
+
+    def replay(self, frames, rate=None, chunkSize=65536):
+        """ Sends frames (list of bytes) as fast as possible or at rate
+        frames per second, in bursts of 1ms worth of frames. """
+
+        if rate is None:
+            chunk = []
+            chunkLen = 0
+            for frame in frames:
+                chunk.append(frame)
+                chunkLen += len(frame)
+                if chunkLen >= chunkSize:
+                    self.send(b"".join(chunk))
+                    chunk = []
+                    chunkLen = 0
+            if chunk:
+                self.send(b"".join(chunk))
+            return
+
+        perBurst = max(1, rate // 1000)
+        t0 = time.perf_counter()
+        for nSent in range(0, len(frames), perBurst):
+            self.send(b"".join(frames[nSent:nSent + perBurst]))
+            wait = t0 + (nSent + perBurst) / rate - time.perf_counter()
+            if wait > 0 and nSent + perBurst < len(frames):
+                time.sleep(wait)
+
+
+    def startReplay(self, frames, rate=None) -> threading.Thread:
+        """ replay() in its own thread, so that requests are still served """
+        thread = threading.Thread(target=self.replay, args=(frames, rate),
+                                  daemon=True)
+        thread.start()
+        return thread
+
+
+    def close(self):
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.socket.close()
+
+
+    def handshake(self, frames):
+        prefix = b"API\0"
+        while len(frames) < len(prefix) + 4:
+            if not self.recv(frames):
+                return False
+        if frames.buf[frames.start:frames.start + len(prefix)] != prefix:
+            logger.error("bad handshake prefix")
+            return False
+        frames.start += len(prefix)
+
+        msg = frames.nextMsg()
+        while msg is None:
+            if not self.recv(frames):
+                return False
+            msg = frames.nextMsg()
+
+        (minVersion, maxVersion) = msg.tobytes().decode()[1:].split("..")
+        if int(minVersion) > self.server.serverVersion:
+            logger.error("client version %s too new", minVersion)
+            return False
+        self.serverVersion = min(int(maxVersion), self.server.serverVersion)
+        self.send(makeFrame(self.serverVersion, self.server.connTime))
+        return True
+
+
+    def recv(self, frames):
+        nRecvd = self.socket.recv_into(frames.reserve(4096), 4096)
+        frames.commit(nRecvd)
+        return nRecvd > 0
+
+
+    def run(self):
+        frames = comm.FrameBuffer()
+        try:
+            if not self.handshake(frames):
+                return
+            self.server.sessionStarted(self)
+            while True:
+                msg = frames.nextMsg()
+                while msg is not None:
+                    self.handle(comm.read_fields(msg))
+                    msg = frames.nextMsg()
+                if not self.recv(frames):
+                    break
+        except OSError:
+            pass
+        except:
+            logger.exception("unhandled exception in FakeTwsSession")
+        finally:
+            self.close()
+
+
+    def handle(self, fields):
+        self.requests.append(fields)
+        handler = self.server.handlers.get(int(fields[0]), None)
+        if handler is not None:
+            handler(self, fields)
+
+
+class FakeTws(Object):
+    def __init__(self, host="127.0.0.1", port=0, serverVersion=MAX_CLIENT_VER,
+                 accounts="DU0000001", nextValidId=1):
+        """ port 0 picks a free port, see self.port once started """
+        self.host = host
+        self.port = port
+        self.serverVersion = serverVersion
+        self.accounts = accounts
+        self.nextValidId = nextValidId
+        self.connTime = time.strftime("%Y%m%d %H:%M:%S") + " UTC"
+        self.handlers = {OUT.START_API: self.handleStartApi}
+        self.sessions = []
+        self.sessionEvent = threading.Condition()
+        self.listener = None
+        self.thread = None
+
+
+    def __enter__(self):
+        self.start()
+        return self
+
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+    def onRequest(self, msgId, handler):
+        """ handler(session, fields) is called for each request msgId,
+        fields being the request fields (bytes), msg id included """
+        self.handlers[msgId] = handler
+
+
+    def handleStartApi(self, session, fields):
+        session.clientId = int(fields[2])
+        session.send(makeFrame(IN.MANAGED_ACCTS, 1, self.accounts)
+                     + makeFrame(IN.NEXT_VALID_ID, 1, self.nextValidId))
+
+
+    def start(self):
+        self.listener = socket.create_server((self.host, self.port))
+        self.port = self.listener.getsockname()[1]
+        self.thread = threading.Thread(target=self.acceptLoop, daemon=True)
+        self.thread.start()
+        return self.port
+
+
+    def stop(self):
+        if self.listener is not None:
+            try:
+                # wakes up the accept()
+                self.listener.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.listener.close()
+            self.listener = None
+        for session in list(self.sessions):
+            session.close()
+            session.thread.join(1)
+        if self.thread is not None:
+            self.thread.join(1)
+
+
+    def acceptLoop(self):
+        while True:
+            try:
+                (sock, _) = self.listener.accept()
+            except (OSError, AttributeError):
+                break
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            FakeTwsSession(self, sock).thread.start()
+
+
+    def sessionStarted(self, session):
+        with self.sessionEvent:
+            self.sessions.append(session)
+            self.sessionEvent.notify_all()
+
+
+    def waitForSession(self, timeout=5.) -> FakeTwsSession:
+        """ the last session started, once its handshake is done """
+        with self.sessionEvent:
+            self.sessionEvent.wait_for(lambda: self.sessions, timeout)
+            return self.sessions[-1] if self.sessions else None
@@ -0,0 +1,199 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+
+"""
+Specialized handlers for the high volume incoming messages.
+
+The generic Decoder.process*Msg() functions walk an iterator over the fields
+and call utils.decode() for each of them. The handlers made here are built
+once the server version is known, for that version only: the version checks
+are resolved up front, the fields are read by index from the fields tuple and
+converted with the builtin types, and the EWrapper methods are looked up once.
+
+Each handler takes the fields of one message (msg id included) and raises
+BadMessage if there are not enough of them (except for TICK_SIZE which, as
+before, only logs a field count that does not match EWrapper.tickSize).
+"""
+
+import logging
+
+from ibapi.message import IN
+from ibapi.common import (BarData, TickAttrib, TICK_ATTRIB_BID_ASK,
+    TICK_ATTRIB_LAST)
+from ibapi.ticktype import TickTypeEnum
+from ibapi.server_versions import (MIN_SERVER_VER_PAST_LIMIT,
+    MIN_SERVER_VER_PRE_OPEN_BID_ASK, MIN_SERVER_VER_SYNT_REALTIME_BARS,
+    MIN_SERVER_VER_SMART_DEPTH)
+from ibapi.utils import BadMessage
+
+
+logger = logging.getLogger(__name__)
+
+
+# size tick sent along with a price tick
+PRICE2SIZE_TICK_TYPE = {
+    TickTypeEnum.BID: TickTypeEnum.BID_SIZE,
+    TickTypeEnum.ASK: TickTypeEnum.ASK_SIZE,
+    TickTypeEnum.LAST: TickTypeEnum.LAST_SIZE,
+    TickTypeEnum.DELAYED_BID: TickTypeEnum.DELAYED_BID_SIZE,
+    TickTypeEnum.DELAYED_ASK: TickTypeEnum.DELAYED_ASK_SIZE,
+    TickTypeEnum.DELAYED_LAST: TickTypeEnum.DELAYED_LAST_SIZE,
+}
+
+
+def makeTickPriceHandler(wrapper, serverVersion):
+    tickPrice = wrapper.tickPrice
+    tickSize = wrapper.tickSize
+    sizeTickType = PRICE2SIZE_TICK_TYPE.get
+    pastLimit = serverVersion >= MIN_SERVER_VER_PAST_LIMIT
+    preOpen = serverVersion >= MIN_SERVER_VER_PRE_OPEN_BID_ASK
+
+    def handleTickPrice(fields):
+        if len(fields) < 7:
+            raise BadMessage("no more fields")
+        reqId = int(fields[2] or 0)
+        tickType = int(fields[3] or 0)
+        attrMask = int(fields[6] or 0)
+
+        attrib = TickAttrib()
+        if pastLimit:
+            attrib.canAutoExecute = attrMask & 1 != 0
+            attrib.pastLimit = attrMask & 2 != 0
+            if preOpen:
+                attrib.preOpen = attrMask & 4 != 0
+        else:
+            attrib.canAutoExecute = attrMask == 1
+
+        tickPrice(reqId, tickType, float(fields[4] or 0), attrib)
+
+        sizeType = sizeTickType(tickType)
+        if sizeType is not None:
+            tickSize(reqId, sizeType, int(fields[5] or 0))
+
+    return handleTickPrice
+
+
+def makeTickSizeHandler(wrapper, serverVersion):
+    tickSize = wrapper.tickSize
+
+    def handleTickSize(fields):
+        if len(fields) != 5:
+            logger.error("diff len fields and params %d %d for fields: %s",
+                         len(fields), 4, fields)
+            return
+        tickSize(int(fields[2] or 0), int(fields[3] or 0), int(fields[4] or 0))
+
+    return handleTickSize
+
+
+def makeTickByTickHandler(wrapper, serverVersion):
+    tickByTickAllLast = wrapper.tickByTickAllLast
+    tickByTickBidAsk = wrapper.tickByTickBidAsk
+    tickByTickMidPoint = wrapper.tickByTickMidPoint
+
+    def handleTickByTick(fields):
+        if len(fields) < 4:
+            raise BadMessage("no more fields")
+        reqId = int(fields[1] or 0)
+        tickType = int(fields[2] or 0)
+        time = int(fields[3] or 0)
+
+        if tickType == 1 or tickType == 2:
+            # Last or AllLast
+            if len(fields) < 9:
+                raise BadMessage("no more fields")
+            tickByTickAllLast(reqId, tickType, time, float(fields[4] or 0),
+                int(fields[5] or 0), TICK_ATTRIB_LAST[int(fields[6] or 0) & 3],
+                fields[7].decode(errors='backslashreplace'),
+                fields[8].decode(errors='backslashreplace'))
+        elif tickType == 3:
+            # BidAsk
+            if len(fields) < 9:
+                raise BadMessage("no more fields")
+            tickByTickBidAsk(reqId, time, float(fields[4] or 0),
+                float(fields[5] or 0), int(fields[6] or 0),
+                int(fields[7] or 0), TICK_ATTRIB_BID_ASK[int(fields[8] or 0) & 3])
+        elif tickType == 4:
+            # MidPoint
+            if len(fields) < 5:
+                raise BadMessage("no more fields")
+            tickByTickMidPoint(reqId, time, float(fields[4] or 0))
+
+    return handleTickByTick
+
+
+def makeMarketDepthL2Handler(wrapper, serverVersion):
+    updateMktDepthL2 = wrapper.updateMktDepthL2
+    smartDepth = serverVersion >= MIN_SERVER_VER_SMART_DEPTH
+    nFields = 10 if smartDepth else 9
+
+    def handleMarketDepthL2(fields):
+        if len(fields) < nFields:
+            raise BadMessage("no more fields")
+        isSmartDepth = smartDepth and int(fields[9] or 0) != 0
+        updateMktDepthL2(int(fields[2] or 0), int(fields[3] or 0),
+            fields[4].decode(errors='backslashreplace'), int(fields[5] or 0),
+            int(fields[6] or 0), float(fields[7] or 0), int(fields[8] or 0),
+            isSmartDepth)
+
+    return handleMarketDepthL2
+
+
+def makeHistoricalDataHandler(wrapper, serverVersion):
+    historicalData = wrapper.historicalData
+    historicalDataEnd = wrapper.historicalDataEnd
+    if serverVersion < MIN_SERVER_VER_SYNT_REALTIME_BARS:
+        first = 2       # skip the version field
+        barLen = 9      # with the hasGaps field
+    else:
+        first = 1
+        barLen = 8
+
+    def handleHistoricalData(fields):
+        if len(fields) < first + 4:
+            raise BadMessage("no more fields")
+        reqId = int(fields[first] or 0)
+        startDateStr = fields[first + 1].decode(errors='backslashreplace')
+        endDateStr = fields[first + 2].decode(errors='backslashreplace')
+        itemCount = int(fields[first + 3] or 0)
+
+        barsStart = first + 4
+        barsEnd = barsStart + itemCount * barLen
+        if len(fields) < barsEnd:
+            raise BadMessage("no more fields")
+
+        barFields = iter(fields[barsStart:barsEnd])
+        for row in zip(*[barFields] * barLen):
+            bar = BarData()
+            bar.date = row[0].decode(errors='backslashreplace')
+            bar.open = float(row[1] or 0)
+            bar.high = float(row[2] or 0)
+            bar.low = float(row[3] or 0)
+            bar.close = float(row[4] or 0)
+            bar.volume = int(row[5] or 0)
+            bar.average = float(row[6] or 0)
+            bar.barCount = int(row[-1] or 0)
+            historicalData(reqId, bar)
+
+        # send end of dataset marker
+        historicalDataEnd(reqId, startDateStr, endDateStr)
+
+    return handleHistoricalData
+
+
+HANDLER_FACTORIES = {
+    IN.TICK_PRICE: makeTickPriceHandler,
+    IN.TICK_SIZE: makeTickSizeHandler,
+    IN.TICK_BY_TICK: makeTickByTickHandler,
+    IN.MARKET_DEPTH_L2: makeMarketDepthL2Handler,
+    IN.HISTORICAL_DATA: makeHistoricalDataHandler,
+}
+
+
+def makeHandlers(wrapper, serverVersion) -> dict:
+    """ msg id -> handler, specialized for the given server version """
+    return {msgId: factory(wrapper, serverVersion)
+            for (msgId, factory) in HANDLER_FACTORIES.items()}
@@ -0,0 +1,99 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+
+"""
+TWS disconnects a client sending it more than 50 msgs in a second. Nothing
+paces the requests on their own: a burst at the open (a watch list
+subscribed, a basket of orders, then their cancels) can go over the limit.
+
+A RateGovernor given to EClient.setOutboundQueue() makes the writer thread
+(writer.EWriter) keep the msgs it writes under the limit: each write takes
+no more msgs than there are tokens left in the last second, the writer
+waits for tokens when there are none. The msgs wait in one queue per
+priority class, the first class written first: by default the orders and
+their cancels go before the other requests, so that a cancel is not held
+back by the market data requests queued before it, and a few msgs of each
+second are kept for them (reserve). Within a class the msgs keep their
+order (a cancel never overtakes its order).
+
+    client.setOutboundQueue(True, governor=RateGovernor())
+
+The writer metrics (EClient.outboundMetrics()) then tell how long the
+writer was held back and the latency of the msgs of each class, from the
+request to the write.
+"""
+
+import logging
+
+from ibapi.message import OUT
+from ibapi.history import TokenBucket
+from ibapi.object_implem import Object
+
+
+logger = logging.getLogger(__name__)
+
+
+MAX_MSGS_PER_SEC = 50
+
+# the priority classes, the first one written first
+(ORDERS, REQUESTS) = range(2)
+
+# the msgs of the ORDERS class, the others are REQUESTS
+ORDER_MSGS = (OUT.START_API, OUT.PLACE_ORDER, OUT.CANCEL_ORDER,
+              OUT.REQ_GLOBAL_CANCEL, OUT.EXERCISE_OPTIONS)
+
+
+class RateGovernor(Object):
+    def __init__(self, maxMsgs=MAX_MSGS_PER_SEC, period=1., margin=0.05,
+                 reserve=5, priorities=None, defaultPriority=REQUESTS):
+        """ maxMsgs: the most msgs written in any period seconds, margin is
+        added to the period for the clock differences with TWS.
+        reserve: the msgs of each period only the first class can use, so
+        that an order or a cancel is written at once, even in a burst of
+        other requests.
+        priorities: {msg id: priority class}, the msgs not in it are in
+        defaultPriority; by default the ORDER_MSGS are ORDERS. """
+        if not 0 <= reserve < maxMsgs:
+            raise ValueError("reserve %d out of [0, %d)" % (reserve, maxMsgs))
+        self.bucket = TokenBucket(maxMsgs, period + margin)
+        self.reserve = reserve
+        if priorities is None:
+            priorities = dict.fromkeys(ORDER_MSGS, ORDERS)
+        # keyed by the msg id field as sent, not to convert it for each msg
+        self.priorities = {b"%d" % msgId: priority
+                           for (msgId, priority) in priorities.items()}
+        self.defaultPriority = defaultPriority
+        self.nClasses = max([defaultPriority, *priorities.values()]) + 1
+
+
+    def priority(self, msg) -> int:
+        """ msg: a msg made with make_msg() """
+        return self.priorities.get(msg[4:msg.find(b"\0", 4)],
+                                   self.defaultPriority)
+
+
+    def available(self, now, priority) -> int:
+        """ the msgs of the priority class that can be written at once """
+        nAvailable = self.bucket.available(now)
+        if priority > 0:
+            nAvailable -= self.reserve
+        return max(nAvailable, 0)
+
+
+    def delay(self, now, priority) -> float:
+        """ the seconds to wait before a msg of the priority class can be
+        written """
+        if self.available(now, priority):
+            return 0.
+        spent = self.bucket.spent
+        nLeft = self.bucket.nTokens - (self.reserve if priority > 0 else 0)
+        # the msg written when there were nLeft - 1 more recent ones
+        return spent[len(spent) - nLeft] + self.bucket.period - now
+
+
+    def take(self, now, nMsgs):
+        """ nMsgs are written at now """
+        self.bucket.take(now, nMsgs)
@@ -0,0 +1,364 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+
+"""
+Downloads of long histories over an AsyncEClient, within the historical
+data pacing limits of TWS:
+    - no more than 60 requests in any 10 minutes
+    - no more than 5 requests for the same contract, exchange and tick type
+      in any 2 seconds
+    - no identical request within 15 seconds
+    - no more than 50 requests open at the same time
+
+HistoryDownloader.downloadBars() splits a date range into the longest
+requests allowed for the bar size, downloadTicks() pages through the ticks
+1000 at a time. The requests go out as soon as HistoricalPacer allows,
+those rejected for pacing anyway are sent again, and the results are put
+back in time order without the overlaps:
+
+    downloader = HistoryDownloader(client)
+    bars = await downloader.downloadBars(contract, start, end, "1 min", "TRADES")
+"""
+
+import time
+import math
+import asyncio
+import logging
+import calendar
+import itertools
+import collections
+
+from ibapi import columnar
+from ibapi.async_client import RequestError
+from ibapi.object_implem import Object
+
+
+logger = logging.getLogger(__name__)
+
+
+MAX_REQUESTS = 60
+MAX_REQUESTS_PERIOD = 600.
+SAME_CONTRACT_REQUESTS = 5
+SAME_CONTRACT_PERIOD = 2.
+IDENTICAL_REQUEST_PERIOD = 15.
+MAX_OPEN_REQUESTS = 50
+
+MAX_TICKS_PER_REQUEST = 1000
+
+DAY = 86400
+
+# the longest request per bar size: (durationStr, seconds surely covered).
+# D, W, M and Y are trading days and calendar periods, the seconds are a
+# lower bound of what they cover, the overlaps are dropped.
+MAX_DURATIONS = {
+    "1 secs": ("1800 S", 1800),
+    "5 secs": ("3600 S", 3600),
+    "10 secs": ("14400 S", 14400),
+    "15 secs": ("14400 S", 14400),
+    "30 secs": ("28800 S", 28800),
+    "1 min": ("86400 S", DAY),
+    "2 mins": ("2 D", DAY),
+    "3 mins": ("1 W", 7 * DAY),
+    "5 mins": ("1 W", 7 * DAY),
+    "10 mins": ("1 W", 7 * DAY),
+    "15 mins": ("1 W", 7 * DAY),
+    "20 mins": ("1 W", 7 * DAY),
+    "30 mins": ("1 M", 28 * DAY),
+    "1 hour": ("1 M", 28 * DAY),
+    "2 hours": ("1 M", 28 * DAY),
+    "3 hours": ("1 M", 28 * DAY),
+    "4 hours": ("1 M", 28 * DAY),
+    "8 hours": ("1 M", 28 * DAY),
+    "1 day": ("1 Y", 365 * DAY),
+    "1 week": ("1 Y", 365 * DAY),
+    "1 month": ("1 Y", 365 * DAY),
+}
+
+
+class TokenBucket(Object):
+    """ At most nTokens spent in any period seconds: the tokens come back
+    in the bucket one period after being spent, which is how TWS counts
+    (a bucket refilled at a steady rate would either allow bursts over the
+    limit or waste some of it). """
+
+    def __init__(self, nTokens, period):
+        self.nTokens = nTokens
+        self.period = period
+        self.spent = collections.deque()
+
+
+    def delay(self, now) -> float:
+        """ seconds to wait for a token """
+        spent = self.spent
+        while spent and spent[0] <= now - self.period:
+            spent.popleft()
+        if len(spent) < self.nTokens:
+            return 0.
+        return spent[0] + self.period - now
+
+
+    def available(self, now) -> int:
+        """ the tokens that can be taken at once """
+        self.delay(now)
+        return self.nTokens - len(self.spent)
+
+
+    def take(self, now, nTokens=1):
+        self.spent.extend(itertools.repeat(now, nTokens))
+
+
+class HistoricalPacer(Object):
+    """ The pacing limits of the historical data requests. margin is added
+    to all the periods, for the clock differences with TWS. """
+
+    def __init__(self, maxRequests=MAX_REQUESTS, period=MAX_REQUESTS_PERIOD,
+                 sameContractRequests=SAME_CONTRACT_REQUESTS,
+                 sameContractPeriod=SAME_CONTRACT_PERIOD,
+                 identicalPeriod=IDENTICAL_REQUEST_PERIOD, margin=0.5,
+                 clock=time.monotonic):
+        self.clock = clock
+        self.all = TokenBucket(maxRequests, period + margin)
+        self.sameContractRequests = sameContractRequests
+        self.sameContractPeriod = sameContractPeriod + margin
+        self.identicalPeriod = identicalPeriod + margin
+        self.contracts = {}         # contract key -> TokenBucket
+        self.lastSent = {}          # request key -> time sent
+
+
+    def delay(self, contractKey, requestKey) -> float:
+        """ seconds to wait before sending the request """
+        now = self.clock()
+        delay = self.all.delay(now)
+        bucket = self.contracts.get(contractKey, None)
+        if bucket is not None:
+            delay = max(delay, bucket.delay(now))
+        lastSent = self.lastSent.get(requestKey, None)
+        if lastSent is not None:
+            delay = max(delay, lastSent + self.identicalPeriod - now)
+        return delay
+
+
+    def take(self, contractKey, requestKey):
+        """ records the request as sent """
+        now = self.clock()
+        self.all.take(now)
+        bucket = self.contracts.get(contractKey, None)
+        if bucket is None:
+            bucket = TokenBucket(self.sameContractRequests, self.sameContractPeriod)
+            self.contracts[contractKey] = bucket
+        bucket.take(now)
+        self.lastSent[requestKey] = now
+        if len(self.lastSent) > 1000:
+            self.forget(now)
+
+
+    def forget(self, now):
+        """ drops what no longer limits anything """
+        self.lastSent = {key: sent for (key, sent) in self.lastSent.items()
+                         if sent > now - self.identicalPeriod}
+        for (key, bucket) in list(self.contracts.items()):
+            bucket.delay(now)       # drops the tokens back in the bucket
+            if not bucket.spent:
+                del self.contracts[key]
+
+
+    async def acquire(self, contractKey, requestKey):
+        """ waits until the request can be sent and records it as sent """
+        delay = self.delay(contractKey, requestKey)
+        while delay > 0:
+            await asyncio.sleep(delay)
+            delay = self.delay(contractKey, requestKey)
+        self.take(contractKey, requestKey)
+
+
+def formatTime(t) -> str:
+    """ epoch seconds as a TWS date time """
+    return time.strftime("%Y%m%d %H:%M:%S GMT", time.gmtime(t))
+
+
+def toEpoch(t) -> float:
+    """ a datetime (naive ones are UTC) or epoch seconds as epoch seconds """
+    if isinstance(t, (int, float)):
+        return t
+    if t.tzinfo is None:
+        return calendar.timegm(t.timetuple()) + t.microsecond / 1e6
+    return t.timestamp()
+
+
+def barTime(date) -> int:
+    """ the start of a bar as epoch seconds, from the date of a bar of
+    formatDate 2 (epoch seconds) or of a daily bar (yyyymmdd) """
+    if len(date) == 8:
+        return calendar.timegm(time.strptime(date, "%Y%m%d"))
+    if date.isdigit():
+        return int(date)
+    return calendar.timegm(time.strptime(date[:18], "%Y%m%d  %H:%M:%S"))
+
+
+def splitRange(startTime, endTime, barSizeSetting) -> list:
+    """ the (endDateTime, durationStr) of the requests covering
+    [startTime, endTime), the latest first """
+    if barSizeSetting not in MAX_DURATIONS:
+        raise ValueError("unknown bar size %r" % barSizeSetting)
+    (durationStr, step) = MAX_DURATIONS[barSizeSetting]
+    requests = []
+    end = endTime
+    while end > startTime:
+        if durationStr.endswith(" S") and end - step < startTime:
+            # only what is left
+            durationStr = "%d S" % max(60, math.ceil(end - startTime))
+        requests.append((formatTime(end), durationStr))
+        end -= step
+    return requests
+
+
+def isPacingViolation(exc) -> bool:
+    return (exc.errorCode == 162 and "pacing violation" in exc.errorString.lower()) \
+        or exc.errorCode == 366
+
+
+def isNoData(exc) -> bool:
+    return exc.errorCode == 162 and "returned no data" in exc.errorString.lower()
+
+
+def contractKey(contract, whatToShow):
+    return (contract.conId, contract.symbol, contract.secType,
+            contract.exchange, contract.currency, whatToShow)
+
+
+class HistoryDownloader(Object):
+    def __init__(self, client, firstReqId=1 << 24, pacer=None,
+                 maxOpenRequests=MAX_OPEN_REQUESTS,
+                 retryDelay=IDENTICAL_REQUEST_PERIOD):
+        """ client: a connected AsyncEClient, the reqIds used start at
+        firstReqId. The pacer can be shared by several downloaders on the
+        same TWS. A request rejected for pacing is sent again after
+        retryDelay seconds. """
+        self.client = client
+        self.reqIds = itertools.count(firstReqId)
+        self.pacer = pacer if pacer is not None else HistoricalPacer()
+        self.maxOpenRequests = maxOpenRequests
+        self.openRequests = None
+        self.retryDelay = retryDelay
+
+
+    async def request(self, send, contractKey, requestKey):
+        """ send(reqId) is awaited once the pacing allows it, as many times
+        as it is rejected for pacing. An answer with no data is []. """
+        if self.openRequests is None:
+            self.openRequests = asyncio.Semaphore(self.maxOpenRequests)
+        async with self.openRequests:
+            while True:
+                await self.pacer.acquire(contractKey, requestKey)
+                try:
+                    return await send(next(self.reqIds))
+                except RequestError as exc:
+                    if isNoData(exc):
+                        return []
+                    if not isPacingViolation(exc):
+                        raise
+                    logger.warning("pacing violation, sent again in %.1fs: %s",
+                                   self.retryDelay, exc)
+                await asyncio.sleep(self.retryDelay)
+
+
+    async def downloadBars(self, contract, start, end, barSizeSetting,
+                           whatToShow, useRTH=1):
+        """ The bars starting in [start, end) (datetimes or epoch seconds),
+        in time order, as a BarData list or with setColumnarBars(True) as a
+        bars array. The dates are epoch seconds, except for the daily and
+        longer bars which are yyyymmdd. """
+
+        startTime = toEpoch(start)
+        endTime = toEpoch(end)
+        key = contractKey(contract, whatToShow)
+
+        def requestBars(endDateTime, durationStr):
+            send = lambda reqId: self.client.reqHistoricalDataAsync(reqId,
+                contract, endDateTime, durationStr, barSizeSetting, whatToShow,
+                useRTH, 2, False, [])
+            return self.request(send, key, key + (endDateTime, durationStr,
+                                                  barSizeSetting, useRTH))
+
+        chunks = await asyncio.gather(*(requestBars(endDateTime, durationStr)
+            for (endDateTime, durationStr) in splitRange(startTime, endTime,
+                                                         barSizeSetting)))
+        return self.stitchBars(chunks, startTime, endTime)
+
+
+    def stitchBars(self, chunks, startTime, endTime):
+        """ the bars of all the chunks in [startTime, endTime), in time
+        order, once each """
+        if self.client.columnarBars:
+            chunks = [bars for bars in chunks if len(bars)]
+            if not chunks:
+                return columnar.numpy.empty(0, dtype=columnar.BAR_DTYPE)
+            bars = columnar.numpy.concatenate(chunks)
+            times = columnar.numpy.array([barTime(date) for date in bars["date"]],
+                                         dtype=columnar.numpy.int64)
+            (times, first) = columnar.numpy.unique(times, return_index=True)
+            keep = (times >= startTime) & (times < endTime)
+            return bars[first[keep]]
+
+        barsByTime = {}
+        for bars in chunks:
+            for bar in bars:
+                t = barTime(bar.date)
+                if startTime <= t < endTime:
+                    barsByTime.setdefault(t, bar)
+        return [barsByTime[t] for t in sorted(barsByTime)]
+
+
+    async def downloadTicks(self, contract, start, end, whatToShow,
+                            useRth=1, ignoreSize=False):
+        """ The ticks in [start, end) (datetimes or epoch seconds), in time
+        order, as a list or with setColumnarTicks(True) as an array. The
+        pages are requested one after the other, each one starting at the
+        time of the last tick of the previous one. """
+
+        startTime = toEpoch(start)
+        endTime = toEpoch(end)
+        key = contractKey(contract, whatToShow)
+        pages = []
+        pageStart = int(startTime)
+        nSeen = 0       # ticks at pageStart already in the previous page
+        while pageStart < endTime:
+            startDateTime = formatTime(pageStart)
+            send = lambda reqId: self.client.reqHistoricalTicksAsync(reqId,
+                contract, startDateTime, "", MAX_TICKS_PER_REQUEST,
+                whatToShow, useRth, ignoreSize, [])
+            page = await self.request(send, key, key + (startDateTime, useRth,
+                                                        ignoreSize))
+            times = page["time"] if not isinstance(page, list) \
+                else [tick.time for tick in page]
+
+            skip = 0
+            while skip < min(nSeen, len(page)) and times[skip] == pageStart:
+                skip += 1
+            end = len(page)
+            while end > skip and times[end - 1] >= endTime:
+                end -= 1
+            pages.append(page[skip:end])
+
+            if len(page) < MAX_TICKS_PER_REQUEST or end < len(page):
+                break
+            lastTime = int(times[-1])
+            if lastTime == pageStart:
+                logger.warning("more than %d ticks at %s, some are missing",
+                               len(page), startDateTime)
+                (pageStart, nSeen) = (lastTime + 1, 0)
+            else:
+                nSeen = sum(1 for t in times if t == lastTime)
+                pageStart = lastTime
+
+        if self.client.columnarTicks:
+            # a page with no data is []
+            pages = [ticks for ticks in pages if len(ticks)]
+            if not pages:
+                return columnar.numpy.empty(0,
+                    dtype=columnar.HISTORICAL_TICK_DTYPES[whatToShow])
+            return columnar.numpy.concatenate(pages)
+        return [tick for page in pages for tick in page]
@@ -0,0 +1,311 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+
+"""
+On-disk cache of the historical bars and ticks, needs numpy.
+
+HistoryCache sits on a history.HistoryDownloader: the bars (or ticks) asked
+for are read from the cache, only the parts of the range not in it yet are
+downloaded, then merged in:
+
+    cache = HistoryCache(HistoryDownloader(client), "~/.ibapi/history")
+    bars = await cache.bars(contract, start, end, "1 min", "TRADES")
+
+There is one series per contract, whatToShow, bar size (or "ticks") and
+useRTH, stored in the cache directory as:
+    <series>.npy    the rows sorted by time, a numpy array of CACHED_BAR_DTYPE
+                    or CACHED_TICK_*_DTYPE, the times in epoch seconds
+    <series>.json   the [start, end) time ranges covered, data or not, so
+                    that the gaps with no data (weekends, ...) are not
+                    downloaded again
+
+The .npy files are memory-mapped: the arrays returned are read-only views
+of the file, read from disk as they are used. A merge writes new files and
+renames them over the old ones, the arrays returned before stay valid (on
+POSIX systems). The exchange and special conditions of the trades are
+stored as bytes of at most TEXT_SIZE chars, longer ones are refused.
+
+The bars not completed yet (the ticks of the last TICKS_SETTLE_TIME
+seconds) are downloaded each time they are asked for and not cached: the
+array returned is then in memory, the cached rows followed by them.
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+
+from ibapi import columnar
+from ibapi.history import barTime, toEpoch
+from ibapi.object_implem import Object
+
+numpy = columnar.numpy
+
+
+logger = logging.getLogger(__name__)
+
+
+# the most chars of the exchange and special conditions of a cached trade
+TEXT_SIZE = 32
+
+
+if numpy is not None:
+    CACHED_BAR_DTYPE = numpy.dtype([
+        ("time", numpy.int64), ("open", numpy.float64), ("high", numpy.float64),
+        ("low", numpy.float64), ("close", numpy.float64),
+        ("volume", numpy.int64), ("average", numpy.float64),
+        ("barCount", numpy.int64)])
+
+    CACHED_TICK_DTYPE = columnar.HISTORICAL_TICK_DTYPE
+
+    CACHED_TICK_BID_ASK_DTYPE = columnar.HISTORICAL_TICK_BID_ASK_DTYPE
+
+    CACHED_TICK_LAST_DTYPE = numpy.dtype([
+        ("time", numpy.int64), ("mask", numpy.uint8),
+        ("price", numpy.float64), ("size", numpy.int64),
+        ("exchange", "S%d" % TEXT_SIZE),
+        ("specialConditions", "S%d" % TEXT_SIZE)])
+
+    TICK_DTYPES = {"MIDPOINT": CACHED_TICK_DTYPE,
+                   "BID_ASK": CACHED_TICK_BID_ASK_DTYPE,
+                   "TRADES": CACHED_TICK_LAST_DTYPE}
+
+
+BAR_SIZE_UNITS = {"sec": 1, "secs": 1, "min": 60, "mins": 60, "hour": 3600,
+                  "hours": 3600, "day": 86400, "week": 7 * 86400,
+                  "month": 31 * 86400}
+
+# the ticks of the last seconds may not all be in yet
+TICKS_SETTLE_TIME = 60
+
+
+def barSeconds(barSizeSetting) -> int:
+    (n, unit) = barSizeSetting.split()
+    return int(n) * BAR_SIZE_UNITS[unit]
+
+
+def mergeRanges(ranges) -> list:
+    """ the [start, end) ranges sorted, overlapping and adjacent ones joined """
+    merged = []
+    for (start, end) in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def missingRanges(ranges, start, end) -> list:
+    """ the parts of [start, end) not in ranges (merged) """
+    missing = []
+    for (rangeStart, rangeEnd) in ranges:
+        if rangeEnd <= start:
+            continue
+        if rangeStart >= end:
+            break
+        if rangeStart > start:
+            missing.append((start, rangeStart))
+        start = max(start, rangeEnd)
+    if start < end:
+        missing.append((start, end))
+    return missing
+
+
+class SeriesFile(Object):
+    """ one series of the cache """
+
+    def __init__(self, path, dtype):
+        """ path: without the extension """
+        self.path = path
+        self.dtype = dtype
+        self.ranges = []
+        if os.path.exists(path + ".json"):
+            with open(path + ".json") as f:
+                self.ranges = json.load(f)
+
+
+    def load(self):
+        """ all the rows, memory-mapped """
+        if not os.path.exists(self.path + ".npy"):
+            return numpy.empty(0, dtype=self.dtype)
+        return numpy.load(self.path + ".npy", mmap_mode="r")
+
+
+    def read(self, start, end):
+        """ the rows in [start, end), memory-mapped """
+        rows = self.load()
+        times = rows["time"]
+        return rows[times.searchsorted(start):times.searchsorted(end)]
+
+
+    def missing(self, start, end) -> list:
+        return missingRanges(self.ranges, start, end)
+
+
+    def store(self, start, end, rows):
+        """ replaces what is in [start, end) by rows (in time order) """
+        old = self.load()
+        times = old["time"]
+        (first, last) = (times.searchsorted(start), times.searchsorted(end))
+        new = numpy.concatenate((old[:first], rows, old[last:]))
+
+        tmpPath = self.path + ".tmp.npy"
+        numpy.save(tmpPath, new)
+        os.replace(tmpPath, self.path + ".npy")
+
+        self.ranges = mergeRanges(self.ranges + [[start, end]])
+        with open(self.path + ".json.tmp", "w") as f:
+            json.dump(self.ranges, f)
+        os.replace(self.path + ".json.tmp", self.path + ".json")
+
+
+def barsToRows(bars):
+    """ BarData list or bars array -> CACHED_BAR_DTYPE array """
+    if isinstance(bars, list):
+        return numpy.array([(barTime(bar.date), bar.open, bar.high, bar.low,
+                             bar.close, bar.volume, bar.average, bar.barCount)
+                            for bar in bars], dtype=CACHED_BAR_DTYPE)
+    rows = numpy.empty(len(bars), dtype=CACHED_BAR_DTYPE)
+    rows["time"] = [barTime(date) for date in bars["date"]]
+    for name in CACHED_BAR_DTYPE.names[1:]:
+        rows[name] = bars[name]
+    return rows
+
+
+def encodeText(value, name) -> bytes:
+    """ value as stored in a TEXT_SIZE bytes field, ValueError if too long """
+    encoded = value.encode()
+    if len(encoded) > TEXT_SIZE:
+        raise ValueError("%s %r longer than %d chars, can not be cached"
+                         % (name, value, TEXT_SIZE))
+    return encoded
+
+
+def ticksToRows(ticks, dtype):
+    """ HistoricalTick* list or ticks array -> the dtype array """
+    if not isinstance(ticks, list):
+        rows = numpy.empty(len(ticks), dtype=dtype)
+        for name in dtype.names:
+            if dtype[name].kind == "S":
+                rows[name] = [encodeText(value, name) for value in ticks[name]]
+            else:
+                rows[name] = ticks[name]
+        return rows
+
+    if dtype is CACHED_TICK_DTYPE:
+        values = [(tick.time, tick.price, tick.size) for tick in ticks]
+    elif dtype is CACHED_TICK_BID_ASK_DTYPE:
+        values = [(tick.time, tick.tickAttribBidAsk.askPastHigh
+                   | tick.tickAttribBidAsk.bidPastLow << 1, tick.priceBid,
+                   tick.priceAsk, tick.sizeBid, tick.sizeAsk) for tick in ticks]
+    else:
+        values = [(tick.time, tick.tickAttribLast.pastLimit
+                   | tick.tickAttribLast.unreported << 1, tick.price, tick.size,
+                   encodeText(tick.exchange, "exchange"),
+                   encodeText(tick.specialConditions, "specialConditions"))
+                  for tick in ticks]
+    return numpy.array(values, dtype=dtype)
+
+
+def seriesName(contract, *params) -> str:
+    if contract.conId:
+        name = str(contract.conId)
+    else:
+        name = "-".join((contract.symbol, contract.secType, contract.exchange,
+                         contract.currency, contract.lastTradeDateOrContractMonth))
+    name = "_".join((name, ) + tuple(str(param).replace(" ", "") for param in params))
+    return "".join(c if c.isalnum() or c in "-_." else "%" for c in name)
+
+
+class HistoryCache(Object):
+    def __init__(self, downloader, directory, clock=time.time):
+        """ downloader: a history.HistoryDownloader, directory: the cache
+        directory, created if need be """
+        columnar.checkNumpy()
+        self.downloader = downloader
+        self.directory = os.path.expanduser(directory)
+        self.clock = clock
+        self.series = {}
+        os.makedirs(self.directory, exist_ok=True)
+
+
+    def seriesFile(self, name, dtype) -> SeriesFile:
+        series = self.series.get(name, None)
+        if series is None:
+            series = SeriesFile(os.path.join(self.directory, name), dtype)
+            self.series[name] = series
+        return series
+
+
+    def gaps(self, series, startTime, endTime, cacheableEnd) -> list:
+        """ the ranges to download, up to what can be cached """
+        return [(gapStart, min(gapEnd, cacheableEnd)) for (gapStart, gapEnd)
+                in series.missing(startTime, endTime) if gapStart < cacheableEnd]
+
+
+    def withTail(self, series, startTime, endTime, tailStart, tail):
+        """ the cached rows in [startTime, endTime), then the rows of the
+        tail (not cached) from tailStart on, if any """
+        if tail is None:
+            return series.read(startTime, endTime)
+        rows = series.read(startTime, tailStart)
+        return numpy.concatenate((rows, tail[(tail["time"] >= tailStart)
+                                             & (tail["time"] < endTime)]))
+
+
+    async def bars(self, contract, start, end, barSizeSetting, whatToShow,
+                   useRTH=1):
+        """ The bars starting in [start, end) (datetimes or epoch seconds) as
+        a memory-mapped CACHED_BAR_DTYPE array, the missing ones downloaded
+        first. The bars not completed yet are downloaded too, but not
+        cached. """
+
+        startTime = int(toEpoch(start))
+        endTime = int(toEpoch(end))
+        series = self.seriesFile(seriesName(contract, whatToShow,
+            barSizeSetting, "rth" if useRTH else "all"), CACHED_BAR_DTYPE)
+
+        # a bar is complete once the next one has started
+        seconds = barSeconds(barSizeSetting)
+        completeEnd = int(self.clock() // seconds * seconds - seconds)
+        gaps = self.gaps(series, startTime, endTime, completeEnd)
+        tailStart = max(startTime, completeEnd)
+        if tailStart < endTime:
+            gaps.append((tailStart, endTime))
+        chunks = await asyncio.gather(*(self.downloader.downloadBars(contract,
+            gapStart, gapEnd, barSizeSetting, whatToShow, useRTH)
+            for (gapStart, gapEnd) in gaps))
+        tail = barsToRows(chunks.pop()) if tailStart < endTime else None
+        for ((gapStart, gapEnd), bars) in zip(gaps, chunks):
+            series.store(gapStart, gapEnd, barsToRows(bars))
+        return self.withTail(series, startTime, endTime, tailStart, tail)
+
+
+    async def ticks(self, contract, start, end, whatToShow, useRth=1):
+        """ The ticks in [start, end) (datetimes or epoch seconds) as a
+        memory-mapped array (CACHED_TICK_DTYPE for MIDPOINT,
+        CACHED_TICK_BID_ASK_DTYPE for BID_ASK, CACHED_TICK_LAST_DTYPE for
+        TRADES), the missing ones downloaded first. The ticks of the last
+        minute are downloaded too, but not cached. """
+
+        startTime = int(toEpoch(start))
+        endTime = int(toEpoch(end))
+        dtype = TICK_DTYPES[whatToShow]
+        series = self.seriesFile(seriesName(contract, whatToShow, "ticks",
+            "rth" if useRth else "all"), dtype)
+
+        settledEnd = int(self.clock()) - TICKS_SETTLE_TIME
+        gaps = self.gaps(series, startTime, endTime, settledEnd)
+        tailStart = max(startTime, settledEnd)
+        if tailStart < endTime:
+            gaps.append((tailStart, endTime))
+        pages = await asyncio.gather(*(self.downloader.downloadTicks(contract,
+            gapStart, gapEnd, whatToShow, useRth) for (gapStart, gapEnd) in gaps))
+        tail = ticksToRows(pages.pop(), dtype) if tailStart < endTime else None
+        for ((gapStart, gapEnd), ticks) in zip(gaps, pages):
+            series.store(gapStart, gapEnd, ticksToRows(ticks, dtype))
+        return self.withTail(series, startTime, endTime, tailStart, tail)
@@ -4,6 +4,8 @@ Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is su
 """
 
 class Object(object):
+    # so that the subclasses declaring __slots__ have no __dict__
+    __slots__ = ()
 
     def __str__(self):
         return "Object"
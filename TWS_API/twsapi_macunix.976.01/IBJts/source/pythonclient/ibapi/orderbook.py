@@ -0,0 +1,269 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+
+"""
+Order books kept up to date from the reqMktDepth() answers, needs numpy.
+
+OrderBooks added to the client with EClient.addFeed() takes the
+MARKET_DEPTH and MARKET_DEPTH_L2 msgs before they go on to updateMktDepth()
+and updateMktDepthL2() as usual, and applies their insert/update/delete
+of a row to the OrderBook of the reqId:
+
+    books = OrderBooks()
+    client.addFeed(books)
+    client.reqMktDepth(1001, contract, 10, True, [])
+    ...
+    (bidPrice, bidSize, askPrice, askSize) = books.top(1001)
+
+Each side of a book is a few preallocated numpy arrays, the rows in the
+order of their positions (best price first), an insert or delete moving
+the rows after it within the arrays. With SMART depth, the rows are the
+orders of each exchange (the marketMaker), levels() sums them per price.
+The error 317 (depth reset by TWS) empties the book.
+
+The books are written by the thread running the decoder: read them there,
+e.g. in the updateMktDepth*() callbacks, or copy them under a lock.
+"""
+
+import logging
+
+from ibapi import columnar
+from ibapi.message import IN
+from ibapi.object_implem import Object
+
+numpy = columnar.numpy
+
+
+logger = logging.getLogger(__name__)
+
+
+ASK = 0
+BID = 1
+
+INSERT = 0
+UPDATE = 1
+DELETE = 2
+
+DEPTH_RESET = 317
+
+
+class BookSide(Object):
+    """ the rows of one side, best price first """
+
+    def __init__(self, side, maxRows):
+        self.side = side
+        self.nRows = 0
+        self.prices = numpy.zeros(maxRows, dtype=numpy.float64)
+        self.sizes = numpy.zeros(maxRows, dtype=numpy.int64)
+        self.marketMakers = numpy.full(maxRows, "", dtype=object)
+
+
+    def grow(self):
+        maxRows = len(self.prices) * 2
+        for name in ("prices", "sizes", "marketMakers"):
+            column = getattr(self, name)
+            newColumn = numpy.zeros(maxRows, dtype=column.dtype)
+            if column.dtype == object:
+                newColumn[:] = ""
+            newColumn[:len(column)] = column
+            setattr(self, name, newColumn)
+
+
+    def insert(self, position, price, size, marketMaker):
+        n = self.nRows
+        if position > n:
+            logger.debug("side %d: insert at %d of %d rows", self.side, position, n)
+            position = n
+        if n == len(self.prices):
+            self.grow()
+        if position < n:
+            for column in (self.prices, self.sizes, self.marketMakers):
+                column[position + 1:n + 1] = column[position:n]
+        self.prices[position] = price
+        self.sizes[position] = size
+        self.marketMakers[position] = marketMaker
+        self.nRows = n + 1
+
+
+    def update(self, position, price, size, marketMaker):
+        if position >= self.nRows:
+            # not there, as after a reset
+            self.insert(position, price, size, marketMaker)
+            return
+        self.prices[position] = price
+        self.sizes[position] = size
+        self.marketMakers[position] = marketMaker
+
+
+    def delete(self, position):
+        n = self.nRows
+        if position >= n:
+            logger.debug("side %d: delete at %d of %d rows", self.side, position, n)
+            return
+        if position < n - 1:
+            for column in (self.prices, self.sizes, self.marketMakers):
+                column[position:n - 1] = column[position + 1:n]
+        self.marketMakers[n - 1] = ""
+        self.nRows = n - 1
+
+
+    def top(self) -> tuple:
+        """ (price, size) of the first level, (NaN, 0) if none """
+        n = self.nRows
+        if n == 0:
+            return (numpy.nan, 0)
+        price = float(self.prices[0])
+        if n == 1 or self.prices[1] != price:
+            return (price, int(self.sizes[0]))
+        return (price, self.cumulativeSize(price))
+
+
+    def levels(self):
+        """ (prices, sizes) with the sizes of the rows at the same price
+        summed, best price first """
+        n = self.nRows
+        prices = self.prices[:n]
+        if n == 0:
+            return (prices.copy(), self.sizes[:0].copy())
+        starts = numpy.flatnonzero(numpy.concatenate(
+            ((True, ), prices[1:] != prices[:-1])))
+        return (prices[starts], numpy.add.reduceat(self.sizes[:n], starts))
+
+
+    def cumulativeSize(self, price) -> int:
+        """ the size at price or better """
+        n = self.nRows
+        prices = self.prices[:n]
+        better = prices >= price if self.side == BID else prices <= price
+        return int(self.sizes[:n][better].sum())
+
+
+class OrderBook(Object):
+    def __init__(self, maxRows=32):
+        """ maxRows: rows preallocated per side, doubled when need be """
+        self.sides = (BookSide(ASK, maxRows), BookSide(BID, maxRows))
+        self.asks = self.sides[ASK]
+        self.bids = self.sides[BID]
+        self.nUpdates = 0
+
+
+    def apply(self, position, operation, side, price, size, marketMaker=""):
+        """ one updateMktDepth*() """
+        bookSide = self.sides[side]
+        if operation == UPDATE and position < bookSide.nRows:
+            # most of them, inlined
+            bookSide.prices[position] = price
+            bookSide.sizes[position] = size
+            bookSide.marketMakers[position] = marketMaker
+        elif operation == UPDATE:
+            bookSide.update(position, price, size, marketMaker)
+        elif operation == INSERT:
+            bookSide.insert(position, price, size, marketMaker)
+        elif operation == DELETE:
+            bookSide.delete(position)
+        else:
+            logger.warning("unknown depth operation %d", operation)
+        self.nUpdates += 1
+
+
+    def clear(self):
+        for bookSide in self.sides:
+            bookSide.nRows = 0
+            bookSide.marketMakers[:] = ""
+        self.nUpdates += 1
+
+
+    def top(self) -> tuple:
+        """ (bidPrice, bidSize, askPrice, askSize) of the first levels, the
+        price NaN and size 0 for an empty side """
+        return self.bids.top() + self.asks.top()
+
+
+    def depth(self, side, nRows=None):
+        """ copies of (prices, sizes, marketMakers) of the first nRows rows
+        of the side, all if None """
+        bookSide = self.sides[side]
+        n = bookSide.nRows if nRows is None else min(nRows, bookSide.nRows)
+        return (bookSide.prices[:n].copy(), bookSide.sizes[:n].copy(),
+                bookSide.marketMakers[:n].copy())
+
+
+    def levels(self, side):
+        """ (prices, sizes) per price, see BookSide.levels() """
+        return self.sides[side].levels()
+
+
+    def cumulativeSizes(self, side):
+        """ (prices, sizes) per price, each size being that at the price or
+        better, e.g. what a market order of that size would reach """
+        (prices, sizes) = self.sides[side].levels()
+        return (prices, sizes.cumsum())
+
+
+    def cumulativeSize(self, side, price) -> int:
+        return self.sides[side].cumulativeSize(price)
+
+
+class OrderBooks(Object):
+    """ the OrderBook of every reqId, fed by the decoder """
+
+    def __init__(self, maxRows=32):
+        columnar.checkNumpy()
+        self.maxRows = maxRows
+        self.books = {}
+
+
+    def book(self, reqId) -> OrderBook:
+        """ the book of reqId, made if need be """
+        book = self.books.get(reqId, None)
+        if book is None:
+            book = OrderBook(self.maxRows)
+            self.books[reqId] = book
+        return book
+
+
+    def remove(self, reqId):
+        """ drops the book, after cancelMktDepth() """
+        self.books.pop(reqId, None)
+
+
+    def top(self, reqId) -> tuple:
+        return self.book(reqId).top()
+
+
+    def makeHandlers(self, nextHandler, serverVersion) -> dict:
+        """ see Decoder.addFeed() """
+        book = self.book
+
+        nextMarketDepth = nextHandler(IN.MARKET_DEPTH)
+        def handleMarketDepth(fields):
+            if len(fields) >= 8:
+                book(int(fields[2] or 0)).apply(int(fields[3] or 0),
+                    int(fields[4] or 0), int(fields[5] or 0),
+                    float(fields[6] or 0), int(fields[7] or 0))
+            nextMarketDepth(fields)
+
+        nextMarketDepthL2 = nextHandler(IN.MARKET_DEPTH_L2)
+        def handleMarketDepthL2(fields):
+            if len(fields) >= 9:
+                book(int(fields[2] or 0)).apply(int(fields[3] or 0),
+                    int(fields[5] or 0), int(fields[6] or 0),
+                    float(fields[7] or 0), int(fields[8] or 0),
+                    fields[4].decode(errors='backslashreplace'))
+            nextMarketDepthL2(fields)
+
+        nextError = nextHandler(IN.ERR_MSG)
+        books = self.books
+        def handleError(fields):
+            if len(fields) >= 4 and int(fields[3] or 0) == DEPTH_RESET:
+                reqId = int(fields[2] or 0)
+                if reqId in books:
+                    books[reqId].clear()
+            nextError(fields)
+
+        return {IN.MARKET_DEPTH: handleMarketDepth,
+                IN.MARKET_DEPTH_L2: handleMarketDepthL2,
+                IN.ERR_MSG: handleError}
@@ -15,14 +15,374 @@ from ibapi.softdollartier import SoftDollarTier
 
 logger = logging.getLogger(__name__)
 
+
+# the objects the plain fields of a plan go to
+CONTRACT, ORDER, ORDER_STATE = range(3)
+
+
+# one field to a value, as decode() does
+def decodeString(field) -> str:
+    if type(field) is str:
+        return field
+    return field.decode(errors='backslashreplace')
+
+def decodeInt(field) -> int:
+    return int(field or 0)
+
+def decodeFloat(field) -> float:
+    return float(field or 0)
+
+def decodeBool(field) -> bool:
+    return int(field or 0) != 0
+
+def decodeIntUnset(field) -> int:
+    return int(field) if field else UNSET_INTEGER
+
+def decodeFloatUnset(field) -> float:
+    return float(field) if field else UNSET_DOUBLE
+
+
 class OrderDecoder(Object):
+    """ Reads the order msgs into a contract, an order and an order state.
+    One OrderDecoder is made per server version and reused for every msg,
+    see reset(). Above MIN_SERVER_VER_ORDER_CONTAINER the msg version is the
+    server version, so the fields of an OPEN_ORDER msg are known once the
+    server version is: openOrderPlan is then the flat list of the steps to
+    decode one, see makePlan(). """
+
     def __init__(self, contract, order, orderState, version, serverVersion):
         self.contract = contract
         self.order = order
         self.orderState = orderState
         self.version = version
         self.serverVersion = serverVersion
-        self.discoverParams()
+        if serverVersion >= MIN_SERVER_VER_ORDER_CONTAINER:
+            self.openOrderPlan = self.makeOpenOrderPlan()
+        else:
+            self.openOrderPlan = None
+        self.completedOrderPlan = self.makeCompletedOrderPlan()
+
+
+    def reset(self, contract, order, orderState, version):
+        """ for the next msg """
+        self.contract = contract
+        self.order = order
+        self.orderState = orderState
+        self.version = version
+
+
+    def decodePlan(self, plan, fields):
+        """ decodes the fields (iterator) following plan, see makePlan() """
+        targets = (self.contract, self.order, self.orderState)
+        for (target, names, converters) in plan:
+            if target is None:
+                converters(self, fields)
+            else:
+                # zip() stops at the end of the converters, before taking
+                # one more field
+                values = [convert(field) for (convert, field)
+                          in zip(converters, fields)]
+                if len(values) < len(names):
+                    raise BadMessage("no more fields")
+                targets[target].__dict__.update(zip(names, values))
+
+
+    @staticmethod
+    def makePlan(steps) -> tuple:
+        """ steps: (target, attribute name, converter) for a plain field, the
+        target being CONTRACT, ORDER or ORDER_STATE, or (None, None, meth)
+        for the fields read by meth(self, fields). The plan has the plain
+        fields in a row going to the same target merged into one
+        (target, names, converters) step. """
+        plan = []
+        for (target, name, convert) in steps:
+            if target is None:
+                plan.append((None, None, convert))
+            elif plan and plan[-1][0] == target:
+                plan[-1][1].append(name)
+                plan[-1][2].append(convert)
+            else:
+                plan.append((target, [name], [convert]))
+        return tuple((target, names, converters) if target is None
+                     else (target, tuple(names), tuple(converters))
+                     for (target, names, converters) in plan)
+
+
+    def contractSteps(self) -> list:
+        steps = [(CONTRACT, "conId", decodeInt),
+                 (CONTRACT, "symbol", decodeString),
+                 (CONTRACT, "secType", decodeString),
+                 (CONTRACT, "lastTradeDateOrContractMonth", decodeString),
+                 (CONTRACT, "strike", decodeFloat),
+                 (CONTRACT, "right", decodeString)]
+        if self.version >= 32:
+            steps.append((CONTRACT, "multiplier", decodeString))
+        steps += [(CONTRACT, "exchange", decodeString),
+                  (CONTRACT, "currency", decodeString),
+                  (CONTRACT, "localSymbol", decodeString)]
+        if self.version >= 32:
+            steps.append((CONTRACT, "tradingClass", decodeString))
+        return steps
+
+
+    def orderSteps(self, isOpenOrder) -> list:
+        """ from the action to the trigger method """
+        steps = [(ORDER, "action", decodeString),
+                 (ORDER, "totalQuantity",
+                  decodeFloat if self.serverVersion >= MIN_SERVER_VER_FRACTIONAL_POSITIONS
+                  else decodeInt),
+                 (ORDER, "orderType", decodeString),
+                 (ORDER, "lmtPrice", decodeFloatUnset),
+                 (ORDER, "auxPrice", decodeFloatUnset),
+                 (ORDER, "tif", decodeString),
+                 (ORDER, "ocaGroup", decodeString),
+                 (ORDER, "account", decodeString),
+                 (ORDER, "openClose", decodeString),
+                 (ORDER, "origin", decodeInt),
+                 (ORDER, "orderRef", decodeString)]
+        if isOpenOrder:
+            steps.append((ORDER, "clientId", decodeInt))
+        steps += [(ORDER, "permId", decodeInt),
+                  (ORDER, "outsideRth", decodeBool),
+                  (ORDER, "hidden", decodeBool),
+                  (ORDER, "discretionaryAmt", decodeFloat),
+                  (ORDER, "goodAfterTime", decodeString)]
+        if isOpenOrder:
+            steps.append((None, None, OrderDecoder.skipSharesAllocation))
+        steps += [(ORDER, "faGroup", decodeString),
+                  (ORDER, "faMethod", decodeString),
+                  (ORDER, "faPercentage", decodeString),
+                  (ORDER, "faProfile", decodeString)]
+        if self.serverVersion >= MIN_SERVER_VER_MODELS_SUPPORT:
+            steps.append((ORDER, "modelCode", decodeString))
+        steps += [(ORDER, "goodTillDate", decodeString),
+                  (ORDER, "rule80A", decodeString),
+                  (ORDER, "percentOffset", decodeFloatUnset),
+                  (ORDER, "settlingFirm", decodeString)]
+        if self.serverVersion == MIN_SERVER_VER_SSHORTX_OLD:
+            steps.append((None, None, OrderDecoder.decodeShortSaleParams))
+        else:
+            steps += [(ORDER, "shortSaleSlot", decodeInt),
+                      (ORDER, "designatedLocation", decodeString),
+                      (ORDER, "exemptCode", decodeInt)]
+        if isOpenOrder:
+            steps.append((ORDER, "auctionStrategy", decodeInt))
+        steps += [(ORDER, "startingPrice", decodeFloatUnset),
+                  (ORDER, "stockRefPrice", decodeFloatUnset),
+                  (ORDER, "delta", decodeFloatUnset),
+                  (ORDER, "stockRangeLower", decodeFloatUnset),
+                  (ORDER, "stockRangeUpper", decodeFloatUnset),
+                  (ORDER, "displaySize", decodeInt)]
+        if isOpenOrder:
+            steps.append((ORDER, "blockOrder", decodeBool))
+        steps += [(ORDER, "sweepToFill", decodeBool),
+                  (ORDER, "allOrNone", decodeBool),
+                  (ORDER, "minQty", decodeIntUnset),
+                  (ORDER, "ocaType", decodeInt)]
+        if isOpenOrder:
+            steps += [(ORDER, "eTradeOnly", decodeBool),
+                      (ORDER, "firmQuoteOnly", decodeBool),
+                      (ORDER, "nbboPriceCap", decodeFloatUnset),
+                      (ORDER, "parentId", decodeInt)]
+        steps.append((ORDER, "triggerMethod", decodeInt))
+        return steps
+
+
+    def makeOpenOrderPlan(self) -> tuple:
+        """ the steps of an OPEN_ORDER msg after the msg id, the msg version
+        being the server version """
+        self.version = self.serverVersion
+        steps = [(ORDER, "orderId", decodeInt)]
+        steps += self.contractSteps()
+        steps += self.orderSteps(True)
+        steps += [
+            (None, None, OrderDecoder.decodeOpenOrderVolParams),
+            (ORDER, "trailStopPrice", decodeFloatUnset),
+            (ORDER, "trailingPercent", decodeFloatUnset),
+            (ORDER, "basisPoints", decodeFloatUnset),
+            (ORDER, "basisPointsType", decodeIntUnset),
+            (None, None, OrderDecoder.decodeComboLegs),
+            (None, None, OrderDecoder.decodeSmartComboRoutingParams),
+            (None, None, OrderDecoder.decodeScaleOrderParams),
+            (None, None, OrderDecoder.decodeHedgeParams),
+            (ORDER, "optOutSmartRouting", decodeBool),
+            (ORDER, "clearingAccount", decodeString),
+            (ORDER, "clearingIntent", decodeString),
+            (ORDER, "notHeld", decodeBool),
+            (None, None, OrderDecoder.decodeDeltaNeutral),
+            (None, None, OrderDecoder.decodeAlgoParams),
+            (ORDER, "solicited", decodeBool),
+            (ORDER, "whatIf", decodeBool),
+            (ORDER_STATE, "status", decodeString)]
+        if self.serverVersion >= MIN_SERVER_VER_WHAT_IF_EXT_FIELDS:
+            steps += [(ORDER_STATE, name, decodeString) for name in (
+                "initMarginBefore", "maintMarginBefore", "equityWithLoanBefore",
+                "initMarginChange", "maintMarginChange", "equityWithLoanChange")]
+        steps += [(ORDER_STATE, "initMarginAfter", decodeString),
+                  (ORDER_STATE, "maintMarginAfter", decodeString),
+                  (ORDER_STATE, "equityWithLoanAfter", decodeString),
+                  (ORDER_STATE, "commission", decodeFloatUnset),
+                  (ORDER_STATE, "minCommission", decodeFloatUnset),
+                  (ORDER_STATE, "maxCommission", decodeFloatUnset),
+                  (ORDER_STATE, "commissionCurrency", decodeString),
+                  (ORDER_STATE, "warningText", decodeString),
+                  (ORDER, "randomizeSize", decodeBool),
+                  (ORDER, "randomizePrice", decodeBool)]
+        if self.serverVersion >= MIN_SERVER_VER_PEGGED_TO_BENCHMARK:
+            steps += [(None, None, OrderDecoder.decodePegToBenchParams),
+                      (None, None, OrderDecoder.decodeConditions),
+                      (ORDER, "adjustedOrderType", decodeString),
+                      (ORDER, "triggerPrice", decodeFloat),
+                      (ORDER, "trailStopPrice", decodeFloat),
+                      (ORDER, "lmtPriceOffset", decodeFloat),
+                      (ORDER, "adjustedStopPrice", decodeFloat),
+                      (ORDER, "adjustedStopLimitPrice", decodeFloat),
+                      (ORDER, "adjustedTrailingAmount", decodeFloat),
+                      (ORDER, "adjustableTrailingUnit", decodeInt)]
+        if self.serverVersion >= MIN_SERVER_VER_SOFT_DOLLAR_TIER:
+            steps.append((None, None, OrderDecoder.decodeSoftDollarTier))
+        steps += self.lastFieldsSteps()
+        if self.serverVersion >= MIN_SERVER_VER_D_PEG_ORDERS:
+            steps.append((ORDER, "discretionaryUpToLimitPrice", decodeBool))
+        if self.serverVersion >= MIN_SERVER_VER_PRICE_MGMT_ALGO:
+            steps.append((ORDER, "usePriceMgmtAlgo", decodeBool))
+        return self.makePlan(steps)
+
+
+    def makeCompletedOrderPlan(self) -> tuple:
+        """ the steps of a COMPLETED_ORDER msg after the msg id """
+        self.version = UNSET_INTEGER
+        steps = self.contractSteps()
+        steps += self.orderSteps(False)
+        steps += [
+            (None, None, OrderDecoder.decodeCompletedOrderVolParams),
+            (ORDER, "trailStopPrice", decodeFloatUnset),
+            (ORDER, "trailingPercent", decodeFloatUnset),
+            (None, None, OrderDecoder.decodeComboLegs),
+            (None, None, OrderDecoder.decodeSmartComboRoutingParams),
+            (None, None, OrderDecoder.decodeScaleOrderParams),
+            (None, None, OrderDecoder.decodeHedgeParams),
+            (ORDER, "clearingAccount", decodeString),
+            (ORDER, "clearingIntent", decodeString),
+            (ORDER, "notHeld", decodeBool),
+            (None, None, OrderDecoder.decodeDeltaNeutral),
+            (None, None, OrderDecoder.decodeAlgoParams),
+            (ORDER, "solicited", decodeBool),
+            (ORDER_STATE, "status", decodeString),
+            (ORDER, "randomizeSize", decodeBool),
+            (ORDER, "randomizePrice", decodeBool)]
+        if self.serverVersion >= MIN_SERVER_VER_PEGGED_TO_BENCHMARK:
+            steps += [(None, None, OrderDecoder.decodePegToBenchParams),
+                      (None, None, OrderDecoder.decodeConditions)]
+        steps += [(ORDER, "trailStopPrice", decodeFloat),
+                  (ORDER, "lmtPriceOffset", decodeFloat)]
+        steps += self.lastFieldsSteps()
+        steps += [(ORDER, "autoCancelDate", decodeString),
+                  (ORDER, "filledQuantity", decodeFloat),
+                  (ORDER, "refFuturesConId", decodeInt),
+                  (ORDER, "autoCancelParent", decodeBool),
+                  (ORDER, "shareholder", decodeString),
+                  (ORDER, "imbalanceOnly", decodeBool),
+                  (ORDER, "routeMarketableToBbo", decodeBool),
+                  (ORDER, "parentPermId", decodeInt),
+                  (ORDER_STATE, "completedTime", decodeString),
+                  (ORDER_STATE, "completedStatus", decodeString)]
+        return self.makePlan(steps)
+
+
+    def lastFieldsSteps(self) -> list:
+        """ the cash qty, the auto price for hedge and the OMS container """
+        steps = []
+        if self.serverVersion >= MIN_SERVER_VER_CASH_QTY:
+            steps.append((ORDER, "cashQty", decodeFloat))
+        if self.serverVersion >= MIN_SERVER_VER_AUTO_PRICE_FOR_HEDGE:
+            steps.append((ORDER, "dontUseAutoPriceForHedge", decodeBool))
+        if self.serverVersion >= MIN_SERVER_VER_ORDER_CONTAINER:
+            steps.append((ORDER, "isOmsContainer", decodeBool))
+        return steps
+
+
+    def decodeOpenOrderVolParams(self, fields):
+        self.decodeVolOrderParams(fields, True)
+
+
+    def decodeCompletedOrderVolParams(self, fields):
+        self.decodeVolOrderParams(fields, False)
+
+
+    def decodeOpenOrder(self, fields):
+        """ the OPEN_ORDER fields after the msg version one by one, for the
+        server versions with no plan """
+        self.decodeOrderId(fields)
+
+        # read contract fields
+        self.decodeContractFields(fields)
+
+        # read order fields
+        self.decodeAction(fields)
+        self.decodeTotalQuantity(fields)
+        self.decodeOrderType(fields)
+        self.decodeLmtPrice(fields)
+        self.decodeAuxPrice(fields)
+        self.decodeTIF(fields)
+        self.decodeOcaGroup(fields)
+        self.decodeAccount(fields)
+        self.decodeOpenClose(fields)
+        self.decodeOrigin(fields)
+        self.decodeOrderRef(fields)
+        self.decodeClientId(fields)
+        self.decodePermId(fields)
+        self.decodeOutsideRth(fields)
+        self.decodeHidden(fields)
+        self.decodeDiscretionaryAmt(fields)
+        self.decodeGoodAfterTime(fields)
+        self.skipSharesAllocation(fields)
+        self.decodeFAParams(fields)
+        self.decodeModelCode(fields)
+        self.decodeGoodTillDate(fields)
+        self.decodeRule80A(fields)
+        self.decodePercentOffset(fields)
+        self.decodeSettlingFirm(fields)
+        self.decodeShortSaleParams(fields)
+        self.decodeAuctionStrategy(fields)
+        self.decodeBoxOrderParams(fields)
+        self.decodePegToStkOrVolOrderParams(fields)
+        self.decodeDisplaySize(fields)
+        self.decodeBlockOrder(fields)
+        self.decodeSweepToFill(fields)
+        self.decodeAllOrNone(fields)
+        self.decodeMinQty(fields)
+        self.decodeOcaType(fields)
+        self.decodeETradeOnly(fields)
+        self.decodeFirmQuoteOnly(fields)
+        self.decodeNbboPriceCap(fields)
+        self.decodeParentId(fields)
+        self.decodeTriggerMethod(fields)
+        self.decodeVolOrderParams(fields, True)
+        self.decodeTrailParams(fields)
+        self.decodeBasisPoints(fields)
+        self.decodeComboLegs(fields)
+        self.decodeSmartComboRoutingParams(fields)
+        self.decodeScaleOrderParams(fields)
+        self.decodeHedgeParams(fields)
+        self.decodeOptOutSmartRouting(fields)
+        self.decodeClearingParams(fields)
+        self.decodeNotHeld(fields)
+        self.decodeDeltaNeutral(fields)
+        self.decodeAlgoParams(fields)
+        self.decodeSolicited(fields)
+        self.decodeWhatIfInfoAndCommission(fields)
+        self.decodeVolRandomizeFlags(fields)
+        self.decodePegToBenchParams(fields)
+        self.decodeConditions(fields)
+        self.decodeAdjustedOrderParams(fields)
+        self.decodeSoftDollarTier(fields)
+        self.decodeCashQty(fields)
+        self.decodeDontUseAutoPriceForHedge(fields)
+        self.decodeIsOmsContainers(fields)
+        self.decodeDiscretionaryUpToLimitPrice(fields)
+        self.decodeUsePriceMgmtAlgo(fields)
+
 
     def decodeOrderId(self, fields):
         self.order.orderId = decode(int, fields)
@@ -0,0 +1,482 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+
+"""
+The PLACE_ORDER msg compiled once per server version.
+
+EClient.placeOrder() used to go through all the server version checks and
+make_field() calls for every order. An OrderEncoder does the version checks
+once, when made: what is left is the list of the capability checks that
+can fail at that version (check()) and a flat plan of the fields to send
+(encode()), the runs of plain contract or order fields read with one
+operator.attrgetter() each, the optional groups (combo legs, algo params,
+conditions, ...) written by their encode*() methods. The fields are made
+as bytes (comm.encode_field()), the msg in one bytearray.
+
+encode() gives the same msg as placeOrder() did, byte for byte.
+"""
+
+import struct
+import logging
+import operator
+
+from ibapi.comm import (encode_field, encode_field_handle_empty, encode_fields,
+                        TRUE_FIELD, FALSE_FIELD, EMPTY_FIELD)
+from ibapi.message import OUT
+from ibapi.common import UNSET_INTEGER, UNSET_DOUBLE
+from ibapi.object_implem import Object
+from ibapi.server_versions import * # @UnusedWildImport
+
+
+logger = logging.getLogger(__name__)
+
+
+# where the plain fields of a plan are read from
+CONTRACT, ORDER = range(2)
+
+
+# the converters of the fields besides encode_field() and
+# encode_field_handle_empty()
+def encodeZeroIfUnset(val) -> bytes:
+    return encode_field(val if val != UNSET_DOUBLE else 0)
+
+def encodeInt(val) -> bytes:
+    return encode_field(int(val))
+
+def encodeOptionalBool(val) -> bytes:
+    return EMPTY_FIELD if val is None else TRUE_FIELD if val else FALSE_FIELD
+
+
+def isScaleOrder(order) -> bool:
+    return order.scalePriceIncrement > 0 and order.scalePriceIncrement != UNSET_DOUBLE
+
+
+# (min server version, predicate(contract, order), error text): the orders
+# a server version before min server version cannot take, in the order
+# they are checked
+PLACE_ORDER_CHECKS = (
+    (MIN_SERVER_VER_DELTA_NEUTRAL,
+     lambda contract, order: contract.deltaNeutralContract,
+     "  It does not support delta-neutral orders."),
+    (MIN_SERVER_VER_SCALE_ORDERS2,
+     lambda contract, order: order.scaleSubsLevelSize != UNSET_INTEGER,
+     "  It does not support Subsequent Level Size for Scale orders."),
+    (MIN_SERVER_VER_ALGO_ORDERS,
+     lambda contract, order: order.algoStrategy,
+     "  It does not support algo orders."),
+    (MIN_SERVER_VER_NOT_HELD,
+     lambda contract, order: order.notHeld,
+     "  It does not support notHeld parameter."),
+    (MIN_SERVER_VER_SEC_ID_TYPE,
+     lambda contract, order: contract.secIdType or contract.secId,
+     "  It does not support secIdType and secId parameters."),
+    (MIN_SERVER_VER_PLACE_ORDER_CONID,
+     lambda contract, order: contract.conId and contract.conId > 0,
+     "  It does not support conId parameter."),
+    (MIN_SERVER_VER_SSHORTX,
+     lambda contract, order: order.exemptCode != -1,
+     "  It does not support exemptCode parameter."),
+    (MIN_SERVER_VER_SSHORTX,
+     lambda contract, order: any(comboLeg.exemptCode != -1
+                                 for comboLeg in contract.comboLegs or ()),
+     "  It does not support exemptCode parameter."),
+    (MIN_SERVER_VER_HEDGE_ORDERS,
+     lambda contract, order: order.hedgeType,
+     "  It does not support hedge orders."),
+    (MIN_SERVER_VER_OPT_OUT_SMART_ROUTING,
+     lambda contract, order: order.optOutSmartRouting,
+     "  It does not support optOutSmartRouting parameter."),
+    (MIN_SERVER_VER_DELTA_NEUTRAL_CONID,
+     lambda contract, order: order.deltaNeutralConId > 0
+        or order.deltaNeutralSettlingFirm or order.deltaNeutralClearingAccount
+        or order.deltaNeutralClearingIntent,
+     "  It does not support deltaNeutral parameters: ConId, SettlingFirm, ClearingAccount, ClearingIntent."),
+    (MIN_SERVER_VER_DELTA_NEUTRAL_OPEN_CLOSE,
+     lambda contract, order: order.deltaNeutralOpenClose
+        or order.deltaNeutralShortSale or order.deltaNeutralShortSaleSlot > 0
+        or order.deltaNeutralDesignatedLocation,
+     "  It does not support deltaNeutral parameters: OpenClose, ShortSale, ShortSaleSlot, DesignatedLocation."),
+    (MIN_SERVER_VER_SCALE_ORDERS3,
+     lambda contract, order: isScaleOrder(order) and (
+        order.scalePriceAdjustValue != UNSET_DOUBLE
+        or order.scalePriceAdjustInterval != UNSET_INTEGER
+        or order.scaleProfitOffset != UNSET_DOUBLE or order.scaleAutoReset
+        or order.scaleInitPosition != UNSET_INTEGER
+        or order.scaleInitFillQty != UNSET_INTEGER or order.scaleRandomPercent),
+     "  It does not support Scale order parameters: PriceAdjustValue, PriceAdjustInterval, " +
+     "ProfitOffset, AutoReset, InitPosition, InitFillQty and RandomPercent"),
+    (MIN_SERVER_VER_ORDER_COMBO_LEGS_PRICE,
+     lambda contract, order: contract.secType == "BAG" and any(
+        orderComboLeg.price != UNSET_DOUBLE
+        for orderComboLeg in order.orderComboLegs or ()),
+     "  It does not support per-leg prices for order combo legs."),
+    (MIN_SERVER_VER_TRAILING_PERCENT,
+     lambda contract, order: order.trailingPercent != UNSET_DOUBLE,
+     "  It does not support trailing percent parameter"),
+    (MIN_SERVER_VER_TRADING_CLASS,
+     lambda contract, order: contract.tradingClass,
+     "  It does not support tradingClass parameter in placeOrder."),
+    (MIN_SERVER_VER_SCALE_TABLE,
+     lambda contract, order: order.scaleTable or order.activeStartTime
+        or order.activeStopTime,
+     "  It does not support scaleTable, activeStartTime and activeStopTime parameters"),
+    (MIN_SERVER_VER_ALGO_ID,
+     lambda contract, order: order.algoId,
+     "  It does not support algoId parameter"),
+    (MIN_SERVER_VER_ORDER_SOLICITED,
+     lambda contract, order: order.solicited,
+     "  It does not support order solicited parameter."),
+    (MIN_SERVER_VER_MODELS_SUPPORT,
+     lambda contract, order: order.modelCode,
+     "  It does not support model code parameter."),
+    (MIN_SERVER_VER_EXT_OPERATOR,
+     lambda contract, order: order.extOperator,
+     "  It does not support ext operator parameter"),
+    (MIN_SERVER_VER_SOFT_DOLLAR_TIER,
+     lambda contract, order: order.softDollarTier.name or order.softDollarTier.val,
+     " It does not support soft dollar tier"),
+    (MIN_SERVER_VER_CASH_QTY,
+     lambda contract, order: order.cashQty,
+     " It does not support cash quantity parameter"),
+    (MIN_SERVER_VER_DECISION_MAKER,
+     lambda contract, order: order.mifid2DecisionMaker != ""
+        or order.mifid2DecisionAlgo != "",
+     " It does not support MIFID II decision maker parameters"),
+    (MIN_SERVER_VER_MIFID_EXECUTION,
+     lambda contract, order: order.mifid2ExecutionTrader != ""
+        or order.mifid2ExecutionAlgo != "",
+     " It does not support MIFID II execution parameters"),
+    (MIN_SERVER_VER_AUTO_PRICE_FOR_HEDGE,
+     lambda contract, order: order.dontUseAutoPriceForHedge,
+     " It does not support dontUseAutoPriceForHedge parameter"),
+    (MIN_SERVER_VER_ORDER_CONTAINER,
+     lambda contract, order: order.isOmsContainer,
+     " It does not support oms container parameter"),
+    (MIN_SERVER_VER_PRICE_MGMT_ALGO,
+     lambda contract, order: order.usePriceMgmtAlgo,
+     " It does not support Use price management algo requests"),
+)
+
+
+class OrderEncoder(Object):
+    def __init__(self, serverVersion):
+        """ for the server versions a client connects to, from
+        MIN_CLIENT_VER """
+        if serverVersion < MIN_CLIENT_VER:
+            raise ValueError("server version %d not supported" % serverVersion)
+        self.serverVersion = serverVersion
+        self.checks = tuple((predicate, text) for (minServerVersion, predicate, text)
+                            in PLACE_ORDER_CHECKS if serverVersion < minServerVersion)
+        # room for the size prefix, then the msg id and version
+        self.head = bytes(4) + encode_field(OUT.PLACE_ORDER)
+        if serverVersion < MIN_SERVER_VER_ORDER_CONTAINER:
+            self.head += encode_field(27 if serverVersion < MIN_SERVER_VER_NOT_HELD else 45)
+        self.plan = self.makePlan(self.makeSteps())
+
+
+    def check(self, contract, order):
+        """ the text of the UPDATE_TWS error if the server version cannot
+        take the order, else None """
+        for (predicate, text) in self.checks:
+            if predicate(contract, order):
+                return text
+        return None
+
+
+    def encode(self, orderId, contract, order) -> bytes:
+        """ the PLACE_ORDER msg, size prefix included, see check() """
+        out = bytearray(self.head)
+        out += encode_field(orderId)
+        for (target, getter, converters) in self.plan:
+            if target is None:
+                getter(self, contract, order, out)
+            else:
+                values = getter(contract if target == CONTRACT else order)
+                out += b"".join([convert(val) for (convert, val)
+                                 in zip(converters, values)])
+        struct.pack_into("!I", out, 0, len(out) - 4)
+        return bytes(out)
+
+
+    @staticmethod
+    def makePlan(steps) -> tuple:
+        """ steps: (target, attribute name, converter) for a plain field, the
+        target being CONTRACT or ORDER, or (None, None, meth) for the fields
+        appended by meth(self, contract, order, out) to the bytearray out.
+        The plan has the plain
+        fields in a row read from the same target merged into one
+        (target, attrgetter, converters) step. """
+        runs = []
+        for (target, name, convert) in steps:
+            if target is None:
+                runs.append((None, None, convert))
+            elif runs and runs[-1][0] == target:
+                runs[-1][1].append(name)
+                runs[-1][2].append(convert)
+            else:
+                runs.append((target, [name], [convert]))
+        plan = []
+        for (target, names, converters) in runs:
+            if target is None:
+                plan.append((None, converters, None))
+            else:
+                getter = operator.attrgetter(*names)
+                if len(names) == 1:
+                    # a tuple, as for several names
+                    getter = lambda obj, getOne=getter: (getOne(obj), )
+                plan.append((target, getter, tuple(converters)))
+        return tuple(plan)
+
+
+    def makeSteps(self) -> list:
+        serverVersion = self.serverVersion
+
+        # contract fields
+        steps = []
+        if serverVersion >= MIN_SERVER_VER_PLACE_ORDER_CONID:
+            steps.append((CONTRACT, "conId", encode_field))
+        steps += [(CONTRACT, name, encode_field) for name in (
+            "symbol", "secType", "lastTradeDateOrContractMonth", "strike",
+            "right", "multiplier", "exchange", "primaryExchange", "currency",
+            "localSymbol")]
+        if serverVersion >= MIN_SERVER_VER_TRADING_CLASS:
+            steps.append((CONTRACT, "tradingClass", encode_field))
+        if serverVersion >= MIN_SERVER_VER_SEC_ID_TYPE:
+            steps += [(CONTRACT, "secIdType", encode_field),
+                      (CONTRACT, "secId", encode_field)]
+
+        # main order fields
+        steps += [(ORDER, "action", encode_field),
+                  (ORDER, "totalQuantity", encode_field
+                   if serverVersion >= MIN_SERVER_VER_FRACTIONAL_POSITIONS
+                   else encodeInt),
+                  (ORDER, "orderType", encode_field),
+                  (ORDER, "lmtPrice", encode_field_handle_empty
+                   if serverVersion >= MIN_SERVER_VER_ORDER_COMBO_LEGS_PRICE
+                   else encodeZeroIfUnset),
+                  (ORDER, "auxPrice", encode_field_handle_empty)]
+
+        # extended order fields
+        steps += [(ORDER, name, encode_field) for name in (
+            "tif", "ocaGroup", "account", "openClose", "origin", "orderRef",
+            "transmit", "parentId", "blockOrder", "sweepToFill", "displaySize",
+            "triggerMethod", "outsideRth", "hidden")]
+        steps.append((None, None, OrderEncoder.encodeComboLegs))
+
+        # the deprecated sharesAllocation field
+        steps.append((None, None, OrderEncoder.encodeEmpty))
+        steps += [(ORDER, name, encode_field) for name in (
+            "discretionaryAmt", "goodAfterTime", "goodTillDate", "faGroup",
+            "faMethod", "faPercentage", "faProfile")]
+        if serverVersion >= MIN_SERVER_VER_MODELS_SUPPORT:
+            steps.append((ORDER, "modelCode", encode_field))
+        steps += [(ORDER, "shortSaleSlot", encode_field),
+                  (ORDER, "designatedLocation", encode_field)]
+        if serverVersion >= MIN_SERVER_VER_SSHORTX_OLD:
+            steps.append((ORDER, "exemptCode", encode_field))
+        steps += [(ORDER, "ocaType", encode_field),
+                  (ORDER, "rule80A", encode_field),
+                  (ORDER, "settlingFirm", encode_field),
+                  (ORDER, "allOrNone", encode_field),
+                  (ORDER, "minQty", encode_field_handle_empty),
+                  (ORDER, "percentOffset", encode_field_handle_empty),
+                  (ORDER, "eTradeOnly", encode_field),
+                  (ORDER, "firmQuoteOnly", encode_field),
+                  (ORDER, "nbboPriceCap", encode_field_handle_empty),
+                  (ORDER, "auctionStrategy", encode_field),
+                  (ORDER, "startingPrice", encode_field_handle_empty),
+                  (ORDER, "stockRefPrice", encode_field_handle_empty),
+                  (ORDER, "delta", encode_field_handle_empty),
+                  (ORDER, "stockRangeLower", encode_field_handle_empty),
+                  (ORDER, "stockRangeUpper", encode_field_handle_empty),
+                  (ORDER, "overridePercentageConstraints", encode_field),
+                  (ORDER, "volatility", encode_field_handle_empty),
+                  (ORDER, "volatilityType", encode_field_handle_empty),
+                  (ORDER, "deltaNeutralOrderType", encode_field),
+                  (ORDER, "deltaNeutralAuxPrice", encode_field_handle_empty),
+                  (None, None, OrderEncoder.encodeDeltaNeutralOrder),
+                  (ORDER, "continuousUpdate", encode_field),
+                  (ORDER, "referencePriceType", encode_field_handle_empty),
+                  (ORDER, "trailStopPrice", encode_field_handle_empty)]
+        if serverVersion >= MIN_SERVER_VER_TRAILING_PERCENT:
+            steps.append((ORDER, "trailingPercent", encode_field_handle_empty))
+
+        # scale orders
+        if serverVersion >= MIN_SERVER_VER_SCALE_ORDERS2:
+            steps += [(ORDER, "scaleInitLevelSize", encode_field_handle_empty),
+                      (ORDER, "scaleSubsLevelSize", encode_field_handle_empty)]
+        else:
+            steps += [(None, None, OrderEncoder.encodeEmpty),
+                      (ORDER, "scaleInitLevelSize", encode_field_handle_empty)]
+        steps.append((ORDER, "scalePriceIncrement", encode_field_handle_empty))
+        if serverVersion >= MIN_SERVER_VER_SCALE_ORDERS3:
+            steps.append((None, None, OrderEncoder.encodeScaleParams))
+        if serverVersion >= MIN_SERVER_VER_SCALE_TABLE:
+            steps += [(ORDER, "scaleTable", encode_field),
+                      (ORDER, "activeStartTime", encode_field),
+                      (ORDER, "activeStopTime", encode_field)]
+
+        if serverVersion >= MIN_SERVER_VER_HEDGE_ORDERS:
+            steps.append((None, None, OrderEncoder.encodeHedgeParams))
+        if serverVersion >= MIN_SERVER_VER_OPT_OUT_SMART_ROUTING:
+            steps.append((ORDER, "optOutSmartRouting", encode_field))
+        if serverVersion >= MIN_SERVER_VER_PTA_ORDERS:
+            steps += [(ORDER, "clearingAccount", encode_field),
+                      (ORDER, "clearingIntent", encode_field)]
+        if serverVersion >= MIN_SERVER_VER_NOT_HELD:
+            steps.append((ORDER, "notHeld", encode_field))
+        if serverVersion >= MIN_SERVER_VER_DELTA_NEUTRAL:
+            steps.append((None, None, OrderEncoder.encodeDeltaNeutralContract))
+        if serverVersion >= MIN_SERVER_VER_ALGO_ORDERS:
+            steps.append((None, None, OrderEncoder.encodeAlgoParams))
+        if serverVersion >= MIN_SERVER_VER_ALGO_ID:
+            steps.append((ORDER, "algoId", encode_field))
+        steps.append((ORDER, "whatIf", encode_field))
+        if serverVersion >= MIN_SERVER_VER_LINKING:
+            steps.append((None, None, OrderEncoder.encodeMiscOptions))
+        if serverVersion >= MIN_SERVER_VER_ORDER_SOLICITED:
+            steps.append((ORDER, "solicited", encode_field))
+        if serverVersion >= MIN_SERVER_VER_RANDOMIZE_SIZE_AND_PRICE:
+            steps += [(ORDER, "randomizeSize", encode_field),
+                      (ORDER, "randomizePrice", encode_field)]
+
+        if serverVersion >= MIN_SERVER_VER_PEGGED_TO_BENCHMARK:
+            steps += [(None, None, OrderEncoder.encodePegToBenchParams),
+                      (None, None, OrderEncoder.encodeConditions)]
+            steps += [(ORDER, name, encode_field) for name in (
+                "adjustedOrderType", "triggerPrice", "lmtPriceOffset",
+                "adjustedStopPrice", "adjustedStopLimitPrice",
+                "adjustedTrailingAmount", "adjustableTrailingUnit")]
+        if serverVersion >= MIN_SERVER_VER_EXT_OPERATOR:
+            steps.append((ORDER, "extOperator", encode_field))
+        if serverVersion >= MIN_SERVER_VER_SOFT_DOLLAR_TIER:
+            steps += [(ORDER, "softDollarTier.name", encode_field),
+                      (ORDER, "softDollarTier.val", encode_field)]
+        if serverVersion >= MIN_SERVER_VER_CASH_QTY:
+            steps.append((ORDER, "cashQty", encode_field))
+        if serverVersion >= MIN_SERVER_VER_DECISION_MAKER:
+            steps += [(ORDER, "mifid2DecisionMaker", encode_field),
+                      (ORDER, "mifid2DecisionAlgo", encode_field)]
+        if serverVersion >= MIN_SERVER_VER_MIFID_EXECUTION:
+            steps += [(ORDER, "mifid2ExecutionTrader", encode_field),
+                      (ORDER, "mifid2ExecutionAlgo", encode_field)]
+        if serverVersion >= MIN_SERVER_VER_AUTO_PRICE_FOR_HEDGE:
+            steps.append((ORDER, "dontUseAutoPriceForHedge", encode_field))
+        if serverVersion >= MIN_SERVER_VER_ORDER_CONTAINER:
+            steps.append((ORDER, "isOmsContainer", encode_field))
+        if serverVersion >= MIN_SERVER_VER_D_PEG_ORDERS:
+            steps.append((ORDER, "discretionaryUpToLimitPrice", encode_field))
+        if serverVersion >= MIN_SERVER_VER_PRICE_MGMT_ALGO:
+            steps.append((ORDER, "usePriceMgmtAlgo", encodeOptionalBool))
+        return steps
+
+
+    ######################################################################
+    # the optional groups of fields
+
+    def encodeEmpty(self, contract, order, out):
+        out += EMPTY_FIELD
+
+
+    def encodeComboLegs(self, contract, order, out):
+        if contract.secType != "BAG":
+            return
+        comboLegs = contract.comboLegs or ()
+        out += encode_field(len(comboLegs))
+        for comboLeg in comboLegs:
+            out += encode_fields(comboLeg.conId, comboLeg.ratio, comboLeg.action,
+                                 comboLeg.exchange, comboLeg.openClose,
+                                 comboLeg.shortSaleSlot,
+                                 comboLeg.designatedLocation)
+            if self.serverVersion >= MIN_SERVER_VER_SSHORTX_OLD:
+                out += encode_field(comboLeg.exemptCode)
+
+        if self.serverVersion >= MIN_SERVER_VER_ORDER_COMBO_LEGS_PRICE:
+            orderComboLegs = order.orderComboLegs or ()
+            out += encode_field(len(orderComboLegs))
+            for orderComboLeg in orderComboLegs:
+                out += encode_field_handle_empty(orderComboLeg.price)
+
+        if self.serverVersion >= MIN_SERVER_VER_SMART_COMBO_ROUTING_PARAMS:
+            tagValues = order.smartComboRoutingParams or ()
+            out += encode_field(len(tagValues))
+            for tagValue in tagValues:
+                out += encode_fields(tagValue.tag, tagValue.value)
+
+
+    def encodeDeltaNeutralOrder(self, contract, order, out):
+        if not order.deltaNeutralOrderType:
+            return
+        if self.serverVersion >= MIN_SERVER_VER_DELTA_NEUTRAL_CONID:
+            out += encode_fields(order.deltaNeutralConId,
+                                 order.deltaNeutralSettlingFirm,
+                                 order.deltaNeutralClearingAccount,
+                                 order.deltaNeutralClearingIntent)
+        if self.serverVersion >= MIN_SERVER_VER_DELTA_NEUTRAL_OPEN_CLOSE:
+            out += encode_fields(order.deltaNeutralOpenClose,
+                                 order.deltaNeutralShortSale,
+                                 order.deltaNeutralShortSaleSlot,
+                                 order.deltaNeutralDesignatedLocation)
+
+
+    def encodeScaleParams(self, contract, order, out):
+        if order.scalePriceIncrement != UNSET_DOUBLE and order.scalePriceIncrement > 0.0:
+            out += encode_field_handle_empty(order.scalePriceAdjustValue)
+            out += encode_field_handle_empty(order.scalePriceAdjustInterval)
+            out += encode_field_handle_empty(order.scaleProfitOffset)
+            out += encode_field(order.scaleAutoReset)
+            out += encode_field_handle_empty(order.scaleInitPosition)
+            out += encode_field_handle_empty(order.scaleInitFillQty)
+            out += encode_field(order.scaleRandomPercent)
+
+
+    def encodeHedgeParams(self, contract, order, out):
+        out += encode_field(order.hedgeType)
+        if order.hedgeType:
+            out += encode_field(order.hedgeParam)
+
+
+    def encodeDeltaNeutralContract(self, contract, order, out):
+        deltaNeutralContract = contract.deltaNeutralContract
+        if deltaNeutralContract:
+            out += encode_fields(True, deltaNeutralContract.conId,
+                                 deltaNeutralContract.delta,
+                                 deltaNeutralContract.price)
+        else:
+            out += FALSE_FIELD
+
+
+    def encodeAlgoParams(self, contract, order, out):
+        out += encode_field(order.algoStrategy)
+        if order.algoStrategy:
+            algoParams = order.algoParams or ()
+            out += encode_field(len(algoParams))
+            for algoParam in algoParams:
+                out += encode_fields(algoParam.tag, algoParam.value)
+
+
+    def encodeMiscOptions(self, contract, order, out):
+        out += encode_field("".join(str(tagValue)
+                                    for tagValue in order.orderMiscOptions or ()))
+
+
+    def encodePegToBenchParams(self, contract, order, out):
+        if order.orderType == "PEG BENCH":
+            out += encode_fields(order.referenceContractId,
+                                 order.isPeggedChangeAmountDecrease,
+                                 order.peggedChangeAmount,
+                                 order.referenceChangeAmount,
+                                 order.referenceExchangeId)
+
+
+    def encodeConditions(self, contract, order, out):
+        out += encode_field(len(order.conditions))
+        if order.conditions:
+            for cond in order.conditions:
+                out += encode_field(cond.type())
+                out += "".join(cond.make_fields()).encode()
+            out += encode_fields(order.conditionsIgnoreRth,
+                                 order.conditionsCancelOrder)
@@ -0,0 +1,256 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+
+"""
+The latest market data of every reqMktData() subscription, in numpy arrays
+fed by the decoder, needs numpy.
+
+A QuoteStore added to the client with EClient.addFeed() takes the
+TICK_PRICE, TICK_SIZE, TICK_GENERIC and TICK_STRING msgs before they go on
+to the wrapper callbacks as usual, and keeps one row per reqId with one
+column per TickTypeEnum value:
+
+    store = QuoteStore()
+    client.addFeed(store)
+    client.reqMktData(1001, contract, "", False, False, [])
+    ...
+    bid = store.get(1001, TickTypeEnum.BID)             # any thread
+    (reqIds, seqs, values) = store.snapshot((TickTypeEnum.BID, TickTypeEnum.ASK))
+
+The rows are written by the thread running the decoder only, and read from
+any thread without a lock: each row has a sequence number, odd while the
+row is being written (a price tick writes the price and its size) and
+increased by 2 per update, the reads retry the rows written meanwhile. A
+reader can also compare the sequence numbers with those of its previous
+read to see what changed.
+
+The values never received are NaN, the strings "". The rows are
+preallocated, nRows of them, twice as many are allocated when they are all
+used. Call remove() once a subscription is cancelled to free its row.
+"""
+
+import time
+import logging
+
+from ibapi import columnar
+from ibapi.message import IN
+from ibapi.ticktype import TickTypeEnum
+from ibapi.fastdecoder import PRICE2SIZE_TICK_TYPE
+from ibapi.object_implem import Object
+
+numpy = columnar.numpy
+
+
+logger = logging.getLogger(__name__)
+
+
+N_TICK_TYPES = TickTypeEnum.NOT_SET + 1
+
+# reads of a row retried at most this many times before giving up
+MAX_READ_TRIES = 1000
+
+
+class QuoteTable(Object):
+    """ the arrays of the store, all replaced at once when it grows """
+
+    def __init__(self, nRows):
+        self.reqIds = numpy.full(nRows, -1, dtype=numpy.int64)     # -1: free
+        self.seqs = numpy.zeros(nRows, dtype=numpy.int64)
+        self.updateTimes = numpy.zeros(nRows, dtype=numpy.float64)
+        self.values = numpy.full((nRows, N_TICK_TYPES), numpy.nan)
+        self.strings = numpy.full((nRows, N_TICK_TYPES), "", dtype=object)
+        # the writes of single items are faster through memoryviews
+        self.seqsView = memoryview(self.seqs)
+        self.valuesView = memoryview(self.values)
+        self.updateTimesView = memoryview(self.updateTimes)
+
+
+    def copyTo(self, table):
+        n = len(self.reqIds)
+        for name in ("reqIds", "seqs", "updateTimes", "values", "strings"):
+            getattr(table, name)[:n] = getattr(self, name)
+
+
+class QuoteStore(Object):
+    def __init__(self, nRows=256, clock=time.time):
+        columnar.checkNumpy()
+        self.table = QuoteTable(nRows)
+        self.rows = {}              # reqId -> row
+        self.freeRows = list(range(nRows - 1, -1, -1))
+        self.clock = clock
+
+
+    def row(self, reqId) -> int:
+        """ the row of reqId, allocated if need be (writer thread only) """
+        row = self.rows.get(reqId, None)
+        if row is None:
+            if not self.freeRows:
+                self.grow()
+            row = self.freeRows.pop()
+            self.table.reqIds[row] = reqId
+            self.rows[reqId] = row
+        return row
+
+
+    def grow(self):
+        table = self.table
+        nRows = len(table.reqIds)
+        newTable = QuoteTable(nRows * 2)
+        table.copyTo(newTable)
+        self.freeRows = list(range(nRows * 2 - 1, nRows - 1, -1))
+        self.table = newTable
+
+
+    def remove(self, reqId):
+        """ frees the row of reqId, call it from the thread running the
+        decoder, after cancelMktData() """
+        row = self.rows.pop(reqId, None)
+        if row is None:
+            return
+        table = self.table
+        table.seqs[row] += 1
+        table.reqIds[row] = -1
+        table.values[row] = numpy.nan
+        table.strings[row] = ""
+        table.updateTimes[row] = 0.
+        table.seqs[row] += 1
+        self.freeRows.append(row)
+
+
+    ######################################################################
+    # writes, by the decoder
+
+    def setValue(self, reqId, tickType, value, sizeType=None, size=0):
+        row = self.row(reqId)
+        table = self.table
+        seqs = table.seqsView
+        values = table.valuesView
+        seqs[row] += 1
+        values[row, tickType] = value
+        if sizeType is not None:
+            values[row, sizeType] = size
+        table.updateTimesView[row] = self.clock()
+        seqs[row] += 1
+
+
+    def setString(self, reqId, tickType, value):
+        row = self.row(reqId)
+        table = self.table
+        seqs = table.seqsView
+        seqs[row] += 1
+        table.strings[row, tickType] = value
+        table.updateTimesView[row] = self.clock()
+        seqs[row] += 1
+
+
+    def makeHandlers(self, nextHandler, serverVersion) -> dict:
+        """ see Decoder.addFeed() """
+        setValue = self.setValue
+        setString = self.setString
+        sizeTickType = PRICE2SIZE_TICK_TYPE.get
+
+        # the tick types of a newer TWS have no column, they only go on
+        nextTickPrice = nextHandler(IN.TICK_PRICE)
+        def handleTickPrice(fields):
+            if len(fields) >= 7:
+                tickType = int(fields[3] or 0)
+                if 0 <= tickType < N_TICK_TYPES:
+                    setValue(int(fields[2] or 0), tickType, float(fields[4] or 0),
+                             sizeTickType(tickType), int(fields[5] or 0))
+            nextTickPrice(fields)
+
+        nextTickSize = nextHandler(IN.TICK_SIZE)
+        def handleTickSize(fields):
+            if len(fields) == 5:
+                tickType = int(fields[3] or 0)
+                if 0 <= tickType < N_TICK_TYPES:
+                    setValue(int(fields[2] or 0), tickType, int(fields[4] or 0))
+            nextTickSize(fields)
+
+        nextTickGeneric = nextHandler(IN.TICK_GENERIC)
+        def handleTickGeneric(fields):
+            if len(fields) >= 5:
+                tickType = int(fields[3] or 0)
+                if 0 <= tickType < N_TICK_TYPES:
+                    setValue(int(fields[2] or 0), tickType, float(fields[4] or 0))
+            nextTickGeneric(fields)
+
+        nextTickString = nextHandler(IN.TICK_STRING)
+        def handleTickString(fields):
+            if len(fields) >= 5:
+                tickType = int(fields[3] or 0)
+                if 0 <= tickType < N_TICK_TYPES:
+                    setString(int(fields[2] or 0), tickType,
+                              fields[4].decode(errors='backslashreplace'))
+            nextTickString(fields)
+
+        return {IN.TICK_PRICE: handleTickPrice, IN.TICK_SIZE: handleTickSize,
+                IN.TICK_GENERIC: handleTickGeneric,
+                IN.TICK_STRING: handleTickString}
+
+
+    ######################################################################
+    # reads, from any thread
+
+    def get(self, reqId, tickType) -> float:
+        """ the latest value of the tick type, NaN if none """
+        row = self.rows.get(reqId, None)
+        if row is None:
+            return numpy.nan
+        return float(self.table.values[row, tickType])
+
+
+    def getString(self, reqId, tickType) -> str:
+        row = self.rows.get(reqId, None)
+        if row is None:
+            return ""
+        return self.table.strings[row, tickType]
+
+
+    def readRow(self, table, row, cols):
+        """ (seq, reqId, updateTime, values of the cols) of the row, as
+        they were at one time """
+        seqs = table.seqs
+        for _ in range(MAX_READ_TRIES):
+            seq = int(seqs[row])
+            if not seq & 1:
+                read = (seq, int(table.reqIds[row]), float(table.updateTimes[row]),
+                        table.values[row, cols].copy())
+                if int(seqs[row]) == seq:
+                    return read
+            time.sleep(0)       # lets the writer finish
+        raise RuntimeError("row %d written too often to be read" % row)
+
+
+    def quote(self, reqId):
+        """ (seq, updateTime, values) of reqId, values being a copy of its
+        row indexed by TickTypeEnum. None if no tick yet. """
+        row = self.rows.get(reqId, None)
+        if row is None:
+            return None
+        (seq, rowReqId, updateTime, values) = self.readRow(self.table, row,
+                                                           slice(None))
+        if rowReqId != reqId:
+            return None         # removed meanwhile
+        return (seq, updateTime, values)
+
+
+    def snapshot(self, tickTypes=None):
+        """ (reqIds, seqs, values) of all the rows in use at once, values
+        being a (rows, tickTypes) array, all the tick types if None """
+        table = self.table
+        used = numpy.flatnonzero(table.reqIds >= 0)
+        cols = slice(None) if tickTypes is None else list(tickTypes)
+        seqs = table.seqs[used]
+        reqIds = table.reqIds[used]
+        values = table.values[used][:, cols]
+
+        # the rows written meanwhile are read again one by one
+        changed = (table.seqs[used] != seqs) | (seqs & 1 == 1)
+        for i in numpy.flatnonzero(changed):
+            (seqs[i], reqIds[i], _, values[i]) = self.readRow(table, used[i], cols)
+        keep = reqIds >= 0      # not removed meanwhile
+        return (reqIds[keep], seqs[keep], values[keep])
@@ -11,10 +11,12 @@ It will read the packets from the wire, use the low level IB messaging to
 remove the size prefix and put the rest in a Queue.
 """
 
+import time
 import logging
 from threading import Thread
 
 from ibapi import comm
+from ibapi.utils import HotPathLog
 
 
 logger = logging.getLogger(__name__)
@@ -25,27 +27,40 @@ class EReader(Thread):
         super().__init__()
         self.conn = conn
         self.msg_queue = msg_queue
+        self.recorder = None    # capture.FrameRecorder, see EClient.startCapture()
 
     def run(self):
         try:
-            buf = b""
+            frames = comm.FrameBuffer()
             while self.conn.isConnected():
 
-                data = self.conn.recvMsg()
-                logger.debug("reader loop, recvd size %d", len(data))
-                buf += data
-
-                while len(buf) > 0:
-                    (size, msg, buf) = comm.read_msg(buf)
-                    #logger.debug("resp %s", buf.decode('ascii'))
-                    logger.debug("size:%d msg.size:%d msg:|%s| buf:%s|", size,
-                        len(msg), buf, "|")
-
-                    if msg:
-                        self.msg_queue.put(msg)
-                    else:
-                        logger.debug("more incoming packet(s) are needed ")
-                        break
+                if self.conn.recvInto:
+                    nRecvd = self.conn.recvMsgInto(frames)
+                else:
+                    data = self.conn.recvMsg()
+                    nRecvd = len(data)
+                    frames.feed(data)
+                recorder = self.recorder
+                if recorder is not None:
+                    recvTime = time.monotonic_ns()
+
+                debug = HotPathLog.debug
+                if debug:
+                    logger.debug("reader loop, recvd size %d", nRecvd)
+
+                msg = frames.nextMsg()
+                while msg is not None:
+                    if debug:
+                        logger.debug("msg.size:%d buf.size:%d", len(msg),
+                            len(frames))
+                    if recorder is not None:
+                        recorder.record(recvTime, msg)
+                    # the view is reused by the next feed(), hand out a copy
+                    self.msg_queue.put(msg.tobytes())
+                    msg = frames.nextMsg()
+
+                if debug and len(frames) > 0:
+                    logger.debug("more incoming packet(s) are needed ")
 
             logger.debug("EReader thread finished")
         except:
@@ -0,0 +1,269 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+
+"""
+One reqMktData() shared by all the consumers of the same market data.
+
+MarketDataMultiplexer stands between the decoder and the user's wrapper of
+a client, like the RequestTracker of the AsyncEClient. Each consumer
+(listener) subscribes to a contract and generic tick list; the first one
+sends the reqMktData(), the others join it, and the ticks of the reqId go
+to the methods of all its listeners (tickPrice(), tickSize(), ... with the
+EWrapper signatures, those a listener does not have are skipped) instead of
+the wrapper. The last listener to leave cancels the market data:
+
+    mux = MarketDataMultiplexer(client)     # before connect()
+    ...
+    reqId = mux.subscribe(strategy, contract)
+    ...
+    mux.unsubscribe(strategy, reqId)
+
+A listener joining a subscription gets the latest value of each tick type
+received so far right away. A subscription failing with an error which is
+not a warning is dropped, its listeners having got the error.
+
+subscribe() and unsubscribe() can be called from any thread; the ticks are
+dispatched in the thread running the decoder, without a lock but while a
+joiner gets the latest values: a tick coming meanwhile waits for them, not
+to be overwritten by an older value.
+"""
+
+import logging
+import itertools
+import threading
+
+from ibapi.contract_cache import queryKey
+from ibapi.object_implem import Object
+
+
+logger = logging.getLogger(__name__)
+
+
+# the market data lines of an account, by default
+DEFAULT_MAX_LINES = 100
+
+# error codes that leave the subscription alive
+WARNING_CODES = frozenset(range(2100, 2200)) | {10167, 10090}
+
+
+def subscriptionKey(contract, genericTickList, mktDataOptions) -> tuple:
+    legs = tuple((leg.conId, leg.ratio, leg.action, leg.exchange)
+                 for leg in contract.comboLegs or ())
+    ticks = ",".join(sorted(tick.strip() for tick in genericTickList.split(",")
+                            if tick.strip()))
+    options = tuple((tagValue.tag, tagValue.value)
+                    for tagValue in mktDataOptions or ())
+    return (queryKey(contract), legs, ticks, options)
+
+
+class Subscription(Object):
+    def __init__(self, reqId, key):
+        self.reqId = reqId
+        self.key = key
+        self.listeners = ()
+        self.latest = {}        # (callback name, tickType) -> args, for the joiners
+        self.nReplays = 0       # joiners getting the latest values
+        self.replayLock = threading.RLock()
+
+
+class MarketDataMultiplexer(Object):
+    def __init__(self, client, firstReqId=1 << 26, maxLines=DEFAULT_MAX_LINES):
+        """ client: an EClient (or AsyncEClient) not connected yet, its
+        wrapper gets everything not dispatched to the listeners. The
+        reqIds used start at firstReqId. """
+        if client.isConnected():
+            raise ValueError("the multiplexer must be made before connect()")
+        self.client = client
+        self.wrapper = client.wrapper
+        client.wrapper = self
+        self.reqIds = itertools.count(firstReqId)
+        self.maxLines = maxLines
+        self.lock = threading.Lock()
+        self.byKey = {}         # subscriptionKey -> Subscription
+        self.byReqId = {}       # reqId -> Subscription
+        self.listeners = {}     # reqId -> tuple of listeners
+        self.nSubscribes = 0
+        self.nShared = 0
+        self.peakLines = 0
+
+
+    def __getattr__(self, name):
+        # only called for what is not defined here
+        return getattr(self.wrapper, name)
+
+
+    def subscribe(self, listener, contract, genericTickList="",
+                  mktDataOptions=None) -> int:
+        """ listener gets the ticks of contract, returns the reqId they come
+        with """
+        key = subscriptionKey(contract, genericTickList, mktDataOptions)
+        with self.lock:
+            subscription = self.byKey.get(key, None)
+            if subscription is not None and listener in subscription.listeners:
+                return subscription.reqId
+            self.nSubscribes += 1
+            isNew = subscription is None
+            if isNew:
+                if len(self.byKey) >= self.maxLines:
+                    logger.warning("%d market data lines in use, over the max %d",
+                                   len(self.byKey) + 1, self.maxLines)
+                subscription = Subscription(next(self.reqIds), key)
+                self.byKey[key] = subscription
+                self.byReqId[subscription.reqId] = subscription
+                self.peakLines = max(self.peakLines, len(self.byKey))
+            else:
+                self.nShared += 1
+                # before the listener is published, see dispatch()
+                subscription.nReplays += 1
+            subscription.listeners += (listener, )
+            self.listeners[subscription.reqId] = subscription.listeners
+
+        reqId = subscription.reqId
+        if isNew:
+            self.client.reqMktData(reqId, contract, genericTickList, False,
+                                   False, mktDataOptions or [])
+            return reqId
+
+        with subscription.replayLock:
+            for ((name, _), args) in list(subscription.latest.items()):
+                method = getattr(listener, name, None)
+                if method is not None:
+                    method(reqId, *args)
+            with self.lock:
+                subscription.nReplays -= 1
+        return reqId
+
+
+    def unsubscribe(self, listener, reqId):
+        """ listener no longer gets the ticks of reqId, the market data is
+        cancelled if it was the last listener """
+        with self.lock:
+            subscription = self.byReqId.get(reqId, None)
+            if subscription is None or listener not in subscription.listeners:
+                return
+            subscription.listeners = tuple(other for other in subscription.listeners
+                                           if other is not listener)
+            isLast = not subscription.listeners
+            if isLast:
+                self.drop(subscription)
+            else:
+                self.listeners[reqId] = subscription.listeners
+        if isLast:
+            self.client.cancelMktData(reqId)
+
+
+    def drop(self, subscription):
+        """ with the lock held """
+        del self.byKey[subscription.key]
+        del self.byReqId[subscription.reqId]
+        self.listeners.pop(subscription.reqId, None)
+
+
+    def metrics(self) -> dict:
+        """ the market data lines use """
+        with self.lock:
+            consumers = sum(len(subscription.listeners)
+                            for subscription in self.byKey.values())
+            return {"lines": len(self.byKey), "maxLines": self.maxLines,
+                    "peakLines": self.peakLines, "consumers": consumers,
+                    "subscribes": self.nSubscribes,
+                    "linesSaved": self.nShared}
+
+
+    ######################################################################
+    # the callbacks with the reqId of a subscription
+
+    def dispatch(self, name, reqId, args, latestKey=None) -> bool:
+        listeners = self.listeners.get(reqId, None)
+        if listeners is None:
+            return False
+        subscription = self.byReqId.get(reqId, None)
+        if subscription is None:
+            self.deliver(None, name, reqId, args, latestKey, listeners)
+        elif subscription.nReplays:
+            # waits for the latest values given to a joiner, then goes to it too
+            with subscription.replayLock:
+                self.deliver(subscription, name, reqId, args, latestKey,
+                             self.listeners.get(reqId, listeners))
+        else:
+            self.deliver(subscription, name, reqId, args, latestKey, listeners)
+        return True
+
+
+    def deliver(self, subscription, name, reqId, args, latestKey, listeners):
+        if latestKey is not None and subscription is not None:
+            subscription.latest[latestKey] = args
+        for listener in listeners:
+            method = getattr(listener, name, None)
+            if method is not None:
+                method(reqId, *args)
+
+
+    def tickPrice(self, reqId, tickType, price, attrib):
+        if not self.dispatch("tickPrice", reqId, (tickType, price, attrib),
+                             ("tickPrice", tickType)):
+            self.wrapper.tickPrice(reqId, tickType, price, attrib)
+
+
+    def tickSize(self, reqId, tickType, size):
+        if not self.dispatch("tickSize", reqId, (tickType, size),
+                             ("tickSize", tickType)):
+            self.wrapper.tickSize(reqId, tickType, size)
+
+
+    def tickGeneric(self, reqId, tickType, value):
+        if not self.dispatch("tickGeneric", reqId, (tickType, value),
+                             ("tickGeneric", tickType)):
+            self.wrapper.tickGeneric(reqId, tickType, value)
+
+
+    def tickString(self, reqId, tickType, value):
+        if not self.dispatch("tickString", reqId, (tickType, value),
+                             ("tickString", tickType)):
+            self.wrapper.tickString(reqId, tickType, value)
+
+
+    def tickEFP(self, reqId, tickType, *args):
+        if not self.dispatch("tickEFP", reqId, (tickType, ) + args,
+                             ("tickEFP", tickType)):
+            self.wrapper.tickEFP(reqId, tickType, *args)
+
+
+    def tickOptionComputation(self, reqId, tickType, *args):
+        if not self.dispatch("tickOptionComputation", reqId, (tickType, ) + args,
+                             ("tickOptionComputation", tickType)):
+            self.wrapper.tickOptionComputation(reqId, tickType, *args)
+
+
+    def tickReqParams(self, tickerId, minTick, bboExchange, snapshotPermissions):
+        if not self.dispatch("tickReqParams", tickerId,
+                             (minTick, bboExchange, snapshotPermissions),
+                             ("tickReqParams", None)):
+            self.wrapper.tickReqParams(tickerId, minTick, bboExchange,
+                                       snapshotPermissions)
+
+
+    def marketDataType(self, reqId, marketDataType):
+        if not self.dispatch("marketDataType", reqId, (marketDataType, ),
+                             ("marketDataType", None)):
+            self.wrapper.marketDataType(reqId, marketDataType)
+
+
+    def tickNews(self, tickerId, *args):
+        if not self.dispatch("tickNews", tickerId, args):
+            self.wrapper.tickNews(tickerId, *args)
+
+
+    def error(self, reqId, errorCode, errorString):
+        if not self.dispatch("error", reqId, (errorCode, errorString)):
+            self.wrapper.error(reqId, errorCode, errorString)
+        elif errorCode not in WARNING_CODES:
+            logger.warning("market data reqId %d dropped: %d %s", reqId,
+                           errorCode, errorString)
+            with self.lock:
+                subscription = self.byReqId.get(reqId, None)
+                if subscription is not None:
+                    self.drop(subscription)
@@ -45,6 +45,26 @@ class LogFunction(object):
         return newFn
 
 
+class HotPathLog(object):
+    """ The instrumentation level of the hot paths: the code run for every
+    msg sent or received (framing, decoding, sending, request logging).
+
+    At NOTSET (the default) the hot path logs are left to the loggers'
+    own levels. Any other level drops the hot path logs below it before
+    anything gets formatted, OFF drops them all. Use setHotPathLogLevel(). """
+    OFF = logging.CRITICAL + 1
+
+    level = logging.NOTSET
+    debug = True
+    info = True
+
+
+def setHotPathLogLevel(level: int):
+    HotPathLog.level = level
+    HotPathLog.debug = level <= logging.DEBUG
+    HotPathLog.info = level <= logging.INFO
+
+
 def current_fn_name(parent_idx = 0):
     #depth is 1 bc this is already a fn, so we need the caller
     return sys._getframe(1 + parent_idx).f_code.co_name
@@ -63,7 +83,8 @@ def decode(the_type, fields, show_unset = False):
     except StopIteration:
         raise BadMessage("no more fields")
 
-    logger.debug("decode %s %s", the_type, s)
+    if HotPathLog.debug:
+        logger.debug("decode %s %s", the_type, s)
 
     if the_type is str:
         if type(s) is str:
@@ -97,6 +118,13 @@ def decode(the_type, fields, show_unset = False):
 
 
 
+def decodeStr(field:bytes) -> str:
+    try:
+        return field.decode('UTF-8')
+    except UnicodeDecodeError:
+        return field.decode('latin-1')
+
+
 def ExerciseStaticMethods(klass):
 
     import types
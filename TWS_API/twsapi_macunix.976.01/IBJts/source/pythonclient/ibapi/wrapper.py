@@ -19,6 +19,7 @@ server and client.
 
 """
 
+import sys
 import logging
 
 from ibapi.common import * # @UnusedWildImport
@@ -38,8 +39,14 @@ class EWrapper:
     def __init__(self):
         pass
 
-    def logAnswer(self, fnName, fnParams):
-        if logger.isEnabledFor(logging.INFO):
+    def logAnswer(self, fnName=None, fnParams=None):
+        """ Logs an answer. Called with no args it logs the calling wrapper
+        method and its params, these are only looked up if it gets logged. """
+        if HotPathLog.info and logger.isEnabledFor(logging.INFO):
+            if fnName is None:
+                frame = sys._getframe(1)
+                fnName = frame.f_code.co_name
+                fnParams = frame.f_locals
             if 'self' in fnParams:
                 prms = dict(fnParams)
                 del prms['self']
@@ -52,17 +59,17 @@ class EWrapper:
         """This event is called when there is an error with the
         communication or when TWS wants to send a message to the client."""
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
         logger.error("ERROR %s %s %s", reqId, errorCode, errorString)
 
 
     def winError(self, text:str, lastError:int):
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def connectAck(self):
         """ callback signifying completion of successful connection """
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def marketDataType(self, reqId:TickerId, marketDataType:int):
@@ -74,42 +81,42 @@ class EWrapper:
         every subscription because different contracts can generally trade on a
         different schedule."""
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def tickPrice(self, reqId:TickerId , tickType:TickType, price:float,
                   attrib:TickAttrib):
         """Market data tick price callback. Handles all price related ticks."""
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def tickSize(self, reqId:TickerId, tickType:TickType, size:int):
         """Market data tick size callback. Handles all size-related ticks."""
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def tickSnapshotEnd(self, reqId:int):
         """When requesting market data snapshots, this market will indicate the
         snapshot reception is finished. """
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def tickGeneric(self, reqId:TickerId, tickType:TickType, value:float):
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def tickString(self, reqId:TickerId, tickType:TickType, value:str):
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def tickEFP(self, reqId:TickerId, tickType:TickType, basisPoints:float,
                 formattedBasisPoints:str, totalDividends:float,
                 holdDays:int, futureLastTradeDate:str, dividendImpact:float,
                 dividendsToLastTradeDate:float):
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
         """ market data call back for Exchange for Physical
         tickerId -      The request's identifier.
         tickType -      The type of tick being received.
@@ -125,7 +132,7 @@ class EWrapper:
         dividendsToLastTradeDate - The dividends expected until the expiration
             of the single stock future."""
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def orderStatus(self, orderId:OrderId , status:str, filled:float,
@@ -157,7 +164,7 @@ class EWrapper:
 
         """
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def openOrder(self, orderId:OrderId, contract:Contract, order:Order,
@@ -171,20 +178,20 @@ class EWrapper:
         orderState: OrderState - The orderState class includes attributes Used
             for both pre and post trade margin and commission data."""
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def openOrderEnd(self):
         """This is called at the end of a given request for open orders."""
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def connectionClosed(self):
         """This function is called when TWS closes the sockets
         connection with the ActiveX control, or when TWS is shut down."""
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def updateAccountValue(self, key:str, val:str, currency:str,
@@ -192,7 +199,7 @@ class EWrapper:
         """ This function is called only when ReqAccountUpdates on
         EEClientSocket object has been called. """
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def updatePortfolio(self, contract:Contract, position:float,
@@ -202,24 +209,24 @@ class EWrapper:
         """This function is called only when reqAccountUpdates on
         EEClientSocket object has been called."""
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def updateAccountTime(self, timeStamp:str):
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def accountDownloadEnd(self, accountName:str):
         """This is called after a batch updateAccountValue() and
         updatePortfolio() is sent."""
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def nextValidId(self, orderId:int):
         """ Receives next valid order id."""
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def contractDetails(self, reqId:int, contractDetails:ContractDetails):
@@ -227,14 +234,14 @@ class EWrapper:
         contracts matching the requested via EEClientSocket::reqContractDetails.
         For example, one can obtain the whole option chain with it."""
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def bondContractDetails(self, reqId:int, contractDetails:ContractDetails):
         """This function is called when reqContractDetails function
         has been called for bonds."""
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def contractDetailsEnd(self, reqId:int):
@@ -242,21 +249,21 @@ class EWrapper:
         request are received. This helps to define the end of an option
         chain."""
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def execDetails(self, reqId:int, contract:Contract, execution:Execution):
         """This event is fired when the reqExecutions() functions is
         invoked, or when an order is filled.  """
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def execDetailsEnd(self, reqId:int):
         """This function is called once all executions have been sent to
         a client in response to reqExecutions()."""
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
 
@@ -274,7 +281,7 @@ class EWrapper:
         price - the order's price
         size -  the order's size"""
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def updateMktDepthL2(self, reqId:TickerId , position:int, marketMaker:str,
@@ -293,7 +300,7 @@ class EWrapper:
         size -  the order's size
         isSmartDepth - is SMART Depth request"""
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def updateNewsBulletin(self, msgId:int, msgType:int, newsMessage:str,
@@ -305,12 +312,12 @@ class EWrapper:
         message - the message
         origExchange -    the exchange where the message comes from.  """
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def managedAccounts(self, accountsList:str):
         """Receives a comma-separated string with the managed account ids."""
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def receiveFA(self, faData:FaDataType , cxml:str):
@@ -325,7 +332,7 @@ class EWrapper:
                  names rather than account numbers.
         faXmlData -  the xml-formatted configuration """
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
     def historicalData(self, reqId: int, bar: BarData):
         """ returns the requested historical data bars
@@ -343,12 +350,19 @@ class EWrapper:
         WAP -   the bar's Weighted Average Price
         hasGaps  -indicates if the data has gaps or not. """
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def historicalDataEnd(self, reqId:int, start:str, end:str):
         """ Marks the ending of the historical bars reception. """
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
+
+
+    def historicalDataBatch(self, reqId:int, bars:ArrayOfBarData):
+        """ historicalData() with EClient.setColumnarBars(True): all the bars
+        of the answer as a numpy array, see columnar.py. historicalDataEnd()
+        follows. """
+        self.logAnswer()
 
 
     def scannerParameters(self, xml:str):
@@ -356,7 +370,7 @@ class EWrapper:
         scanner.
 
         xml -   the xml-formatted string with the available parameters."""
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def scannerData(self, reqId:int, rank:int, contractDetails:ContractDetails,
@@ -371,7 +385,7 @@ class EWrapper:
         projection -    according to query.
         legStr - describes the combo legs when the scanner is returning EFP"""
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def scannerDataEnd(self, reqId:int):
@@ -379,7 +393,7 @@ class EWrapper:
 
         reqId - the request's identifier"""
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def realtimeBar(self, reqId: TickerId, time:int, open_: float, high: float, low: float, close: float,
@@ -399,13 +413,13 @@ class EWrapper:
         bar.count - the number of trades during the bar's timespan (only available
             for TRADES)."""
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
     def currentTime(self, time:int):
         """ Server's current time. This method will receive IB server's system
         time resulting after the invokation of reqCurrentTime. """
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def fundamentalData(self, reqId:TickerId , data:str):
@@ -413,7 +427,7 @@ class EWrapper:
         market data. The appropriate market data subscription must be set
         up in Account Management before you can receive this data."""
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def deltaNeutralValidation(self, reqId:int, deltaNeutralContract:DeltaNeutralContract):
@@ -424,7 +438,7 @@ class EWrapper:
         server. These values are locked when the RFQ is processed and remain
         locked until the RFQ is canceled."""
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
 
@@ -433,7 +447,7 @@ class EWrapper:
         - immediately after a trade execution
         - by calling reqExecutions()."""
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def position(self, account:str, contract:Contract, position:float,
@@ -441,14 +455,14 @@ class EWrapper:
         """This event returns real-time positions for all accounts in
         response to the reqPositions() method."""
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def positionEnd(self):
         """This is called once all position data for a given request are
         received and functions as an end marker for the position() data. """
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def accountSummary(self, reqId:int, account:str, tag:str, value:str,
@@ -456,34 +470,34 @@ class EWrapper:
         """Returns the data from the TWS Account Window Summary tab in
         response to reqAccountSummary()."""
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def accountSummaryEnd(self, reqId:int):
         """This method is called once all account summary data for a
         given request are received."""
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def verifyMessageAPI(self, apiData:str):
         """ Deprecated Function """
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def verifyCompleted(self, isSuccessful:bool, errorText:str):
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def verifyAndAuthMessageAPI(self, apiData:str, xyzChallange:str):
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def verifyAndAuthCompleted(self, isSuccessful:bool, errorText:str):
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def displayGroupList(self, reqId:int, groups:str):
@@ -495,7 +509,7 @@ class EWrapper:
              not change during TWS session (in other words, user cannot add a
             new group; sorting can change though)."""
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def displayGroupUpdated(self, reqId:int, contractInfo:str):
@@ -512,7 +526,7 @@ class EWrapper:
                 Examples: 8314@SMART for IBM SMART; 8314@ARCA for IBM @ARCA.
             combo = if any combo is selected.  """
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def positionMulti(self, reqId:int, account:str, modelCode:str,
@@ -520,14 +534,14 @@ class EWrapper:
         """same as position() except it can be for a certain
         account/model"""
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def positionMultiEnd(self, reqId:int):
         """same as positionEnd() except it can be for a certain
         account/model"""
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def accountUpdateMulti(self, reqId:int, account:str, modelCode:str,
@@ -535,14 +549,14 @@ class EWrapper:
         """same as updateAccountValue() except it can be for a certain
         account/model"""
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def accountUpdateMultiEnd(self, reqId:int):
         """same as accountDownloadEnd() except it can be for a certain
         account/model"""
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def tickOptionComputation(self, reqId:TickerId, tickType:TickType ,
@@ -553,7 +567,7 @@ class EWrapper:
         deltas, along with the present value of dividends expected on that
         options underlier are received."""
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def securityDefinitionOptionParameter(self, reqId:int, exchange:str,
@@ -573,7 +587,7 @@ class EWrapper:
         strikes - a list of the possible strikes for options of this underlying
              on this exchange """
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def securityDefinitionOptionParameterEnd(self, reqId:int):
@@ -582,7 +596,7 @@ class EWrapper:
 
         reqId - the ID used in the call to securityDefinitionOptionParameter """
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def softDollarTiers(self, reqId:int, tiers:list):
@@ -592,113 +606,130 @@ class EWrapper:
         tiers - Stores a list of SoftDollarTier that contains all Soft Dollar
             Tiers information """
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def familyCodes(self, familyCodes:ListOfFamilyCode):
         """ returns array of family codes """
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
 
     def symbolSamples(self, reqId:int,
                       contractDescriptions:ListOfContractDescription):
         """ returns array of sample contract descriptions """
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
     def mktDepthExchanges(self, depthMktDataDescriptions:ListOfDepthExchanges):
         """ returns array of exchanges which return depth to UpdateMktDepthL2"""
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
     def tickNews(self, tickerId: int, timeStamp:int, providerCode:str, articleId:str, headline:str, extraData:str):
         """ returns news headlines"""
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
     def smartComponents(self, reqId:int, smartComponentMap:SmartComponentMap):
         """returns exchange component mapping"""
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
     def tickReqParams(self, tickerId:int, minTick:float, bboExchange:str, snapshotPermissions:int):
         """returns exchange map of a particular contract"""
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
     def newsProviders(self, newsProviders:ListOfNewsProviders):
         """returns available, subscribed API news providers"""
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
     def newsArticle(self, requestId:int, articleType:int, articleText:str):
         """returns body of news article"""
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
     def historicalNews(self, requestId:int, time:str, providerCode:str, articleId:str, headline:str):
         """returns historical news headlines"""
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
     def historicalNewsEnd(self, requestId:int, hasMore:bool):
         """signals end of historical news"""
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
     def headTimestamp(self, reqId:int, headTimestamp:str):
         """returns earliest available data of a type of data for a particular contract"""
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
     def histogramData(self, reqId:int, items:HistogramData):
         """returns histogram data for a contract"""
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
     def historicalDataUpdate(self, reqId: int, bar: BarData):
         """returns updates in real time when keepUpToDate is set to True"""
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
     def rerouteMktDataReq(self, reqId: int, conId: int, exchange: str):
         """returns reroute CFD contract information for market data request"""
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
     def rerouteMktDepthReq(self, reqId: int, conId: int, exchange: str):
         """returns reroute CFD contract information for market depth request"""
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
     def marketRule(self, marketRuleId: int, priceIncrements: ListOfPriceIncrements):
         """returns minimum price increment structure for a particular market rule ID"""
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
     def pnl(self, reqId: int, dailyPnL: float, unrealizedPnL: float, realizedPnL: float):
         """returns the daily PnL for the account"""
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
     def pnlSingle(self, reqId: int, pos: int, dailyPnL: float, unrealizedPnL: float, realizedPnL: float, value: float):
         """returns the daily PnL for a single position in the account"""
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
     def historicalTicks(self, reqId: int, ticks: ListOfHistoricalTick, done: bool):
         """returns historical tick data when whatToShow=MIDPOINT"""
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
     def historicalTicksBidAsk(self, reqId: int, ticks: ListOfHistoricalTickBidAsk, done: bool):
         """returns historical tick data when whatToShow=BID_ASK"""
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
     def historicalTicksLast(self, reqId: int, ticks: ListOfHistoricalTickLast, done: bool):
         """returns historical tick data when whatToShow=TRADES"""
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
+
+    def historicalTicksArray(self, reqId: int, ticks: ArrayOfHistoricalTick, done: bool):
+        """historicalTicks() with EClient.setColumnarTicks(True), the ticks
+        being a numpy array, see columnar.py"""
+        self.logAnswer()
+
+    def historicalTicksBidAskArray(self, reqId: int, ticks: ArrayOfHistoricalTickBidAsk,
+                                   done: bool):
+        """historicalTicksBidAsk() with EClient.setColumnarTicks(True), the
+        ticks being a numpy array, see columnar.py"""
+        self.logAnswer()
+
+    def historicalTicksLastArray(self, reqId: int, ticks: ArrayOfHistoricalTickLast,
+                                 done: bool):
+        """historicalTicksLast() with EClient.setColumnarTicks(True), the
+        ticks being a numpy array, see columnar.py"""
+        self.logAnswer()
 
     def tickByTickAllLast(self, reqId: int, tickType: int, time: int, price: float,
                           size: int, tickAttribLast: TickAttribLast, exchange: str,
                           specialConditions: str):
         """returns tick-by-tick data for tickType = "Last" or "AllLast" """
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
     def tickByTickBidAsk(self, reqId: int, time: int, bidPrice: float, askPrice: float,
                          bidSize: int, askSize: int, tickAttribBidAsk: TickAttribBidAsk):
         """returns tick-by-tick data for tickType = "BidAsk" """
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
     def tickByTickMidPoint(self, reqId: int, time: int, midPoint: float):
         """returns tick-by-tick data for tickType = "MidPoint" """
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
     def orderBound(self, reqId: int, apiClientId: int, apiOrderId: int):
         """returns orderBound notification"""
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
         
     def completedOrder(self, contract:Contract, order:Order, orderState:OrderState):
         """This function is called to feed in completed orders.
@@ -707,9 +738,9 @@ class EWrapper:
         order: Order - The Order class gives the details of the completed order.
         orderState: OrderState - The orderState class includes completed order status details."""
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
 
     def completedOrdersEnd(self):
         """This is called at the end of a given request for completed orders."""
 
-        self.logAnswer(current_fn_name(), vars())
+        self.logAnswer()
@@ -0,0 +1,274 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+
+"""
+The EWriter runs in a separate thread and sends the outgoing messages.
+
+Without it every request is sent by the thread making it, one socket write
+per message. With it (EClient.setOutboundQueue()) the requests only put
+their message in a queue: the writer takes all the messages queued since
+its last write and sends them in one Connection.sendAll(), so that a burst
+(subscribing to hundreds of contracts at startup, a basket of orders) goes
+out in a few large writes instead of one small one per message. A write
+blocked on a full socket buffer lets the queue grow, the next write takes
+all of it.
+
+With a governor (governor.py) the writes are paced under the TWS limit of
+msgs per second, the msgs queued by priority class.
+"""
+
+import time
+import logging
+import threading
+import collections
+from threading import Thread
+
+from ibapi.utils import HotPathLog
+
+
+logger = logging.getLogger(__name__)
+
+
+# the most bytes taken from the queue for one write
+DEFAULT_MAX_BATCH = 1 << 20
+
+
+class EWriter(Thread):
+    def __init__(self, conn, linger=0., maxBatch=DEFAULT_MAX_BATCH,
+                 governor=None):
+        """ linger: the seconds a write waits for more msgs once the first
+        one is queued, 0 to write right away what is queued.
+        governor: a governor.RateGovernor pacing the writes, None to write
+        the msgs as fast as they come """
+        super().__init__()
+        self.conn = conn
+        self.linger = linger
+        self.maxBatch = maxBatch
+        self.governor = governor
+        self.cond = threading.Condition()
+        # one queue of (msg, time queued) per priority class
+        nClasses = governor.nClasses if governor is not None else 1
+        self.queues = [collections.deque() for _ in range(nClasses)]
+        self.nQueuedMsgs = 0
+        self.nQueuedBytes = 0
+        self.writing = False
+        self.stopping = False
+        self.error = None
+        self.nWrites = 0
+        self.nMsgs = 0
+        self.nBytes = 0
+        self.nDropped = 0
+        self.peakQueuedMsgs = 0
+        self.peakQueuedBytes = 0
+        self.maxBatchMsgs = 0
+        self.writeTime = 0.
+        self.nThrottled = 0         # writes that waited for the governor
+        self.throttleTime = 0.
+        # per priority class: [msgs written, total latency, max latency]
+        self.latencies = [[0, 0., 0.] for _ in range(nClasses)]
+
+
+    def put(self, msg) -> bool:
+        """ msg: one msg made with make_msg(), several go with putAll().
+        Returns False if the msg is dropped, the writer having stopped or
+        failed. """
+        with self.cond:
+            if self.error is not None or self.stopping:
+                logger.debug("msg dropped, the writer is stopped")
+                return False
+            self.queue(msg, time.monotonic())
+            self.cond.notify_all()
+            return True
+
+
+    def putAll(self, msgs):
+        """ msgs: a list of msgs made with make_msg(). Returns False if
+        they are dropped, as put() does. """
+        with self.cond:
+            if self.error is not None or self.stopping:
+                logger.debug("%d msgs dropped, the writer is stopped", len(msgs))
+                return False
+            now = time.monotonic()
+            for msg in msgs:
+                self.queue(msg, now)
+            self.cond.notify_all()
+            return True
+
+
+    def queue(self, msg, now):
+        """ with the lock held """
+        governor = self.governor
+        priority = governor.priority(msg) if governor is not None else 0
+        self.queues[priority].append((msg, now))
+        self.nQueuedMsgs += 1
+        self.nQueuedBytes += len(msg)
+        if self.nQueuedMsgs > self.peakQueuedMsgs:
+            self.peakQueuedMsgs = self.nQueuedMsgs
+        if self.nQueuedBytes > self.peakQueuedBytes:
+            self.peakQueuedBytes = self.nQueuedBytes
+
+
+    def flush(self, timeout=None) -> bool:
+        """ waits until all the msgs queued so far are written, returns False
+        if it timed out or the writer stopped first """
+        with self.cond:
+            self.cond.wait_for(lambda: not (self.nQueuedMsgs or self.writing)
+                               or self.error is not None, timeout)
+            return not (self.nQueuedMsgs or self.writing) and self.error is None
+
+
+    def stop(self, timeout=None):
+        """ writes what is queued, within timeout, and ends the thread. With
+        a governor, what is still queued then is dropped: it could only be
+        written over the rate limit. """
+        self.flush(timeout)
+        with self.cond:
+            self.stopping = True
+            self.cond.notify_all()
+        if self.is_alive() and self is not threading.current_thread():
+            self.join(timeout)
+
+
+    def queueDepth(self) -> tuple:
+        """ (msgs, bytes) waiting to be written """
+        with self.cond:
+            return (self.nQueuedMsgs, self.nQueuedBytes)
+
+
+    def metrics(self) -> dict:
+        """ latencies: per priority class, the msgs written and the mean and
+        max seconds from put() to their write """
+        with self.cond:
+            return {"queuedMsgs": self.nQueuedMsgs,
+                    "queuedBytes": self.nQueuedBytes,
+                    "peakQueuedMsgs": self.peakQueuedMsgs,
+                    "peakQueuedBytes": self.peakQueuedBytes,
+                    "writes": self.nWrites, "msgs": self.nMsgs,
+                    "bytes": self.nBytes, "maxBatchMsgs": self.maxBatchMsgs,
+                    "writeTime": self.writeTime, "droppedMsgs": self.nDropped,
+                    "throttledWrites": self.nThrottled,
+                    "throttleTime": self.throttleTime,
+                    "latencies": [{"msgs": nMsgs,
+                                   "meanLatency": total / nMsgs if nMsgs else 0.,
+                                   "maxLatency": maxLatency}
+                                  for (nMsgs, total, maxLatency) in self.latencies]}
+
+
+    def drop(self):
+        """ with the lock held: drops all the queued msgs """
+        for queue in self.queues:
+            self.nDropped += len(queue)
+            queue.clear()
+        self.nQueuedMsgs = 0
+        self.nQueuedBytes = 0
+        self.cond.notify_all()
+
+
+    def topPriority(self) -> int:
+        """ with the lock held: the first class with msgs queued """
+        for (priority, queue) in enumerate(self.queues):
+            if queue:
+                return priority
+        return None
+
+
+    def waitForGovernor(self) -> bool:
+        """ with the lock held: waits until the governor lets write a msg
+        queued, False to stop """
+        governor = self.governor
+        now = t0 = time.monotonic()
+        delay = governor.delay(now, self.topPriority())
+        if delay <= 0:
+            return True
+        while delay > 0:
+            if self.stopping or not self.conn.isConnected():
+                logger.warning("%d msgs dropped, not written within the rate limit",
+                               self.nQueuedMsgs)
+                self.drop()
+                return False
+            self.cond.wait(delay)
+            now = time.monotonic()
+            # a msg of a class before may have come meanwhile
+            delay = governor.delay(now, self.topPriority())
+        self.nThrottled += 1
+        self.throttleTime += now - t0
+        return True
+
+
+    def nextBatch(self) -> list:
+        """ with the lock held: the msgs of the next write, None to stop """
+        while not self.nQueuedMsgs:
+            if self.stopping or not self.conn.isConnected():
+                return None
+            self.cond.wait(0.2)
+        if self.linger:
+            deadline = time.monotonic() + self.linger
+            while not self.stopping and self.nQueuedBytes < self.maxBatch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.cond.wait(remaining)
+        governor = self.governor
+        if governor is not None and not self.waitForGovernor():
+            return None
+
+        batch = []
+        nBytes = 0
+        now = time.monotonic()
+        for (priority, queue) in enumerate(self.queues):
+            nAllowed = governor.available(now, priority) \
+                if governor is not None else len(batch) + len(queue)
+            latencies = self.latencies[priority]
+            while queue and len(batch) < nAllowed and \
+                    (not batch or nBytes + len(queue[0][0]) <= self.maxBatch):
+                (msg, queued) = queue.popleft()
+                batch.append(msg)
+                nBytes += len(msg)
+                latency = now - queued
+                latencies[0] += 1
+                latencies[1] += latency
+                if latency > latencies[2]:
+                    latencies[2] = latency
+        if governor is not None:
+            governor.take(now, len(batch))
+        self.nQueuedMsgs -= len(batch)
+        self.nQueuedBytes -= nBytes
+        self.writing = True
+        return batch
+
+
+    def run(self):
+        try:
+            while True:
+                with self.cond:
+                    batch = self.nextBatch()
+                if batch is None:
+                    break
+
+                data = b"".join(batch) if len(batch) > 1 else batch[0]
+                t0 = time.perf_counter()
+                try:
+                    self.conn.sendAll(data)
+                finally:
+                    with self.cond:
+                        self.writing = False
+                        self.writeTime += time.perf_counter() - t0
+                        self.nWrites += 1
+                        self.nMsgs += len(batch)
+                        self.nBytes += len(data)
+                        self.maxBatchMsgs = max(self.maxBatchMsgs, len(batch))
+                        self.cond.notify_all()
+
+                if HotPathLog.debug:
+                    logger.debug("writer loop, sent %d msgs %d bytes",
+                                 len(batch), len(data))
+
+            logger.debug("EWriter thread finished")
+        except Exception as ex:
+            logger.exception('unhandled exception in EWriter thread')
+            with self.cond:
+                self.error = ex
+                self.drop()
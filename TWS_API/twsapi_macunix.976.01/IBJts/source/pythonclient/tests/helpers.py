@@ -0,0 +1,54 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+
+"""
+What the decoding tests share: the fields of a msg as the decoder gets
+them, and a wrapper recording the callbacks.
+"""
+
+from ibapi import comm
+from ibapi.wrapper import EWrapper
+
+
+def make_fields(*vals):
+    """ the fields of the msg made of vals """
+    return comm.read_fields("".join(comm.make_field(val) for val in vals))
+
+
+def attributes(obj):
+    """ the attributes of obj, with or without __slots__ """
+    if hasattr(obj, "__dict__"):
+        return vars(obj)
+    slots = [slot for cls in type(obj).__mro__
+             for slot in getattr(cls, "__slots__", ())]
+    if not slots:
+        return obj
+    return {slot: getattr(obj, slot) for slot in slots}
+
+
+class RecordingWrapper(EWrapper):
+    """ records the calls as (name, args...): all of them or those of
+    names, the objects as their attributes if byAttributes """
+    def __init__(self, names=None, byAttributes=False):
+        self.calls = []
+        self.names = names
+        self.byAttributes = byAttributes
+
+    def __getattribute__(self, name):
+        if name in ("calls", "names", "byAttributes") or name.startswith("__"):
+            return super().__getattribute__(name)
+        names = self.names
+        if names is not None and name not in names:
+            return super().__getattribute__(name)
+        def record(*args):
+            if self.byAttributes:
+                args = tuple(attributes(arg) for arg in args)
+            self.calls.append((name, ) + args)
+        return record
+
+    def callsOf(self, name) -> list:
+        """ the args of the calls of name """
+        return [call[1:] for call in self.calls if call[0] == name]
@@ -0,0 +1,206 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+import os
+import asyncio
+import tempfile
+import unittest
+
+from ibapi import comm
+from ibapi import columnar
+from ibapi.async_client import AsyncEClient, RequestError
+from ibapi.capture import FrameReplayer
+from ibapi.decoder import Decoder
+from ibapi.wrapper import EWrapper
+from ibapi.contract import Contract
+from ibapi.execution import ExecutionFilter
+from ibapi.message import IN, OUT
+from ibapi.errors import NOT_CONNECTED, UPDATE_TWS
+from ibapi.server_versions import MAX_CLIENT_VER, MIN_SERVER_VER_HISTORICAL_TICKS
+
+
+def make_frame(*vals):
+    return comm.make_msg("".join(comm.make_field(val) for val in vals))
+
+
+class FakeTws(asyncio.Protocol):
+    """ just enough of TWS for these tests """
+    def __init__(self):
+        self.transport = None
+        self.frames = comm.FrameBuffer()
+        self.handshaken = False
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        if not self.handshaken:
+            self.handshaken = True
+            data = data[len(b"API\0"):]
+            self.frames.feed(data)
+            self.frames.nextMsg()
+            self.transport.write(make_frame(MAX_CLIENT_VER, "20191010 10:00:00 EST"))
+            return
+        self.frames.feed(data)
+        msg = self.frames.nextMsg()
+        while msg is not None:
+            self.answer([int(field) if field.isdigit() else field
+                         for field in comm.read_fields(msg)])
+            msg = self.frames.nextMsg()
+
+    def answer(self, fields):
+        msgId = fields[0]
+        if msgId == OUT.START_API:
+            self.transport.write(make_frame(IN.NEXT_VALID_ID, 1, 7))
+        elif msgId == OUT.REQ_HISTORICAL_DATA:
+            reqId = fields[1]
+            self.transport.write(
+                make_frame(IN.ERR_MSG, 2, reqId, 2176, "just a warning")
+                + make_frame(IN.HISTORICAL_DATA, reqId, "20191010", "20191011", 2,
+                             "20191010", 1.5, 2.5, 1., 2., 1000, 1.75, 10,
+                             "20191011", 2., 3., 1.5, 2.5, 2000, 2.25, 20))
+        elif msgId == OUT.REQ_CONTRACT_DATA:
+            self.transport.write(make_frame(IN.ERR_MSG, 2, fields[2], 200,
+                                            "No security definition has been found"))
+        elif msgId == OUT.REQ_EXECUTIONS:
+            self.transport.write(make_frame(IN.EXECUTION_DATA_END, 1, fields[2]))
+
+
+class RecordingWrapper(EWrapper):
+    def __init__(self):
+        self.calls = []
+
+    def nextValidId(self, orderId):
+        self.calls.append(("nextValidId", orderId))
+
+    def error(self, reqId, errorCode, errorString):
+        self.calls.append(("error", reqId, errorCode))
+
+    def connectionClosed(self):
+        self.calls.append(("connectionClosed", ))
+
+
+class AsyncClientTestCase(unittest.TestCase):
+    def setUp(self):
+        self.wrapper = RecordingWrapper()
+        self.client = AsyncEClient(self.wrapper)
+
+
+    def tearDown(self):
+        pass
+
+
+    def runSession(self, session):
+        async def main():
+            loop = asyncio.get_running_loop()
+            server = await loop.create_server(FakeTws, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            try:
+                await self.client.connect("127.0.0.1", port, 0)
+                return await asyncio.wait_for(session(), 5)
+            finally:
+                self.client.disconnect()
+                server.close()
+                await server.wait_closed()
+                await asyncio.sleep(0.01)
+        return asyncio.run(main())
+
+
+    def test_requests(self):
+        async def session():
+            bars = await self.client.reqHistoricalDataAsync(1001, Contract(),
+                "", "2 D", "1 day", "TRADES", 1, 1, False, [])
+            execs = await self.client.reqExecutionsAsync(1002, ExecutionFilter())
+            with self.assertRaises(RequestError) as cm:
+                await self.client.reqContractDetailsAsync(1003, Contract())
+            return (bars, execs, cm.exception)
+
+        (bars, execs, exc) = self.runSession(session)
+
+        self.assertTrue(self.client.serverVersion_ is None, "should be reset")
+        self.assertEqual([(bar.date, bar.close, bar.barCount) for bar in bars],
+                         [("20191010", 2., 10), ("20191011", 2.5, 20)])
+        self.assertEqual(execs, [])
+        self.assertEqual((exc.reqId, exc.errorCode), (1003, 200))
+        self.assertEqual(self.wrapper.calls, [("nextValidId", 7),
+            ("error", 1001, 2176), ("connectionClosed", )])
+
+
+    def test_not_connected(self):
+        with self.assertRaises(RequestError) as cm:
+            asyncio.run(asyncio.wait_for(
+                self.client.reqContractDetailsAsync(1001, Contract()), 5))
+        self.assertEqual((cm.exception.reqId, cm.exception.errorCode),
+                         (1001, NOT_CONNECTED.code()))
+
+
+    def test_refused_request(self):
+        # refused by reqHistoricalTicks() itself, with NO_VALID_ID
+        async def session():
+            self.client.serverVersion_ = MIN_SERVER_VER_HISTORICAL_TICKS - 1
+            with self.assertRaises(RequestError) as cm:
+                await self.client.reqHistoricalTicksAsync(1001, Contract(),
+                    "", "20191010 10:00:00", 100, "TRADES", 1, False, [])
+            return cm.exception
+
+        exc = self.runSession(session)
+        self.assertEqual((exc.reqId, exc.errorCode), (1001, UPDATE_TWS.code()))
+        self.assertFalse(("error", -1, UPDATE_TWS.code()) in self.wrapper.calls)
+
+
+    def test_run(self):
+        async def session():
+            runner = asyncio.ensure_future(self.client.run())
+            await asyncio.sleep(0.01)
+            self.assertFalse(runner.done())
+            self.client.disconnect()
+            await runner
+
+        self.runSession(session)
+        self.assertEqual(self.wrapper.calls[-1], ("connectionClosed", ))
+        # not connected
+        asyncio.run(AsyncEClient(RecordingWrapper()).run())
+
+
+    def test_no_outbound_queue(self):
+        with self.assertRaises(ValueError):
+            self.client.setOutboundQueue(True)
+        self.client.setOutboundQueue(False)
+        self.assertTrue(self.client.outboundOptions is None)
+
+
+    def test_capture(self):
+        (fd, path) = tempfile.mkstemp(suffix=".ibcap")
+        os.close(fd)
+        os.remove(path)
+        self.addCleanup(lambda: os.path.exists(path) and os.remove(path))
+
+        async def session():
+            self.client.startCapture(path)
+            return await self.client.reqHistoricalDataAsync(1001, Contract(),
+                "", "2 D", "1 day", "TRADES", 1, 1, False, [])
+
+        self.runSession(session)
+        replayer = FrameReplayer(path)
+        wrapper = RecordingWrapper()
+        self.assertEqual(replayer.replay(Decoder(wrapper, replayer.serverVersion)), 3)
+        self.assertEqual(wrapper.calls, [("nextValidId", 7), ("error", 1001, 2176)])
+
+
+    @unittest.skipIf(columnar.numpy is None, "needs numpy")
+    def test_columnar_bars(self):
+        self.client.setColumnarBars(True)
+        async def session():
+            return await self.client.reqHistoricalDataAsync(1001, Contract(),
+                "", "2 D", "1 day", "TRADES", 1, 1, False, [])
+
+        bars = self.runSession(session)
+        self.assertEqual(bars.dtype, columnar.BAR_DTYPE)
+        self.assertEqual(list(bars[["date", "close", "barCount"]].tolist()),
+                         [("20191010", 2., 10), ("20191011", 2.5, 20)])
+
+
+if "__main__" == __name__:
+    unittest.main()
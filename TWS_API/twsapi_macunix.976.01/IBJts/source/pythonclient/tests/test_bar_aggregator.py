@@ -0,0 +1,105 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+import unittest
+
+from ibapi import comm
+from ibapi import faketws
+from ibapi import columnar
+from ibapi.decoder import Decoder
+from ibapi.wrapper import EWrapper
+from ibapi.server_versions import MAX_CLIENT_VER
+
+if columnar.numpy is not None:
+    from ibapi.bar_aggregator import BarAggregator
+
+
+T0 = 1570000000     # a multiple of 10
+
+
+def make_fields(frame):
+    return comm.read_fields(frame[4:])
+
+
+class TicksWrapper(EWrapper):
+    def __init__(self):
+        self.nTicks = 0
+
+    def tickByTickAllLast(self, reqId, tickType, time, price, size, tickAttribLast,
+                          exchange, specialConditions):
+        self.nTicks += 1
+
+    def tickByTickBidAsk(self, reqId, time, bidPrice, askPrice, bidSize,
+                         askSize, tickAttribBidAsk):
+        self.nTicks += 1
+
+
+@unittest.skipIf(columnar.numpy is None, "needs numpy")
+class BarAggregatorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.wrapper = TicksWrapper()
+        self.aggregator = BarAggregator()
+        self.decoder = Decoder(self.wrapper, MAX_CLIENT_VER,
+                               feeds=[self.aggregator])
+
+
+    def tearDown(self):
+        pass
+
+
+    def trade(self, time, price, size, reqId=1001):
+        self.decoder.interpret(make_fields(faketws.tickByTickLastFrame(
+            reqId, time, price, size)))
+
+
+    def test_time_bars(self):
+        completed = []
+        series = self.aggregator.addSeries(1001, "time", 10,
+            callback=lambda series, bar: completed.append(bar.copy()))
+        for (dt, price, size) in ((1, 10., 100), (5, 12., 100), (9, 9., 200),
+                                  (12, 11., 100), (35, 13., 300)):
+            self.trade(T0 + dt, price, size)
+
+        self.assertEqual(len(completed), 2)
+        self.assertEqual(completed[0].tolist(), (T0, T0 + 9, 10., 12., 9., 9.,
+                                                 400, 4000., 3))
+        self.assertEqual(series.last()["time"].tolist(), [T0, T0 + 10])
+        self.aggregator.flush(T0 + 39)
+        self.assertEqual(series.nBars, 2)
+        self.aggregator.flush(T0 + 40)
+        self.assertEqual(series.last(1)["time"].tolist(), [T0 + 30])
+        self.assertEqual(self.wrapper.nTicks, 5)
+
+
+    def test_volume_value_ticks_bars(self):
+        volume = self.aggregator.addSeries(1001, "volume", 250)
+        value = self.aggregator.addSeries(1001, "value", 2000.)
+        ticks = self.aggregator.addSeries(1001, "ticks", 2)
+        other = self.aggregator.addSeries(1002, "ticks", 1)
+        for (dt, price, size) in ((1, 10., 100), (2, 10., 100), (3, 10., 100),
+                                  (4, 10., 100)):
+            self.trade(T0 + dt, price, size)
+
+        self.assertEqual(volume.last()[["time", "endTime", "volume"]].tolist(),
+                         [(T0 + 1, T0 + 3, 300)])
+        self.assertEqual(value.last()["count"].tolist(), [2, 2])
+        self.assertEqual(ticks.nBars, 2)
+        self.assertEqual(other.nBars, 0)
+
+
+    def test_midpoint_and_ring(self):
+        series = self.aggregator.addSeries(1001, "ticks", 1, capacity=3)
+        for i in range(5):
+            self.decoder.interpret(make_fields(faketws.tickByTickBidAskFrame(
+                1001, T0 + i, 100. + i, 101. + i, 100, 200)))
+        self.decoder.interpret(make_fields(faketws.tickByTickMidPointFrame(
+            1001, T0 + 5, 200.)))
+        self.assertEqual(series.nBars, 6)
+        self.assertEqual(series.last()["close"].tolist(), [103.5, 104.5, 200.])
+        self.assertEqual(series.last(2)["volume"].tolist(), [0, 0])
+
+
+if "__main__" == __name__:
+    unittest.main()
@@ -0,0 +1,150 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+import os
+import time
+import tempfile
+import threading
+import unittest
+
+from ibapi import faketws
+from ibapi.capture import FrameRecorder, FrameReplayer, RECORD, SESSION, WALL_CLOCK
+from ibapi.client import EClient
+from ibapi.decoder import Decoder
+from ibapi.wrapper import EWrapper
+from ibapi.contract import Contract
+from ibapi.message import OUT
+from ibapi.server_versions import MAX_CLIENT_VER
+
+
+class CallsWrapper(EWrapper):
+    def __init__(self):
+        self.calls = []
+        self.tickByTickDone = threading.Event()
+        self.started = threading.Event()
+
+    def nextValidId(self, orderId):
+        self.started.set()
+
+    def tickPrice(self, reqId, tickType, price, attrib):
+        self.calls.append(("tickPrice", reqId, tickType, price))
+
+    def tickSize(self, reqId, tickType, size):
+        self.calls.append(("tickSize", reqId, tickType, size))
+
+    def tickByTickMidPoint(self, reqId, time, midPoint):
+        self.calls.append(("tickByTickMidPoint", reqId, time, midPoint))
+        self.tickByTickDone.set()
+
+
+FRAMES = [faketws.tickPriceFrame(1001, 1, 100.25, 300),
+          faketws.tickSizeFrame(1001, 0, 500),
+          faketws.tickPriceFrame(1002, 2, 100.5, 200)]
+
+CALLS = [("tickPrice", 1001, 1, 100.25), ("tickSize", 1001, 0, 300),
+         ("tickSize", 1001, 0, 500),
+         ("tickPrice", 1002, 2, 100.5), ("tickSize", 1002, 3, 200)]
+
+
+class CaptureTestCase(unittest.TestCase):
+    def setUp(self):
+        (fd, self.path) = tempfile.mkstemp(suffix=".ibcap")
+        os.close(fd)
+        os.remove(self.path)
+
+
+    def tearDown(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+    def record(self, frames, t0=0):
+        recorder = FrameRecorder(self.path, MAX_CLIENT_VER)
+        for (i, frame) in enumerate(frames):
+            recorder.record(t0 + i * 1000, frame[4:])
+        recorder.close()
+
+
+    def replay(self, paced=False):
+        replayer = FrameReplayer(self.path)
+        wrapper = CallsWrapper()
+        nMsgs = replayer.replay(Decoder(wrapper, replayer.serverVersion),
+                                paced, speed=10.)
+        return (nMsgs, wrapper.calls)
+
+
+    def test_record_replay(self):
+        self.record(FRAMES)
+        self.assertEqual(self.replay(), (3, CALLS))
+        self.assertEqual(self.replay(paced=True), (3, CALLS))
+
+
+    def test_append_after_cut_short(self):
+        self.record(FRAMES[:2])
+        with open(self.path, "ab") as f:
+            f.write(b"\0\0\0\0\0\0\0\1\0\0\0\x20abc")
+        self.assertEqual(self.replay(), (2, CALLS[:3]))
+
+        self.record(FRAMES[2:], t0=5000)
+        self.assertEqual(self.replay(), (3, CALLS))
+
+
+    def test_sessions(self):
+        self.record(FRAMES[:2], t0=time.monotonic_ns())
+        # a session of another boot, its monotonic clock started again
+        later = time.time_ns() + 3600 * 10 ** 9
+        with open(self.path, "ab") as f:
+            f.write(RECORD.pack(5, SESSION) + WALL_CLOCK.pack(later))
+            f.write(RECORD.pack(1005, len(FRAMES[2]) - 4) + FRAMES[2][4:])
+
+        replayer = FrameReplayer(self.path)
+        sessions = [(session, recvTime) for (session, recvTime, _)
+                    in replayer.sessionRecords()]
+        self.assertEqual([session for (session, _) in sessions], [0, 0, 1])
+        self.assertLess(abs(sessions[0][1] - time.time_ns()), 60 * 10 ** 9)
+        self.assertEqual(sessions[1][1] - sessions[0][1], 1000)
+        self.assertEqual(sessions[2][1], later + 1000)
+
+        # the time between the sessions is not waited
+        t0 = time.monotonic()
+        self.assertEqual(self.replay(paced=True), (3, CALLS))
+        self.assertLess(time.monotonic() - t0, 1.)
+
+
+    def test_server_version_mismatch(self):
+        self.record(FRAMES)
+        self.assertRaises(ValueError, FrameRecorder, self.path, MAX_CLIENT_VER - 1)
+
+
+    def test_client_capture(self):
+        frames = faketws.tickStream(1000, (1001, )) \
+            + [faketws.tickByTickMidPointFrame(1001, 1570000000, 100.)]
+        tws = faketws.FakeTws()
+        tws.onRequest(OUT.REQ_MKT_DATA,
+                      lambda session, fields: session.replay(frames))
+        tws.start()
+        wrapper = CallsWrapper()
+        client = EClient(wrapper)
+        try:
+            client.connect("127.0.0.1", tws.port, 0)
+            thread = threading.Thread(target=client.run)
+            thread.start()
+            # the startApi answers are not captured
+            self.assertTrue(wrapper.started.wait(5))
+            client.startCapture(self.path)
+            client.reqMktData(1001, Contract(), "", False, False, [])
+            self.assertTrue(wrapper.tickByTickDone.wait(5))
+        finally:
+            client.disconnect()
+            tws.stop()
+        thread.join(5)
+
+        (nMsgs, calls) = self.replay()
+        self.assertEqual(nMsgs, len(frames))
+        self.assertEqual(calls, wrapper.calls)
+
+
+if "__main__" == __name__:
+    unittest.main()
@@ -0,0 +1,106 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+import logging
+import unittest
+
+from ibapi import comm
+from ibapi.client import EClient
+from ibapi.wrapper import EWrapper
+from ibapi.contract import Contract
+from ibapi.utils import BadMessage, HotPathLog, setHotPathLogLevel
+
+
+class FakeConn:
+    def __init__(self):
+        self.sent = []
+        self.connected = True
+
+    def isConnected(self):
+        return self.connected
+
+    def sendMsg(self, msg):
+        self.sent.append(msg)
+
+    def disconnect(self):
+        self.connected = False
+
+
+class RecordingDecoder:
+    def __init__(self, client, nMsgs):
+        self.client = client
+        self.nMsgs = nMsgs
+        self.fields = []
+
+    def interpret(self, fields):
+        if fields[0] == b"bad":
+            raise BadMessage("bad msg")
+        self.fields.append(fields)
+        if len(self.fields) == self.nMsgs:
+            self.client.done = True
+
+
+class ClientTestCase(unittest.TestCase):
+    def setUp(self):
+        self.client = EClient(EWrapper())
+        self.client.conn = FakeConn()
+        self.client.setConnState(EClient.CONNECTED)
+
+
+    def tearDown(self):
+        setHotPathLogLevel(logging.NOTSET)
+
+
+    def test_run_drains_queue_in_order(self):
+        nMsgs = 100
+        decoder = RecordingDecoder(self.client, nMsgs)
+        self.client.decoder = decoder
+        for i in range(nMsgs):
+            self.client.msg_queue.put(comm.make_field(i).encode())
+
+        self.client.run()
+
+        self.assertEqual([int(fields[0]) for fields in decoder.fields],
+                         list(range(nMsgs)), "msgs not interpreted in order")
+        self.assertTrue(self.client.msg_queue.empty(), "queue should be empty")
+
+
+    def test_run_after_bad_message(self):
+        # the msgs dequeued with the bad one are still decoded
+        decoder = RecordingDecoder(self.client, 3)
+        self.client.decoder = decoder
+        for text in ("0", "bad", "1", "2"):
+            self.client.msg_queue.put(comm.make_field(text).encode())
+
+        conn = self.client.conn
+        self.client.run()
+
+        self.assertEqual([int(fields[0]) for fields in decoder.fields], [0, 1, 2])
+        self.assertFalse(conn.isConnected())
+
+
+    def test_log_request_looks_up_caller(self):
+        self.client.serverVersion_ = 150
+        with self.assertLogs("ibapi.client", logging.INFO) as logs:
+            self.client.reqMktData(1001, Contract(), "", False, False, [])
+
+        self.assertIn("REQUEST reqMktData", logs.output[0])
+        self.assertIn("'reqId': 1001", logs.output[0])
+        self.assertNotIn("'self'", logs.output[0])
+        self.assertIn("SENDING reqMktData", logs.output[1])
+
+
+    def test_hot_path_log_off(self):
+        self.client.serverVersion_ = 150
+        setHotPathLogLevel(HotPathLog.OFF)
+        with self.assertRaises(AssertionError):
+            # assertLogs() fails when nothing got logged
+            with self.assertLogs("ibapi", logging.DEBUG):
+                self.client.reqMktData(1001, Contract(), "", False, False, [])
+        self.assertEqual(len(self.client.conn.sent), 1)
+
+
+if "__main__" == __name__:
+    unittest.main()
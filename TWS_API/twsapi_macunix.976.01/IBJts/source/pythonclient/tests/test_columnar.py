@@ -0,0 +1,144 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+import unittest
+
+from ibapi import columnar
+from ibapi.decoder import Decoder
+from ibapi.message import IN
+from ibapi.server_versions import (MAX_CLIENT_VER,
+    MIN_SERVER_VER_SYNT_REALTIME_BARS)
+from ibapi.utils import BadMessage
+
+from helpers import make_fields, RecordingWrapper
+
+
+# the callbacks of the historical data
+HISTORICAL = ("historicalTicks", "historicalTicksBidAsk", "historicalTicksLast",
+              "historicalTicksArray", "historicalTicksBidAskArray",
+              "historicalTicksLastArray", "historicalData",
+              "historicalDataBatch", "historicalDataEnd")
+
+
+TICKS = make_fields(IN.HISTORICAL_TICKS, 1001, 2,
+    1570000000, 0, 123.25, 100,
+    1570000001, 0, 123.5, "", 1)
+TICKS_BID_ASK = make_fields(IN.HISTORICAL_TICKS_BID_ASK, 1001, 2,
+    1570000000, 1, 123.4, 123.5, 100, 200,
+    1570000001, 2, 123.3, 123.6, 300, 400, 0)
+TICKS_LAST = make_fields(IN.HISTORICAL_TICKS_LAST, 1002, 3,
+    1570000000, 0, 123.4, 100, "ISLAND", "",
+    1570000001, 3, 123.5, 200, "ARCA", "@ T",
+    1570000002, 2, 123.6, 300, "ISLAND", "", 1)
+
+
+@unittest.skipIf(columnar.numpy is None, "needs numpy")
+class ColumnarTestCase(unittest.TestCase):
+    def setUp(self):
+        self.wrapper = RecordingWrapper(HISTORICAL)
+        self.decoder = Decoder(self.wrapper, MAX_CLIENT_VER, columnarTicks=True)
+        self.objWrapper = RecordingWrapper(HISTORICAL)
+        self.objDecoder = Decoder(self.objWrapper, MAX_CLIENT_VER)
+
+
+    def tearDown(self):
+        pass
+
+
+    def decode(self, fields):
+        self.decoder.interpret(fields)
+        self.objDecoder.interpret(fields)
+        ((_, reqId, ticks, done), ) = self.wrapper.calls
+        ((_, objReqId, objTicks, objDone), ) = self.objWrapper.calls
+        self.assertEqual((reqId, done), (objReqId, objDone))
+        self.assertEqual(len(ticks), len(objTicks))
+        return (ticks, objTicks)
+
+
+    def test_ticks(self):
+        (ticks, objTicks) = self.decode(TICKS)
+        self.assertEqual(ticks.dtype, columnar.HISTORICAL_TICK_DTYPE)
+        self.assertEqual([tuple(tick) for tick in ticks],
+                         [(tick.time, tick.price, tick.size) for tick in objTicks])
+
+
+    def test_ticks_bid_ask(self):
+        (ticks, objTicks) = self.decode(TICKS_BID_ASK)
+        self.assertEqual(ticks.dtype, columnar.HISTORICAL_TICK_BID_ASK_DTYPE)
+        self.assertEqual([tuple(tick) for tick in ticks],
+            [(tick.time,
+              tick.tickAttribBidAsk.askPastHigh | tick.tickAttribBidAsk.bidPastLow << 1,
+              tick.priceBid, tick.priceAsk, tick.sizeBid, tick.sizeAsk)
+             for tick in objTicks])
+
+
+    def test_ticks_last(self):
+        (ticks, objTicks) = self.decode(TICKS_LAST)
+        self.assertEqual(ticks.dtype, columnar.HISTORICAL_TICK_LAST_DTYPE)
+        self.assertEqual([tuple(tick) for tick in ticks],
+            [(tick.time,
+              tick.tickAttribLast.pastLimit | tick.tickAttribLast.unreported << 1,
+              tick.price, tick.size, tick.exchange, tick.specialConditions)
+             for tick in objTicks])
+        self.assertIs(ticks["exchange"][0], ticks["exchange"][2])
+
+
+    def test_empty_page(self):
+        (ticks, _) = self.decode(make_fields(IN.HISTORICAL_TICKS_LAST, 1002, 0, 1))
+        self.assertEqual(ticks.dtype, columnar.HISTORICAL_TICK_LAST_DTYPE)
+
+
+    def test_short_msg(self):
+        self.assertRaises(BadMessage, self.decoder.interpret, TICKS_LAST[:-1])
+
+
+    def test_switch(self):
+        self.decoder.setColumnarTicks(False)
+        self.decoder.interpret(TICKS)
+        self.assertIsInstance(self.wrapper.calls[0][2], list)
+
+        self.decoder.setServerVersion(MAX_CLIENT_VER)
+        self.decoder.setColumnarTicks(True)
+        self.decoder.setServerVersion(MAX_CLIENT_VER)
+        self.decoder.interpret(TICKS)
+        self.assertIsInstance(self.wrapper.calls[1][2], columnar.numpy.ndarray)
+
+
+    def test_bars(self):
+        for (serverVersion, hasGaps) in ((MAX_CLIENT_VER, ()),
+                (MIN_SERVER_VER_SYNT_REALTIME_BARS - 1, ("false", ))):
+            version = () if hasGaps == () else (3, )
+            fields = make_fields(IN.HISTORICAL_DATA, *version, 1001,
+                "20191010", "20191011", 2,
+                "20191010", 1.5, 2.5, 1., 2., 1000, 1.75, *hasGaps, 10,
+                "20191011", 2., 3., 1.5, 2.5, 2000, 2.25, *hasGaps, 20)
+            wrapper = RecordingWrapper(HISTORICAL)
+            Decoder(wrapper, serverVersion, columnarBars=True).interpret(fields)
+            objWrapper = RecordingWrapper(HISTORICAL)
+            Decoder(objWrapper, serverVersion).interpret(fields)
+
+            ((_, bars), ) = wrapper.callsOf("historicalDataBatch")
+            end = wrapper.calls[-1]
+            self.assertEqual(end, objWrapper.calls[-1])
+            self.assertEqual(bars.dtype, columnar.BAR_DTYPE)
+            self.assertEqual([tuple(bar) for bar in bars],
+                [(bar.date, bar.open, bar.high, bar.low, bar.close, bar.volume,
+                  bar.average, bar.barCount) for (_, bar) in objWrapper.callsOf("historicalData")])
+
+
+    def test_data_frame(self):
+        try:
+            import pandas
+        except ImportError:
+            self.skipTest("needs pandas")
+        self.decoder.interpret(TICKS_LAST)
+        df = columnar.toDataFrame(self.wrapper.calls[0][2], index="time")
+        self.assertEqual(list(df.columns), ["mask", "price", "size", "exchange",
+                                            "specialConditions"])
+        self.assertEqual(df.loc[1570000001, "exchange"], "ARCA")
+
+
+if "__main__" == __name__:
+    unittest.main()
@@ -5,7 +5,9 @@ Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is su
 
 import unittest
 import struct
+from decimal import Decimal
 from ibapi import comm
+from ibapi.common import UNSET_INTEGER, UNSET_DOUBLE
 
 
 class CommTestCase(unittest.TestCase):
@@ -36,6 +38,31 @@ class CommTestCase(unittest.TestCase):
         self.assertEqual(field[0:-1], text, "payload not good")
 
 
+    def test_encode_field(self):
+        vals = [0, 1, -1, 1001, 2 ** 40, 0., 123.45, 1e-07, UNSET_DOUBLE,
+                UNSET_INTEGER, "", "SMART", "AAPL", True, False, Decimal("1.5")]
+        for val in vals:
+            self.assertEqual(comm.encode_field(val), comm.make_field(val).encode())
+            self.assertEqual(comm.encode_field_handle_empty(val),
+                             comm.make_field_handle_empty(val).encode())
+        self.assertEqual(comm.encode_fields(*vals),
+                         "".join(comm.make_field(val) for val in vals).encode())
+
+        with self.assertRaises(ValueError):
+            comm.encode_field(None)
+
+
+    def test_encode_msg(self):
+        vals = [1, 11, 1001, "AAPL", 0., False, ""]
+        self.assertEqual(comm.encode_msg(vals),
+            comm.make_msg("".join(comm.make_field(val) for val in vals)))
+
+        # the size prefix counts the bytes, not the characters
+        msg = comm.encode_msg(["Zürich"])
+        (size, text, rest) = comm.read_msg(msg)
+        self.assertEqual((size, text, rest), (8, "Zürich\0".encode(), b""))
+
+
     def test_read_msg(self):
         text = "ABCD"
         msg = comm.make_msg(text)
@@ -61,6 +88,36 @@ class CommTestCase(unittest.TestCase):
         self.assertEqual(fields[1].decode(), text2)        
 
 
+    def test_frame_buffer(self):
+        texts = ["ABCD", "123", "", "X" * 1000]
+        data = b"".join(comm.make_msg(text) for text in texts)
+
+        frames = comm.FrameBuffer(capacity=16, compactThreshold=8)
+        msgs = []
+        # feed in small chunks so that msgs span several reads
+        for i in range(0, len(data), 7):
+            frames.feed(data[i:i+7])
+            msg = frames.nextMsg()
+            while msg is not None:
+                msgs.append(msg.tobytes().decode())
+                msg = frames.nextMsg()
+
+        self.assertEqual(msgs, texts, "msgs not good")
+        self.assertEqual(len(frames), 0, "there should be no remainder")
+
+
+    def test_frame_buffer_reserve(self):
+        msg = comm.make_msg("ABCD")
+
+        frames = comm.FrameBuffer(capacity=4)
+        view = frames.reserve(len(msg))
+        view[0:len(msg)] = msg
+        frames.commit(len(msg))
+
+        self.assertEqual(frames.nextMsg().tobytes(), b"ABCD", "msg not good")
+        self.assertIsNone(frames.nextMsg(), "there should be no more msgs")
+
+
 if "__main__" == __name__:
     unittest.main()
         
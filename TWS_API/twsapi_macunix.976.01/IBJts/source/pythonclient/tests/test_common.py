@@ -0,0 +1,88 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+import copy
+import pickle
+import unittest
+
+from ibapi.common import (BarData, RealTimeBar, HistoricalTick,
+    HistoricalTickBidAsk, HistoricalTickLast, TickAttrib, TickAttribBidAsk,
+    TickAttribLast, TICK_ATTRIB_BID_ASK, TICK_ATTRIB_LAST)
+from ibapi.decoder import Decoder
+from ibapi.message import IN
+from ibapi.server_versions import MAX_CLIENT_VER
+
+from helpers import make_fields, RecordingWrapper
+
+
+class CommonTestCase(unittest.TestCase):
+    def setUp(self):
+        pass
+
+
+    def tearDown(self):
+        pass
+
+
+    def test_slots(self):
+        for cls in (BarData, RealTimeBar, HistoricalTick, HistoricalTickBidAsk,
+                    HistoricalTickLast, TickAttrib, TickAttribBidAsk,
+                    TickAttribLast):
+            obj = cls()
+            self.assertFalse(hasattr(obj, "__dict__"), cls.__name__)
+            self.assertRaises(AttributeError, setattr, obj, "typo", 1)
+
+
+    def test_shared_tick_attribs(self):
+        for mask in range(4):
+            attrib = TICK_ATTRIB_BID_ASK[mask]
+            self.assertEqual((attrib.bidPastLow, attrib.askPastHigh),
+                             (mask & 1 != 0, mask & 2 != 0))
+            self.assertIsInstance(attrib, TickAttribBidAsk)
+            self.assertRaises(AttributeError, setattr, attrib, "bidPastLow", True)
+            self.assertRaises(AttributeError, delattr, attrib, "askPastHigh")
+
+            attrib = TICK_ATTRIB_LAST[mask]
+            self.assertEqual((attrib.pastLimit, attrib.unreported),
+                             (mask & 1 != 0, mask & 2 != 0))
+            self.assertIsInstance(attrib, TickAttribLast)
+            self.assertRaises(AttributeError, setattr, attrib, "pastLimit", True)
+
+            self.assertEqual(str(pickle.loads(pickle.dumps(attrib))), str(attrib))
+            self.assertEqual(str(copy.deepcopy(attrib)), str(attrib))
+
+
+    def test_decoded_ticks_share_attribs(self):
+        wrapper = RecordingWrapper(("historicalTicksBidAsk",
+                                    "historicalTicksLast", "tickByTickBidAsk"))
+        decoder = Decoder(wrapper, MAX_CLIENT_VER)
+        decoder.interpret(make_fields(IN.HISTORICAL_TICKS_BID_ASK, 1001, 2,
+            1570000000, 1, 123.4, 123.5, 100, 200,
+            1570000001, 2, 123.4, 123.5, 100, 200, 1))
+        decoder.interpret(make_fields(IN.HISTORICAL_TICKS_LAST, 1001, 1,
+            1570000000, 3, 123.4, 100, "ISLAND", "@ T", 1))
+        decoder.interpret(make_fields(IN.TICK_BY_TICK, 1001, 3, 1570000000,
+                                      123.4, 123.5, 100, 200, 1))
+
+        ((_, (askPastHigh, bidPastLow), _), ) = wrapper.callsOf("historicalTicksBidAsk")
+        ((_, (last, ), _), ) = wrapper.callsOf("historicalTicksLast")
+        tickByTick = wrapper.callsOf("tickByTickBidAsk")[0][-1]
+        self.assertIs(askPastHigh.tickAttribBidAsk, TICK_ATTRIB_BID_ASK[2])
+        self.assertIs(bidPastLow.tickAttribBidAsk, TICK_ATTRIB_BID_ASK[1])
+        self.assertIs(last.tickAttribLast, TICK_ATTRIB_LAST[3])
+        self.assertIs(tickByTick, TICK_ATTRIB_BID_ASK[1])
+
+
+    def test_decoded_real_time_bar(self):
+        wrapper = RecordingWrapper(("realtimeBar", ))
+        decoder = Decoder(wrapper, MAX_CLIENT_VER)
+        decoder.interpret(make_fields(IN.REAL_TIME_BARS, 3, 1001, 1570000000,
+            123.4, 123.9, 123.1, 123.5, 300, 123.45, 12))
+        self.assertEqual(wrapper.callsOf("realtimeBar"), [(1001, 1570000000,
+            123.4, 123.9, 123.1, 123.5, 300, 123.45, 12)])
+
+
+if "__main__" == __name__:
+    unittest.main()
@@ -0,0 +1,54 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+import unittest
+import socket
+
+from ibapi import comm
+from ibapi.connection import Connection
+
+
+class ConnectionTestCase(unittest.TestCase):
+    def setUp(self):
+        (self.sock, self.peer) = socket.socketpair()
+        self.sock.settimeout(1)
+        self.conn = Connection("127.0.0.1", 0, readSize=16, recvInto=True)
+        self.conn.socket = self.sock
+
+
+    def tearDown(self):
+        self.conn.disconnect()
+        self.peer.close()
+
+
+    def test_recv_msg_into(self):
+        texts = ["ABCD" * 10, "123"]
+        self.peer.sendall(b"".join(comm.make_msg(text) for text in texts))
+
+        frames = comm.FrameBuffer(capacity=8)
+        nRecvd = 0
+        msgs = []
+        while len(msgs) < len(texts):
+            nRecvd += self.conn.recvMsgInto(frames)
+            msg = frames.nextMsg()
+            while msg is not None:
+                msgs.append(msg.tobytes().decode())
+                msg = frames.nextMsg()
+
+        self.assertEqual(msgs, texts, "msgs not good")
+        self.assertEqual(nRecvd, sum(4 + len(text) for text in texts))
+
+
+    def test_recv_msg_into_closed(self):
+        self.peer.close()
+
+        nRecvd = self.conn.recvMsgInto(comm.FrameBuffer())
+
+        self.assertEqual(nRecvd, 0, "nothing should be received")
+        self.assertFalse(self.conn.isConnected(), "should be disconnected")
+
+
+if "__main__" == __name__:
+    unittest.main()
@@ -0,0 +1,156 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+import os
+import asyncio
+import tempfile
+import unittest
+
+from ibapi import faketws
+from ibapi.contract_cache import ContractCache, ContractResolver
+from ibapi.async_client import AsyncEClient, RequestError
+from ibapi.wrapper import EWrapper
+from ibapi.contract import Contract, ContractDetails
+from ibapi.message import IN, OUT
+
+
+def makeDetails(conId, symbol, exchange="SMART"):
+    details = ContractDetails()
+    contract = details.contract
+    (contract.conId, contract.symbol, contract.secType) = (conId, symbol, "STK")
+    (contract.exchange, contract.currency) = (exchange, "USD")
+    contract.localSymbol = symbol
+    details.longName = symbol + " Inc"
+    return details
+
+
+def makeContract(symbol, exchange="SMART", conId=0):
+    contract = Contract()
+    (contract.conId, contract.symbol, contract.secType) = (conId, symbol, "STK")
+    (contract.exchange, contract.currency) = (exchange, "USD")
+    return contract
+
+
+class ContractsTws(faketws.FakeTws):
+    """ one STK per symbol on SMART and ISLAND, conId 1000 + index of the
+    symbol, "NONE" is unknown """
+
+    SYMBOLS = ["AAPL", "MSFT", "IBM", "SPY"]
+
+    def __init__(self):
+        super().__init__()
+        self.onRequest(OUT.REQ_CONTRACT_DATA, self.handleContractData)
+        self.requested = []
+
+
+    def handleContractData(self, session, fields):
+        reqId = int(fields[2])
+        symbol = fields[4].decode()
+        self.requested.append(symbol)
+        if symbol not in self.SYMBOLS:
+            session.send(faketws.makeFrame(IN.ERR_MSG, 2, reqId, 200,
+                "No security definition has been found for the request"))
+            return
+        conId = 1000 + self.SYMBOLS.index(symbol)
+        session.send(faketws.contractDataFrame(reqId, makeDetails(conId, symbol))
+            + faketws.contractDataFrame(reqId, makeDetails(conId, symbol, "ISLAND"))
+            + faketws.makeFrame(IN.CONTRACT_DATA_END, 1, reqId))
+
+
+class ContractCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.clock = 1000.
+        self.cache = ContractCache(maxSize=3, ttl=60., clock=lambda: self.clock)
+
+
+    def tearDown(self):
+        pass
+
+
+    def test_indexes(self):
+        cache = self.cache
+        cache.put(makeDetails(1, "AAPL"))
+        cache.put(makeDetails(2, "AAPL", "ISLAND"))
+        self.assertEqual(cache.get(1).contract.symbol, "AAPL")
+        self.assertIsNone(cache.get(3))
+        self.assertEqual([details.contract.conId for details in
+                          cache.lookup("AAPL", "STK", "ISLAND", "USD")], [2])
+        self.assertEqual(sorted(details.contract.conId for details in
+                                cache.lookupLocalSymbol("AAPL")), [1, 2])
+
+
+    def test_lru_and_ttl(self):
+        cache = self.cache
+        for conId in (1, 2, 3):
+            cache.put(makeDetails(conId, "S%d" % conId))
+        cache.get(1)
+        cache.put(makeDetails(4, "S4"))
+        self.assertEqual([conId for (conId, _) in cache.entries], [3, 1, 4])
+        self.assertEqual(cache.lookup("S2", "STK", "SMART", "USD"), [])
+
+        self.clock += 60.
+        self.assertIsNone(cache.get(1))
+        self.assertEqual(len(cache), 2)
+
+
+    def test_answers(self):
+        cache = self.cache
+        contract = makeContract("AAPL")
+        self.assertIsNone(cache.getAnswer(contract))
+        cache.addAnswer(contract, [makeDetails(1, "AAPL")])
+        self.assertEqual(cache.getAnswer(contract)[0].contract.conId, 1)
+        self.assertEqual(cache.getAnswer(makeContract("", "SMART", 1))[0].longName,
+                         "AAPL Inc")
+        self.clock += 60.
+        self.assertIsNone(cache.getAnswer(contract))
+
+
+    def test_save_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "contracts.pickle")
+            cache = ContractCache(path, clock=lambda: self.clock)
+            cache.addAnswer(makeContract("AAPL"), [makeDetails(1, "AAPL")])
+            cache.put(makeDetails(2, "MSFT"), self.clock - 100.)
+            cache.save()
+
+            loaded = ContractCache(path, ttl=60., clock=lambda: self.clock)
+            self.assertEqual(list(loaded.entries), [(1, "SMART")])
+            self.assertEqual(loaded.getAnswer(makeContract("AAPL"))[0].longName,
+                             "AAPL Inc")
+
+        with self.assertRaises(ValueError):
+            self.cache.save()
+
+
+    def test_resolver(self):
+        async def main():
+            client = AsyncEClient(EWrapper())
+            await client.connect("127.0.0.1", tws.port, 0)
+            resolver = ContractResolver(client, maxRequestsPerSec=2)
+            try:
+                symbols = ContractsTws.SYMBOLS + ["AAPL"]
+                cold = await asyncio.wait_for(resolver.resolveMany(
+                    [makeContract(symbol) for symbol in symbols]), 5)
+                warm = await resolver.resolve(makeContract("MSFT"))
+                with self.assertRaises(RequestError):
+                    await resolver.resolve(makeContract("NONE"))
+                return (cold, warm, resolver)
+            finally:
+                client.disconnect()
+                await asyncio.sleep(0.01)
+
+        with ContractsTws() as tws:
+            (cold, warm, resolver) = asyncio.run(main())
+
+        self.assertEqual(sorted(tws.requested), sorted(ContractsTws.SYMBOLS + ["NONE"]))
+        self.assertEqual([[details.contract.exchange for details in detailsList]
+                          for detailsList in cold], [["SMART", "ISLAND"]] * 5)
+        self.assertIs(cold[4][0], cold[0][0])
+        self.assertIs(warm[0], cold[1][0])
+        self.assertEqual(resolver.cache.get(1003).contract.symbol, "SPY")
+
+
+if "__main__" == __name__:
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+import unittest
+
+from ibapi.decoder import Decoder
+from ibapi.message import IN
+from ibapi.server_versions import MAX_CLIENT_VER, MIN_SERVER_VER_SMART_DEPTH
+from ibapi.utils import BadMessage
+
+from helpers import make_fields, RecordingWrapper
+
+
+# msgs with the handlers in fastdecoder, for the current server version
+HOT_MSGS = [
+    make_fields(IN.TICK_PRICE, 6, 1001, 1, 123.45, 300, 3),
+    make_fields(IN.TICK_PRICE, 6, 1001, 9, 120.5, 0, 0),
+    make_fields(IN.TICK_SIZE, 6, 1001, 8, 12345),
+    make_fields(IN.TICK_BY_TICK, 1001, 1, 1570000000, 123.4, 100, 2, "ISLAND", "@ T"),
+    make_fields(IN.TICK_BY_TICK, 1001, 3, 1570000000, 123.4, 123.5, 100, 200, 1),
+    make_fields(IN.TICK_BY_TICK, 1001, 4, 1570000000, 123.45),
+    make_fields(IN.MARKET_DEPTH_L2, 1, 1001, 0, "NSDQ", 1, 1, 123.4, 500, 1),
+    make_fields(IN.HISTORICAL_DATA, 1001, "20191010 10:00:00", "20191011 10:00:00", 2,
+                "20191010", 1.5, 2.5, 1., 2., 1000, 1.75, 10,
+                "20191011", 2., 3., 1.5, 2.5, 2000, 2.25, 20),
+]
+
+
+class DecoderTestCase(unittest.TestCase):
+    def setUp(self):
+        self.fastWrapper = RecordingWrapper(byAttributes=True)
+        self.fastDecoder = Decoder(self.fastWrapper, MAX_CLIENT_VER)
+
+        self.slowWrapper = RecordingWrapper(byAttributes=True)
+        self.slowDecoder = Decoder(self.slowWrapper, MAX_CLIENT_VER)
+        self.slowDecoder.fastHandlers = {}
+
+
+    def tearDown(self):
+        pass
+
+
+    def test_fast_handlers_match_generic_decoding(self):
+        for fields in HOT_MSGS:
+            self.fastDecoder.interpret(fields)
+            self.slowDecoder.interpret(fields)
+
+        self.assertEqual(len(self.fastWrapper.calls), 11)
+        self.assertEqual(self.fastWrapper.calls, self.slowWrapper.calls)
+
+
+    def test_fast_handlers_older_server_version(self):
+        serverVersion = MIN_SERVER_VER_SMART_DEPTH - 1
+        self.fastDecoder.setServerVersion(serverVersion)
+        self.slowDecoder.serverVersion = serverVersion
+
+        fields = make_fields(IN.MARKET_DEPTH_L2, 1, 1001, 0, "NSDQ", 1, 1, 123.4, 500)
+        self.fastDecoder.interpret(fields)
+        self.slowDecoder.interpret(fields)
+
+        self.assertEqual(self.fastWrapper.calls, self.slowWrapper.calls)
+
+
+    def test_signature_decoding(self):
+        self.fastDecoder.interpret(make_fields(IN.ACCOUNT_SUMMARY, 1, 7,
+            "DU123", "NetLiquidation", "1000.5", "USD"))
+        self.fastDecoder.interpret(make_fields(IN.TICK_GENERIC, 6, 1001, 49, 0.5))
+        self.fastDecoder.interpret(
+            (str(IN.ACCT_UPDATE_TIME).encode(), b"1", "10:30\xe9".encode("latin-1")))
+
+        self.assertEqual(self.fastWrapper.calls, [
+            ("accountSummary", 7, "DU123", "NetLiquidation", "1000.5", "USD"),
+            ("tickGeneric", 1001, 49, 0.5),
+            ("updateAccountTime", "10:30\xe9")])
+
+
+    def test_fast_handler_bad_message(self):
+        fields = make_fields(IN.TICK_PRICE, 6, 1001, 1)
+        self.assertRaises(BadMessage, self.fastDecoder.interpret, fields)
+        self.assertEqual(self.fastWrapper.calls[-1][0], "error")
+
+
+if "__main__" == __name__:
+    unittest.main()
@@ -0,0 +1,128 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+import threading
+import unittest
+
+from ibapi import comm
+from ibapi import faketws
+from ibapi.client import EClient
+from ibapi.decoder import Decoder
+from ibapi.wrapper import EWrapper
+from ibapi.contract import Contract
+from ibapi.order import Order
+from ibapi.order_state import OrderState
+from ibapi.tag_value import TagValue
+from ibapi.message import OUT
+from ibapi.server_versions import MAX_CLIENT_VER
+
+
+class RecordingWrapper(EWrapper):
+    def __init__(self):
+        self.calls = []
+        self.nTicks = 0
+        self.ticksDone = threading.Event()
+        self.nExpectedTicks = None
+
+    def managedAccounts(self, accountsList):
+        self.calls.append(("managedAccounts", accountsList))
+
+    def nextValidId(self, orderId):
+        self.calls.append(("nextValidId", orderId))
+
+    def openOrder(self, orderId, contract, order, orderState):
+        self.calls.append(("openOrder", orderId, contract, order, orderState))
+
+    def tick(self, *args):
+        self.nTicks += 1
+        if self.nTicks == self.nExpectedTicks:
+            self.ticksDone.set()
+
+    tickPrice = tickSize = tickByTickAllLast = tickByTickBidAsk = tick
+    updateMktDepthL2 = tick
+
+
+def comparable(obj):
+    """ the attributes, with the objects in them as their str() """
+    def value(val):
+        if isinstance(val, list):
+            return [value(item) for item in val]
+        return str(val) if hasattr(val, "__dict__") else val
+    return {name: value(val) for (name, val) in vars(obj).items()}
+
+
+class FakeTwsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tws = faketws.FakeTws(accounts="DU1,DU2", nextValidId=42)
+        self.tws.start()
+        self.wrapper = RecordingWrapper()
+        self.client = EClient(self.wrapper)
+
+
+    def tearDown(self):
+        self.client.disconnect()
+        self.tws.stop()
+
+
+    def test_session(self):
+        frames = faketws.tickStream(5000, (1001, 1002))
+        def onMktData(session, fields):
+            session.startReplay(frames, rate=100000)
+        self.tws.onRequest(OUT.REQ_MKT_DATA, onMktData)
+
+        self.client.connect("127.0.0.1", self.tws.port, 3)
+        thread = threading.Thread(target=self.client.run)
+        thread.start()
+
+        session = self.tws.waitForSession()
+        self.assertEqual(session.serverVersion, MAX_CLIENT_VER)
+
+        # TICK_PRICE for the bid, ask and last also give a TICK_SIZE
+        fields = [comm.read_fields(frame[4:]) for frame in frames]
+        self.wrapper.nExpectedTicks = len(frames) + sum(
+            1 for flds in fields if flds[0] == b"1" and flds[3] in (b"1", b"2", b"4"))
+        self.client.reqMktData(1001, Contract(), "", False, False, [])
+        self.assertTrue(self.wrapper.ticksDone.wait(5), "ticks not all received")
+
+        self.client.disconnect()
+        thread.join(5)
+
+        self.assertEqual(session.clientId, 3)
+        self.assertEqual(self.wrapper.calls, [("managedAccounts", "DU1,DU2"),
+                                              ("nextValidId", 42)])
+
+
+    def test_open_order_frame(self):
+        contract = Contract()
+        contract.conId = 265598
+        contract.symbol = "AAPL"
+        contract.secType = "STK"
+        contract.exchange = "SMART"
+        contract.currency = "USD"
+        order = Order()
+        order.orderId = 7
+        order.action = "BUY"
+        order.totalQuantity = 100.
+        order.orderType = "LMT"
+        order.lmtPrice = 123.45
+        order.algoStrategy = "Adaptive"
+        order.algoParams = [TagValue("adaptivePriority", "Normal")]
+        order.usePriceMgmtAlgo = True
+        orderState = OrderState()
+        orderState.status = "Submitted"
+
+        decoder = Decoder(self.wrapper, MAX_CLIENT_VER)
+        frame = faketws.openOrderFrame(contract, order, orderState)
+        decoder.interpret(comm.read_fields(frame[4:]))
+
+        (_, orderId, contract2, order2, orderState2) = self.wrapper.calls[0]
+        self.assertEqual(orderId, 7)
+        self.assertEqual(comparable(contract2), comparable(contract))
+        self.assertEqual(comparable(order2), comparable(order))
+        self.assertEqual(comparable(orderState2), comparable(orderState))
+
+
+if "__main__" == __name__:
+    unittest.main()
@@ -0,0 +1,196 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+import time
+import threading
+import unittest
+
+from ibapi import comm
+from ibapi import faketws
+from ibapi.governor import RateGovernor, ORDERS, REQUESTS
+from ibapi.writer import EWriter
+from ibapi.client import EClient
+from ibapi.wrapper import EWrapper
+from ibapi.contract import Contract
+from ibapi.order import Order
+from ibapi.message import OUT
+
+
+def make_request(msgId, reqId) -> bytes:
+    return comm.encode_msg([msgId, 1, reqId])
+
+
+class RecordingConn:
+    """ records the msgs of each write and when it was made """
+    def __init__(self):
+        self.writes = []
+
+    def isConnected(self):
+        return True
+
+    def sendAll(self, data):
+        msgs = []
+        rest = data
+        while rest:
+            (size, text, rest) = comm.read_msg(rest)
+            fields = comm.read_fields(text)
+            msgs.append("%s:%s" % (fields[0].decode(), fields[2].decode()))
+        self.writes.append((time.monotonic(), msgs))
+        return len(data)
+
+
+class StartedWrapper(EWrapper):
+    def __init__(self):
+        self.started = threading.Event()
+
+    def nextValidId(self, orderId):
+        self.started.set()
+
+
+class GovernorTestCase(unittest.TestCase):
+    def setUp(self):
+        pass
+
+
+    def tearDown(self):
+        pass
+
+
+    def test_priority(self):
+        governor = RateGovernor()
+        self.assertEqual(governor.priority(make_request(OUT.CANCEL_ORDER, 7)), ORDERS)
+        self.assertEqual(governor.priority(make_request(OUT.REQ_MKT_DATA, 7)), REQUESTS)
+        self.assertEqual(governor.nClasses, 2)
+
+        governor = RateGovernor(priorities={OUT.CANCEL_ORDER: 0,
+                                            OUT.PLACE_ORDER: 1}, defaultPriority=2)
+        self.assertEqual([governor.priority(make_request(msgId, 7)) for msgId in
+                          (OUT.CANCEL_ORDER, OUT.PLACE_ORDER, OUT.REQ_MKT_DATA)],
+                         [0, 1, 2])
+        self.assertEqual(governor.nClasses, 3)
+
+
+    def test_paced_writes(self):
+        conn = RecordingConn()
+        writer = EWriter(conn, governor=RateGovernor(10, 0.2, margin=0.,
+                                                      reserve=0))
+        for reqId in range(25):
+            writer.put(make_request(OUT.REQ_MKT_DATA, reqId))
+        writer.putAll([make_request(OUT.CANCEL_ORDER, orderId)
+                       for orderId in range(5)])
+        t0 = time.monotonic()
+        writer.start()
+        self.addCleanup(writer.stop, 5)
+        self.assertTrue(writer.flush(5))
+        self.assertGreaterEqual(time.monotonic() - t0, 0.4)
+
+        # the cancels first, no more than 10 msgs a write
+        msgs = [msg for (t, writeMsgs) in conn.writes for msg in writeMsgs]
+        self.assertEqual(msgs, ["%d:%d" % (OUT.CANCEL_ORDER, orderId)
+                                for orderId in range(5)]
+                         + ["%d:%d" % (OUT.REQ_MKT_DATA, reqId)
+                            for reqId in range(25)])
+        self.assertEqual([len(writeMsgs) for (t, writeMsgs) in conn.writes],
+                         [10, 10, 10])
+
+        metrics = writer.metrics()
+        self.assertEqual(metrics["throttledWrites"], 2)
+        self.assertGreater(metrics["throttleTime"], 0.3)
+        (orders, requests) = metrics["latencies"]
+        self.assertEqual((orders["msgs"], requests["msgs"]), (5, 25))
+        self.assertLess(orders["maxLatency"], requests["maxLatency"])
+
+
+    def test_reserve(self):
+        governor = RateGovernor(10, 1., margin=0., reserve=3)
+        self.assertEqual((governor.available(0., ORDERS),
+                          governor.available(0., REQUESTS)), (10, 7))
+        governor.take(0., 7)
+        governor.take(0.5, 2)
+        self.assertEqual((governor.available(0.6, ORDERS),
+                          governor.available(0.6, REQUESTS)), (1, 0))
+        self.assertEqual((governor.delay(0.6, ORDERS),
+                          governor.delay(0.6, REQUESTS)), (0., 0.4))
+        governor.take(0.6, 1)
+        self.assertAlmostEqual(governor.delay(0.7, ORDERS), 0.3)
+        self.assertEqual(governor.available(1., REQUESTS), 4)
+
+        with self.assertRaises(ValueError):
+            RateGovernor(10, reserve=10)
+
+        # the cancel queued behind a burst is written at once
+        conn = RecordingConn()
+        writer = EWriter(conn, governor=RateGovernor(10, 10., reserve=3))
+        writer.start()
+        self.addCleanup(writer.stop, 0.1)
+        for reqId in range(20):
+            writer.put(make_request(OUT.REQ_MKT_DATA, reqId))
+        self.assertFalse(writer.flush(0.2))
+        self.assertEqual(writer.metrics()["latencies"][REQUESTS]["msgs"], 7)
+        writer.put(make_request(OUT.CANCEL_ORDER, 1))
+        deadline = time.monotonic() + 5
+        while writer.metrics()["latencies"][ORDERS]["msgs"] == 0 \
+                and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(writer.metrics()["latencies"][ORDERS]["msgs"], 1)
+        self.assertEqual(writer.queueDepth()[0], 13)
+        writer.stop(0.1)
+
+
+    def test_stop_drops_throttled(self):
+        conn = RecordingConn()
+        writer = EWriter(conn, governor=RateGovernor(1, 10., reserve=0))
+        writer.start()
+        self.addCleanup(writer.stop, 5)
+        for reqId in range(3):
+            writer.put(make_request(OUT.REQ_MKT_DATA, reqId))
+        writer.stop(0.1)
+        self.assertFalse(writer.is_alive())
+        self.assertEqual(len(conn.writes), 1)
+        self.assertEqual(writer.metrics()["droppedMsgs"], 2)
+
+
+    def test_client(self):
+        tws = faketws.FakeTws()
+        tws.start()
+        wrapper = StartedWrapper()
+        client = EClient(wrapper)
+        client.setOutboundQueue(True, governor=RateGovernor(1000))
+        try:
+            client.connect("127.0.0.1", tws.port, 0)
+            thread = threading.Thread(target=client.run)
+            thread.start()
+            self.assertTrue(wrapper.started.wait(5))
+            session = tws.waitForSession()
+            contract = Contract()
+            (contract.symbol, contract.secType) = ("AAPL", "STK")
+            (contract.exchange, contract.currency) = ("SMART", "USD")
+            order = Order()
+            (order.action, order.totalQuantity) = ("BUY", 100.)
+            (order.orderType, order.lmtPrice) = ("LMT", 123.45)
+            for reqId in range(20):
+                client.reqMktData(reqId, contract, "", False, False, [])
+            client.placeOrders([(orderId, contract, order)
+                                for orderId in range(3)])
+            self.assertTrue(client.flush(5))
+            metrics = client.outboundMetrics()
+            deadline = time.monotonic() + 5
+            while len(session.requests) < 24 and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            client.disconnect()
+            tws.stop()
+        thread.join(5)
+
+        self.assertEqual(metrics["msgs"], 24)
+        self.assertEqual([latencies["msgs"] for latencies in metrics["latencies"]],
+                         [4, 20])
+        requests = sorted(int(fields[0]) for fields in session.requests)
+        self.assertEqual(requests, sorted([OUT.START_API] + [OUT.REQ_MKT_DATA] * 20
+                                          + [OUT.PLACE_ORDER] * 3))
+
+
+if "__main__" == __name__:
+    unittest.main()
@@ -0,0 +1,192 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+import time
+import asyncio
+import calendar
+import unittest
+
+from ibapi import faketws
+from ibapi import history
+from ibapi import columnar
+from ibapi.async_client import AsyncEClient
+from ibapi.wrapper import EWrapper
+from ibapi.common import BarData
+from ibapi.contract import Contract
+from ibapi.message import IN, OUT
+
+
+T0 = calendar.timegm((2019, 10, 7, 0, 0, 0))
+PACING_VIOLATION = "Historical Market Data Service error message:" \
+                   "Historical data request pacing violation"
+
+
+def parseTime(fields, idx):
+    return calendar.timegm(time.strptime(fields[idx].decode(), "%Y%m%d %H:%M:%S GMT"))
+
+
+class HistoricalTws(faketws.FakeTws):
+    """ 1 min bars and 3 ticks per second from T0 on, the first request is
+    rejected for pacing """
+
+    def __init__(self):
+        super().__init__()
+        self.onRequest(OUT.REQ_HISTORICAL_DATA, self.handleHistoricalData)
+        self.onRequest(OUT.REQ_HISTORICAL_TICKS, self.handleHistoricalTicks)
+        self.nRequests = 0
+        self.durations = []
+
+
+    def rejectFirst(self, session, reqId) -> bool:
+        self.nRequests += 1
+        if self.nRequests == 1:
+            session.send(faketws.makeFrame(IN.ERR_MSG, 2, reqId, 162,
+                                           PACING_VIOLATION))
+        return self.nRequests == 1
+
+
+    def handleHistoricalData(self, session, fields):
+        reqId = int(fields[1])
+        if self.rejectFirst(session, reqId):
+            return
+        end = parseTime(fields, 15)
+        duration = fields[17].decode()
+        self.durations.append(duration)
+        bars = []
+        for t in range(end - int(duration.split()[0]), end, 60):
+            if t >= T0:
+                bar = BarData()
+                (bar.date, bar.close, bar.barCount) = (str(t), (t - T0) / 60, 1)
+                bars.append(bar)
+        session.send(faketws.historicalDataFrame(reqId, bars))
+
+
+    def handleHistoricalTicks(self, session, fields):
+        reqId = int(fields[1])
+        if self.rejectFirst(session, reqId):
+            return
+        first = max(0, (parseTime(fields, 15) - T0) * 3)
+        last = first + int(fields[17])
+        last += 2 - (last - 1) % 3      # up to the end of the second
+        vals = []
+        for i in range(first, last):
+            vals += [T0 + i // 3, 0, i, 100, "ISLAND", ""]
+        session.send(faketws.makeFrame(IN.HISTORICAL_TICKS_LAST, reqId,
+                                       last - first, *vals, 1))
+
+
+class NoTicksTws(faketws.FakeTws):
+    """ has no historical ticks """
+
+    def __init__(self):
+        super().__init__()
+        self.onRequest(OUT.REQ_HISTORICAL_TICKS, self.handleHistoricalTicks)
+
+
+    def handleHistoricalTicks(self, session, fields):
+        session.send(faketws.makeFrame(IN.ERR_MSG, 2, int(fields[1]), 162,
+            "Historical Market Data Service error message:"
+            "HMDS query returned no data: AAPL@SMART Last"))
+
+
+class HistoryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.clock = 0.
+        self.pacer = history.HistoricalPacer(maxRequests=3, period=10.,
+            sameContractRequests=2, sameContractPeriod=1., identicalPeriod=5.,
+            margin=0., clock=lambda: self.clock)
+
+
+    def tearDown(self):
+        pass
+
+
+    def test_pacer(self):
+        pacer = self.pacer
+        pacer.take("A", "A1")
+        self.assertEqual(pacer.delay("A", "A1"), 5.)
+        self.assertEqual(pacer.delay("A", "A2"), 0.)
+        pacer.take("A", "A2")
+        self.assertEqual(pacer.delay("A", "A3"), 1.)
+        self.assertEqual(pacer.delay("B", "B1"), 0.)
+        pacer.take("B", "B1")
+        self.assertEqual(pacer.delay("C", "C1"), 10.)
+
+        self.clock = 1.
+        self.assertEqual(pacer.delay("A", "A3"), 9.)
+        self.clock = 10.
+        self.assertEqual(pacer.delay("A", "A3"), 0.)
+        self.assertEqual(pacer.delay("A", "A1"), 0.)
+
+
+    def test_split_range(self):
+        self.assertEqual(history.splitRange(T0, T0 + 2.5 * 86400, "1 min"),
+            [("20191009 12:00:00 GMT", "86400 S"),
+             ("20191008 12:00:00 GMT", "86400 S"),
+             ("20191007 12:00:00 GMT", "43200 S")])
+        self.assertEqual(history.splitRange(T0, T0 + 10 * 86400, "1 day"),
+                         [("20191017 00:00:00 GMT", "1 Y")])
+        self.assertRaises(ValueError, history.splitRange, T0, T0 + 1, "7 mins")
+
+
+    def download(self, download, columnarBars=False, columnarTicks=False,
+                 tws=HistoricalTws):
+        async def main():
+            client = AsyncEClient(EWrapper())
+            client.setColumnarBars(columnarBars)
+            client.setColumnarTicks(columnarTicks)
+            await client.connect("127.0.0.1", tws.port, 0)
+            pacer = history.HistoricalPacer(identicalPeriod=0., margin=0.)
+            downloader = history.HistoryDownloader(client, pacer=pacer,
+                                                   retryDelay=0.01)
+            try:
+                return await asyncio.wait_for(download(downloader), 5)
+            finally:
+                client.disconnect()
+                await asyncio.sleep(0.01)
+        with tws() as tws:
+            return (asyncio.run(main()), tws)
+
+
+    def test_download_bars(self):
+        contract = Contract()
+        (bars, tws) = self.download(lambda downloader: downloader.downloadBars(
+            contract, T0 - 600, T0 + 2.5 * 86400, "1 min", "TRADES"))
+
+        self.assertEqual(tws.nRequests, 4)
+        self.assertEqual(sorted(tws.durations), ["43800 S", "86400 S", "86400 S"])
+        self.assertEqual([bar.close for bar in bars], list(range(int(2.5 * 1440))))
+
+
+    @unittest.skipIf(columnar.numpy is None, "needs numpy")
+    def test_download_bars_columnar(self):
+        contract = Contract()
+        (bars, tws) = self.download(lambda downloader: downloader.downloadBars(
+            contract, T0 - 600, T0 + 2.5 * 86400, "1 min", "TRADES"), True)
+
+        self.assertEqual(bars["close"].tolist(), list(range(int(2.5 * 1440))))
+
+
+    def test_download_ticks(self):
+        contract = Contract()
+        (ticks, tws) = self.download(lambda downloader: downloader.downloadTicks(
+            contract, T0, T0 + 700, "TRADES"))
+
+        self.assertEqual(tws.nRequests, 4)
+        self.assertEqual([tick.price for tick in ticks], list(range(2100)))
+
+
+    @unittest.skipIf(columnar.numpy is None, "needs numpy")
+    def test_download_no_ticks_columnar(self):
+        contract = Contract()
+        for (start, end) in ((T0, T0 + 700), (T0, T0)):
+            (ticks, tws) = self.download(lambda downloader: downloader.downloadTicks(
+                contract, start, end, "TRADES"), columnarTicks=True, tws=NoTicksTws)
+            self.assertEqual(ticks.dtype, columnar.HISTORICAL_TICK_LAST_DTYPE)
+            self.assertEqual(len(ticks), 0)
+
+
+if "__main__" == __name__:
+    unittest.main()
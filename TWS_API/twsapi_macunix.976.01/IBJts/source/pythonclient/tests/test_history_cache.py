@@ -0,0 +1,143 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+import asyncio
+import calendar
+import tempfile
+import unittest
+
+from ibapi import columnar
+from ibapi.common import BarData, HistoricalTickLast, TICK_ATTRIB_LAST
+from ibapi.contract import Contract
+
+
+T0 = calendar.timegm((2019, 10, 7, 0, 0, 0))
+DAY = 86400
+
+
+class FakeClient(object):
+    columnarBars = False
+    columnarTicks = False
+
+
+class FakeDownloader(object):
+    """ 1 min bars and a tick every 10s from T0 on, up to clock(), the
+    downloads are recorded """
+
+    def __init__(self, clock):
+        self.client = FakeClient()
+        self.clock = clock
+        self.downloads = []
+        self.exchange = "ISLAND"
+
+
+    async def downloadBars(self, contract, start, end, barSizeSetting,
+                           whatToShow, useRTH=1):
+        self.downloads.append((start, end))
+        bars = []
+        for t in range(max(start, T0), min(end, self.clock()), 60):
+            bar = BarData()
+            (bar.date, bar.close, bar.barCount) = (str(t), (t - T0) / 60, 1)
+            bars.append(bar)
+        return bars
+
+
+    async def downloadTicks(self, contract, start, end, whatToShow,
+                            useRth=1, ignoreSize=False):
+        self.downloads.append((start, end))
+        ticks = []
+        for t in range(T0 + max(0, start - T0 + 9) // 10 * 10,
+                       min(end, self.clock()), 10):
+            tick = HistoricalTickLast()
+            (tick.time, tick.price, tick.size) = (t, (t - T0) / 10, 100)
+            tick.tickAttribLast = TICK_ATTRIB_LAST[t // 10 & 3]
+            (tick.exchange, tick.specialConditions) = (self.exchange, "")
+            ticks.append(tick)
+        return ticks
+
+
+@unittest.skipIf(columnar.numpy is None, "needs numpy")
+class HistoryCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        from ibapi.history_cache import HistoryCache
+        self.directory = tempfile.TemporaryDirectory()
+        self.downloader = FakeDownloader(lambda: self.now)
+        self.now = T0 + 10 * DAY
+        self.cache = HistoryCache(self.downloader, self.directory.name,
+                                  clock=lambda: self.now)
+        self.contract = Contract()
+        self.contract.conId = 265598
+
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+
+    def bars(self, cache, start, end):
+        return asyncio.run(cache.bars(self.contract, start, end, "1 min", "TRADES"))
+
+
+    def test_bars(self):
+        bars = self.bars(self.cache, T0, T0 + DAY)
+        self.assertEqual(bars["close"].tolist(), list(range(1440)))
+
+        bars = self.bars(self.cache, T0 + DAY // 2, T0 + 2 * DAY)
+        self.assertEqual(bars["close"].tolist(), list(range(720, 2880)))
+        self.assertEqual(bars["time"][0], T0 + DAY // 2)
+        self.assertEqual(self.downloader.downloads,
+                         [(T0, T0 + DAY), (T0 + DAY, T0 + 2 * DAY)])
+
+        # a new cache on the same directory, what has no data is not asked again
+        from ibapi.history_cache import HistoryCache
+        downloader = FakeDownloader(lambda: self.now)
+        cache = HistoryCache(downloader, self.directory.name, clock=lambda: self.now)
+        bars = self.bars(cache, T0 - DAY, T0 + 3 * DAY)
+        self.assertEqual(downloader.downloads,
+                         [(T0 - DAY, T0), (T0 + 2 * DAY, T0 + 3 * DAY)])
+        self.assertEqual(bars["close"].tolist(), list(range(4320)))
+        self.assertFalse(bars.flags.writeable)
+        self.assertEqual(self.bars(cache, T0 - DAY, T0 + 3 * DAY).tolist(),
+                         bars.tolist())
+        self.assertEqual(len(downloader.downloads), 2)
+
+
+    def test_incomplete_bars(self):
+        # the bars from T0 + DAY on are not complete, downloaded but not cached
+        self.now = T0 + DAY + 90
+        bars = self.bars(self.cache, T0 + DAY - 600, T0 + 2 * DAY)
+        self.assertEqual(bars["time"].tolist(), list(range(T0 + DAY - 600,
+                                                           T0 + DAY + 61, 60)))
+        self.now += 60
+        bars = self.bars(self.cache, T0 + DAY - 600, T0 + 2 * DAY)
+        self.assertEqual(bars["time"].tolist(), list(range(T0 + DAY - 600,
+                                                           T0 + DAY + 121, 60)))
+        self.assertEqual(self.downloader.downloads,
+                         [(T0 + DAY - 600, T0 + DAY), (T0 + DAY, T0 + 2 * DAY),
+                          (T0 + DAY, T0 + DAY + 60), (T0 + DAY + 60, T0 + 2 * DAY)])
+
+
+    def test_ticks(self):
+        ticks = asyncio.run(self.cache.ticks(self.contract, T0 + 5, T0 + 3600,
+                                             "TRADES"))
+        self.assertEqual(len(ticks), 359)
+        self.assertEqual(ticks[0].tolist(), (T0 + 10, 1, 1., 100, b"ISLAND", b""))
+
+        # the ticks of the last minute are not cached
+        self.now = T0 + 7200
+        ticks = asyncio.run(self.cache.ticks(self.contract, T0 + 3000, T0 + 7200,
+                                             "TRADES"))
+        self.assertEqual(ticks["time"].tolist(), list(range(T0 + 3000, T0 + 7200, 10)))
+        self.assertEqual(self.downloader.downloads[1:],
+                         [(T0 + 3600, T0 + 7140), (T0 + 7140, T0 + 7200)])
+
+        self.downloader.exchange = "X" * 33
+        self.now = T0 + 8000
+        with self.assertRaises(ValueError):
+            asyncio.run(self.cache.ticks(self.contract, T0 + 7200, T0 + 7260,
+                                         "TRADES"))
+
+
+if "__main__" == __name__:
+    unittest.main()
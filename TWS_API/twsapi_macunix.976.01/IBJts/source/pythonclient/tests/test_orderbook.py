@@ -0,0 +1,102 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+import math
+import random
+import unittest
+
+from ibapi import columnar
+from ibapi.decoder import Decoder
+from ibapi.message import IN
+from ibapi.server_versions import MAX_CLIENT_VER
+
+if columnar.numpy is not None:
+    from ibapi.orderbook import OrderBook, OrderBooks, ASK, BID
+
+from helpers import make_fields, RecordingWrapper
+
+
+@unittest.skipIf(columnar.numpy is None, "needs numpy")
+class OrderBookTestCase(unittest.TestCase):
+    def setUp(self):
+        self.wrapper = RecordingWrapper(("updateMktDepth", "updateMktDepthL2",
+                                         "error"))
+        self.books = OrderBooks(maxRows=2)
+        self.decoder = Decoder(self.wrapper, MAX_CLIENT_VER, feeds=[self.books])
+
+
+    def tearDown(self):
+        pass
+
+
+    def interpret(self, *vals):
+        self.decoder.interpret(make_fields(*vals))
+
+
+    def test_operations(self):
+        book = OrderBook(maxRows=2)
+        # the same as a list of rows
+        rows = {ASK: [], BID: []}
+        rnd = random.Random(0)
+        for _ in range(2000):
+            side = rnd.choice((ASK, BID))
+            n = len(rows[side])
+            operation = rnd.choice((0, 1, 2)) if n else 0
+            position = rnd.randint(0, n if operation == 0 else n - 1)
+            (price, size) = (rnd.randint(1, 100) / 4, rnd.randint(1, 10))
+            book.apply(position, operation, side, price, size, "M%d" % size)
+            if operation == 0:
+                rows[side].insert(position, (price, size, "M%d" % size))
+            elif operation == 1:
+                rows[side][position] = (price, size, "M%d" % size)
+            else:
+                del rows[side][position]
+            for checkedSide in (ASK, BID):
+                self.assertEqual(list(zip(*(column.tolist() for column
+                                            in book.depth(checkedSide)))),
+                                 rows[checkedSide])
+
+
+    def test_feed(self):
+        self.interpret(IN.MARKET_DEPTH, 1, 1001, 0, 0, BID, 99.5, 300)
+        self.interpret(IN.MARKET_DEPTH, 1, 1001, 0, 0, BID, 99.75, 100)
+        self.interpret(IN.MARKET_DEPTH, 1, 1001, 0, 0, ASK, 100.25, 200)
+        self.interpret(IN.MARKET_DEPTH, 1, 1001, 2, 0, BID, 99.25, 500)
+        self.interpret(IN.MARKET_DEPTH, 1, 1001, 1, 1, BID, 99.5, 400)
+        self.assertEqual(self.books.top(1001), (99.75, 100, 100.25, 200))
+        self.assertEqual(self.books.book(1001).depth(BID, 2)[1].tolist(), [100, 400])
+        self.assertEqual(self.books.book(1001).cumulativeSize(BID, 99.5), 500)
+        self.assertEqual(len(self.wrapper.calls), 5)
+
+        self.interpret(IN.MARKET_DEPTH, 1, 1001, 0, 2, BID, 0, 0)
+        self.assertEqual(self.books.top(1001), (99.5, 400, 100.25, 200))
+
+        self.interpret(IN.ERR_MSG, 2, 1001, 317,
+                       "Market depth data has been RESET")
+        (bidPrice, bidSize, askPrice, askSize) = self.books.top(1001)
+        self.assertTrue(math.isnan(bidPrice) and math.isnan(askPrice))
+        self.assertEqual(self.wrapper.calls[-1][:3], ("error", 1001, 317))
+
+
+    def test_smart_depth(self):
+        for (position, marketMaker, price, size) in ((0, "ISLAND", 100., 100),
+                (1, "ARCA", 100., 200), (2, "BATS", 100.5, 300),
+                (3, "ISLAND", 100.5, 50), (4, "ARCA", 101., 10)):
+            self.interpret(IN.MARKET_DEPTH_L2, 1, 1002, position, marketMaker,
+                           0, ASK, price, size, 1)
+        book = self.books.book(1002)
+        self.assertEqual(book.top()[2:], (100., 300))
+        self.assertEqual(book.depth(ASK)[2].tolist(),
+                         ["ISLAND", "ARCA", "BATS", "ISLAND", "ARCA"])
+        (prices, sizes) = book.levels(ASK)
+        self.assertEqual((prices.tolist(), sizes.tolist()),
+                         ([100., 100.5, 101.], [300, 350, 10]))
+        self.assertEqual(book.cumulativeSizes(ASK)[1].tolist(), [300, 650, 660])
+        self.assertEqual(self.wrapper.calls[0], ("updateMktDepthL2", 1002, 0,
+                         "ISLAND", 0, ASK, 100., 100, True))
+
+
+if "__main__" == __name__:
+    unittest.main()
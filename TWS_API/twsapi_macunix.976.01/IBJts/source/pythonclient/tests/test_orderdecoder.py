@@ -0,0 +1,212 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+import unittest
+
+from ibapi import comm
+from ibapi import faketws
+from ibapi.orderdecoder import OrderDecoder
+from ibapi.decoder import Decoder
+from ibapi.wrapper import EWrapper
+from ibapi.contract import Contract, DeltaNeutralContract
+from ibapi.order import Order
+from ibapi.order_state import OrderState
+from ibapi.tag_value import TagValue
+from ibapi.message import IN
+from ibapi.common import UNSET_INTEGER
+from ibapi.server_versions import (MAX_CLIENT_VER, MIN_SERVER_VER_ORDER_CONTAINER,
+                                   MIN_SERVER_VER_D_PEG_ORDERS)
+
+
+def comparable(val):
+    """ the attributes, all the way down """
+    if isinstance(val, list):
+        return [comparable(item) for item in val]
+    if hasattr(val, "__dict__"):
+        return {name: comparable(item) for (name, item) in vars(val).items()}
+    return val
+
+
+def decodeCompletedOrder(decoder, fields):
+    """ the COMPLETED_ORDER fields one by one, the reference of
+    OrderDecoder.completedOrderPlan """
+    # read contract fields
+    decoder.decodeContractFields(fields)
+
+    # read order fields
+    decoder.decodeAction(fields)
+    decoder.decodeTotalQuantity(fields)
+    decoder.decodeOrderType(fields)
+    decoder.decodeLmtPrice(fields)
+    decoder.decodeAuxPrice(fields)
+    decoder.decodeTIF(fields)
+    decoder.decodeOcaGroup(fields)
+    decoder.decodeAccount(fields)
+    decoder.decodeOpenClose(fields)
+    decoder.decodeOrigin(fields)
+    decoder.decodeOrderRef(fields)
+    decoder.decodePermId(fields)
+    decoder.decodeOutsideRth(fields)
+    decoder.decodeHidden(fields)
+    decoder.decodeDiscretionaryAmt(fields)
+    decoder.decodeGoodAfterTime(fields)
+    decoder.decodeFAParams(fields)
+    decoder.decodeModelCode(fields)
+    decoder.decodeGoodTillDate(fields)
+    decoder.decodeRule80A(fields)
+    decoder.decodePercentOffset(fields)
+    decoder.decodeSettlingFirm(fields)
+    decoder.decodeShortSaleParams(fields)
+    decoder.decodeBoxOrderParams(fields)
+    decoder.decodePegToStkOrVolOrderParams(fields)
+    decoder.decodeDisplaySize(fields)
+    decoder.decodeSweepToFill(fields)
+    decoder.decodeAllOrNone(fields)
+    decoder.decodeMinQty(fields)
+    decoder.decodeOcaType(fields)
+    decoder.decodeTriggerMethod(fields)
+    decoder.decodeVolOrderParams(fields, False)
+    decoder.decodeTrailParams(fields)
+    decoder.decodeComboLegs(fields)
+    decoder.decodeSmartComboRoutingParams(fields)
+    decoder.decodeScaleOrderParams(fields)
+    decoder.decodeHedgeParams(fields)
+    decoder.decodeClearingParams(fields)
+    decoder.decodeNotHeld(fields)
+    decoder.decodeDeltaNeutral(fields)
+    decoder.decodeAlgoParams(fields)
+    decoder.decodeSolicited(fields)
+    decoder.decodeOrderStatus(fields)
+    decoder.decodeVolRandomizeFlags(fields)
+    decoder.decodePegToBenchParams(fields)
+    decoder.decodeConditions(fields)
+    decoder.decodeStopPriceAndLmtPriceOffset(fields)
+    decoder.decodeCashQty(fields)
+    decoder.decodeDontUseAutoPriceForHedge(fields)
+    decoder.decodeIsOmsContainers(fields)
+    decoder.decodeAutoCancelDate(fields)
+    decoder.decodeFilledQuantity(fields)
+    decoder.decodeRefFuturesConId(fields)
+    decoder.decodeAutoCancelParent(fields)
+    decoder.decodeShareholder(fields)
+    decoder.decodeImbalanceOnly(fields)
+    decoder.decodeRouteMarketableToBbo(fields)
+    decoder.decodeParentPermId(fields)
+    decoder.decodeCompletedTime(fields)
+    decoder.decodeCompletedStatus(fields)
+
+
+class OrdersWrapper(EWrapper):
+    def __init__(self):
+        self.calls = []
+
+    def openOrder(self, orderId, contract, order, orderState):
+        self.calls.append((orderId, contract, order, orderState))
+
+    def completedOrder(self, contract, order, orderState):
+        self.calls.append((contract, order, orderState))
+
+
+class OrderDecoderTestCase(unittest.TestCase):
+    def setUp(self):
+        pass
+
+
+    def tearDown(self):
+        pass
+
+
+    def decodeBoth(self, serverVersion, isOpenOrder, fields):
+        """ fields decoded following the plan and one by one, with what is
+        left of them """
+        results = []
+        for usePlan in (True, False):
+            decoder = OrderDecoder(None, None, None, serverVersion, serverVersion)
+            (contract, order, orderState) = (Contract(), Order(), OrderState())
+            it = iter(fields)
+            if isOpenOrder:
+                decoder.reset(contract, order, orderState, serverVersion)
+                if usePlan:
+                    decoder.decodePlan(decoder.openOrderPlan, it)
+                else:
+                    decoder.decodeOpenOrder(it)
+            else:
+                decoder.reset(contract, order, orderState, UNSET_INTEGER)
+                if usePlan:
+                    decoder.decodePlan(decoder.completedOrderPlan, it)
+                else:
+                    decodeCompletedOrder(decoder, it)
+            results.append((comparable(contract), comparable(order),
+                            comparable(orderState), len(list(it))))
+        return results
+
+
+    def test_plans_match_the_steps(self):
+        # all "1": every optional group is there (combo legs, conditions,
+        # algo params, ...), all "": none
+        for serverVersion in (MIN_SERVER_VER_ORDER_CONTAINER,
+                              MIN_SERVER_VER_D_PEG_ORDERS, MAX_CLIENT_VER):
+            for isOpenOrder in (True, False):
+                for field in (b"1", b""):
+                    (byPlan, bySteps) = self.decodeBoth(serverVersion,
+                                                        isOpenOrder, [field] * 400)
+                    self.assertEqual(byPlan, bySteps)
+                    self.assertLess(byPlan[3], 400)
+
+
+    def test_old_server_version(self):
+        decoder = OrderDecoder(None, None, None, MIN_SERVER_VER_ORDER_CONTAINER - 1,
+                               MIN_SERVER_VER_ORDER_CONTAINER - 1)
+        self.assertIsNone(decoder.openOrderPlan)
+
+
+    def test_decoder(self):
+        contract = Contract()
+        (contract.conId, contract.symbol, contract.secType) = (265598, "AAPL", "STK")
+        contract.deltaNeutralContract = DeltaNeutralContract()
+        order = Order()
+        (order.orderId, order.action, order.totalQuantity) = (7, "BUY", 100.)
+        (order.orderType, order.lmtPrice) = ("LMT", 123.45)
+        order.deltaNeutralOrderType = "LMT"
+        order.algoStrategy = "Adaptive"
+        order.algoParams = [TagValue("adaptivePriority", "Normal")]
+        (order.scalePriceIncrement, order.hedgeType) = (0.5, "D")
+        orderState = OrderState()
+        orderState.status = "Submitted"
+        frame = faketws.openOrderFrame(contract, order, orderState)
+
+        wrapper = OrdersWrapper()
+        decoder = Decoder(wrapper, MAX_CLIENT_VER)
+        for _ in range(2):
+            decoder.interpret(comm.read_fields(frame[4:]))
+        self.assertEqual(len(wrapper.calls), 2)
+        (orderId, contract2, order2, orderState2) = wrapper.calls[0]
+        self.assertEqual(orderId, 7)
+        self.assertEqual(comparable(contract2), comparable(contract))
+        self.assertEqual((order2.lmtPrice, order2.deltaNeutralOrderType,
+                          order2.scalePriceIncrement, order2.hedgeType),
+                         (123.45, "LMT", 0.5, "D"))
+        self.assertEqual(comparable(order2.algoParams), comparable(order.algoParams))
+        self.assertEqual(orderState2.status, "Submitted")
+        # new objects for each msg
+        self.assertIsNot(wrapper.calls[1][2], order2)
+
+        fields = comm.read_fields(comm.make_field(IN.COMPLETED_ORDER)
+                                  + "".join(comm.make_field("") for _ in range(150)))
+        decoder.interpret(fields)
+        self.assertEqual(len(wrapper.calls), 3)
+
+
+    def test_signatures_discovered_once(self):
+        handleInfo = Decoder.msgId2handleInfo[IN.TICK_SIZE]
+        Decoder(EWrapper(), MAX_CLIENT_VER)
+        converters = handleInfo.wrapperConverters
+        Decoder(EWrapper(), MAX_CLIENT_VER)
+        self.assertIs(handleInfo.wrapperConverters, converters)
+        self.assertEqual(converters, (int, int, int))
+
+
+if "__main__" == __name__:
+    unittest.main()
@@ -0,0 +1,191 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+import unittest
+
+from ibapi import comm
+from ibapi.orderencoder import OrderEncoder
+from ibapi.client import EClient
+from ibapi.wrapper import EWrapper
+from ibapi.contract import Contract, ComboLeg, DeltaNeutralContract
+from ibapi.order import Order, OrderComboLeg
+from ibapi.order_condition import Create, OrderCondition
+from ibapi.tag_value import TagValue
+from ibapi.message import OUT
+from ibapi.errors import UPDATE_TWS
+from ibapi.server_versions import (MIN_CLIENT_VER, MAX_CLIENT_VER,
+                                   MIN_SERVER_VER_CASH_QTY,
+                                   MIN_SERVER_VER_ORDER_CONTAINER,
+                                   MIN_SERVER_VER_D_PEG_ORDERS)
+
+
+class FakeConn:
+    def __init__(self):
+        self.sent = []
+
+    def isConnected(self):
+        return True
+
+    def sendMsg(self, msg):
+        self.sent.append(msg)
+
+    def sendAll(self, data):
+        self.sent.append(data)
+
+
+class ErrorsWrapper(EWrapper):
+    def __init__(self):
+        self.errors = []
+
+    def error(self, reqId, errorCode, errorString):
+        self.errors.append((reqId, errorCode, errorString))
+
+
+def make_contract():
+    contract = Contract()
+    (contract.conId, contract.symbol, contract.secType) = (265598, "AAPL", "STK")
+    (contract.exchange, contract.currency) = ("SMART", "USD")
+    return contract
+
+
+def make_order():
+    order = Order()
+    (order.action, order.totalQuantity) = ("BUY", 100.)
+    (order.orderType, order.lmtPrice) = ("LMT", 123.45)
+    return order
+
+
+def make_bag_order():
+    contract = make_contract()
+    contract.secType = "BAG"
+    leg = ComboLeg()
+    (leg.conId, leg.ratio, leg.action, leg.exchange) = (1, 2, "BUY", "SMART")
+    contract.comboLegs = [leg]
+    contract.deltaNeutralContract = DeltaNeutralContract()
+    order = make_order()
+    legPrice = OrderComboLeg()
+    legPrice.price = 1.5
+    order.orderComboLegs = [legPrice, OrderComboLeg()]
+    order.smartComboRoutingParams = [TagValue("NonGuaranteed", "1")]
+    order.orderType = "PEG BENCH"
+    order.algoStrategy = "Adaptive"
+    order.algoParams = [TagValue("adaptivePriority", "Normal")]
+    (order.deltaNeutralOrderType, order.scalePriceIncrement) = ("LMT", 0.5)
+    (order.hedgeType, order.hedgeParam) = ("D", "0.5")
+    order.orderMiscOptions = [TagValue("a", "b")]
+    condition = Create(OrderCondition.Price)
+    (condition.conId, condition.exchange, condition.price) = (1, "SMART", 10.)
+    (condition.isMore, condition.triggerMethod) = (True, 0)
+    order.conditions = [condition]
+    order.usePriceMgmtAlgo = True
+    return (contract, order)
+
+
+class OrderEncoderTestCase(unittest.TestCase):
+    def setUp(self):
+        self.wrapper = ErrorsWrapper()
+        self.client = EClient(self.wrapper)
+        self.client.conn = FakeConn()
+        self.client.serverVersion_ = MAX_CLIENT_VER
+        self.client.setConnState(EClient.CONNECTED)
+
+
+    def tearDown(self):
+        pass
+
+
+    def payload(self, msg) -> str:
+        (size, text, rest) = comm.read_msg(msg)
+        self.assertEqual((size, rest), (len(msg) - 4, b""))
+        return text.decode()
+
+
+    def test_fields(self):
+        fields = self.payload(OrderEncoder(MAX_CLIENT_VER).encode(
+            7, make_contract(), make_order())).split("\0")
+        self.assertEqual(fields[:6], [str(OUT.PLACE_ORDER), "7", "265598",
+                                      "AAPL", "STK", ""])
+        self.assertEqual(fields[16:21], ["BUY", "100.0", "LMT", "123.45", ""])
+        # usePriceMgmtAlgo not set, then the terminator of the last field
+        self.assertEqual(fields[-2:], ["", ""])
+
+        fields = self.payload(OrderEncoder(MIN_SERVER_VER_ORDER_CONTAINER - 1).encode(
+            7, make_contract(), make_order())).split("\0")
+        self.assertEqual(fields[:3], [str(OUT.PLACE_ORDER), "45", "7"])
+
+
+    def test_groups(self):
+        # a field more at D_PEG_ORDERS and PRICE_MGMT_ALGO
+        (contract, order) = make_bag_order()
+        lengths = {}
+        for serverVersion in (MIN_SERVER_VER_ORDER_CONTAINER,
+                              MIN_SERVER_VER_D_PEG_ORDERS, MAX_CLIENT_VER):
+            msg = self.payload(OrderEncoder(serverVersion).encode(7, contract, order))
+            lengths[serverVersion] = msg.count("\0")
+            for fields in (("AAPL", "BAG"), ("1", "2", "BUY", "SMART"),
+                           ("2", "1.5", ""), ("NonGuaranteed", "1"),
+                           ("Adaptive", "1", "adaptivePriority", "Normal"),
+                           ("a=b;", )):
+                self.assertIn("\0%s\0" % "\0".join(fields), msg)
+        self.assertEqual(lengths[MAX_CLIENT_VER] - 2,
+                         lengths[MIN_SERVER_VER_ORDER_CONTAINER])
+        self.assertTrue(msg.endswith("\0" + "1\0"))
+
+
+    def test_check(self):
+        encoder = OrderEncoder(MIN_SERVER_VER_CASH_QTY)
+        order = make_order()
+        self.assertIsNone(encoder.check(make_contract(), order))
+        order.isOmsContainer = True
+        self.assertEqual(encoder.check(make_contract(), order),
+                         " It does not support oms container parameter")
+        self.assertIsNone(OrderEncoder(MAX_CLIENT_VER).check(make_contract(), order))
+        # the first check failing, as placeOrder() always did: cashQty is
+        # UNSET_DOUBLE, not 0, in a new Order
+        self.assertEqual(OrderEncoder(MIN_CLIENT_VER).check(make_contract(), order),
+                         " It does not support cash quantity parameter")
+
+        with self.assertRaises(ValueError):
+            OrderEncoder(MIN_CLIENT_VER - 1)
+
+
+    def test_place_order(self):
+        self.client.placeOrder(7, make_contract(), make_order())
+        encoder = self.client.orderEncoder
+        self.client.placeOrder(8, make_contract(), make_order())
+        self.assertIs(self.client.orderEncoder, encoder)
+        self.assertEqual(self.client.conn.sent[0],
+                         encoder.encode(7, make_contract(), make_order()))
+
+        # made again for another server version
+        self.client.serverVersion_ = MIN_SERVER_VER_ORDER_CONTAINER
+        order = make_order()
+        order.usePriceMgmtAlgo = True
+        self.client.placeOrder(9, make_contract(), order)
+        self.assertEqual(self.client.orderEncoder.serverVersion,
+                         MIN_SERVER_VER_ORDER_CONTAINER)
+        self.assertEqual(len(self.client.conn.sent), 2)
+        self.assertEqual(self.wrapper.errors, [(9, UPDATE_TWS.code(), UPDATE_TWS.msg()
+            + " It does not support Use price management algo requests")])
+
+
+    def test_place_orders(self):
+        rejected = make_order()
+        rejected.usePriceMgmtAlgo = True
+        self.client.serverVersion_ = MIN_SERVER_VER_D_PEG_ORDERS
+        self.client.placeOrders([(7, make_contract(), make_order()),
+                                 (8, make_contract(), rejected),
+                                 (9, make_contract(), make_order())])
+
+        self.assertEqual(len(self.client.conn.sent), 1)
+        encoder = self.client.orderEncoder
+        self.assertEqual(self.client.conn.sent[0],
+            encoder.encode(7, make_contract(), make_order())
+            + encoder.encode(9, make_contract(), make_order()))
+        self.assertEqual([error[0] for error in self.wrapper.errors], [8])
+
+
+if "__main__" == __name__:
+    unittest.main()
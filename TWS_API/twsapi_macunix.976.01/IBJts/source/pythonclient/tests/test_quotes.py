@@ -0,0 +1,124 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+import math
+import threading
+import unittest
+
+from ibapi import columnar
+from ibapi.decoder import Decoder
+from ibapi.message import IN
+from ibapi.ticktype import TickTypeEnum
+from ibapi.server_versions import MAX_CLIENT_VER
+
+if columnar.numpy is not None:
+    from ibapi.quotes import QuoteStore, N_TICK_TYPES
+
+from helpers import make_fields, RecordingWrapper
+
+
+class QuoteStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.wrapper = RecordingWrapper(("tickPrice", "tickSize",
+                                         "tickGeneric", "tickString"))
+        self.store = QuoteStore(nRows=2, clock=lambda: 1570000000.)
+        self.decoder = Decoder(self.wrapper, MAX_CLIENT_VER, feeds=[self.store])
+
+
+    def tearDown(self):
+        pass
+
+
+    def interpret(self, *vals):
+        self.decoder.interpret(make_fields(*vals))
+
+
+    def test_ticks(self):
+        self.interpret(IN.TICK_PRICE, 6, 1001, TickTypeEnum.BID, 123.4, 500, 0)
+        self.interpret(IN.TICK_SIZE, 6, 1001, TickTypeEnum.VOLUME, 12345)
+        self.interpret(IN.TICK_GENERIC, 6, 1001, TickTypeEnum.HALTED, 0.)
+        self.interpret(IN.TICK_STRING, 6, 1001, TickTypeEnum.LAST_TIMESTAMP,
+                       "1570000000")
+
+        store = self.store
+        self.assertEqual(store.get(1001, TickTypeEnum.BID), 123.4)
+        self.assertEqual(store.get(1001, TickTypeEnum.BID_SIZE), 500)
+        self.assertEqual(store.get(1001, TickTypeEnum.VOLUME), 12345)
+        self.assertEqual(store.get(1001, TickTypeEnum.HALTED), 0.)
+        self.assertTrue(math.isnan(store.get(1001, TickTypeEnum.ASK)))
+        self.assertTrue(math.isnan(store.get(1002, TickTypeEnum.BID)))
+        self.assertEqual(store.getString(1001, TickTypeEnum.LAST_TIMESTAMP),
+                         "1570000000")
+
+        (seq, updateTime, values) = store.quote(1001)
+        self.assertEqual((seq, updateTime), (8, 1570000000.))
+        self.assertEqual(values[TickTypeEnum.BID], 123.4)
+        self.assertIsNone(store.quote(1002))
+
+        # the wrapper still gets them
+        self.assertEqual([call[:4] for call in self.wrapper.calls], [
+            ("tickPrice", 1001, TickTypeEnum.BID, 123.4),
+            ("tickSize", 1001, TickTypeEnum.BID_SIZE, 500),
+            ("tickSize", 1001, TickTypeEnum.VOLUME, 12345),
+            ("tickGeneric", 1001, TickTypeEnum.HALTED, 0.),
+            ("tickString", 1001, TickTypeEnum.LAST_TIMESTAMP, "1570000000")])
+
+
+    def test_unknown_tick_type(self):
+        # a tick type of a newer TWS still goes to the wrapper
+        for msgId in (IN.TICK_SIZE, IN.TICK_GENERIC, IN.TICK_STRING):
+            self.interpret(msgId, 6, 1001, N_TICK_TYPES, 1)
+        self.interpret(IN.TICK_PRICE, 6, 1001, N_TICK_TYPES + 1, 123.4, 500, 0)
+        self.assertEqual(len(self.wrapper.calls), 4)
+        self.assertIsNone(self.store.quote(1001))
+
+
+    def test_snapshot_and_rows(self):
+        for reqId in (1001, 1002, 1003):
+            self.interpret(IN.TICK_PRICE, 6, reqId, TickTypeEnum.BID, reqId / 10, 1, 0)
+            self.interpret(IN.TICK_PRICE, 6, reqId, TickTypeEnum.ASK, reqId / 10 + 1, 1, 0)
+        store = self.store
+        self.assertEqual(len(store.table.reqIds), 4)
+
+        (reqIds, seqs, values) = store.snapshot((TickTypeEnum.BID, TickTypeEnum.ASK))
+        self.assertEqual(reqIds.tolist(), [1001, 1002, 1003])
+        self.assertEqual(seqs.tolist(), [4, 4, 4])
+        self.assertEqual(values.tolist(), [[100.1, 101.1], [100.2, 101.2],
+                                           [100.3, 101.3]])
+
+        store.remove(1002)
+        self.interpret(IN.TICK_SIZE, 6, 1004, TickTypeEnum.VOLUME, 7)
+        (reqIds, seqs, values) = store.snapshot()
+        self.assertEqual(sorted(reqIds.tolist()), [1001, 1003, 1004])
+        row = reqIds.tolist().index(1004)
+        self.assertTrue(math.isnan(values[row, TickTypeEnum.BID]))
+        self.assertEqual(values[row, TickTypeEnum.VOLUME], 7)
+
+
+    def test_concurrent_reads(self):
+        store = self.store
+        store.setValue(1001, TickTypeEnum.BID, 0, TickTypeEnum.BID_SIZE, 0)
+        done = threading.Event()
+
+        def write():
+            for i in range(100000):
+                store.setValue(1001, TickTypeEnum.BID, i, TickTypeEnum.BID_SIZE, i)
+            done.set()
+        thread = threading.Thread(target=write)
+        thread.start()
+
+        nReads = 0
+        while not done.is_set() or nReads == 0:
+            (seq, _, values) = store.quote(1001)
+            self.assertEqual(values[TickTypeEnum.BID], values[TickTypeEnum.BID_SIZE])
+            (_, _, values) = store.snapshot((TickTypeEnum.BID, TickTypeEnum.BID_SIZE))
+            self.assertEqual(values[0, 0], values[0, 1])
+            nReads += 1
+        thread.join()
+        self.assertEqual(store.quote(1001)[0], 200002)
+
+
+if "__main__" == __name__:
+    unittest.main()
@@ -0,0 +1,161 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+import threading
+import unittest
+
+from ibapi import comm
+from ibapi import faketws
+from ibapi.subscriptions import MarketDataMultiplexer
+from ibapi.decoder import Decoder
+from ibapi.client import EClient
+from ibapi.wrapper import EWrapper
+from ibapi.contract import Contract
+from ibapi.ticktype import TickTypeEnum
+from ibapi.server_versions import MAX_CLIENT_VER
+
+
+class RecordingClient(EClient):
+    """ records the market data requests instead of sending them """
+    def __init__(self, wrapper):
+        super().__init__(wrapper)
+        self.requests = []
+
+    def reqMktData(self, reqId, contract, genericTickList, snapshot,
+                   regulatorySnapshot, mktDataOptions):
+        self.requests.append(("reqMktData", reqId, contract.symbol, genericTickList))
+
+    def cancelMktData(self, reqId):
+        self.requests.append(("cancelMktData", reqId))
+
+
+class Listener(object):
+    def __init__(self):
+        self.calls = []
+
+    def tickPrice(self, reqId, tickType, price, attrib):
+        self.calls.append((reqId, tickType, price))
+
+    def error(self, reqId, errorCode, errorString):
+        self.calls.append((reqId, errorCode))
+
+
+class RecordingWrapper(EWrapper):
+    def __init__(self):
+        self.calls = []
+
+    def tickPrice(self, reqId, tickType, price, attrib):
+        self.calls.append((reqId, tickType, price))
+
+    def tickSize(self, reqId, tickType, size):
+        self.calls.append((reqId, tickType, size))
+
+
+def make_contract(symbol):
+    contract = Contract()
+    (contract.symbol, contract.secType, contract.exchange) = (symbol, "STK", "SMART")
+    contract.currency = "USD"
+    return contract
+
+
+class MultiplexerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.wrapper = RecordingWrapper()
+        self.client = RecordingClient(self.wrapper)
+        self.mux = MarketDataMultiplexer(self.client, firstReqId=100)
+        self.decoder = Decoder(self.client.wrapper, MAX_CLIENT_VER)
+
+
+    def tearDown(self):
+        pass
+
+
+    def tick(self, reqId, tickType, price):
+        self.decoder.interpret(comm.read_fields(
+            faketws.tickPriceFrame(reqId, tickType, price, 0)[4:]))
+
+
+    def test_sharing(self):
+        (a, b, c) = (Listener(), Listener(), Listener())
+        mux = self.mux
+        reqId = mux.subscribe(a, make_contract("AAPL"), "233,100")
+        self.tick(reqId, TickTypeEnum.BID, 123.4)
+        self.assertEqual(mux.subscribe(b, make_contract("AAPL"), "100,233"), reqId)
+        self.assertEqual(mux.subscribe(c, make_contract("MSFT")), 101)
+        self.tick(reqId, TickTypeEnum.ASK, 123.5)
+        self.tick(1, TickTypeEnum.ASK, 1.)      # not a subscription
+
+        self.assertEqual(a.calls, [(reqId, TickTypeEnum.BID, 123.4),
+                                   (reqId, TickTypeEnum.ASK, 123.5)])
+        # the latest bid on joining
+        self.assertEqual(b.calls, a.calls)
+        self.assertEqual(c.calls, [])
+        self.assertEqual(self.wrapper.calls, [(1, TickTypeEnum.ASK, 1.),
+                                              (1, TickTypeEnum.ASK_SIZE, 0)])
+        self.assertEqual(mux.metrics(), {"lines": 2, "maxLines": 100,
+            "peakLines": 2, "consumers": 3, "subscribes": 3, "linesSaved": 1})
+
+        mux.unsubscribe(a, reqId)
+        self.assertEqual(self.client.requests[-1][0], "reqMktData")
+        mux.unsubscribe(b, reqId)
+        self.assertEqual(self.client.requests, [
+            ("reqMktData", 100, "AAPL", "233,100"),
+            ("reqMktData", 101, "MSFT", ""), ("cancelMktData", 100)])
+        self.tick(reqId, TickTypeEnum.ASK, 123.6)
+        self.assertEqual(len(b.calls), 2)
+        self.assertEqual(mux.metrics()["lines"], 1)
+
+
+    def test_subscribe_twice(self):
+        a = Listener()
+        reqId = self.mux.subscribe(a, make_contract("AAPL"))
+        self.tick(reqId, TickTypeEnum.BID, 123.4)
+        self.assertEqual(self.mux.subscribe(a, make_contract("AAPL")), reqId)
+        self.assertEqual(len(a.calls), 1)
+        self.assertEqual(self.mux.metrics()["subscribes"], 1)
+        self.assertEqual(self.mux.metrics()["linesSaved"], 0)
+
+
+    def test_tick_during_replay(self):
+        a = Listener()
+        reqId = self.mux.subscribe(a, make_contract("AAPL"))
+        self.tick(reqId, TickTypeEnum.BID, 123.4)
+        self.tick(reqId, TickTypeEnum.ASK, 123.5)
+
+        test = self
+        class SlowJoiner(Listener):
+            # a new ask comes while the latest bid is given
+            def tickPrice(self, reqId, tickType, price, attrib):
+                super().tickPrice(reqId, tickType, price, attrib)
+                if tickType == TickTypeEnum.BID:
+                    self.thread = threading.Thread(target=test.tick,
+                        args=(reqId, TickTypeEnum.ASK, 123.6))
+                    self.thread.start()
+                    self.thread.join(0.2)
+
+        b = SlowJoiner()
+        self.mux.subscribe(b, make_contract("AAPL"))
+        b.thread.join(5)
+        self.assertEqual(b.calls, [(reqId, TickTypeEnum.BID, 123.4),
+                                   (reqId, TickTypeEnum.ASK, 123.5),
+                                   (reqId, TickTypeEnum.ASK, 123.6)])
+        self.assertEqual(a.calls[-1], (reqId, TickTypeEnum.ASK, 123.6))
+
+
+    def test_error(self):
+        (a, b) = (Listener(), Listener())
+        reqId = self.mux.subscribe(a, make_contract("NONE"))
+        self.mux.subscribe(b, make_contract("NONE"))
+        self.client.wrapper.error(reqId, 2104, "Market data farm connection is OK")
+        self.client.wrapper.error(reqId, 200, "No security definition")
+        self.assertEqual(b.calls, [(reqId, 2104), (reqId, 200)])
+        self.assertEqual(self.mux.metrics()["lines"], 0)
+
+        # a new line for the next one
+        self.assertEqual(self.mux.subscribe(a, make_contract("NONE")), reqId + 1)
+
+
+if "__main__" == __name__:
+    unittest.main()
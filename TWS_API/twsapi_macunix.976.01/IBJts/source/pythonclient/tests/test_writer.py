@@ -0,0 +1,211 @@
+"""
+Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is subject to the terms
+ and conditions of the IB API Non-Commercial License or the IB API Commercial License, as applicable.
+"""
+
+import time
+import socket
+import threading
+import unittest
+
+from ibapi import comm
+from ibapi import faketws
+from ibapi.writer import EWriter
+from ibapi.connection import Connection
+from ibapi.client import EClient
+from ibapi.wrapper import EWrapper
+from ibapi.contract import Contract
+from ibapi.order import Order
+from ibapi.errors import NOT_CONNECTED
+from ibapi.message import OUT
+from ibapi.server_versions import MAX_CLIENT_VER
+
+
+class BlockingConn:
+    """ records the writes, the first one waits for release """
+    def __init__(self):
+        self.writes = []
+        self.writing = threading.Event()
+        self.release = threading.Event()
+
+    def isConnected(self):
+        return True
+
+    def sendAll(self, data):
+        self.writing.set()
+        self.release.wait(5)
+        self.writes.append(data)
+        return len(data)
+
+
+class FailingConn:
+    """ each write fails, as on a broken connection """
+    def isConnected(self):
+        return True
+
+    def sendAll(self, data):
+        raise OSError("broken pipe")
+
+
+class ErrorsWrapper(EWrapper):
+    def __init__(self):
+        self.errors = []
+
+    def error(self, reqId, errorCode, errorString):
+        self.errors.append((reqId, errorCode))
+
+
+class StartedWrapper(EWrapper):
+    def __init__(self):
+        self.started = threading.Event()
+
+    def nextValidId(self, orderId):
+        self.started.set()
+
+
+class WriterTestCase(unittest.TestCase):
+    def setUp(self):
+        pass
+
+
+    def tearDown(self):
+        pass
+
+
+    def test_coalescing(self):
+        conn = BlockingConn()
+        writer = EWriter(conn)
+        writer.start()
+        self.addCleanup(writer.stop, 5)
+        self.addCleanup(conn.release.set)
+        msgs = [comm.make_msg(comm.make_field(i)) for i in range(500)]
+        writer.put(msgs[0])
+        self.assertTrue(conn.writing.wait(5))
+        for msg in msgs[1:]:
+            writer.put(msg)
+        self.assertFalse(writer.flush(0.05))
+        self.assertEqual(writer.queueDepth()[0], 499)
+
+        conn.release.set()
+        self.assertTrue(writer.flush(5))
+        writer.stop(5)
+        self.assertFalse(writer.is_alive())
+        self.assertEqual(b"".join(conn.writes), b"".join(msgs))
+        metrics = writer.metrics()
+        self.assertEqual(metrics["writes"], 2)
+        self.assertEqual((metrics["queuedMsgs"], metrics["msgs"]), (0, 500))
+        self.assertEqual((metrics["peakQueuedMsgs"], metrics["maxBatchMsgs"]),
+                         (499, 499))
+
+
+    def test_max_batch(self):
+        conn = BlockingConn()
+        conn.release.set()
+        writer = EWriter(conn, linger=0.05, maxBatch=100)
+        for i in range(10):
+            writer.put(b"x" * 30)
+        writer.start()
+        self.addCleanup(writer.stop, 5)
+        self.assertTrue(writer.flush(5))
+        writer.stop(5)
+        self.assertEqual([len(data) for data in conn.writes], [90, 90, 90, 30])
+
+
+    def test_full_socket_buffer(self):
+        # the peer does not read for a while: the socket buffer fills up and
+        # the sends time out, without any byte lost or sent twice
+        (sock, peer) = socket.socketpair()
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+        sock.settimeout(0.02)
+        conn = Connection("", 0)
+        conn.socket = sock
+        writer = EWriter(conn)
+        writer.start()
+        self.addCleanup(writer.stop, 5)
+        msgs = [comm.make_msg(comm.make_field("%06d" % i) * 100) for i in range(2000)]
+        for msg in msgs:
+            writer.put(msg)
+        self.assertFalse(writer.flush(0.2))
+
+        received = bytearray()
+        def read():
+            size = len(b"".join(msgs))
+            while len(received) < size:
+                received.extend(peer.recv(65536))
+        reader = threading.Thread(target=read)
+        reader.start()
+        self.assertTrue(writer.flush(10))
+        reader.join(10)
+        self.assertEqual(bytes(received), b"".join(msgs))
+
+        writer.stop(5)
+        conn.disconnect()
+        peer.close()
+
+
+    def test_client(self):
+        tws = faketws.FakeTws()
+        tws.start()
+        wrapper = StartedWrapper()
+        client = EClient(wrapper)
+        client.setOutboundQueue(True)
+        try:
+            client.connect("127.0.0.1", tws.port, 0)
+            thread = threading.Thread(target=client.run)
+            thread.start()
+            self.assertTrue(wrapper.started.wait(5))
+            session = tws.waitForSession()
+            for reqId in range(500):
+                contract = Contract()
+                contract.symbol = "SYM%d" % reqId
+                client.reqMktData(reqId, contract, "", False, False, [])
+            self.assertTrue(client.flush(5))
+            metrics = client.outboundMetrics()
+            self.assertEqual(metrics["msgs"], 501)
+            self.assertLess(metrics["writes"], 501)
+            client.reqCurrentTime()
+            self.assertTrue(client.flush(5))
+            deadline = time.monotonic() + 5
+            while len(session.requests) < 502 and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            client.disconnect()
+            tws.stop()
+        thread.join(5)
+
+        requests = [int(fields[0]) for fields in session.requests]
+        self.assertEqual(requests, [OUT.START_API] + [OUT.REQ_MKT_DATA] * 500
+                         + [OUT.REQ_CURRENT_TIME])
+        self.assertIsNone(client.writer)
+
+
+
+    def test_dropped_after_failure(self):
+        wrapper = ErrorsWrapper()
+        client = EClient(wrapper)
+        client.conn = FailingConn()
+        client.serverVersion_ = MAX_CLIENT_VER
+        client.setConnState(EClient.CONNECTED)
+        client.writer = EWriter(client.conn)
+        client.writer.start()
+        self.addCleanup(client.writer.stop, 5)
+        client.reqCurrentTime()
+        client.writer.join(5)
+        self.assertIsNotNone(client.writer.error)
+        self.assertEqual(wrapper.errors, [])
+
+        order = Order()
+        (order.action, order.totalQuantity) = ("BUY", 100.)
+        (order.orderType, order.lmtPrice) = ("LMT", 123.45)
+        client.placeOrder(7, Contract(), order)
+        client.placeOrders([(8, Contract(), order), (9, Contract(), order)])
+        client.reqCurrentTime()
+        self.assertEqual(wrapper.errors, [(7, NOT_CONNECTED.code()),
+                                          (8, NOT_CONNECTED.code()),
+                                          (9, NOT_CONNECTED.code()),
+                                          (-1, NOT_CONNECTED.code())])
+        self.assertFalse(client.writer.put(b"x"))
+
+
+if "__main__" == __name__:
+    unittest.main()